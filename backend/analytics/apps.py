@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class AnalyticsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'analytics'
+
+    def ready(self):
+        from .signals import connect_product_sales_signals, connect_rollup_signals
+        connect_rollup_signals()
+        connect_product_sales_signals()
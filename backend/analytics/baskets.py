@@ -0,0 +1,244 @@
+"""
+Analyse des paniers : produits fréquemment achetés ensemble
+Les paires de produits des commandes terminées sont comptées dans une matrice
+creuse (table ProductPair). Le recalcul incrémental ne reprend que les
+commandes modifiées depuis la dernière exécution : leur ancien panier
+(CountedBasket) est décompté, le nouveau compté, puis seules les associations
+des produits concernés sont reclassées (support, confidence, lift).
+
+Approximation : support et lift dépendent aussi du nombre total de paniers et
+de la popularité de la suggestion, qui évoluent sans que les autres produits
+soient reclassés. Chaque association garde le nombre de paniers utilisé
+(total_baskets) ; dès que le total courant s'en écarte de plus de
+RERANK_DRIFT, tous les produits sont reclassés. Entre deux, support et lift
+peuvent donc dériver d'au plus cet écart relatif pour les produits non touchés
+"""
+from collections import Counter, defaultdict
+from itertools import combinations
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import CountedBasket, ProductAssociation, ProductPair, RefreshWatermark
+import logging
+
+logger = logging.getLogger(__name__)
+
+WATERMARK = 'basket_analysis'
+TOP_N = 10
+MIN_PAIR_BASKETS = 2          # Paires observées moins souvent : bruit
+MAX_BASKET_PRODUCTS = 40      # Au-delà (commande atelier, inventaire...) : paires ignorées
+BATCH_SIZE = 2000
+RERANK_DRIFT = 0.05           # Écart relatif du nombre de paniers déclenchant un reclassement complet
+
+CACHE_VERSION_KEY = 'basket_associations_version'
+CACHE_TIMEOUT = 60 * 60
+
+
+def basket_pairs(product_ids):
+    """Paires (a, b) avec a <= b d'un panier, diagonale comprise"""
+    products = sorted(set(product_ids))
+    pairs = [(product, product) for product in products]
+    if len(products) <= MAX_BASKET_PRODUCTS:
+        pairs.extend(combinations(products, 2))
+    return pairs
+
+
+class BasketAnalysisService:
+
+    @staticmethod
+    def _baskets(order_ids):
+        """{order_id: [produits]} des commandes terminées parmi `order_ids`"""
+        from orders.models import OrderItem
+
+        baskets = defaultdict(set)
+        items = OrderItem.objects.filter(order__status='completed', product__isnull=False)
+        if order_ids is not None:
+            items = items.filter(order_id__in=order_ids)
+        for order_id, product_id in items.values_list('order_id', 'product_id').order_by().iterator(chunk_size=5000):
+            baskets[order_id].add(product_id)
+        return {order_id: sorted(products) for order_id, products in baskets.items()}
+
+    @staticmethod
+    def _apply(delta):
+        """Ajoute les variations {(a, b): n} aux compteurs ProductPair"""
+        delta = {pair: change for pair, change in delta.items() if change}
+        if not delta:
+            return
+        firsts = {a for a, _ in delta}
+        current = {
+            (a, b): baskets
+            for a, b, baskets in ProductPair.objects.filter(product_a_id__in=firsts).values_list(
+                'product_a_id', 'product_b_id', 'baskets'
+            )
+            if (a, b) in delta
+        }
+        rows, emptied = [], []
+        for (a, b), change in delta.items():
+            total = current.get((a, b), 0) + change
+            if total > 0:
+                rows.append(ProductPair(product_a_id=a, product_b_id=b, baskets=total))
+            elif (a, b) in current:
+                emptied.append(Q(product_a_id=a, product_b_id=b))
+
+        ProductPair.objects.bulk_create(
+            rows, batch_size=BATCH_SIZE, update_conflicts=True,
+            unique_fields=['product_a', 'product_b'], update_fields=['baskets'],
+        )
+        for start in range(0, len(emptied), 500):
+            condition = Q()
+            for pair in emptied[start:start + 500]:
+                condition |= pair
+            ProductPair.objects.filter(condition).delete()
+
+    @staticmethod
+    def drifted(total):
+        """Vrai si des associations ont été classées avec un total de paniers trop éloigné de `total`"""
+        margin = total * RERANK_DRIFT
+        return ProductAssociation.objects.exclude(
+            total_baskets__gte=total - margin, total_baskets__lte=total + margin
+        ).exists()
+
+    @staticmethod
+    def rank(product_ids, now=None, total=None):
+        """Reclasse les associations des produits donnés"""
+        now = now or timezone.now()
+        product_ids = set(product_ids)
+        if total is None:
+            total = CountedBasket.objects.count()
+
+        pairs = ProductPair.objects.filter(
+            Q(product_a_id__in=product_ids) | Q(product_b_id__in=product_ids)
+        ).values_list('product_a_id', 'product_b_id', 'baskets')
+        together = defaultdict(dict)
+        involved = set()
+        for a, b, baskets in pairs:
+            if a == b:
+                continue
+            if a in product_ids:
+                together[a][b] = baskets
+            if b in product_ids:
+                together[b][a] = baskets
+            involved.update((a, b))
+        # Nombre de paniers de chaque produit (diagonale)
+        alone = dict(ProductPair.objects.filter(
+            product_a_id__in=involved | product_ids, product_b_id=F('product_a_id')
+        ).values_list('product_a_id', 'baskets'))
+
+        rows = []
+        for product, partners in together.items():
+            candidates = []
+            for partner, baskets in partners.items():
+                if baskets < MIN_PAIR_BASKETS or not alone.get(product) or not alone.get(partner):
+                    continue
+                confidence = baskets / alone[product]
+                lift = confidence / (alone[partner] / total)
+                if lift <= 1:
+                    continue
+                candidates.append((confidence, lift, baskets, partner))
+            candidates.sort(key=lambda item: (-item[0], -item[1], item[3]))
+            for position, (confidence, lift, baskets, partner) in enumerate(candidates[:TOP_N], start=1):
+                rows.append(ProductAssociation(
+                    product_id=product, recommended_id=partner, rank=position, baskets=baskets,
+                    support=round(baskets / total, 6), confidence=round(confidence, 4), lift=round(lift, 4),
+                    total_baskets=total, computed_at=now,
+                ))
+
+        ProductAssociation.objects.filter(product_id__in=product_ids).delete()
+        ProductAssociation.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+        return len(rows)
+
+    @staticmethod
+    def refresh(full=False):
+        """
+        Met à jour la matrice des paires et les associations
+        Retourne le nombre de commandes prises en compte
+        """
+        from orders.models import Order
+
+        started = timezone.now()
+        watermark = RefreshWatermark.objects.filter(name=WATERMARK).first()
+        incremental = not full and watermark is not None
+
+        with transaction.atomic():
+            if incremental:
+                changed = set(Order.objects.filter(updated_at__gte=watermark.last_run).values_list('id', flat=True))
+                deleted = set(CountedBasket.objects.exclude(
+                    order_id__in=Order.objects.values('id')
+                ).values_list('order_id', flat=True))
+                touched = changed | deleted
+                previous = dict(CountedBasket.objects.filter(order_id__in=touched).values_list('order_id', 'product_ids'))
+                baskets = BasketAnalysisService._baskets(changed)
+            else:
+                ProductPair.objects.all().delete()
+                CountedBasket.objects.all().delete()
+                ProductAssociation.objects.all().delete()
+                previous = {}
+                baskets = BasketAnalysisService._baskets(None)
+                touched = set(baskets)
+
+            delta = Counter()
+            for products in previous.values():
+                delta.subtract(basket_pairs(products))
+            for products in baskets.values():
+                delta.update(basket_pairs(products))
+            BasketAnalysisService._apply(delta)
+
+            CountedBasket.objects.filter(order_id__in=touched).delete()
+            CountedBasket.objects.bulk_create(
+                [CountedBasket(order_id=order_id, product_ids=products) for order_id, products in baskets.items()],
+                batch_size=BATCH_SIZE,
+            )
+
+            affected = {product for (a, b), change in delta.items() if change for product in (a, b)}
+            total = CountedBasket.objects.count()
+            if incremental and BasketAnalysisService.drifted(total):
+                # Support et lift des produits non touchés trop anciens : tout est reclassé
+                affected |= set(ProductPair.objects.filter(
+                    product_b_id=F('product_a_id')
+                ).values_list('product_a_id', flat=True))
+            associations = BasketAnalysisService.rank(affected, started, total) if affected else 0
+            RefreshWatermark.objects.update_or_create(name=WATERMARK, defaults={'last_run': started})
+
+        cache.set(CACHE_VERSION_KEY, started.timestamp(), None)
+        logger.info(
+            f"Analyse des paniers : {len(touched)} commande(s), {len(affected)} produit(s), "
+            f"{associations} association(s)"
+        )
+        return len(touched)
+
+    @staticmethod
+    def suggestions(cart, limit=5):
+        """
+        Suggestions pour un panier (une lecture indexée, résultat en cache)
+        [{'product_id', 'name', 'price_ttc', 'confidence', 'lift'}]
+        """
+        cart = sorted({int(product_id) for product_id in cart})
+        if not cart:
+            return []
+        key = f"basket_suggestions:{cache.get(CACHE_VERSION_KEY, 0)}:{','.join(map(str, cart))}:{limit}"
+        result = cache.get(key)
+        if result is not None:
+            return result
+
+        best = {}
+        for association in ProductAssociation.objects.filter(
+            product_id__in=cart, recommended__is_active=True
+        ).exclude(recommended_id__in=cart).select_related('recommended'):
+            current = best.get(association.recommended_id)
+            if current is None or association.confidence > current.confidence:
+                best[association.recommended_id] = association
+        ranked = sorted(best.values(), key=lambda item: (-item.confidence, -item.lift, item.recommended_id))
+        result = [
+            {
+                'product_id': association.recommended_id,
+                'name': association.recommended.name,
+                'reference': association.recommended.reference,
+                'price_ttc': float(association.recommended.price_ttc),
+                'confidence': association.confidence,
+                'lift': association.lift,
+            }
+            for association in ranked[:limit]
+        ]
+        cache.set(key, result, CACHE_TIMEOUT)
+        return result
@@ -0,0 +1,173 @@
+"""
+Prévision de la demande par produit et par magasin
+Les ventes des commandes terminées sont lues en une requête sous forme de
+matrice (produit x magasin x semaine), puis toutes les séries sont ajustées
+ensemble avec NumPy : saisonnalité mensuelle propre à chaque produit,
+rapprochée de celle du magasin quand le produit se vend peu, et niveau
+désaisonnalisé des dernières semaines. Le résultat est mis en cache tant
+qu'aucune commande n'a été créée ou modifiée, et reporté sur StoreStockConfig
+(demande prévue et facteur saisonnier utilisé par les transferts)
+"""
+from datetime import timedelta
+from django.core.cache import cache
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import TruncWeek
+from django.utils import timezone
+from .rollups import day_start, local_day
+from .timeseries import bucket_start
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+STORES = ['ville_avray', 'garches']
+HISTORY_WEEKS = 104
+RECENT_WEEKS = 12
+HORIZON_WEEKS = 4
+# Unités vendues à partir desquelles la saisonnalité propre du produit l'emporte sur celle du magasin
+SHRINKAGE = 20.0
+# Bornes du facteur saisonnier acceptées par la configuration des stocks
+SEASONAL_BOUNDS = (0.1, 5.0)
+
+CACHE_KEY = 'demand_forecast'
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def sales_fingerprint():
+    """Empreinte des commandes : change à chaque commande créée, modifiée ou supprimée"""
+    from orders.models import Order
+
+    state = Order.objects.aggregate(last=Max('updated_at'), count=Count('id'))
+    last = state['last'].isoformat() if state['last'] else '-'
+    return f"{last}:{state['count']}"
+
+
+class DemandForecastService:
+
+    @staticmethod
+    def sales_matrix(today=None):
+        """
+        Ventes hebdomadaires des HISTORY_WEEKS dernières semaines complètes
+        Retourne (ids produits, débuts de semaine, matrice produit x magasin x semaine)
+        """
+        from orders.models import OrderItem
+
+        current_week = bucket_start(today or timezone.localdate(), 'week')
+        first_week = current_week - timedelta(weeks=HISTORY_WEEKS)
+        weeks = [first_week + timedelta(weeks=index) for index in range(HISTORY_WEEKS)]
+
+        rows = list(OrderItem.objects.filter(
+            order__status='completed',
+            order__created_at__gte=day_start(first_week),
+            order__created_at__lt=day_start(current_week),
+            product__isnull=False,
+        ).annotate(
+            week=TruncWeek('order__created_at', tzinfo=timezone.get_current_timezone())
+        ).values_list('product_id', 'order__store', 'week').annotate(quantity=Sum('quantity')).order_by())
+
+        if not rows:
+            return np.array([], dtype=np.int64), weeks, np.zeros((0, len(STORES), HISTORY_WEEKS))
+
+        product_ids, store_names, week_starts, quantities = zip(*rows)
+        products, product_index = np.unique(np.array(product_ids, dtype=np.int64), return_inverse=True)
+        store_index = np.array([STORES.index(store) for store in store_names])
+        week_index = np.array([(local_day(week) - first_week).days // 7 for week in week_starts])
+
+        matrix = np.zeros((len(products), len(STORES), HISTORY_WEEKS))
+        np.add.at(matrix, (product_index, store_index, week_index), np.array(quantities, dtype=np.float64))
+        return products, weeks, matrix
+
+    @staticmethod
+    def fit(matrix, weeks, horizon=HORIZON_WEEKS):
+        """
+        Ajuste toutes les séries en une fois
+        Retourne (prévision produit x magasin x semaine à venir, facteur saisonnier
+        moyen sur l'horizon, débuts des semaines prévues)
+        """
+        future = [weeks[-1] + timedelta(weeks=index + 1) for index in range(horizon)]
+        months = np.array([week.month - 1 for week in weeks])
+        future_months = np.array([week.month - 1 for week in future])
+        if not len(matrix):
+            empty = np.zeros(matrix.shape[:2] + (horizon,))
+            return empty, np.ones(matrix.shape[:2]), future
+
+        # Demande hebdomadaire moyenne par mois de l'année, rapportée à la moyenne globale
+        one_hot = np.eye(12)[months]                      # semaine x mois
+        weeks_per_month = one_hot.sum(axis=0)
+        observed = weeks_per_month > 0
+
+        def seasonality(series):
+            by_month = (series @ one_hot) / np.maximum(weeks_per_month, 1)
+            mean = series.mean(axis=-1, keepdims=True)
+            index = np.divide(by_month, mean, out=np.ones_like(by_month), where=mean > 0)
+            index[..., ~observed] = 1.0
+            return index
+
+        own = seasonality(matrix)                         # produit x magasin x mois
+        pooled = seasonality(matrix.sum(axis=0))          # magasin x mois
+        volume = matrix.sum(axis=-1, keepdims=True)
+        weight = volume / (volume + SHRINKAGE)
+        seasonal = weight * own + (1 - weight) * pooled[np.newaxis]
+
+        # Niveau : moyenne désaisonnalisée des dernières semaines
+        recent = matrix[..., -RECENT_WEEKS:]
+        recent_index = np.maximum(seasonal[..., months[-RECENT_WEEKS:]], SEASONAL_BOUNDS[0])
+        level = (recent / recent_index).mean(axis=-1)
+
+        future_index = seasonal[..., future_months]
+        forecast = level[..., np.newaxis] * future_index
+        factor = np.clip(future_index.mean(axis=-1), *SEASONAL_BOUNDS)
+        return forecast, factor, future
+
+    @staticmethod
+    def forecast(today=None):
+        """
+        Prévisions de tous les produits (cache invalidé par toute modification de commande)
+        {'products': ids, 'stores', 'weeks': semaines prévues, 'forecast', 'seasonal_factor'}
+        """
+        key = f'{CACHE_KEY}:{sales_fingerprint()}:{today or timezone.localdate()}'
+        result = cache.get(key)
+        if result is not None:
+            return result
+
+        products, weeks, matrix = DemandForecastService.sales_matrix(today)
+        forecast, factor, future = DemandForecastService.fit(matrix, weeks)
+        result = {
+            'products': products,
+            'stores': STORES,
+            'weeks': future,
+            'forecast': forecast,
+            'seasonal_factor': factor,
+        }
+        cache.set(key, result, CACHE_TIMEOUT)
+        return result
+
+    @staticmethod
+    def refresh(today=None):
+        """
+        Reporte la demande prévue et le facteur saisonnier sur les configurations
+        de stock actives ; retourne le nombre de configurations mises à jour
+        """
+        from suppliers.models_extended import StoreStockConfig
+
+        result = DemandForecastService.forecast(today)
+        rows = {product_id: index for index, product_id in enumerate(result['products'].tolist())}
+        demand = result['forecast'].sum(axis=-1)
+        now = timezone.now()
+
+        configs = list(StoreStockConfig.objects.filter(is_active=True).only('id', 'product_id', 'store'))
+        for config in configs:
+            row = rows.get(config.product_id)
+            if row is None or config.store not in STORES:
+                config.forecast_demand, config.seasonal_factor = 0.0, 1.0
+            else:
+                column = STORES.index(config.store)
+                config.forecast_demand = round(float(demand[row, column]), 2)
+                config.seasonal_factor = round(float(result['seasonal_factor'][row, column]), 2)
+            config.forecast_updated_at = now
+
+        StoreStockConfig.objects.bulk_update(
+            configs, ['forecast_demand', 'seasonal_factor', 'forecast_updated_at'], batch_size=1000
+        )
+        logger.info(f"Prévision de la demande : {len(configs)} configuration(s) mise(s) à jour")
+        return len(configs)
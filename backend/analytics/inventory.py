@@ -0,0 +1,147 @@
+"""
+Analyse des stocks par produit et par magasin (table InventoryClassification)
+Ventes des 12 derniers mois lues en requêtes groupées, puis calculs NumPy
+pour tous les produits à la fois :
+  ABC            : part cumulée du chiffre d'affaires du magasin (80 % / 95 %)
+  XYZ            : coefficient de variation des ventes mensuelles (0,5 / 1,0)
+  rotation       : unités vendues sur 12 mois / stock actuel
+  couverture     : jours de ventes couverts par le stock actuel
+  stock dormant  : stock positif sans vente depuis DEAD_STOCK_DAYS jours
+"""
+from datetime import timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from .models import InventoryClassification
+from .rollups import day_start, local_day
+from .timeseries import bucket_starts, last_buckets
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+STORES = ['ville_avray', 'garches']
+STOCK_FIELDS = {'ville_avray': 'stock_ville_avray', 'garches': 'stock_garches'}
+MONTHS = 12
+ABC_THRESHOLDS = (0.80, 0.95)
+XYZ_THRESHOLDS = (0.5, 1.0)
+DEAD_STOCK_DAYS = 180
+BATCH_SIZE = 2000
+
+
+def abc_classes(revenue):
+    """Classe ABC de chaque produit selon la part cumulée du CA (tri décroissant)"""
+    classes = np.full(len(revenue), 'C', dtype='<U1')
+    total = revenue.sum()
+    if not total:
+        return classes
+    order = np.argsort(-revenue, kind='stable')
+    # Part cumulée avant le produit : le produit qui franchit le seuil reste dans la classe
+    before = (np.cumsum(revenue[order]) - revenue[order]) / total
+    ranked = np.where(before < ABC_THRESHOLDS[0], 'A', np.where(before < ABC_THRESHOLDS[1], 'B', 'C'))
+    classes[order] = ranked
+    classes[revenue <= 0] = 'C'
+    return classes
+
+
+def xyz_classes(monthly):
+    """Classe XYZ et coefficient de variation (NaN sans vente) des séries mensuelles"""
+    mean = monthly.mean(axis=-1)
+    cv = np.divide(monthly.std(axis=-1), mean, out=np.full(mean.shape, np.nan), where=mean > 0)
+    classes = np.where(cv < XYZ_THRESHOLDS[0], 'X', np.where(cv < XYZ_THRESHOLDS[1], 'Y', 'Z'))
+    classes[np.isnan(cv)] = 'Z'
+    return classes, cv
+
+
+def optional(value, digits=2):
+    return None if np.isnan(value) else round(float(value), digits)
+
+
+class InventoryAnalyticsService:
+
+    @staticmethod
+    def refresh(today=None):
+        """Recalcule l'analyse de tous les produits actifs ; retourne le nombre de lignes"""
+        from orders.models import OrderItem
+        from products.models import Product
+
+        today = today or timezone.localdate()
+        now = timezone.now()
+        months = bucket_starts(last_buckets(MONTHS, 'month', today)[0], today, 'month')
+        month_index = {month: index for index, month in enumerate(months)}
+
+        products = list(Product.objects.filter(is_active=True).values_list(
+            'id', 'price_ht', 'alert_stock', *STOCK_FIELDS.values()
+        ).order_by('id'))
+        if not products:
+            InventoryClassification.objects.all().delete()
+            return 0
+        ids = np.array([row[0] for row in products], dtype=np.int64)
+        price = np.array([float(row[1] or 0) for row in products])
+        alert = np.array([row[2] or 0 for row in products], dtype=np.int64)
+        stock = np.array([row[3:] for row in products], dtype=np.int64)    # produit x magasin
+
+        # Ventes mensuelles des commandes terminées (une requête)
+        units = np.zeros((len(ids), len(STORES), len(months)))
+        revenue = np.zeros((len(ids), len(STORES)))
+        sales = OrderItem.objects.filter(
+            order__status='completed',
+            order__created_at__gte=day_start(months[0]),
+            product_id__in=Product.objects.filter(is_active=True).values('id'),
+        ).annotate(
+            month=TruncMonth('order__created_at', tzinfo=timezone.get_current_timezone())
+        ).values_list('product_id', 'order__store', 'month').annotate(
+            quantity=Sum('quantity'), total=Sum('subtotal_ttc')
+        ).order_by()
+        for product_id, store, month, quantity, total in sales:
+            row = np.searchsorted(ids, product_id)
+            column = STORES.index(store)
+            units[row, column, month_index[local_day(month)]] += quantity
+            revenue[row, column] += float(total or 0)
+
+        # Dernière vente (tout l'historique)
+        last_sale = {}
+        for product_id, store, last in OrderItem.objects.filter(
+            order__status='completed', product__is_active=True
+        ).values_list('product_id', 'order__store').annotate(last=Max('order__created_at')).order_by():
+            last_sale[(product_id, store)] = last
+        dead_before = day_start(today - timedelta(days=DEAD_STOCK_DAYS))
+
+        rows = []
+        for column, store in enumerate(STORES):
+            store_revenue = revenue[:, column]
+            abc = abc_classes(store_revenue)
+            xyz, cv = xyz_classes(units[:, column, :])
+            sold = units[:, column, :].sum(axis=-1)
+            store_stock = stock[:, column]
+            total = store_revenue.sum()
+            share = store_revenue / total * 100 if total else np.zeros(len(ids))
+            turnover = np.divide(sold, store_stock, out=np.full(len(ids), np.nan), where=store_stock > 0)
+            daily = sold / (len(months) * 30.4)
+            cover = np.divide(np.maximum(store_stock, 0), daily, out=np.full(len(ids), np.nan), where=daily > 0)
+            status = np.where(store_stock <= 0, 'out', np.where(store_stock <= alert, 'low', 'ok'))
+
+            for index, product_id in enumerate(ids.tolist()):
+                last = last_sale.get((product_id, store))
+                rows.append(InventoryClassification(
+                    product_id=product_id, store=store,
+                    abc_class=abc[index], xyz_class=xyz[index],
+                    revenue=Decimal(str(round(store_revenue[index], 2))),
+                    revenue_share=Decimal(str(round(share[index], 3))),
+                    units_sold=int(sold[index]), demand_cv=optional(cv[index], 3),
+                    stock=int(store_stock[index]),
+                    stock_value=Decimal(str(round(max(int(store_stock[index]), 0) * price[index], 2))),
+                    stock_status=status[index],
+                    turnover=optional(turnover[index]), days_of_cover=optional(cover[index], 1),
+                    last_sale=last,
+                    is_dead_stock=bool(store_stock[index] > 0 and (last is None or last < dead_before)),
+                    computed_at=now,
+                ))
+
+        with transaction.atomic():
+            InventoryClassification.objects.all().delete()
+            InventoryClassification.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+        logger.info(f"Analyse des stocks : {len(rows)} ligne(s) recalculée(s)")
+        return len(rows)
@@ -0,0 +1,60 @@
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+from analytics.rollups import DashboardRollupService, local_day
+
+
+def parse_day(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f'Date invalide : {value} (attendu AAAA-MM-JJ)')
+
+
+def first_activity_day():
+    """Premier jour ayant une commande, un client, une réparation, un devis ou un rendez-vous"""
+    from orders.models import Order
+    from clients.models import Client
+    from repairs.models import Repair
+    from quotes.models import Quote
+    from appointments.models import Appointment
+
+    candidates = [
+        Order.objects.aggregate(first=Min('created_at'))['first'],
+        Client.objects.aggregate(first=Min('created_at'))['first'],
+        Repair.objects.aggregate(first=Min('created_at'))['first'],
+        Quote.objects.aggregate(first=Min('created_at'))['first'],
+        Appointment.objects.aggregate(first=Min('appointment_date'))['first'],
+    ]
+    days = [local_day(value) for value in candidates if value is not None]
+    return min(days) if days else None
+
+
+class Command(BaseCommand):
+    help = "Recalcule les statistiques journalières du dashboard sur l'historique"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', help='Premier jour (défaut : première activité)')
+        parser.add_argument('--to', dest='date_to', help="Dernier jour inclus (défaut : aujourd'hui)")
+        parser.add_argument('--chunk-days', type=int, default=31, help='Jours recalculés par lot')
+
+    def handle(self, *args, **options):
+        date_to = parse_day(options['date_to']) if options['date_to'] else timezone.localdate()
+        date_from = parse_day(options['date_from']) if options['date_from'] else first_activity_day()
+        if date_from is None:
+            self.stdout.write('Aucune donnée à agréger')
+            return
+        if date_from > date_to:
+            raise CommandError('--from doit précéder --to')
+
+        chunk = timedelta(days=max(options['chunk_days'], 1))
+        start, rows = date_from, 0
+        while start <= date_to:
+            end = min(start + chunk - timedelta(days=1), date_to)
+            rows += DashboardRollupService.refresh(start, end)
+            start = end + timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{rows} jour(s) agrégé(s) du {date_from} au {date_to}'
+        ))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from analytics.forecasting import DemandForecastService
+
+
+class Command(BaseCommand):
+    help = "Prévoit la demande de tous les produits et met à jour les configurations de stock"
+
+    def handle(self, *args, **options):
+        updated = DemandForecastService.refresh()
+        self.stdout.write(self.style.SUCCESS(f'{updated} configuration(s) de stock mise(s) à jour'))
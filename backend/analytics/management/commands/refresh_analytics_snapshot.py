@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from analytics.snapshot import AnalyticsSnapshotService, TABLES
+
+
+class Command(BaseCommand):
+    help = "Met à jour l'instantané colonnaire des rapports (lignes modifiées depuis la dernière exécution)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Reconstruit l'instantané complet")
+        parser.add_argument(
+            '--table', action='append', dest='tables',
+            help=f"Table à mettre à jour (répétable) : {', '.join(TABLES)}"
+        )
+
+    def handle(self, *args, **options):
+        tables = options['tables'] or list(TABLES)
+        unknown = [table for table in tables if table not in TABLES]
+        if unknown:
+            raise CommandError(f"Table(s) inconnue(s) : {', '.join(unknown)}")
+
+        result = AnalyticsSnapshotService.refresh(tables, full=options['full'])
+        for table, rows in result.items():
+            self.stdout.write(f'{table} : {rows} ligne(s) mise(s) à jour')
+        self.stdout.write(self.style.SUCCESS('Instantané à jour'))
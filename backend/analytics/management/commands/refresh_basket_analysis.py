@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from analytics.baskets import BasketAnalysisService
+
+
+class Command(BaseCommand):
+    help = "Met à jour les produits fréquemment achetés ensemble (commandes modifiées depuis la dernière exécution)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Recompte tous les paniers")
+
+    def handle(self, *args, **options):
+        orders = BasketAnalysisService.refresh(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(f'{orders} commande(s) prise(s) en compte'))
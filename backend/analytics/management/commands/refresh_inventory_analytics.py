@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from analytics.inventory import InventoryAnalyticsService
+
+
+class Command(BaseCommand):
+    help = "Recalcule l'analyse des stocks (ABC/XYZ, rotation, couverture, stock dormant)"
+
+    def handle(self, *args, **options):
+        rows = InventoryAnalyticsService.refresh()
+        self.stdout.write(self.style.SUCCESS(f'{rows} ligne(s) produit/magasin recalculée(s)'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from analytics.product_sales import ProductSalesService
+
+
+class Command(BaseCommand):
+    help = "Met à jour les ventes mensuelles par produit et les classements (mois modifiés ou ayant perdu une commande depuis la dernière exécution)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help="Recalcule tout l'historique"
+        )
+
+    def handle(self, *args, **options):
+        months = ProductSalesService.refresh(full=options['full'])
+        if not months:
+            self.stdout.write('Aucun mois à recalculer')
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(months)} mois recalculé(s) du {months[0]:%Y-%m} au {months[-1]:%Y-%m}'
+        ))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from analytics.segmentation import ClientSegmentationService
+
+
+class Command(BaseCommand):
+    help = "Recalcule la segmentation RFM des clients (à planifier chaque nuit)"
+
+    def handle(self, *args, **options):
+        counts = ClientSegmentationService.refresh()
+        for segment, count in sorted(counts.items()):
+            self.stdout.write(f'{segment} : {count}')
+        self.stdout.write(self.style.SUCCESS(f'{sum(counts.values())} client(s) segmenté(s)'))
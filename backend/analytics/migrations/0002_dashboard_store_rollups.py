@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dashboardstats',
+            name='completed_orders',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='dashboardstats',
+            name='orders_garches',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='dashboardstats',
+            name='orders_ville_avray',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='dashboardstats',
+            name='revenue_garches',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='dashboardstats',
+            name='revenue_ville_avray',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_product_created_at_id_index'),
+        ('analytics', '0002_dashboard_store_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RefreshWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_run', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'refresh_watermarks',
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='topproduct',
+            name='top_product_period_163931_idx',
+        ),
+        migrations.AlterUniqueTogether(
+            name='productsales',
+            unique_together=set(),
+        ),
+        migrations.AlterUniqueTogether(
+            name='topproduct',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='productsales',
+            name='store',
+            field=models.CharField(choices=[('ville_avray', "Ville d'Avray"), ('garches', 'Garches')], default='garches', max_length=20),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='topproduct',
+            name='store',
+            field=models.CharField(blank=True, choices=[('ville_avray', "Ville d'Avray"), ('garches', 'Garches')], default='', max_length=20),
+        ),
+        migrations.AlterUniqueTogether(
+            name='productsales',
+            unique_together={('product', 'store', 'year', 'month')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='topproduct',
+            unique_together={('period', 'date', 'store', 'rank')},
+        ),
+        migrations.AddIndex(
+            model_name='topproduct',
+            index=models.Index(fields=['period', 'date', 'store', 'rank'], name='top_product_period_b6c442_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0003_client_created_at_id_index'),
+        ('analytics', '0003_product_sales_refresh'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('segment', models.CharField(choices=[('champion', 'Champions'), ('loyal', 'Fidèles'), ('recent', 'Nouveaux acheteurs'), ('regular', 'Réguliers'), ('at_risk', 'À risque'), ('lost', 'Perdus'), ('prospect', 'Sans achat')], max_length=20)),
+                ('recency_days', models.IntegerField(blank=True, null=True)),
+                ('frequency', models.IntegerField(default=0)),
+                ('monetary', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('last_activity', models.DateTimeField(blank=True, null=True)),
+                ('r_score', models.PositiveSmallIntegerField(default=0)),
+                ('f_score', models.PositiveSmallIntegerField(default=0)),
+                ('m_score', models.PositiveSmallIntegerField(default=0)),
+                ('computed_at', models.DateTimeField()),
+                ('client', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='segment', to='clients.client')),
+            ],
+            options={
+                'db_table': 'client_segments',
+                'indexes': [models.Index(fields=['segment', 'monetary'], name='client_segm_segment_e8d785_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_product_created_at_id_index'),
+        ('analytics', '0004_client_segments'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryClassification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('store', models.CharField(choices=[('ville_avray', "Ville d'Avray"), ('garches', 'Garches')], max_length=20)),
+                ('abc_class', models.CharField(choices=[('A', 'A - 80 % du CA'), ('B', 'B - 15 % suivants'), ('C', 'C - reste')], max_length=1)),
+                ('xyz_class', models.CharField(choices=[('X', 'X - demande régulière'), ('Y', 'Y - demande variable'), ('Z', 'Z - demande irrégulière')], max_length=1)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('revenue_share', models.DecimalField(decimal_places=3, default=0, max_digits=6)),
+                ('units_sold', models.IntegerField(default=0)),
+                ('demand_cv', models.FloatField(blank=True, null=True)),
+                ('stock', models.IntegerField(default=0)),
+                ('stock_value', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('stock_status', models.CharField(choices=[('out', 'Rupture'), ('low', 'Stock faible'), ('ok', 'Normal')], max_length=10)),
+                ('turnover', models.FloatField(blank=True, null=True)),
+                ('days_of_cover', models.FloatField(blank=True, null=True)),
+                ('last_sale', models.DateTimeField(blank=True, null=True)),
+                ('is_dead_stock', models.BooleanField(default=False)),
+                ('computed_at', models.DateTimeField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory_classifications', to='products.product')),
+            ],
+            options={
+                'db_table': 'inventory_classifications',
+                'ordering': ['store', '-revenue'],
+                'indexes': [models.Index(fields=['store', 'abc_class', 'xyz_class'], name='inventory_c_store_bf8dfa_idx'), models.Index(fields=['store', 'is_dead_stock'], name='inventory_c_store_ab9117_idx'), models.Index(fields=['store', 'stock_status'], name='inventory_c_store_59a9ca_idx')],
+                'unique_together': {('product', 'store')},
+            },
+        ),
+    ]
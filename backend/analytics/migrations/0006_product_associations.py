@@ -0,0 +1,59 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_product_created_at_id_index'),
+        ('analytics', '0005_inventory_classification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CountedBasket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_id', models.IntegerField(unique=True)),
+                ('product_ids', models.JSONField(default=list)),
+            ],
+            options={
+                'db_table': 'counted_baskets',
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductPair',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('baskets', models.IntegerField(default=0)),
+                ('product_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.product')),
+                ('product_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.product')),
+            ],
+            options={
+                'db_table': 'product_pairs',
+                'indexes': [models.Index(fields=['product_b'], name='product_pai_product_23cdae_idx')],
+                'unique_together': {('product_a', 'product_b')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductAssociation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('baskets', models.IntegerField(default=0)),
+                ('support', models.FloatField(default=0)),
+                ('confidence', models.FloatField(default=0)),
+                ('lift', models.FloatField(default=0)),
+                ('computed_at', models.DateTimeField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='associations', to='products.product')),
+                ('recommended', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.product')),
+            ],
+            options={
+                'db_table': 'product_associations',
+                'ordering': ['product', 'rank'],
+                'unique_together': {('product', 'rank')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0007_product_sales_tombstones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productassociation',
+            name='total_baskets',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -27,6 +27,13 @@ class DashboardStats(models.Model):
     total_orders = models.IntegerField(default=0)
     total_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     average_order_value = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    completed_orders = models.IntegerField(default=0)
+    
+    # Ventes par magasin (commandes terminées)
+    revenue_ville_avray = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    revenue_garches = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    orders_ville_avray = models.IntegerField(default=0)
+    orders_garches = models.IntegerField(default=0)
     
     # Statistiques clients
     new_clients = models.IntegerField(default=0)
@@ -71,11 +78,18 @@ class DashboardStats(models.Model):
         return f"Stats {self.period} - {self.date}"
 
 
+STORE_CHOICES = [
+    ('ville_avray', 'Ville d\'Avray'),
+    ('garches', 'Garches'),
+]
+
+
 class ProductSales(models.Model):
     """
-    Statistiques de ventes par produit
+    Statistiques de ventes par produit, magasin et mois (commandes terminées)
     """
     product = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='sales_stats')
+    store = models.CharField(max_length=20, choices=STORE_CHOICES)
     
     # Période
     date = models.DateField()
@@ -97,7 +111,7 @@ class ProductSales(models.Model):
     
     class Meta:
         db_table = 'product_sales'
-        unique_together = ['product', 'year', 'month']
+        unique_together = ['product', 'store', 'year', 'month']
         indexes = [
             models.Index(fields=['product', 'date']),
             models.Index(fields=['year', 'month']),
@@ -105,7 +119,7 @@ class ProductSales(models.Model):
         ]
     
     def __str__(self):
-        return f"Ventes {self.product.name} - {self.year}-{self.month:02d}"
+        return f"Ventes {self.product.name} ({self.store}) - {self.year}-{self.month:02d}"
 
 
 class TopProduct(models.Model):
@@ -114,8 +128,9 @@ class TopProduct(models.Model):
     """
     product = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='top_rankings')
     
-    # Période et rang
+    # Période et rang (store vide : tous magasins confondus)
     period = models.CharField(max_length=20, choices=DashboardStats.PERIOD_CHOICES)
+    store = models.CharField(max_length=20, choices=STORE_CHOICES, blank=True, default='')
     rank = models.IntegerField()
     date = models.DateField()
     
@@ -128,11 +143,208 @@ class TopProduct(models.Model):
     
     class Meta:
         db_table = 'top_products'
-        unique_together = ['period', 'date', 'rank']
+        unique_together = ['period', 'date', 'store', 'rank']
         indexes = [
-            models.Index(fields=['period', 'date', 'rank']),
+            models.Index(fields=['period', 'date', 'store', 'rank']),
             models.Index(fields=['product']),
         ]
     
     def __str__(self):
         return f"Top #{self.rank} {self.product.name} ({self.period})"
+
+
+class RefreshWatermark(models.Model):
+    """
+    Date de la dernière exécution d'un recalcul incrémental
+    Le recalcul suivant ne traite que les données modifiées depuis
+    """
+    name = models.CharField(max_length=50, unique=True)
+    last_run = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'refresh_watermarks'
+    
+    def __str__(self):
+        return f"{self.name} - {self.last_run}"
+
+
+class ProductSalesTombstone(models.Model):
+    """
+    Mois (premier jour) d'une commande supprimée, à recalculer par le
+    prochain recalcul incrémental des ventes produits
+    """
+    date = models.DateField(unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'product_sales_tombstones'
+    
+    def __str__(self):
+        return f"Ventes à recalculer - {self.date:%Y-%m}"
+
+
+class ClientSegment(models.Model):
+    """
+    Segment RFM (récence, fréquence, montant) de chaque client
+    Recalculé en masse par ClientSegmentationService (nuit ou à la demande)
+    """
+    SEGMENT_CHOICES = [
+        ('champion', 'Champions'),
+        ('loyal', 'Fidèles'),
+        ('recent', 'Nouveaux acheteurs'),
+        ('regular', 'Réguliers'),
+        ('at_risk', 'À risque'),
+        ('lost', 'Perdus'),
+        ('prospect', 'Sans achat'),
+    ]
+    
+    client = models.OneToOneField(Client, on_delete=models.CASCADE, related_name='segment')
+    segment = models.CharField(max_length=20, choices=SEGMENT_CHOICES)
+    
+    # Valeurs brutes (commandes terminées + réparations)
+    recency_days = models.IntegerField(null=True, blank=True)  # Jours depuis la dernière visite
+    frequency = models.IntegerField(default=0)
+    monetary = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    last_activity = models.DateTimeField(null=True, blank=True)
+    
+    # Scores par quintile (1 à 5, 0 sans achat)
+    r_score = models.PositiveSmallIntegerField(default=0)
+    f_score = models.PositiveSmallIntegerField(default=0)
+    m_score = models.PositiveSmallIntegerField(default=0)
+    
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'client_segments'
+        indexes = [
+            models.Index(fields=['segment', 'monetary']),
+        ]
+    
+    def __str__(self):
+        return f"{self.client} - {self.get_segment_display()}"
+
+
+class InventoryClassification(models.Model):
+    """
+    Analyse de stock par produit et magasin (12 derniers mois)
+    ABC : part du chiffre d'affaires, XYZ : régularité de la demande mensuelle
+    Recalculée en masse par InventoryAnalyticsService
+    """
+    ABC_CHOICES = [
+        ('A', 'A - 80 % du CA'),
+        ('B', 'B - 15 % suivants'),
+        ('C', 'C - reste'),
+    ]
+    
+    XYZ_CHOICES = [
+        ('X', 'X - demande régulière'),
+        ('Y', 'Y - demande variable'),
+        ('Z', 'Z - demande irrégulière'),
+    ]
+    
+    STOCK_STATUS_CHOICES = [
+        ('out', 'Rupture'),
+        ('low', 'Stock faible'),
+        ('ok', 'Normal'),
+    ]
+    
+    product = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='inventory_classifications')
+    store = models.CharField(max_length=20, choices=STORE_CHOICES)
+    
+    # Classement
+    abc_class = models.CharField(max_length=1, choices=ABC_CHOICES)
+    xyz_class = models.CharField(max_length=1, choices=XYZ_CHOICES)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    revenue_share = models.DecimalField(max_digits=6, decimal_places=3, default=0)  # % du CA du magasin
+    units_sold = models.IntegerField(default=0)
+    demand_cv = models.FloatField(null=True, blank=True)  # Coefficient de variation mensuel
+    
+    # Stock
+    stock = models.IntegerField(default=0)
+    stock_value = models.DecimalField(max_digits=12, decimal_places=2, default=0)  # Au prix HT
+    stock_status = models.CharField(max_length=10, choices=STOCK_STATUS_CHOICES)
+    turnover = models.FloatField(null=True, blank=True)  # Ventes annuelles / stock
+    days_of_cover = models.FloatField(null=True, blank=True)
+    last_sale = models.DateTimeField(null=True, blank=True)
+    is_dead_stock = models.BooleanField(default=False)
+    
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'inventory_classifications'
+        unique_together = ['product', 'store']
+        ordering = ['store', '-revenue']
+        indexes = [
+            models.Index(fields=['store', 'abc_class', 'xyz_class']),
+            models.Index(fields=['store', 'is_dead_stock']),
+            models.Index(fields=['store', 'stock_status']),
+        ]
+    
+    def __str__(self):
+        return f"{self.product.name} ({self.store}) : {self.abc_class}{self.xyz_class}"
+
+
+class ProductPair(models.Model):
+    """
+    Nombre de paniers (commandes terminées) contenant deux produits
+    product_a < product_b ; la diagonale (product_a == product_b) compte les
+    paniers contenant le produit
+    """
+    product_a = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='+')
+    product_b = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='+')
+    baskets = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'product_pairs'
+        unique_together = ['product_a', 'product_b']
+        indexes = [
+            models.Index(fields=['product_b']),
+        ]
+    
+    def __str__(self):
+        return f"{self.product_a_id} + {self.product_b_id} : {self.baskets}"
+
+
+class CountedBasket(models.Model):
+    """
+    Produits d'une commande déjà comptés dans ProductPair
+    Identifiant de commande sans clé étrangère : une commande supprimée doit
+    encore pouvoir être décomptée
+    """
+    order_id = models.IntegerField(unique=True)
+    product_ids = models.JSONField(default=list)
+    
+    class Meta:
+        db_table = 'counted_baskets'
+    
+    def __str__(self):
+        return f"Panier {self.order_id} ({len(self.product_ids)} produits)"
+
+
+class ProductAssociation(models.Model):
+    """
+    Produits fréquemment achetés ensemble (top N par produit)
+    support = part des paniers contenant les deux produits,
+    confidence = part des paniers du produit contenant aussi la suggestion,
+    lift = confidence rapportée à la popularité de la suggestion
+    total_baskets = nombre de paniers lors du classement (dénominateur du
+    support), pour détecter la dérive entre deux reclassements complets
+    """
+    product = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='associations')
+    recommended = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    baskets = models.IntegerField(default=0)
+    support = models.FloatField(default=0)
+    confidence = models.FloatField(default=0)
+    lift = models.FloatField(default=0)
+    total_baskets = models.IntegerField(default=0)
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'product_associations'
+        unique_together = ['product', 'rank']
+        ordering = ['product', 'rank']
+    
+    def __str__(self):
+        return f"{self.product_id} -> {self.recommended_id} (#{self.rank})"
@@ -0,0 +1,182 @@
+"""
+Ventes mensuelles par produit (table ProductSales) et classements (TopProduct)
+Une ligne par (produit, magasin, mois en heure de Paris) calculée à partir des
+lignes des commandes terminées. Le recalcul incrémental ne reprend que les mois
+contenant une commande modifiée depuis la dernière exécution, ainsi que ceux
+d'une commande supprimée (ProductSalesTombstone, posé par signal post_delete) ;
+les classements mensuels et annuels de ces mois sont reconstruits à partir de
+ProductSales
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from .models import ProductSales, ProductSalesTombstone, RefreshWatermark, TopProduct
+from .rollups import day_start, local_day
+import logging
+
+logger = logging.getLogger(__name__)
+
+WATERMARK = 'product_sales'
+MONTHLY = 'monthly'
+YEARLY = 'yearly'
+TOP_N = 20
+ALL_STORES = ''
+
+SALES_FIELDS = ['date', 'quantity_sold', 'revenue', 'average_price', 'updated_at']
+
+
+def month_range(month):
+    """Bornes [début, fin) du mois en heure locale"""
+    following = (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return day_start(month), day_start(following)
+
+
+class ProductSalesService:
+
+    @staticmethod
+    def mark_deleted(*values):
+        """Mémorise le mois des commandes supprimées (datetimes ou dates, None ignorés)"""
+        months = {local_day(value).replace(day=1) for value in values if value is not None}
+        if months:
+            ProductSalesTombstone.objects.bulk_create(
+                [ProductSalesTombstone(date=month) for month in months], ignore_conflicts=True
+            )
+
+    @staticmethod
+    def affected_months(since=None):
+        """
+        Mois (premier jour) contenant une commande modifiée depuis `since`
+        Tous les mois ayant une commande si `since` est None
+        """
+        from orders.models import Order
+
+        orders = Order.objects.all()
+        if since is not None:
+            orders = orders.filter(updated_at__gte=since)
+        months = orders.annotate(
+            month=TruncMonth('created_at', tzinfo=timezone.get_current_timezone())
+        ).values_list('month', flat=True).distinct().order_by()
+        return sorted({local_day(month) for month in months})
+
+    @staticmethod
+    def compute(month):
+        """{(product_id, store): {'quantity_sold', 'revenue'}} des commandes terminées du mois"""
+        from orders.models import OrderItem
+
+        start, end = month_range(month)
+        rows = OrderItem.objects.filter(
+            order__status='completed',
+            order__created_at__gte=start,
+            order__created_at__lt=end,
+            product__isnull=False,
+        ).values('product_id', 'order__store').annotate(
+            quantity_sold=Sum('quantity'),
+            revenue=Sum('subtotal_ttc'),
+        ).order_by()
+        return {
+            (row['product_id'], row['order__store']): {
+                'quantity_sold': row['quantity_sold'] or 0,
+                'revenue': row['revenue'] or Decimal('0'),
+            }
+            for row in rows
+        }
+
+    @staticmethod
+    def refresh_month(month):
+        """Recalcule les lignes ProductSales d'un mois (lignes sans vente supprimées)"""
+        sales = ProductSalesService.compute(month)
+        rows = []
+        for (product_id, store), values in sales.items():
+            quantity = values['quantity_sold']
+            average = (values['revenue'] / quantity).quantize(Decimal('0.01')) if quantity else Decimal('0')
+            rows.append(ProductSales(
+                product_id=product_id, store=store, date=month, year=month.year, month=month.month,
+                average_price=average, **values
+            ))
+
+        with transaction.atomic():
+            if rows:
+                ProductSales.objects.bulk_create(
+                    rows, update_conflicts=True, unique_fields=['product', 'store', 'year', 'month'],
+                    update_fields=SALES_FIELDS,
+                )
+            existing = ProductSales.objects.filter(year=month.year, month=month.month).values_list(
+                'id', 'product_id', 'store'
+            )
+            stale = [pk for pk, product_id, store in existing if (product_id, store) not in sales]
+            if stale:
+                ProductSales.objects.filter(pk__in=stale).delete()
+        return len(rows)
+
+    @staticmethod
+    def rank(period, period_date, sales):
+        """Reconstruit les classements d'une période (par magasin et tous magasins)"""
+        by_store = {ALL_STORES: {}}
+        for row in sales.values('product_id', 'store').annotate(
+            quantity=Sum('quantity_sold'), revenue=Sum('revenue')
+        ).order_by():
+            for store in (row['store'], ALL_STORES):
+                current = by_store.setdefault(store, {}).setdefault(
+                    row['product_id'], {'product_id': row['product_id'], 'quantity': 0, 'revenue': Decimal('0')}
+                )
+                current['quantity'] += row['quantity']
+                current['revenue'] += row['revenue']
+
+        rankings = []
+        for store, products in by_store.items():
+            rows = list(products.values())
+            total = sum((row['revenue'] for row in rows), Decimal('0'))
+            rows.sort(key=lambda row: (-row['revenue'], -row['quantity'], row['product_id']))
+            for position, row in enumerate(rows[:TOP_N], start=1):
+                share = (row['revenue'] * 100 / total).quantize(Decimal('0.01')) if total else Decimal('0')
+                rankings.append(TopProduct(
+                    product_id=row['product_id'], period=period, date=period_date, store=store,
+                    rank=position, total_sales=row['quantity'], total_revenue=row['revenue'],
+                    market_share=share,
+                ))
+
+        with transaction.atomic():
+            TopProduct.objects.filter(period=period, date=period_date).delete()
+            TopProduct.objects.bulk_create(rankings)
+        return len(rankings)
+
+    @staticmethod
+    def refresh(full=False):
+        """
+        Recalcule les mois modifiés depuis la dernière exécution ou ayant perdu
+        une commande (tous si `full`) puis les classements mensuels et annuels
+        concernés
+        Retourne la liste des mois recalculés
+        """
+        started = timezone.now()
+        watermark = RefreshWatermark.objects.filter(name=WATERMARK).first()
+        since = None if full or watermark is None else watermark.last_run
+
+        # Lus avant le recalcul : une suppression concurrente reste en attente
+        tombstones = dict(ProductSalesTombstone.objects.values_list('id', 'date'))
+        months = ProductSalesService.affected_months(since)
+        if not full:
+            months = sorted(set(months) | set(tombstones.values()))
+        if full:
+            # Mois qui n'ont plus aucune commande : lignes orphelines
+            stale = ProductSales.objects.exclude(date__in=months)
+            stale_months = set(stale.values_list('date', flat=True).distinct().order_by())
+            stale.delete()
+            TopProduct.objects.filter(period=MONTHLY).exclude(date__in=months).delete()
+            TopProduct.objects.filter(period=YEARLY).exclude(
+                date__in={date(month.year, 1, 1) for month in months}
+            ).delete()
+            logger.info(f"Ventes produits : {len(stale_months)} mois sans commande supprimé(s)")
+
+        for month in months:
+            ProductSalesService.refresh_month(month)
+            ProductSalesService.rank(MONTHLY, month, ProductSales.objects.filter(date=month))
+        for year in sorted({month.year for month in months}):
+            ProductSalesService.rank(YEARLY, date(year, 1, 1), ProductSales.objects.filter(year=year))
+
+        RefreshWatermark.objects.update_or_create(name=WATERMARK, defaults={'last_run': started})
+        ProductSalesTombstone.objects.filter(pk__in=tombstones).delete()
+        return months
@@ -0,0 +1,185 @@
+"""
+Agrégats journaliers du dashboard (table DashboardStats, période "daily")
+Une ligne par jour (heure de Paris) : commandes, clients, réparations, devis
+et rendez-vous. La ligne du jour concerné est recalculée après le commit de
+chaque modification ; le dashboard additionne ces lignes au lieu de parcourir
+tout l'historique
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import DashboardStats
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+DAILY = 'daily'
+DASHBOARD_CACHE_KEY = 'dashboard_stats'
+
+REPAIR_DONE_STATUSES = ('completed', 'delivered')
+QUOTE_PENDING_STATUSES = ('draft', 'sent')
+QUOTE_ACCEPTED_STATUSES = ('accepted', 'converted')
+
+ROLLUP_FIELDS = [
+    'total_orders', 'completed_orders', 'total_revenue', 'average_order_value',
+    'revenue_ville_avray', 'revenue_garches', 'orders_ville_avray', 'orders_garches',
+    'new_clients',
+    'total_repairs', 'completed_repairs', 'average_repair_cost',
+    'total_quotes', 'pending_quotes', 'accepted_quotes', 'rejected_quotes',
+    'total_appointments', 'completed_appointments', 'cancelled_appointments',
+]
+
+_pending = threading.local()
+
+
+def day_start(day):
+    """Début du jour en heure locale (aware)"""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def local_day(value):
+    """Jour local d'une date/heure (aware ou non) ou d'une date"""
+    if isinstance(value, datetime):
+        return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+    return value
+
+
+class DashboardRollupService:
+
+    @staticmethod
+    def _grouped(queryset, field, **aggregates):
+        """{jour: agrégats} en une requête GROUP BY sur le jour local de `field`"""
+        return {
+            row.pop('day'): row
+            for row in queryset.annotate(day=TruncDate(field)).values('day').annotate(**aggregates).order_by()
+        }
+
+    @staticmethod
+    def compute(start_day, end_day):
+        """
+        Agrégats de chaque jour de [start_day, end_day] ayant de l'activité
+        Une requête groupée par source, quelle que soit la longueur de la période
+        """
+        from orders.models import Order
+        from clients.models import Client
+        from repairs.models import Repair
+        from quotes.models import Quote
+        from appointments.models import Appointment
+
+        start, end = day_start(start_day), day_start(end_day + timedelta(days=1))
+        completed = Q(status='completed')
+        grouped = DashboardRollupService._grouped
+        days = {}
+
+        def merge(rows):
+            for day, values in rows.items():
+                days.setdefault(day, {}).update(values)
+
+        merge(grouped(
+            Order.objects.filter(created_at__gte=start, created_at__lt=end), 'created_at',
+            total_orders=Count('id'),
+            completed_orders=Count('id', filter=completed),
+            total_revenue=Sum('total_ttc', filter=completed),
+            revenue_ville_avray=Sum('total_ttc', filter=completed & Q(store='ville_avray')),
+            revenue_garches=Sum('total_ttc', filter=completed & Q(store='garches')),
+            orders_ville_avray=Count('id', filter=completed & Q(store='ville_avray')),
+            orders_garches=Count('id', filter=completed & Q(store='garches')),
+        ))
+        merge(grouped(
+            Client.objects.filter(created_at__gte=start, created_at__lt=end), 'created_at',
+            new_clients=Count('id'),
+        ))
+        done = Q(status__in=REPAIR_DONE_STATUSES)
+        merge(grouped(
+            Repair.objects.filter(created_at__gte=start, created_at__lt=end), 'created_at',
+            total_repairs=Count('id'),
+            completed_repairs=Count('id', filter=done),
+            average_repair_cost=Avg('final_cost', filter=done),
+        ))
+        merge(grouped(
+            Quote.objects.filter(created_at__gte=start, created_at__lt=end), 'created_at',
+            total_quotes=Count('id'),
+            pending_quotes=Count('id', filter=Q(status__in=QUOTE_PENDING_STATUSES)),
+            accepted_quotes=Count('id', filter=Q(status__in=QUOTE_ACCEPTED_STATUSES)),
+            rejected_quotes=Count('id', filter=Q(status='rejected')),
+        ))
+        appointments = Appointment.objects.filter(
+            appointment_date__gte=start_day, appointment_date__lte=end_day
+        ).values('appointment_date').annotate(
+            total_appointments=Count('id'),
+            completed_appointments=Count('id', filter=Q(status='completed')),
+            cancelled_appointments=Count('id', filter=Q(status='cancelled')),
+        ).order_by()
+        merge({row.pop('appointment_date'): row for row in appointments})
+
+        for values in days.values():
+            for field in ROLLUP_FIELDS:
+                if values.get(field) is None:
+                    values[field] = 0
+            revenue = Decimal(values['total_revenue'])
+            if values['completed_orders']:
+                values['average_order_value'] = (revenue / values['completed_orders']).quantize(Decimal('0.01'))
+            values['average_repair_cost'] = Decimal(values['average_repair_cost']).quantize(Decimal('0.01'))
+        return days
+
+    @staticmethod
+    def refresh(start_day, end_day=None):
+        """
+        Recalcule les lignes journalières de la période
+        Les jours sans activité n'ont pas de ligne (supprimée si elle existait)
+        """
+        end_day = end_day or start_day
+        days = DashboardRollupService.compute(start_day, end_day)
+
+        rows = [
+            DashboardStats(
+                period=DAILY, date=day, year=day.year, month=day.month,
+                week=day.isocalendar()[1], day=day.day, **values
+            )
+            for day, values in sorted(days.items())
+        ]
+        with transaction.atomic():
+            if rows:
+                DashboardStats.objects.bulk_create(
+                    rows, update_conflicts=True, unique_fields=['period', 'date'],
+                    update_fields=ROLLUP_FIELDS + ['updated_at'],
+                )
+            DashboardStats.objects.filter(
+                period=DAILY, date__gte=start_day, date__lte=end_day
+            ).exclude(date__in=list(days)).delete()
+
+        cache.delete(DASHBOARD_CACHE_KEY)
+        return len(rows)
+
+    @staticmethod
+    def mark_dirty(*values):
+        """
+        Planifie le recalcul des jours concernés après le commit
+        Les jours marqués dans une même transaction sont recalculés une seule fois
+        """
+        days = getattr(_pending, 'days', None)
+        if days is None:
+            days = _pending.days = set()
+        days.update(local_day(value) for value in values if value is not None)
+        # Le premier rappel exécuté vide l'ensemble, les suivants n'ont rien à faire ;
+        # des jours marqués dans une transaction annulée sont simplement recalculés au prochain commit
+        transaction.on_commit(DashboardRollupService._flush)
+
+    @staticmethod
+    def _flush():
+        days = getattr(_pending, 'days', None)
+        if not days:
+            return
+        pending_days = sorted(days)
+        days.clear()
+        try:
+            for day in pending_days:
+                DashboardRollupService.refresh(day)
+        except Exception:
+            # Les statistiques ne doivent jamais faire échouer une vente
+            logger.exception(f"Échec du recalcul des statistiques du dashboard ({pending_days})")
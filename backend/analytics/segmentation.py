@@ -0,0 +1,133 @@
+"""
+Segmentation RFM des clients (table ClientSegment)
+Récence, fréquence et montant de chaque client sont lus en deux requêtes
+agrégées (commandes terminées, réparations), notés par quintile avec NumPy
+puis enregistrés en masse ; les endpoints lisent uniquement la table
+"""
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+from .models import ClientSegment
+from .rollups import REPAIR_DONE_STATUSES
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 2000
+SEGMENT_FIELDS = [
+    'segment', 'recency_days', 'frequency', 'monetary', 'last_activity',
+    'r_score', 'f_score', 'm_score', 'computed_at',
+]
+
+
+def quintile_scores(values):
+    """
+    Score 1 à 5 selon le quintile de chaque valeur (5 = valeurs les plus hautes)
+    Les valeurs égales reçoivent le même score
+    """
+    if not len(values):
+        return np.array([], dtype=np.int16)
+    ordered = np.sort(values)
+    rank = np.searchsorted(ordered, values, side='left')
+    return (1 + rank * 5 // len(values)).astype(np.int16)
+
+
+def segment_labels(r, f, m):
+    """Segments RFM à partir des scores (tableaux de même longueur)"""
+    labels = np.full(len(r), 'regular', dtype=object)
+    labels[(r <= 2) & (f <= 2)] = 'lost'
+    labels[(r <= 2) & (f >= 3)] = 'at_risk'
+    labels[(r >= 4) & (f <= 2)] = 'recent'
+    labels[(f >= 4) & (r >= 3)] = 'loyal'
+    labels[(r >= 4) & (f >= 4) & (m >= 4)] = 'champion'
+    return labels
+
+
+class ClientSegmentationService:
+
+    @staticmethod
+    def collect():
+        """
+        {client_id: (dernière activité, nombre, montant)} : commandes terminées
+        et réparations, une requête agrégée chacune (pas de jointure croisée)
+        """
+        from orders.models import Order
+        from repairs.models import Repair
+
+        activity = {}
+        orders = Order.objects.filter(status='completed').values('client_id').annotate(
+            last=Max('created_at'), count=Count('id'), total=Sum('total_ttc')
+        ).order_by()
+        repairs = Repair.objects.values('client_id').annotate(
+            last=Max('created_at'), count=Count('id'),
+            total=Sum('final_cost', filter=Q(status__in=REPAIR_DONE_STATUSES)),
+        ).order_by()
+        for rows in (orders, repairs):
+            for row in rows:
+                last, count, total = activity.get(row['client_id'], (None, 0, Decimal('0')))
+                activity[row['client_id']] = (
+                    max(filter(None, (last, row['last'])), default=None),
+                    count + row['count'],
+                    total + (row['total'] or 0),
+                )
+        return activity
+
+    @staticmethod
+    def score(activity, now=None):
+        """
+        Notes et segments des clients actifs
+        Retourne (ids, récence en jours, fréquence, montant en centimes, r, f, m, segments)
+        """
+        now = now or timezone.now()
+        ids = np.fromiter(activity.keys(), dtype=np.int64, count=len(activity))
+        last = [value[0] for value in activity.values()]
+        recency = np.fromiter(((now - moment).days for moment in last), dtype=np.int64, count=len(ids))
+        frequency = np.fromiter((value[1] for value in activity.values()), dtype=np.int64, count=len(ids))
+        monetary = np.fromiter((int(value[2] * 100) for value in activity.values()), dtype=np.int64, count=len(ids))
+
+        r = quintile_scores(-recency)  # Activité récente = meilleure note
+        f = quintile_scores(frequency)
+        m = quintile_scores(monetary)
+        return ids, recency, frequency, monetary, r, f, m, segment_labels(r, f, m)
+
+    @staticmethod
+    def refresh(now=None):
+        """Recalcule le segment de tous les clients ; retourne {segment: nombre}"""
+        from clients.models import Client
+
+        now = now or timezone.now()
+        activity = ClientSegmentationService.collect()
+        ids, recency, frequency, monetary, r, f, m, labels = ClientSegmentationService.score(activity, now)
+
+        rows = [
+            ClientSegment(
+                client_id=client_id, segment=label, recency_days=days, frequency=count,
+                monetary=Decimal(cents) / 100, last_activity=activity[client_id][0],
+                r_score=rs, f_score=fs, m_score=ms, computed_at=now,
+            )
+            for client_id, days, count, cents, rs, fs, ms, label in zip(
+                ids.tolist(), recency.tolist(), frequency.tolist(), monetary.tolist(),
+                r.tolist(), f.tolist(), m.tolist(), labels.tolist(),
+            )
+        ]
+        active = set(activity)
+        rows.extend(
+            ClientSegment(client_id=client_id, segment='prospect', computed_at=now)
+            for client_id in Client.objects.values_list('id', flat=True).order_by()
+            if client_id not in active
+        )
+
+        with transaction.atomic():
+            for start in range(0, len(rows), BATCH_SIZE):
+                ClientSegment.objects.bulk_create(
+                    rows[start:start + BATCH_SIZE], update_conflicts=True,
+                    unique_fields=['client'], update_fields=SEGMENT_FIELDS,
+                )
+
+        counts = {}
+        for row in rows:
+            counts[row.segment] = counts.get(row.segment, 0) + 1
+        logger.info(f"Segmentation RFM : {len(rows)} client(s) {counts}")
+        return counts
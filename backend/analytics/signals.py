@@ -0,0 +1,52 @@
+"""
+Recalcul des agrégats du dashboard lors des modifications
+Chaque source indique le champ qui détermine son jour de rattachement.
+Les commandes supprimées marquent aussi leur mois pour les ventes produits
+"""
+from django.db.models.signals import post_delete, post_init, post_save
+from .product_sales import ProductSalesService
+from .rollups import DashboardRollupService
+
+ROLLUP_DAY_FIELDS = {
+    'orders.Order': 'created_at',
+    'clients.Client': 'created_at',
+    'repairs.Repair': 'created_at',
+    'quotes.Quote': 'created_at',
+    'appointments.Appointment': 'appointment_date',
+}
+
+_day_fields = {}  # Modèle -> champ du jour
+
+
+def remember_initial_day(sender, instance, **kwargs):
+    """Mémorise le jour d'origine (un rendez-vous déplacé modifie deux jours)"""
+    # Lecture directe : ne déclenche pas de requête si le champ a été différé
+    instance._rollup_initial_day = instance.__dict__.get(_day_fields[sender])
+
+
+def mark_day_dirty(sender, instance, **kwargs):
+    DashboardRollupService.mark_dirty(
+        instance.__dict__.get(_day_fields[sender]),
+        getattr(instance, '_rollup_initial_day', None),
+    )
+
+
+def connect_rollup_signals():
+    from django.apps import apps
+    for label, field in ROLLUP_DAY_FIELDS.items():
+        model = apps.get_model(label)
+        _day_fields[model] = field
+        if field != 'created_at':
+            post_init.connect(remember_initial_day, sender=model, dispatch_uid=f'rollup_init_{label}')
+        post_save.connect(mark_day_dirty, sender=model, dispatch_uid=f'rollup_save_{label}')
+        post_delete.connect(mark_day_dirty, sender=model, dispatch_uid=f'rollup_delete_{label}')
+
+
+def mark_sales_month_dirty(sender, instance, **kwargs):
+    # Une commande supprimée ne laisse pas de updated_at à suivre
+    ProductSalesService.mark_deleted(instance.__dict__.get('created_at'))
+
+
+def connect_product_sales_signals():
+    from orders.models import Order
+    post_delete.connect(mark_sales_month_dirty, sender=Order, dispatch_uid='product_sales_delete_order')
@@ -0,0 +1,391 @@
+"""
+Instantané colonnaire des données pour les rapports lourds
+Commandes, lignes de commande, réparations, produits et clients sont copiés
+dans des fichiers .npy (une colonne par fichier, types compacts) relus en
+mémoire projetée. Le rafraîchissement est incrémental (watermark sur
+updated_at) et les rapports (cohortes, paniers...) tournent sur ces colonnes
+sans interroger la base transactionnelle
+
+Encodage des colonnes :
+  int      : entiers (int64), clés étrangères nulles = -1
+  cents    : décimaux à 2 chiffres stockés en centièmes (int64, exact)
+  category : codes int16, libellés dans meta.json
+  date     : jour local (datetime64[D]) d'une date/heure, NaT si nul
+  bool     : booléens
+"""
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+from django.apps import apps
+from django.conf import settings
+from django.utils import timezone
+import json
+import logging
+import os
+import shutil
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+NULL_KEY = -1
+
+TABLES = {
+    'orders': {
+        'model': 'orders.Order',
+        'columns': {
+            'id': 'int', 'client_id': 'int', 'user_id': 'int',
+            'store': 'category', 'status': 'category', 'payment_method': 'category',
+            'subtotal_ht': 'cents', 'total_tva': 'cents', 'total_ttc': 'cents', 'discount_amount': 'cents',
+            'created_at': 'date',
+        },
+    },
+    # Pas d'updated_at sur les lignes : elles suivent le watermark de leur commande
+    'order_items': {
+        'model': 'orders.OrderItem',
+        'parent': ('orders.Order', 'order_id'),
+        'columns': {
+            'id': 'int', 'order_id': 'int', 'product_id': 'int', 'quantity': 'int',
+            'unit_price_ht': 'cents', 'unit_price_ttc': 'cents', 'subtotal_ht': 'cents', 'subtotal_ttc': 'cents',
+        },
+    },
+    'repairs': {
+        'model': 'repairs.Repair',
+        'columns': {
+            'id': 'int', 'client_id': 'int', 'assigned_to_id': 'int',
+            'store': 'category', 'status': 'category', 'priority': 'category', 'repair_type': 'category',
+            'estimated_cost': 'cents', 'final_cost': 'cents', 'labor_hours': 'cents',
+            'created_at': 'date', 'actual_completion': 'date',
+        },
+    },
+    'products': {
+        'model': 'products.Product',
+        'columns': {
+            'id': 'int', 'category_id': 'int', 'product_type': 'category',
+            'price_ht': 'cents', 'price_ttc': 'cents',
+            'stock_ville_avray': 'int', 'stock_garches': 'int', 'is_active': 'bool',
+        },
+    },
+    'clients': {
+        'model': 'clients.Client',
+        'columns': {
+            'id': 'int', 'is_active': 'bool', 'total_purchases': 'cents', 'visit_count': 'int',
+            'created_at': 'date',
+        },
+    },
+}
+
+DTYPES = {
+    'int': np.int64,
+    'cents': np.int64,
+    'category': np.int16,
+    'date': 'datetime64[D]',
+    'bool': np.bool_,
+}
+
+
+def snapshot_dir():
+    return Path(getattr(settings, 'ANALYTICS_SNAPSHOT_DIR', Path(settings.BASE_DIR) / 'snapshots'))
+
+
+def to_cents(value):
+    return NULL_KEY if value is None else int(Decimal(value) * 100)
+
+
+def cents_to_decimal(cents):
+    """Centièmes (int ou scalaire NumPy) -> Decimal à 2 chiffres"""
+    return Decimal(int(cents)) / 100
+
+
+class Frame:
+    """
+    Colonnes NumPy de même longueur avec filtres, jointure par clé et
+    agrégations groupées. Les colonnes "category" contiennent des codes ;
+    les filtres et rows() acceptent/renvoient les libellés
+    """
+
+    def __init__(self, columns, categories=None):
+        self.columns = columns
+        self.categories = categories or {}
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def assign(self, **arrays):
+        """Nouvelle frame avec des colonnes calculées en plus"""
+        return Frame({**self.columns, **arrays}, self.categories)
+
+    def _encode(self, column, value):
+        labels = self.categories.get(column)
+        if labels is None:
+            return value
+        return labels.index(value) if value in labels else NULL_KEY
+
+    def where(self, mask=None, **conditions):
+        """
+        Filtre : masque booléen et/ou conditions col=valeur, col__in, col__ne,
+        col__gt, col__gte, col__lt, col__lte (libellés pour les catégories)
+        """
+        keep = np.ones(len(self), dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+        for key, value in conditions.items():
+            column, _, op = key.partition('__')
+            data = self.columns[column]
+            if op == 'in':
+                keep &= np.isin(data, [self._encode(column, item) for item in value])
+                continue
+            value = self._encode(column, value)
+            if op in ('', 'exact'):
+                keep &= data == value
+            elif op == 'ne':
+                keep &= data != value
+            elif op == 'gt':
+                keep &= data > value
+            elif op == 'gte':
+                keep &= data >= value
+            elif op == 'lt':
+                keep &= data < value
+            elif op == 'lte':
+                keep &= data <= value
+            else:
+                raise ValueError(f"Opérateur inconnu : {op}")
+        return Frame({name: data[keep] for name, data in self.columns.items()}, self.categories)
+
+    def sum(self, column):
+        return self.columns[column].sum()
+
+    def lookup(self, keys, column, key='id', default=NULL_KEY):
+        """Valeur de `column` pour chaque clé de `keys` (jointure sur `key`, `default` si absente)"""
+        reference = self.columns[key]
+        order = np.argsort(reference, kind='stable')
+        sorted_keys = reference[order]
+        positions = np.searchsorted(sorted_keys, keys)
+        positions = np.clip(positions, 0, max(len(sorted_keys) - 1, 0))
+        found = (sorted_keys[positions] == keys) if len(sorted_keys) else np.zeros(len(keys), dtype=bool)
+        values = self.columns[column][order][positions] if len(sorted_keys) else np.empty(len(keys))
+        result = np.full(len(keys), default, dtype=self.columns[column].dtype)
+        result[found] = values[found]
+        return result
+
+    def group_by(self, *keys, **aggregates):
+        """
+        Agrégation groupée, renvoie une Frame (une ligne par groupe)
+        aggregates : nom=('count',) | ('sum', col) | ('min', col) | ('max', col) | ('mean', col)
+        """
+        if not len(self):
+            return Frame({name: np.array([], dtype=np.int64) for name in (*keys, *aggregates)}, self.categories)
+
+        # Combinaison des clés en un seul index de groupe
+        combined = np.zeros(len(self), dtype=np.int64)
+        uniques = []
+        for key in keys:
+            values, inverse = np.unique(self.columns[key], return_inverse=True)
+            uniques.append(values)
+            combined = combined * len(values) + inverse.reshape(-1)
+        space = int(np.prod([len(values) for values in uniques], dtype=np.float64))
+        if space <= 4 * len(self):
+            # Peu de combinaisons possibles : comptage direct, sans second tri
+            groups = np.flatnonzero(np.bincount(combined, minlength=space))
+            positions = np.full(space, -1, dtype=np.int64)
+            positions[groups] = np.arange(len(groups))
+            index = positions[combined]
+        else:
+            groups, index = np.unique(combined, return_inverse=True)
+            index = index.reshape(-1)
+
+        result = {}
+        remaining = groups
+        for key, values in reversed(list(zip(keys, uniques))):
+            result[key] = values[remaining % len(values)]
+            remaining = remaining // len(values)
+        result = {key: result[key] for key in keys}
+
+        counts = np.bincount(index, minlength=len(groups))
+        for name, spec in aggregates.items():
+            operation = spec[0]
+            if operation == 'count':
+                result[name] = counts
+                continue
+            data = self.columns[spec[1]]
+            if operation in ('sum', 'mean'):
+                totals = np.bincount(index, weights=data, minlength=len(groups))
+                if operation == 'mean':
+                    result[name] = totals / counts
+                else:
+                    result[name] = np.rint(totals).astype(np.int64) if data.dtype.kind in 'iub' else totals
+            elif operation in ('min', 'max'):
+                reducer = np.minimum if operation == 'min' else np.maximum
+                start = data.max() if operation == 'min' else data.min()
+                values = np.full(len(groups), start, dtype=data.dtype)
+                reducer.at(values, index, data)
+                result[name] = values
+            else:
+                raise ValueError(f"Agrégation inconnue : {operation}")
+        return Frame(result, {key: self.categories[key] for key in keys if key in self.categories})
+
+    def sort(self, column, descending=False):
+        order = np.argsort(self.columns[column], kind='stable')
+        if descending:
+            order = order[::-1]
+        return Frame({name: data[order] for name, data in self.columns.items()}, self.categories)
+
+    def rows(self):
+        """Lignes en dictionnaires Python (libellés décodés, dates en date)"""
+        decoded = {}
+        for name, data in self.columns.items():
+            labels = self.categories.get(name)
+            if labels is not None:
+                decoded[name] = [labels[code] if code >= 0 else None for code in data.tolist()]
+            elif data.dtype.kind == 'M':
+                decoded[name] = [None if np.isnat(value) else value.item() for value in data]
+            else:
+                decoded[name] = data.tolist()
+        return [dict(zip(decoded, values)) for values in zip(*decoded.values())]
+
+
+class AnalyticsSnapshotService:
+
+    @staticmethod
+    def path(table):
+        return snapshot_dir() / table
+
+    @staticmethod
+    def read_meta(table):
+        meta_file = AnalyticsSnapshotService.path(table) / 'meta.json'
+        if not meta_file.exists():
+            return None
+        return json.loads(meta_file.read_text())
+
+    @staticmethod
+    def load(table, mmap=True):
+        """Frame d'une table de l'instantané (fichiers projetés en mémoire, lecture seule)"""
+        meta = AnalyticsSnapshotService.read_meta(table)
+        if meta is None:
+            raise FileNotFoundError(f"Instantané absent pour {table} (lancer refresh_analytics_snapshot)")
+        directory = AnalyticsSnapshotService.path(table)
+        columns = {
+            name: np.load(directory / f'{name}.npy', mmap_mode='r' if mmap else None)
+            for name in meta['columns']
+        }
+        return Frame(columns, meta['categories'])
+
+    @staticmethod
+    def _encode_rows(spec, rows, categories):
+        """Lignes (tuples values_list) -> colonnes NumPy typées"""
+        names = list(spec['columns'])
+        values = {name: [] for name in names}
+        encoders = []
+        for name, kind in spec['columns'].items():
+            target = values[name]
+            if kind == 'int':
+                encoders.append(lambda value, target=target: target.append(NULL_KEY if value is None else value))
+            elif kind == 'cents':
+                encoders.append(lambda value, target=target: target.append(to_cents(value)))
+            elif kind == 'category':
+                labels = categories.setdefault(name, [])
+                index = {label: position for position, label in enumerate(labels)}
+
+                def encode(value, target=target, labels=labels, index=index):
+                    if value is None:
+                        target.append(NULL_KEY)
+                        return
+                    if value not in index:
+                        index[value] = len(labels)
+                        labels.append(value)
+                    target.append(index[value])
+                encoders.append(encode)
+            elif kind == 'date':
+                def encode(value, target=target):
+                    if isinstance(value, datetime):
+                        value = timezone.localdate(value) if timezone.is_aware(value) else value.date()
+                    target.append(np.datetime64('NaT') if value is None else np.datetime64(value, 'D'))
+                encoders.append(encode)
+            else:
+                encoders.append(lambda value, target=target: target.append(bool(value)))
+
+        for row in rows:
+            for encoder, value in zip(encoders, row):
+                encoder(value)
+        return {
+            name: np.array(values[name], dtype=DTYPES[kind])
+            for name, kind in spec['columns'].items()
+        }
+
+    @staticmethod
+    def _write(table, columns, meta):
+        """Écrit la table dans un répertoire temporaire puis le substitue à l'ancien"""
+        target = AnalyticsSnapshotService.path(table)
+        staging = target.with_name(f'{table}.tmp-{os.getpid()}')
+        previous = target.with_name(f'{table}.old-{os.getpid()}')
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir(parents=True)
+        for name, data in columns.items():
+            np.save(staging / f'{name}.npy', data)
+        (staging / 'meta.json').write_text(json.dumps(meta))
+
+        # Les lecteurs ayant déjà projeté les anciens fichiers les conservent jusqu'à fermeture
+        if target.exists():
+            target.rename(previous)
+        staging.rename(target)
+        shutil.rmtree(previous, ignore_errors=True)
+
+    @staticmethod
+    def refresh_table(table, full=False):
+        """
+        Met à jour une table de l'instantané ; retourne le nombre de lignes réécrites
+        Incrémental : lignes modifiées depuis le watermark remplacées, lignes
+        supprimées en base retirées (lecture des seuls identifiants)
+        """
+        spec = TABLES[table]
+        model = apps.get_model(spec['model'])
+        fields = list(spec['columns'])
+        meta = None if full else AnalyticsSnapshotService.read_meta(table)
+        started = timezone.now()
+
+        if meta is None:
+            categories = {}
+            current = None
+            changed = model.objects.all()
+        else:
+            categories = meta['categories']
+            current = AnalyticsSnapshotService.load(table, mmap=False)
+            since = datetime.fromisoformat(meta['watermark'])
+            if 'parent' in spec:
+                parent_model, key = spec['parent']
+                parent_ids = apps.get_model(parent_model).objects.filter(updated_at__gte=since).values('id')
+                changed = model.objects.filter(**{f'{key}__in': parent_ids})
+                changed_keys = np.fromiter(parent_ids.values_list('id', flat=True), dtype=np.int64)
+            else:
+                key = 'id'
+                changed = model.objects.filter(updated_at__gte=since)
+                changed_keys = np.fromiter(changed.values_list('id', flat=True), dtype=np.int64)
+
+        fresh = AnalyticsSnapshotService._encode_rows(
+            spec, changed.order_by().values_list(*fields).iterator(chunk_size=5000), categories
+        )
+        if current is None:
+            columns = fresh
+        else:
+            existing_ids = np.fromiter(model.objects.order_by().values_list('id', flat=True), dtype=np.int64)
+            keep = ~np.isin(current[key], changed_keys) & np.isin(current['id'], existing_ids)
+            columns = {name: np.concatenate([current[name][keep], fresh[name]]) for name in fields}
+
+        order = np.argsort(columns['id'], kind='stable')
+        columns = {name: data[order] for name, data in columns.items()}
+        AnalyticsSnapshotService._write(table, columns, {
+            'watermark': started.isoformat(),
+            'rows': int(len(columns['id'])),
+            'columns': fields,
+            'categories': categories,
+        })
+        return len(fresh['id'])
+
+    @staticmethod
+    def refresh(tables=None, full=False):
+        """Met à jour les tables demandées (toutes par défaut) ; {table: lignes réécrites}"""
+        result = {}
+        for table in tables or TABLES:
+            result[table] = AnalyticsSnapshotService.refresh_table(table, full=full)
+            logger.info(f"Instantané {table} : {result[table]} ligne(s) mise(s) à jour")
+        return result
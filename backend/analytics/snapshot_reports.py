@@ -0,0 +1,81 @@
+"""
+Rapports lourds calculés sur l'instantané colonnaire (voir snapshot.py)
+Aucune requête en base : uniquement des opérations NumPy sur les colonnes
+"""
+import numpy as np
+from .snapshot import AnalyticsSnapshotService, NULL_KEY, cents_to_decimal
+
+
+def completed_orders(orders=None):
+    orders = orders if orders is not None else AnalyticsSnapshotService.load('orders')
+    return orders.where(status='completed')
+
+
+def cohort_retention(orders=None):
+    """
+    Cohortes mensuelles de clients (mois de la première commande terminée)
+    [{'cohort': date, 'months': n, 'clients': nb de clients actifs n mois après}]
+    """
+    orders = completed_orders(orders)
+    month = orders['created_at'].astype('datetime64[M]')
+    orders = orders.assign(month=month)
+    first = orders.group_by('client_id', first=('min', 'month'))
+    cohort = first.lookup(orders['client_id'], 'first', key='client_id', default=np.datetime64('NaT', 'M'))
+    offset = (month - cohort).astype(np.int64)
+
+    active = orders.assign(cohort=cohort, offset=offset).group_by('cohort', 'offset', 'client_id')
+    table = active.group_by('cohort', 'offset', clients=('count',))
+    return [
+        {'cohort': row['cohort'], 'months': row['offset'], 'clients': row['clients']}
+        for row in table.rows()
+    ]
+
+
+def basket_stats(orders=None, items=None):
+    """
+    Paniers par magasin : nombre de commandes terminées, articles par panier
+    et panier moyen TTC
+    """
+    orders = completed_orders(orders)
+    items = items if items is not None else AnalyticsSnapshotService.load('order_items')
+    items = items.where(np.isin(items['order_id'], orders['id']))
+    store = orders.lookup(items['order_id'], 'store')
+    articles = items.assign(store=store).group_by('store', quantity=('sum', 'quantity'))
+    articles = dict(zip(articles['store'].tolist(), articles['quantity'].tolist()))
+
+    result = {}
+    for row in orders.group_by('store', orders=('count',), revenue=('sum', 'total_ttc')).rows():
+        code = orders.categories['store'].index(row['store'])
+        result[row['store']] = {
+            'orders': row['orders'],
+            'items_per_basket': round(articles.get(code, 0) / row['orders'], 2),
+            'average_basket': cents_to_decimal(row['revenue'] // row['orders']),
+        }
+    return result
+
+
+def category_revenue(orders=None, items=None, products=None):
+    """
+    Chiffre d'affaires HT par catégorie de produit (commandes terminées),
+    comparé au prix catalogue HT : l'écart correspond aux remises consenties
+    """
+    orders = completed_orders(orders)
+    items = items if items is not None else AnalyticsSnapshotService.load('order_items')
+    products = products if products is not None else AnalyticsSnapshotService.load('products')
+    items = items.where(np.isin(items['order_id'], orders['id']) & (items['product_id'] != NULL_KEY))
+
+    category = products.lookup(items['product_id'], 'category_id')
+    list_price = products.lookup(items['product_id'], 'price_ht', default=0) * items['quantity']
+    table = items.assign(category_id=category, list_price_ht=list_price).group_by(
+        'category_id', revenue_ht=('sum', 'subtotal_ht'), list_price_ht=('sum', 'list_price_ht'),
+        quantity=('sum', 'quantity'),
+    ).sort('revenue_ht', descending=True)
+    return [
+        {
+            'category_id': None if row['category_id'] == NULL_KEY else row['category_id'],
+            'quantity': row['quantity'],
+            'revenue_ht': cents_to_decimal(row['revenue_ht']),
+            'discount_ht': cents_to_decimal(row['list_price_ht'] - row['revenue_ht']),
+        }
+        for row in table.rows()
+    ]
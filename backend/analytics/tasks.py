@@ -0,0 +1,49 @@
+from celery import shared_task
+from .baskets import BasketAnalysisService
+from .forecasting import DemandForecastService
+from .inventory import InventoryAnalyticsService
+from .product_sales import ProductSalesService
+from .segmentation import ClientSegmentationService
+
+
+@shared_task(name='analytics.segment_clients_nightly')
+def segment_clients_nightly():
+    """
+    Tâche planifiée (nuit) : recalcul de la segmentation RFM des clients
+    """
+    counts = ClientSegmentationService.refresh()
+    return {'clients': sum(counts.values()), 'segments': counts}
+
+
+@shared_task(name='analytics.forecast_demand_nightly')
+def forecast_demand_nightly():
+    """
+    Tâche planifiée (nuit) : prévision de la demande et facteurs saisonniers
+    """
+    return {'configs': DemandForecastService.refresh()}
+
+
+@shared_task(name='analytics.inventory_analytics_nightly')
+def inventory_analytics_nightly():
+    """
+    Tâche planifiée (nuit) : classes ABC/XYZ, rotation et stock dormant
+    """
+    return {'rows': InventoryAnalyticsService.refresh()}
+
+
+@shared_task(name='analytics.basket_analysis_hourly')
+def basket_analysis_hourly():
+    """
+    Tâche planifiée (toutes les heures) : paniers des commandes modifiées
+    """
+    return {'orders': BasketAnalysisService.refresh()}
+
+
+@shared_task(name='analytics.product_sales_refresh')
+def product_sales_refresh(full=False):
+    """
+    Tâche planifiée (toutes les heures) : ventes par produit et classements
+    des mois modifiés ou ayant perdu une commande
+    """
+    months = ProductSalesService.refresh(full=full)
+    return {'months': len(months)}
@@ -0,0 +1,118 @@
+"""
+Séries temporelles des statistiques
+Totaux et nombres par intervalle (jour, semaine, mois en heure de Paris)
+calculés en une seule requête GROUP BY, quelle que soit la longueur de la
+période ; les intervalles sans activité sont complétés en Python
+"""
+from datetime import datetime, timedelta
+from decimal import Decimal
+from django.db.models import Count, DateTimeField, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+from .rollups import day_start
+
+TRUNCATE = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+
+def bucket_start(day, granularity):
+    """Premier jour de l'intervalle contenant `day`"""
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(day, granularity):
+    if granularity == 'week':
+        return day + timedelta(days=7)
+    if granularity == 'month':
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return day + timedelta(days=1)
+
+
+def bucket_starts(start_day, end_day, granularity):
+    """Débuts de tous les intervalles couvrant [start_day, end_day]"""
+    buckets = []
+    current = bucket_start(start_day, granularity)
+    while current <= end_day:
+        buckets.append(current)
+        current = next_bucket(current, granularity)
+    return buckets
+
+
+def last_buckets(count, granularity, today=None):
+    """Les `count` derniers intervalles jusqu'à aujourd'hui (le plus ancien d'abord)"""
+    today = today or timezone.localdate()
+    start = bucket_start(today, granularity)
+    for _ in range(count - 1):
+        start = bucket_start(start - timedelta(days=1), granularity)
+    return start, today
+
+
+class TimeSeries:
+
+    @staticmethod
+    def query(queryset, start_day, end_day, granularity='day', date_field='created_at',
+              sum_field=None, split=None):
+        """
+        Série [{'bucket': date, 'count': n, 'total': Decimal, 'splits': {...}}]
+        couvrant [start_day, end_day] en une requête
+
+        sum_field : champ additionné dans 'total' (omis si None)
+        split     : champ de répartition (ex. 'store', 'status') ; chaque
+                    intervalle contient alors 'splits': {valeur: {'count', 'total'}}
+        """
+        if granularity not in TRUNCATE:
+            raise ValueError(f"Granularité inconnue : {granularity}")
+
+        field = queryset.model._meta.get_field(date_field)
+        if isinstance(field, DateTimeField):
+            queryset = queryset.filter(**{
+                f'{date_field}__gte': day_start(start_day),
+                f'{date_field}__lt': day_start(end_day + timedelta(days=1)),
+            })
+            truncate = TRUNCATE[granularity](date_field, tzinfo=timezone.get_current_timezone())
+        else:
+            queryset = queryset.filter(**{f'{date_field}__gte': start_day, f'{date_field}__lte': end_day})
+            truncate = TRUNCATE[granularity](date_field)
+
+        aggregates = {'count': Count('id')}
+        if sum_field:
+            aggregates['total'] = Sum(sum_field)
+        group_by = ['bucket'] + ([split] if split else [])
+        rows = queryset.annotate(bucket=truncate).values(*group_by).annotate(**aggregates).order_by()
+
+        def empty():
+            point = {'count': 0}
+            if sum_field:
+                point['total'] = Decimal('0')
+            return point
+
+        series = {}
+        for day in bucket_starts(start_day, end_day, granularity):
+            series[day] = {'bucket': day, **empty()}
+            if split:
+                series[day]['splits'] = {}
+
+        for row in rows:
+            bucket = row['bucket']
+            if isinstance(bucket, datetime):
+                bucket = timezone.localtime(bucket).date() if timezone.is_aware(bucket) else bucket.date()
+            point = series.get(bucket)
+            if point is None:
+                continue
+            point['count'] += row['count']
+            if sum_field:
+                point['total'] += row['total'] or 0
+            if split:
+                part = point['splits'].setdefault(row[split], empty())
+                part['count'] += row['count']
+                if sum_field:
+                    part['total'] += row['total'] or 0
+
+        return list(series.values())
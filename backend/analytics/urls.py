@@ -8,10 +8,14 @@ urlpatterns = [
     path('sales/', views.sales_stats, name='sales-stats'),
     path('sales/trends/', views.sales_trends, name='sales-trends'),
     path('products/top/', views.top_products, name='top-products'),
+    path('products/suggestions/', views.product_suggestions, name='product-suggestions'),
     path('clients/top/', views.top_clients, name='top-clients'),
     path('products/', views.product_stats, name='product-stats'),
     path('inventory/', views.inventory_report, name='inventory-report'),
+    path('inventory/forecast/', views.demand_forecast, name='demand-forecast'),
     path('clients/', views.client_stats, name='client-stats'),
+    path('clients/segments/', views.client_segments, name='client-segments'),
+    path('clients/segments/refresh/', views.refresh_client_segments, name='client-segments-refresh'),
     path('repairs/', views.repair_stats, name='repair-stats'),
     path('repairs/mechanics/', views.mechanic_performance, name='mechanic-performance'),
 ]
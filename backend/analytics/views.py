@@ -2,16 +2,30 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Sum, Count, F, Q, Case, When, Value, CharField, Avg
+from rest_framework.pagination import PageNumberPagination
+from django.db.models import Sum, Count, F, Q, Case, When, Value, CharField
+from django.db.models.functions import Coalesce
 from django.utils import timezone
-from datetime import timedelta
+from datetime import date, timedelta
 from decimal import Decimal
 from django.core.cache import cache
-from orders.models import Order, OrderItem
+from orders.models import Order
 from products.models import Product
 from clients.models import Client
 from repairs.models import Repair
 from quotes.models import Quote
+from appointments.models import Appointment
+from .models import ClientSegment, DashboardStats, InventoryClassification, ProductSales, TopProduct
+from .baskets import BasketAnalysisService
+from .forecasting import DemandForecastService
+from .inventory import InventoryAnalyticsService
+from .product_sales import MONTHLY, TOP_N, YEARLY
+from .segmentation import ClientSegmentationService
+from .rollups import DAILY, DASHBOARD_CACHE_KEY, QUOTE_PENDING_STATUSES, day_start
+from .timeseries import TimeSeries, bucket_starts, last_buckets
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 def decimal_to_float(value):
@@ -21,117 +35,131 @@ def decimal_to_float(value):
     return value if value is not None else 0
 
 
+SERIES_SPLITS = ('store', 'status')
+INVENTORY_ORDERING = (
+    'revenue', 'revenue_share', 'units_sold', 'stock', 'stock_value',
+    'turnover', 'days_of_cover', 'last_sale', 'demand_cv',
+)
+
+
+def series_params(request, queryset):
+    """
+    Filtre ?store= et répartition ?split=store|status communs aux séries de ventes
+    Retourne (queryset, split) ou lève ValueError
+    """
+    store = request.query_params.get('store')
+    split = request.query_params.get('split') or None
+    if store:
+        if store not in ('ville_avray', 'garches'):
+            raise ValueError('Magasin invalide')
+        queryset = queryset.filter(store=store)
+    if split and split not in SERIES_SPLITS:
+        raise ValueError('Répartition invalide (store ou status)')
+    if split != 'status':
+        queryset = queryset.filter(status='completed')
+    return queryset, split
+
+
+def sales_point(point, split):
+    """Total et nombre des ventes terminées d'un intervalle (+ répartition éventuelle)"""
+    source = point
+    if split == 'status':
+        source = point['splits'].get('completed', {'count': 0, 'total': 0})
+    entry = {'total': decimal_to_float(source['total']), 'count': source['count']}
+    if split:
+        entry['splits'] = {
+            key: {'total': decimal_to_float(part['total']), 'count': part['count']}
+            for key, part in point['splits'].items()
+        }
+    return entry
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def dashboard_stats(request):
-    """Vue d'ensemble pour le dashboard avec cache"""
+    """
+    Vue d'ensemble pour le dashboard avec cache
+    Les chiffres historiques proviennent des agrégats journaliers (DashboardStats),
+    maintenus à chaque modification : le coût ne dépend pas du volume de commandes
+    """
     
     # Vérifier le cache
-    cache_key = 'dashboard_stats'
-    cached_stats = cache.get(cache_key)
+    cached_stats = cache.get(DASHBOARD_CACHE_KEY)
     if cached_stats:
         return Response(cached_stats)
     
     try:
-        today = timezone.now().date()
-        start_of_month = today.replace(day=1)
+        today = timezone.localdate()
         start_of_week = today - timedelta(days=today.weekday())
+        months = bucket_starts(last_buckets(6, 'month', today)[0], today, 'month')
+        daily = DashboardStats.objects.filter(period=DAILY)
+        
+        # Cumuls depuis l'origine (une ligne par jour d'activité)
+        totals = daily.aggregate(
+            revenue=Sum('total_revenue'),
+            orders=Sum('total_orders'),
+            repairs=Sum('total_repairs'),
+            pending_quotes=Sum('pending_quotes'),
+            ville_avray=Sum('revenue_ville_avray'),
+            garches=Sum('revenue_garches'),
+        )
         
-        # Chiffre d'affaires total
-        total_revenue_result = Order.objects.filter(
-            status='completed'
-        ).aggregate(total=Sum('total_ttc'))
-        total_revenue = decimal_to_float(total_revenue_result['total'])
-        
-        # Nombre total de commandes
-        total_orders = Order.objects.count()
-        
-        # Nombre total de clients
-        total_clients = Client.objects.filter(is_active=True).count()
-        
-        # Nombre total de produits
-        total_products = Product.objects.filter(is_active=True).count()
+        # Ventes par mois (6 derniers mois calendaires)
+        revenue_by_month = {
+            (row['year'], row['month']): row['revenue']
+            for row in daily.filter(date__gte=months[0]).values('year', 'month').annotate(
+                revenue=Sum('total_revenue')
+            ).order_by()
+        }
+        sales_by_month = [
+            {
+                'month': month.strftime('%b %Y'),
+                'total': decimal_to_float(revenue_by_month.get((month.year, month.month)))
+            }
+            for month in months
+        ]
         
-        # Ventes par mois (6 derniers mois) - AVEC TIMEZONE
-        sales_by_month = []
-        now = timezone.now()
+        # Tendance mensuelle
+        month_revenue = sales_by_month[-1]['total']
+        last_month_revenue = sales_by_month[-2]['total']
+        if last_month_revenue > 0:
+            growth = ((month_revenue - last_month_revenue) / last_month_revenue) * 100
+        else:
+            growth = 0
         
-        for i in range(5, -1, -1):
-            # Calculer le début du mois avec timezone
-            month_date = now - timedelta(days=30*i)
-            month_start = month_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            
-            if i == 0:
-                month_end = now
-            else:
-                if month_start.month == 12:
-                    next_month = month_start.replace(year=month_start.year + 1, month=1)
-                else:
-                    next_month = month_start.replace(month=month_start.month + 1)
-                month_end = next_month - timedelta(seconds=1)
-            
-            month_sales_result = Order.objects.filter(
-                created_at__gte=month_start,
-                created_at__lte=month_end,
-                status='completed'
-            ).aggregate(total=Sum('total_ttc'))
-            
-            month_sales = decimal_to_float(month_sales_result['total'])
-            
-            sales_by_month.append({
-                'month': month_start.strftime('%b %Y'),
-                'total': month_sales
-            })
+        # Semaine en cours et rendez-vous du jour
+        week = daily.filter(date__gte=start_of_week).aggregate(
+            revenue=Sum('total_revenue'),
+            orders=Sum('completed_orders'),
+            new_clients=Sum('new_clients'),
+            repairs=Sum('total_repairs'),
+            today_appointments=Sum('total_appointments', filter=Q(date=today)),
+        )
         
         # Top 5 produits les plus vendus
-        top_products_query = OrderItem.objects.values(
-            'product__name'
+        top_products_query = ProductSales.objects.values(
+            'product_id', 'product__name'
         ).annotate(
-            quantity=Sum('quantity')
+            quantity=Sum('quantity_sold')
         ).order_by('-quantity')[:5]
         
-        top_products_data = []
-        for item in top_products_query:
-            if item['product__name']:
-                top_products_data.append({
-                    'name': item['product__name'],
-                    'quantity': int(item['quantity'])
-                })
-        
-        # Ventes par magasin
-        ville_avray_result = Order.objects.filter(
-            store='ville_avray',
-            status='completed'
-        ).aggregate(total=Sum('total_ttc'))
-        ville_avray_sales = decimal_to_float(ville_avray_result['total'])
-        
-        garches_result = Order.objects.filter(
-            store='garches',
-            status='completed'
-        ).aggregate(total=Sum('total_ttc'))
-        garches_sales = decimal_to_float(garches_result['total'])
-        
-        store_stats = {
-            'ville_avray': ville_avray_sales,
-            'garches': garches_sales
-        }
-        
-        # Produits en rupture de stock - UTILISER stock_ville_avray + stock_garches
-        # Calculer le stock total et filtrer ceux qui ont <= 5
-        all_products = Product.objects.filter(is_active=True)
-        low_stock_data = []
-        
-        for p in all_products:
-            total_stock = (p.stock_ville_avray or 0) + (p.stock_garches or 0)
-            if total_stock <= 5:
-                low_stock_data.append({
-                    'id': p.id,
-                    'name': p.name,
-                    'reference': p.reference,
-                    'total_stock': total_stock
-                })
-                if len(low_stock_data) >= 20: # Limiter à 20 produits
-                    break
+        top_products_data = [
+            {'name': item['product__name'], 'quantity': int(item['quantity'])}
+            for item in top_products_query
+        ]
+        
+        # Produits en stock faible (stock cumulé des deux magasins <= 5)
+        low_stock_data = [
+            {
+                'id': p['id'],
+                'name': p['name'],
+                'reference': p['reference'],
+                'total_stock': p['total_stock']
+            }
+            for p in Product.objects.filter(is_active=True).annotate(
+                total_stock=Coalesce('stock_ville_avray', 0) + Coalesce('stock_garches', 0)
+            ).filter(total_stock__lte=5).values('id', 'name', 'reference', 'total_stock')[:20]
+        ]
         
         # Dernières commandes (10 dernières)
         recent_orders = Order.objects.select_related('client').order_by('-created_at')[:10]
@@ -147,168 +175,86 @@ def dashboard_stats(request):
                 'status': order.status
             })
         
-        # Nouvelles statistiques pour le Dashboard optimisé
-        # Statistiques mensuelles pour tendances
-        month_orders = Order.objects.filter(
-            status='completed',
-            completed_at__gte=start_of_month
-        )
-        month_revenue = decimal_to_float(
-            month_orders.aggregate(total=Sum('total_ttc'))['total'] or 0
-        )
-        
-        # Mois précédent pour comparaison
-        last_month = start_of_month - timedelta(days=1)
-        last_month_start = last_month.replace(day=1)
-        
-        last_month_orders = Order.objects.filter(
-            status='completed',
-            completed_at__gte=last_month_start,
-            completed_at__lt=start_of_month
-        )
-        last_month_revenue = decimal_to_float(
-            last_month_orders.aggregate(total=Sum('total_ttc'))['total'] or 0
-        )
-        
-        # Calcul de la tendance
-        if last_month_revenue > 0:
-            growth = ((month_revenue - last_month_revenue) / last_month_revenue) * 100
-        else:
-            growth = 0
-        
-        # Statistiques hebdomadaires
-        week_orders = Order.objects.filter(
-            status='completed',
-            completed_at__gte=start_of_week
-        )
-        week_revenue = decimal_to_float(
-            week_orders.aggregate(total=Sum('total_ttc'))['total'] or 0
-        )
-        
-        # Réparations et RDV
-        total_repairs = Repair.objects.count()
-        pending_quotes = Quote.objects.filter(status='pending').count()
-        
-        # RDV du jour (si la table appointments existe)
-        try:
-            from appointments.models import Appointment
-            today_appointments = Appointment.objects.filter(
-                appointment_date=today
-            ).count()
-        except ImportError:
-            # Fallback: utiliser les réparations avec date estimée
-            today_appointments = Repair.objects.filter(
-                estimated_completion=today
-            ).count()
-        
-        # Top produits avec revenus
-        top_products_with_revenue = []
-        for item in top_products_query[:3]:
-            if item['product__name']:
-                # Calculer le revenu moyen
-                order_items_with_price = OrderItem.objects.filter(
-                    product__name=item['product__name'],
-                    order__status='completed'
-                )
-                avg_price = order_items_with_price.aggregate(
-                    avg_price=Avg('unit_price_ttc')
-                )['avg_price'] or 45
-                
-                top_products_with_revenue.append({
-                    'name': item['product__name'],
-                    'sales': int(item['quantity']),
-                    'revenue': decimal_to_float(avg_price * item['quantity'])
-                })
-        
         # Tâches à venir
         upcoming_tasks = []
         
         # Rendez-vous à venir
-        try:
-            appointments = Appointment.objects.filter(
-                appointment_date__gte=today,
-                appointment_date__lte=today + timedelta(days=7)
-            ).order_by('appointment_date', 'appointment_time')[:2]
-            
-            for apt in appointments:
-                upcoming_tasks.append({
-                    'type': 'appointment',
-                    'title': f"RDV - {apt.client.name}",
-                    'time': apt.appointment_time.strftime('%H:%M'),
-                    'priority': apt.priority
-                })
-        except ImportError:
-            pass
+        appointments = Appointment.objects.select_related('client').filter(
+            appointment_date__gte=today,
+            appointment_date__lte=today + timedelta(days=7)
+        ).order_by('appointment_date', 'appointment_time')[:2]
+        
+        for apt in appointments:
+            upcoming_tasks.append({
+                'type': 'appointment',
+                'title': f"RDV - {apt.client.full_name}",
+                'time': apt.appointment_time.strftime('%H:%M'),
+                'priority': apt.priority
+            })
         
         # Réparations en cours
-        repairs_in_progress = Repair.objects.filter(
+        repairs_in_progress = Repair.objects.select_related('client').filter(
             status__in=['pending', 'in_progress']
         ).order_by('priority', 'created_at')[:2]
         
         for repair in repairs_in_progress:
             upcoming_tasks.append({
                 'type': 'repair',
-                'title': f"Réparation - {repair.client.name}",
-                'time': repair.created_at.strftime('%H:%M') if repair.created_at else '10:00',
+                'title': f"Réparation - {repair.client.full_name}",
+                'time': timezone.localtime(repair.created_at).strftime('%H:%M') if repair.created_at else '10:00',
                 'priority': repair.priority
             })
         
         # Devis en attente récents
-        recent_quotes = Quote.objects.filter(
-            status='pending'
+        recent_quotes = Quote.objects.select_related('client').filter(
+            status__in=QUOTE_PENDING_STATUSES
         ).order_by('-created_at')[:1]
         
         for quote in recent_quotes:
             upcoming_tasks.append({
                 'type': 'quote',
-                'title': f"Devis - {quote.client.name}",
-                'time': quote.created_at.strftime('%H:%M') if quote.created_at else '14:00',
+                'title': f"Devis - {quote.client.full_name}",
+                'time': timezone.localtime(quote.created_at).strftime('%H:%M') if quote.created_at else '14:00',
                 'priority': 'low'
             })
         
         stats = {
-            'totalRevenue': total_revenue,
-            'totalOrders': total_orders,
-            'totalClients': total_clients,
-            'totalProducts': total_products,
-            'totalRepairs': total_repairs,
-            'pendingQuotes': pending_quotes,
-            'todayAppointments': today_appointments,
+            'totalRevenue': decimal_to_float(totals['revenue']),
+            'totalOrders': totals['orders'] or 0,
+            'totalClients': Client.objects.filter(is_active=True).count(),
+            'totalProducts': Product.objects.filter(is_active=True).count(),
+            'totalRepairs': totals['repairs'] or 0,
+            'pendingQuotes': totals['pending_quotes'] or 0,
+            'todayAppointments': week['today_appointments'] or 0,
             'monthlyTrend': {
                 'current': month_revenue,
                 'previous': last_month_revenue,
                 'percentage': round(growth, 1)
             },
             'weeklyStats': {
-                'revenue': week_revenue,
-                'orders': week_orders.count(),
-                'newClients': Client.objects.filter(
-                    created_at__gte=start_of_week
-                ).count(),
-                'repairs': Repair.objects.filter(
-                    created_at__gte=start_of_week
-                ).count()
+                'revenue': decimal_to_float(week['revenue']),
+                'orders': week['orders'] or 0,
+                'newClients': week['new_clients'] or 0,
+                'repairs': week['repairs'] or 0
             },
-            'lowStockProducts': low_stock_data[:5],  # Limiter à 5 pour le dashboard
-            'recentOrders': recent_orders_data[:5],  # Limiter à 5 pour le dashboard
-            'topProducts': top_products_with_revenue,
             'upcomingTasks': upcoming_tasks[:3],  # Limiter à 3 tâches pour le dashboard
             'salesByMonth': sales_by_month,
-            'storeStats': store_stats,
+            'storeStats': {
+                'ville_avray': decimal_to_float(totals['ville_avray']),
+                'garches': decimal_to_float(totals['garches'])
+            },
             'topProducts': top_products_data,
             'lowStockProducts': low_stock_data,
             'recentOrders': recent_orders_data
         }
         
-        # Mettre en cache pour 5 minutes
-        cache.set(cache_key, stats, timeout=300)
+        # Mettre en cache pour 5 minutes (invalidé à chaque recalcul des agrégats)
+        cache.set(DASHBOARD_CACHE_KEY, stats, timeout=300)
         
         return Response(stats)
         
     except Exception as e:
-        print(f"Erreur dans dashboard_stats: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Erreur dans dashboard_stats: {str(e)}")
         
         # Retourner des données vides en cas d'erreur
         return Response({
@@ -321,9 +267,6 @@ def dashboard_stats(request):
             'todayAppointments': 0,
             'monthlyTrend': {'current': 0, 'previous': 0, 'percentage': 0},
             'weeklyStats': {'revenue': 0, 'orders': 0, 'newClients': 0, 'repairs': 0},
-            'lowStockProducts': [],
-            'recentOrders': [],
-            'topProducts': [],
             'upcomingTasks': [],
             'salesByMonth': [],
             'storeStats': {'ville_avray': 0, 'garches': 0},
@@ -365,35 +308,32 @@ def dashboard_detailed(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def sales_stats(request):
-    """Statistiques des ventes"""
+    """
+    Statistiques des ventes sur les `days` derniers jours (aujourd'hui inclus)
+    Une seule requête quelle que soit la période ; ?store= et ?split=store|status
+    """
     try:
-        days = int(request.query_params.get('days', 30))
-        start_date = timezone.now().date() - timedelta(days=days)
-        
-        orders = Order.objects.filter(
-            created_at__date__gte=start_date,
-            status='completed'
-        )
-        
-        total_sales = decimal_to_float(
-            orders.aggregate(total=Sum('total_ttc'))['total'] or 0
-        )
+        days = max(int(request.query_params.get('days', 30)), 1)
+        orders, split = series_params(request, Order.objects.all())
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        today = timezone.localdate()
+        start_date = today - timedelta(days=days - 1)
+        series = TimeSeries.query(orders, start_date, today, 'day', sum_field='total_ttc', split=split)
         
-        # Ventes par jour
-        daily_sales = []
-        for i in range(days):
-            date = start_date + timedelta(days=i)
-            day_sales = orders.filter(created_at__date=date)
-            daily_sales.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'total': decimal_to_float(day_sales.aggregate(total=Sum('total_ttc'))['total'] or 0),
-                'count': day_sales.count()
-            })
+        daily_sales = [
+            {'date': point['bucket'].strftime('%Y-%m-%d'), **sales_point(point, split)}
+            for point in series
+        ]
+        total_sales = sum(day['total'] for day in daily_sales)
+        total_orders = sum(day['count'] for day in daily_sales)
         
         return Response({
             'total_sales': total_sales,
-            'total_orders': orders.count(),
-            'average_order': total_sales / orders.count() if orders.count() > 0 else 0,
+            'total_orders': total_orders,
+            'average_order': total_sales / total_orders if total_orders > 0 else 0,
             'daily_sales': daily_sales
         })
         
@@ -404,42 +344,29 @@ def sales_stats(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def sales_trends(request):
-    """Tendances des ventes"""
+    """Tendances des ventes par mois calendaire (une requête) ; ?store= et ?split=store|status"""
+    try:
+        months = max(int(request.query_params.get('months', 12)), 1)
+        orders, split = series_params(request, Order.objects.all())
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
     try:
-        months = int(request.query_params.get('months', 12))
+        start, end = last_buckets(months, 'month')
+        series = TimeSeries.query(orders, start, end, 'month', sum_field='total_ttc', split=split)
         
         trends_data = []
-        now = timezone.now()
-        
-        for i in range(months):
-            month_date = now - timedelta(days=30*i)
-            month_start = month_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            
-            if i == 0:
-                month_end = now
-            else:
-                if month_start.month == 12:
-                    next_month = month_start.replace(year=month_start.year + 1, month=1)
-                else:
-                    next_month = month_start.replace(month=month_start.month + 1)
-                month_end = next_month - timedelta(seconds=1)
-            
-            month_sales = Order.objects.filter(
-                created_at__gte=month_start,
-                created_at__lte=month_end,
-                status='completed'
-            )
-            
-            total = decimal_to_float(month_sales.aggregate(total=Sum('total_ttc'))['total'] or 0)
-            
+        for point in series:
+            entry = sales_point(point, split)
             trends_data.append({
-                'month': month_start.strftime('%Y-%m'),
-                'sales': total,
-                'orders': month_sales.count()
+                'month': point['bucket'].strftime('%Y-%m'),
+                'sales': entry.pop('total'),
+                'orders': entry.pop('count'),
+                **entry
             })
         
         return Response({
-            'trends': list(reversed(trends_data))
+            'trends': trends_data
         })
         
     except Exception as e:
@@ -449,30 +376,82 @@ def sales_trends(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def top_products(request):
-    """Produits les plus vendus"""
+    """
+    Produits les plus vendus (commandes terminées), lus dans les tables
+    ProductSales/TopProduct alimentées par refresh_product_sales
+
+    ?store=ville_avray|garches  ?period=month|year (défaut : tout l'historique)
+    ?year=AAAA&month=MM (défaut : période en cours)  ?limit=10
+    """
     try:
         limit = int(request.query_params.get('limit', 10))
-        
-        top_products = OrderItem.objects.values(
+        store = request.query_params.get('store', '')
+        period = request.query_params.get('period')
+        today = timezone.localdate()
+        
+        if period in ('month', 'year'):
+            year = int(request.query_params.get('year', today.year))
+            if period == 'month':
+                month = int(request.query_params.get('month', today.month))
+                rankings = TopProduct.objects.filter(period=MONTHLY, date=date(year, month, 1))
+            else:
+                rankings = TopProduct.objects.filter(period=YEARLY, date=date(year, 1, 1))
+            rows = rankings.filter(store=store).select_related('product').order_by('rank')[:min(limit, TOP_N)]
+            return Response([
+                {
+                    'name': row.product.name,
+                    'reference': row.product.reference,
+                    'quantity_sold': row.total_sales,
+                    'revenue': decimal_to_float(row.total_revenue),
+                    'market_share': decimal_to_float(row.market_share),
+                }
+                for row in rows
+            ])
+        if period:
+            return Response({'error': 'period doit valoir month ou year'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        sales = ProductSales.objects.all()
+        if store:
+            sales = sales.filter(store=store)
+        top_products = sales.values(
+            'product_id',
             'product__name',
             'product__reference'
         ).annotate(
-            total_quantity=Sum('quantity'),
-            total_revenue=Sum(F('quantity') * F('unit_price_ttc'))
+            total_quantity=Sum('quantity_sold'),
+            total_revenue=Sum('revenue')
         ).order_by('-total_revenue')[:limit]
         
-        result = []
-        for item in top_products:
-            if item['product__name']:
-                result.append({
-                    'name': item['product__name'],
-                    'reference': item['product__reference'],
-                    'quantity_sold': int(item['total_quantity']),
-                    'revenue': decimal_to_float(item['total_revenue'])
-                })
-        
-        return Response(result)
+        return Response([
+            {
+                'name': item['product__name'],
+                'reference': item['product__reference'],
+                'quantity_sold': int(item['total_quantity']),
+                'revenue': decimal_to_float(item['total_revenue'])
+            }
+            for item in top_products
+        ])
         
+    except ValueError:
+        return Response({'error': 'Paramètres year, month ou limit invalides'}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({'error': str(e)}, status=500)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def product_suggestions(request):
+    """
+    Produits fréquemment achetés avec ceux du panier (caisse)
+    ?cart=12,57,103  ?limit=5
+    """
+    try:
+        cart = [value for value in request.query_params.get('cart', '').split(',') if value.strip()]
+        limit = min(int(request.query_params.get('limit', 5)), 20)
+        return Response({'suggestions': BasketAnalysisService.suggestions(cart, limit)})
+    except ValueError:
+        return Response({'error': 'cart doit être une liste d\'identifiants séparés par des virgules'},
+                        status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({'error': str(e)}, status=500)
 
@@ -550,35 +529,85 @@ def product_stats(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def inventory_report(request):
-    """Rapport d'inventaire"""
+    """
+    Rapport d'inventaire : classes ABC/XYZ, rotation, couverture et stock dormant
+    par produit et magasin, lus dans InventoryClassification (paginé)
+
+    ?store=ville_avray|garches  ?abc=A  ?xyz=X  ?status=out|low|ok  ?dead=1
+    ?ordering=-revenue|stock_value|days_of_cover|turnover...  ?page=  ?page_size=
+    """
     try:
-        products = Product.objects.filter(is_active=True)
+        rows = InventoryClassification.objects.all()
+        if not rows.exists() and Product.objects.filter(is_active=True).exists():
+            InventoryAnalyticsService.refresh()
+        
+        filters = {
+            'store': request.query_params.get('store'),
+            'abc_class': request.query_params.get('abc'),
+            'xyz_class': request.query_params.get('xyz'),
+            'stock_status': request.query_params.get('status'),
+        }
+        rows = rows.filter(**{field: value for field, value in filters.items() if value})
+        if request.query_params.get('dead') in ('1', 'true'):
+            rows = rows.filter(is_dead_stock=True)
+        
+        ordering = request.query_params.get('ordering', '-revenue')
+        if ordering.lstrip('-') not in INVENTORY_ORDERING:
+            return Response({'error': f'Tri non supporté : {ordering}'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        summary = rows.aggregate(
+            total_rows=Count('id'),
+            total_value=Sum('stock_value'),
+            low_stock_count=Count('id', filter=Q(stock_status__in=('out', 'low'))),
+            out_of_stock_count=Count('id', filter=Q(stock_status='out')),
+            dead_stock_count=Count('id', filter=Q(is_dead_stock=True)),
+            dead_stock_value=Sum('stock_value', filter=Q(is_dead_stock=True)),
+        )
         
-        inventory_data = []
-        for product in products:
-            total_stock = (product.stock_ville_avray or 0) + (product.stock_garches or 0)
-            total_value = total_stock * (product.price_ttc or 0)
-            
-            inventory_data.append({
-                'id': product.id,
-                'name': product.name,
-                'reference': product.reference,
-                'category': product.category.name if product.category else 'N/A',
-                'stock_ville_avray': product.stock_ville_avray or 0,
-                'stock_garches': product.stock_garches or 0,
-                'total_stock': total_stock,
-                'unit_price': decimal_to_float(product.price_ttc or 0),
-                'total_value': decimal_to_float(total_value),
-                'status': 'low' if total_stock <= 5 else 'normal'
-            })
+        paginator = PageNumberPagination()
+        paginator.page_size_query_param = 'page_size'
+        paginator.max_page_size = 200
+        page = paginator.paginate_queryset(
+            rows.select_related('product__category').order_by(ordering, 'product_id', 'store'), request
+        )
         
         return Response({
-            'products': inventory_data,
+            'count': paginator.page.paginator.count,
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link(),
+            'computed_at': page[0].computed_at if page else None,
+            'products': [
+                {
+                    'id': row.product_id,
+                    'name': row.product.name,
+                    'reference': row.product.reference,
+                    'category': row.product.category.name if row.product.category else 'N/A',
+                    'store': row.store,
+                    'stock': row.stock,
+                    'unit_price': decimal_to_float(row.product.price_ht),
+                    'total_value': decimal_to_float(row.stock_value),
+                    'status': row.stock_status,
+                    'abc_class': row.abc_class,
+                    'xyz_class': row.xyz_class,
+                    'revenue': decimal_to_float(row.revenue),
+                    'revenue_share': decimal_to_float(row.revenue_share),
+                    'units_sold': row.units_sold,
+                    'demand_cv': row.demand_cv,
+                    'turnover': row.turnover,
+                    'days_of_cover': row.days_of_cover,
+                    'last_sale': row.last_sale,
+                    'is_dead_stock': row.is_dead_stock,
+                }
+                for row in page
+            ],
             'summary': {
-                'total_products': len(inventory_data),
-                'total_value': sum(item['total_value'] for item in inventory_data),
-                'low_stock_count': sum(1 for item in inventory_data if item['status'] == 'low')
-            }
+                'total_rows': summary['total_rows'],
+                'total_value': decimal_to_float(summary['total_value']),
+                'low_stock_count': summary['low_stock_count'],
+                'out_of_stock_count': summary['out_of_stock_count'],
+                'dead_stock_count': summary['dead_stock_count'],
+                'dead_stock_value': decimal_to_float(summary['dead_stock_value']),
+            },
         })
         
     except Exception as e:
@@ -593,35 +622,14 @@ def client_stats(request):
         total_clients = Client.objects.filter(is_active=True).count()
         
         # Nouveaux clients par mois (6 derniers mois)
-        new_clients_by_month = []
-        now = timezone.now()
-        
-        for i in range(5, -1, -1):
-            month_date = now - timedelta(days=30*i)
-            month_start = month_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            
-            if i == 0:
-                month_end = now
-            else:
-                if month_start.month == 12:
-                    next_month = month_start.replace(year=month_start.year + 1, month=1)
-                else:
-                    next_month = month_start.replace(month=month_start.month + 1)
-                month_end = next_month - timedelta(seconds=1)
-            
-            month_clients = Client.objects.filter(
-                created_at__gte=month_start,
-                created_at__lte=month_end,
-                is_active=True
-            ).count()
-            
-            new_clients_by_month.append({
-                'month': month_start.strftime('%b %Y'),
-                'new_clients': month_clients
-            })
+        start, end = last_buckets(6, 'month')
+        new_clients_by_month = [
+            {'month': point['bucket'].strftime('%b %Y'), 'new_clients': point['count']}
+            for point in TimeSeries.query(Client.objects.filter(is_active=True), start, end, 'month')
+        ]
         
         # Clients actifs (ayant commandé dans les 6 derniers mois)
-        six_months_ago = now - timedelta(days=180)
+        six_months_ago = timezone.now() - timedelta(days=180)
         active_clients = Order.objects.filter(
             created_at__gte=six_months_ago,
             status='completed'
@@ -637,45 +645,141 @@ def client_stats(request):
         return Response({'error': str(e)}, status=500)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def client_segments(request):
+    """
+    Segments RFM des clients (table ClientSegment)
+    ?segment=champion : ajoute les clients du segment (?limit=50, meilleurs montants d'abord)
+    """
+    try:
+        segments = ClientSegment.objects.values('segment').annotate(
+            count=Count('id'), monetary=Sum('monetary')
+        ).order_by()
+        counts = {row['segment']: row for row in segments}
+        total = sum(row['count'] for row in counts.values())
+        
+        result = {
+            'total': total,
+            'computed_at': ClientSegment.objects.order_by('-computed_at').values_list('computed_at', flat=True).first(),
+            'segments': [
+                {
+                    'segment': code,
+                    'label': label,
+                    'count': counts.get(code, {}).get('count', 0),
+                    'percentage': round(counts.get(code, {}).get('count', 0) / max(total, 1) * 100, 2),
+                    'monetary': decimal_to_float(counts.get(code, {}).get('monetary')),
+                }
+                for code, label in ClientSegment.SEGMENT_CHOICES
+            ],
+        }
+        
+        segment = request.query_params.get('segment')
+        if segment:
+            if segment not in dict(ClientSegment.SEGMENT_CHOICES):
+                return Response({'error': f'Segment inconnu : {segment}'}, status=status.HTTP_400_BAD_REQUEST)
+            limit = int(request.query_params.get('limit', 50))
+            members = ClientSegment.objects.filter(segment=segment).select_related('client').order_by('-monetary')[:limit]
+            result['clients'] = [
+                {
+                    'id': member.client_id,
+                    'name': member.client.full_name,
+                    'recency_days': member.recency_days,
+                    'frequency': member.frequency,
+                    'monetary': decimal_to_float(member.monetary),
+                    'rfm': f'{member.r_score}{member.f_score}{member.m_score}',
+                }
+                for member in members
+            ]
+        
+        return Response(result)
+        
+    except ValueError:
+        return Response({'error': 'limit doit être un entier'}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({'error': str(e)}, status=500)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def refresh_client_segments(request):
+    """Recalcule la segmentation RFM à la demande (administrateurs)"""
+    if not request.user.is_staff:
+        return Response({'error': 'Réservé aux administrateurs'}, status=status.HTTP_403_FORBIDDEN)
+    try:
+        return Response({'segments': ClientSegmentationService.refresh()})
+    except Exception as e:
+        logger.exception("Échec de la segmentation RFM")
+        return Response({'error': str(e)}, status=500)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def demand_forecast(request):
+    """
+    Demande prévue des prochaines semaines par produit
+    ?store=ville_avray|garches (défaut : deux magasins)  ?product=<id>  ?limit=50
+    """
+    try:
+        limit = int(request.query_params.get('limit', 50))
+        store = request.query_params.get('store')
+        product = request.query_params.get('product')
+        result = DemandForecastService.forecast()
+        
+        if store and store not in result['stores']:
+            return Response({'error': f'Magasin inconnu : {store}'}, status=status.HTTP_400_BAD_REQUEST)
+        columns = [result['stores'].index(store)] if store else list(range(len(result['stores'])))
+        weekly = result['forecast'][:, columns, :].sum(axis=1)
+        factor = result['seasonal_factor'][:, columns].mean(axis=1)
+        
+        rows = range(len(result['products']))
+        if product:
+            rows = [index for index in rows if result['products'][index] == int(product)]
+        else:
+            rows = weekly.sum(axis=1).argsort()[::-1][:limit].tolist()
+        
+        names = dict(Product.objects.filter(
+            id__in=[int(result['products'][index]) for index in rows]
+        ).values_list('id', 'name'))
+        return Response({
+            'weeks': [week.isoformat() for week in result['weeks']],
+            'products': [
+                {
+                    'product_id': int(result['products'][index]),
+                    'name': names.get(int(result['products'][index])),
+                    'forecast': [round(float(value), 2) for value in weekly[index]],
+                    'total': round(float(weekly[index].sum()), 2),
+                    'seasonal_factor': round(float(factor[index]), 2),
+                }
+                for index in rows
+            ],
+        })
+        
+    except ValueError:
+        return Response({'error': 'Paramètres product ou limit invalides'}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({'error': str(e)}, status=500)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def repair_stats(request):
     """Statistiques des réparations"""
     try:
         days = int(request.query_params.get('days', 30))
-        start_date = timezone.now().date() - timedelta(days=days)
+        start_date = timezone.localdate() - timedelta(days=days)
         
-        repairs = Repair.objects.filter(created_at__date__gte=start_date)
+        repairs = Repair.objects.filter(created_at__gte=day_start(start_date))
         
         # Réparations par statut
-        repairs_by_status = repairs.values('status').annotate(count=Count('id'))
-        
-        # Réparations par mois
-        repairs_by_month = []
-        now = timezone.now()
-        
-        for i in range(5, -1, -1):
-            month_date = now - timedelta(days=30*i)
-            month_start = month_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            
-            if i == 0:
-                month_end = now
-            else:
-                if month_start.month == 12:
-                    next_month = month_start.replace(year=month_start.year + 1, month=1)
-                else:
-                    next_month = month_start.replace(month=month_start.month + 1)
-                month_end = next_month - timedelta(seconds=1)
-            
-            month_repairs = repairs.filter(
-                created_at__gte=month_start,
-                created_at__lte=month_end
-            ).count()
-            
-            repairs_by_month.append({
-                'month': month_start.strftime('%b %Y'),
-                'repairs': month_repairs
-            })
+        repairs_by_status = repairs.values('status').annotate(count=Count('id')).order_by()
+        
+        # Réparations par mois (6 derniers mois)
+        start, end = last_buckets(6, 'month')
+        repairs_by_month = [
+            {'month': point['bucket'].strftime('%b %Y'), 'repairs': point['count']}
+            for point in TimeSeries.query(Repair.objects.all(), start, end, 'month')
+        ]
         
         return Response({
             'total_repairs': repairs.count(),
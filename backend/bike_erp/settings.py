@@ -244,6 +244,15 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 
+# Pré-rendu des PDF de facture après la commande (0 = rendu synchrone)
+INVOICE_PDF_WORKERS = config('INVOICE_PDF_WORKERS', default=2, cast=int)
+INVOICE_PDF_PENDING_TIMEOUT = config('INVOICE_PDF_PENDING_TIMEOUT', default=120, cast=int)  # secondes
+# Processus de rendu pour l'export groupé des factures (0 = rendu dans le processus web)
+INVOICE_EXPORT_WORKERS = config('INVOICE_EXPORT_WORKERS', default=4, cast=int)
+
+# Instantané colonnaire des rapports lourds (refresh_analytics_snapshot)
+ANALYTICS_SNAPSHOT_DIR = config('ANALYTICS_SNAPSHOT_DIR', default=os.path.join(BASE_DIR, 'snapshots'))
+
 # SMS Configuration (Free Mobile - 100% Gratuit)
 SMS_ENABLED = config('SMS_ENABLED', default=False, cast=bool)
 SMS_PROVIDER = config('SMS_PROVIDER', default='TWILIO')
@@ -7,7 +7,11 @@ class ClientAdmin(admin.ModelAdmin):
     list_display = ['full_name', 'email', 'phone', 'city', 'total_purchases', 'visit_count', 'is_active', 'created_at']
     search_fields = ['first_name', 'last_name', 'email', 'phone']
     list_filter = ['is_active', 'country', 'created_at']
-    readonly_fields = ['created_at', 'updated_at', 'full_name']
+    readonly_fields = [
+        'created_at', 'updated_at', 'full_name', 'total_purchases', 'visit_count',
+        'orders_total', 'orders_count', 'repairs_total', 'repairs_count',
+        'first_interaction', 'last_interaction',
+    ]
     
     fieldsets = (
         ('Informations personnelles', {
@@ -17,7 +21,13 @@ class ClientAdmin(admin.ModelAdmin):
             'fields': ('address', 'city', 'postal_code', 'country')
         }),
         ('Informations commerciales', {
-            'fields': ('total_purchases', 'visit_count', 'is_active', 'notes')
+            'fields': ('is_active', 'notes')
+        }),
+        ('Valeur client', {
+            'fields': (
+                'total_purchases', 'visit_count', 'orders_total', 'orders_count',
+                'repairs_total', 'repairs_count', 'first_interaction', 'last_interaction',
+            )
         }),
         ('Dates', {
             'fields': ('created_at', 'updated_at'),
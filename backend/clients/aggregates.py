@@ -0,0 +1,120 @@
+"""
+Agrégats par client (colonnes de la table clients)
+Une commande compte lorsqu'elle est terminée, une réparation lorsqu'elle est
+livrée. Chaque changement applique un incrément F() : un seul UPDATE par
+client, aucune relecture de l'historique ; la commande
+rebuild_client_aggregates recalcule tout en requêtes groupées. Une
+interaction retirée (annulation, suppression) ne recule pas les dates de
+première et dernière interaction avant la reconstruction suivante
+"""
+from collections import defaultdict
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, Least
+from .models import Client
+import logging
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+AGGREGATE_FIELDS = [
+    'orders_total', 'orders_count', 'repairs_total', 'repairs_count',
+    'total_purchases', 'visit_count', 'first_interaction', 'last_interaction',
+]
+
+# Modèle -> (préfixe des champs, statut comptabilisé, champ montant)
+TRACKED = {
+    'orders.Order': ('orders', 'completed', 'total_ttc'),
+    'repairs.Repair': ('repairs', 'delivered', 'final_cost'),
+}
+
+
+def empty_aggregate():
+    return {
+        'orders_total': Decimal('0'), 'orders_count': 0,
+        'repairs_total': Decimal('0'), 'repairs_count': 0,
+        'first': None, 'last': None,
+    }
+
+
+class ClientAggregateService:
+
+    @staticmethod
+    def apply(changes):
+        """
+        Applique des variations [(client_id, 'orders'|'repairs', montant, date, signe)]
+        Un UPDATE par client concerné, quel que soit le nombre de variations
+        """
+        totals = defaultdict(empty_aggregate)
+        for client_id, kind, amount, moment, sign in changes:
+            delta = totals[client_id]
+            delta[f'{kind}_total'] += sign * Decimal(str(amount or 0))
+            delta[f'{kind}_count'] += sign
+            if sign > 0 and moment is not None:
+                delta['first'] = min(filter(None, (delta['first'], moment)))
+                delta['last'] = max(filter(None, (delta['last'], moment)))
+
+        for client_id, delta in totals.items():
+            if not any(delta.values()):
+                continue
+            fields = {
+                'orders_total': F('orders_total') + delta['orders_total'],
+                'orders_count': F('orders_count') + delta['orders_count'],
+                'repairs_total': F('repairs_total') + delta['repairs_total'],
+                'repairs_count': F('repairs_count') + delta['repairs_count'],
+                'total_purchases': F('total_purchases') + (delta['orders_total'] + delta['repairs_total']),
+                'visit_count': F('visit_count') + (delta['orders_count'] + delta['repairs_count']),
+            }
+            if delta['first'] is not None:
+                # LEAST/GREATEST renvoient NULL tant que le client n'a aucune interaction
+                first, last = Value(delta['first']), Value(delta['last'])
+                fields['first_interaction'] = Coalesce(Least('first_interaction', first), first)
+                fields['last_interaction'] = Coalesce(Greatest('last_interaction', last), last)
+            Client.objects.filter(pk=client_id).update(**fields)
+
+    @staticmethod
+    def record(kind, instances):
+        """Comptabilise des commandes/réparations créées en masse (bulk_create n'émet pas de signal)"""
+        amount_field = {prefix: field for prefix, _, field in TRACKED.values()}[kind]
+        ClientAggregateService.apply([
+            (instance.client_id, kind, getattr(instance, amount_field), instance.created_at, 1)
+            for instance in instances
+        ])
+
+    @staticmethod
+    def rebuild():
+        """Recalcule les agrégats de tous les clients ; retourne le nombre de clients avec activité"""
+        from django.apps import apps
+
+        totals = defaultdict(empty_aggregate)
+        for label, (kind, status, amount_field) in TRACKED.items():
+            for row in apps.get_model(label).objects.filter(status=status).values('client_id').annotate(
+                total=Sum(amount_field), count=Count('id'), first=Min('created_at'), last=Max('created_at')
+            ).order_by():
+                aggregate = totals[row['client_id']]
+                aggregate[f'{kind}_total'] = row['total'] or Decimal('0')
+                aggregate[f'{kind}_count'] = row['count']
+                aggregate['first'] = min(filter(None, (aggregate['first'], row['first'])))
+                aggregate['last'] = max(filter(None, (aggregate['last'], row['last'])))
+
+        clients = [
+            Client(
+                pk=client_id,
+                orders_total=aggregate['orders_total'], orders_count=aggregate['orders_count'],
+                repairs_total=aggregate['repairs_total'], repairs_count=aggregate['repairs_count'],
+                total_purchases=aggregate['orders_total'] + aggregate['repairs_total'],
+                visit_count=aggregate['orders_count'] + aggregate['repairs_count'],
+                first_interaction=aggregate['first'], last_interaction=aggregate['last'],
+            )
+            for client_id, aggregate in totals.items()
+        ]
+        with transaction.atomic():
+            Client.objects.update(
+                orders_total=0, orders_count=0, repairs_total=0, repairs_count=0,
+                total_purchases=0, visit_count=0, first_interaction=None, last_interaction=None,
+            )
+            Client.objects.bulk_update(clients, AGGREGATE_FIELDS, batch_size=BATCH_SIZE)
+
+        logger.info(f"Agrégats clients reconstruits : {len(clients)} client(s) avec activité")
+        return len(clients)
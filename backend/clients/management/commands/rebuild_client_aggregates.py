@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from clients.aggregates import ClientAggregateService
+
+
+class Command(BaseCommand):
+    help = "Reconstruit les agrégats clients (valeur vie, interactions) depuis l'historique"
+
+    def handle(self, *args, **options):
+        count = ClientAggregateService.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'{count} client(s) avec activité'))
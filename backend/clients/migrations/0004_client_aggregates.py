@@ -0,0 +1,51 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0003_client_created_at_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='first_interaction',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='last_interaction',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='orders_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='orders_total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='repairs_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='repairs_total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['total_purchases', 'id'], name='clients_total_p_5c33b2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['last_interaction'], name='clients_last_in_6c4d5f_idx'),
+        ),
+    ]
@@ -16,8 +16,16 @@ class Client(models.Model):
     notes = models.TextField(blank=True, default='')
 
     is_active = models.BooleanField(default=True)
-    total_purchases = models.DecimalField(max_digits=10, decimal_places=2, default=0)
-    visit_count = models.IntegerField(default=0)
+    # Agrégats tenus à jour par incréments (clients.aggregates) :
+    # commandes terminées et réparations livrées
+    total_purchases = models.DecimalField(max_digits=10, decimal_places=2, default=0)  # Valeur vie client
+    visit_count = models.IntegerField(default=0)  # Commandes + réparations
+    orders_total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    orders_count = models.IntegerField(default=0)
+    repairs_total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    repairs_count = models.IntegerField(default=0)
+    first_interaction = models.DateTimeField(null=True, blank=True)
+    last_interaction = models.DateTimeField(null=True, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -28,6 +36,9 @@ class Client(models.Model):
         indexes = [
             models.Index(fields=['email']),
             models.Index(fields=['last_name', 'first_name']),
+            models.Index(fields=['created_at', 'id']),  # Pagination par curseur
+            models.Index(fields=['total_purchases', 'id']),  # Tri par valeur vie client
+            models.Index(fields=['last_interaction']),
         ]
 
     def __str__(self):
@@ -36,3 +47,10 @@ class Client(models.Model):
     @property
     def full_name(self):
         return f"{self.first_name} {self.last_name}"
+
+    @property
+    def average_basket(self):
+        """Panier moyen des commandes terminées"""
+        if not self.orders_count:
+            return 0
+        return round(self.orders_total / self.orders_count, 2)
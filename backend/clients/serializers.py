@@ -4,13 +4,15 @@ import re
 
 class ClientSerializer(serializers.ModelSerializer):
     full_name = serializers.ReadOnlyField()
+    average_basket = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
 
     class Meta:
         model = Client
         fields = '__all__'
         read_only_fields = [
             'id', 'created_at', 'updated_at', 'full_name',
-            'total_purchases', 'visit_count'
+            'total_purchases', 'visit_count', 'orders_total', 'orders_count',
+            'repairs_total', 'repairs_count', 'first_interaction', 'last_interaction',
         ]
         extra_kwargs = {
             'first_name': {'required': False, 'allow_blank': True},
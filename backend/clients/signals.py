@@ -0,0 +1,66 @@
+"""
+Mise à jour incrémentale des agrégats clients
+La contribution d'une commande ou d'une réparation (client, montant, date) est
+mémorisée au chargement ; à l'enregistrement, l'ancienne est retirée et la
+nouvelle ajoutée lorsqu'elles diffèrent (statut, montant ou client modifié)
+"""
+from django.db.models.signals import post_delete, post_init, post_save
+from .aggregates import TRACKED, ClientAggregateService
+
+UNKNOWN = object()  # Champ différé : contribution impossible à déterminer
+
+_tracked = {}  # Modèle -> (préfixe, statut comptabilisé, champ montant)
+
+
+def contribution(sender, instance):
+    """(client_id, montant, date) si l'instance est comptabilisée, sinon None"""
+    kind, status, amount_field = _tracked[sender]
+    # Lecture directe : ne déclenche pas de requête si un champ a été différé
+    values = instance.__dict__
+    if 'status' not in values:
+        return UNKNOWN
+    if values['status'] != status:
+        return None
+    if not {'client_id', amount_field, 'created_at'} <= values.keys():
+        return UNKNOWN
+    return values['client_id'], values[amount_field], values['created_at']
+
+
+def remember_contribution(sender, instance, **kwargs):
+    # Instance pas encore enregistrée : rien n'est comptabilisé
+    instance._aggregate_contribution = None if instance.pk is None else contribution(sender, instance)
+
+
+def apply_contribution(sender, instance, **kwargs):
+    previous = getattr(instance, '_aggregate_contribution', None)
+    current = contribution(sender, instance)
+    if previous is UNKNOWN or current is UNKNOWN or previous == current:
+        return
+    kind = _tracked[sender][0]
+    changes = []
+    if previous is not None:
+        client_id, amount, moment = previous
+        changes.append((client_id, kind, amount, moment, -1))
+    if current is not None:
+        client_id, amount, moment = current
+        changes.append((client_id, kind, amount, moment, 1))
+    ClientAggregateService.apply(changes)
+    instance._aggregate_contribution = current
+
+
+def remove_contribution(sender, instance, **kwargs):
+    current = contribution(sender, instance)
+    if current is None or current is UNKNOWN:
+        return
+    client_id, amount, moment = current
+    ClientAggregateService.apply([(client_id, _tracked[sender][0], amount, moment, -1)])
+
+
+def connect_aggregate_signals():
+    from django.apps import apps
+    for label, tracked in TRACKED.items():
+        model = apps.get_model(label)
+        _tracked[model] = tracked
+        post_init.connect(remember_contribution, sender=model, dispatch_uid=f'client_aggregate_init_{label}')
+        post_save.connect(apply_contribution, sender=model, dispatch_uid=f'client_aggregate_save_{label}')
+        post_delete.connect(remove_contribution, sender=model, dispatch_uid=f'client_aggregate_delete_{label}')
@@ -1,19 +1,36 @@
 from rest_framework import viewsets, filters, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from django.db.models import Q
+from decimal import Decimal, InvalidOperation
 from .models import Client
 from .serializers import ClientSerializer
+from utils.pagination import HybridCursorPagination, ListCountMixin
 
 
-class ClientViewSet(viewsets.ModelViewSet):
+class ClientViewSet(ListCountMixin, viewsets.ModelViewSet):
     queryset = Client.objects.all()
     serializer_class = ClientSerializer
+    pagination_class = HybridCursorPagination
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['first_name', 'last_name', 'email', 'phone']
-    ordering_fields = ['created_at', 'last_name', 'first_name']
+    # total_purchases : valeur vie client (ClientAggregate), indexée
+    ordering_fields = ['created_at', 'last_name', 'first_name', 'total_purchases', 'visit_count']
     ordering = ['-created_at']
     
+    def get_queryset(self):
+        """Filtre optionnel par valeur vie client : ?min_value= / ?max_value="""
+        queryset = super().get_queryset()
+        for param, lookup in (('min_value', 'total_purchases__gte'), ('max_value', 'total_purchases__lte')):
+            value = self.request.query_params.get(param)
+            if value:
+                try:
+                    queryset = queryset.filter(**{lookup: Decimal(value)})
+                except InvalidOperation:
+                    raise ValidationError({param: 'Montant invalide'})
+        return queryset
+    
     def create(self, request, *args, **kwargs):
         """Create a new client with better error handling"""
         serializer = self.get_serializer(data=request.data)
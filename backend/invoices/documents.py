@@ -0,0 +1,102 @@
+"""
+Pré-rendu des PDF (ticket de caisse et facture) hors du chemin de la caisse
+La génération est déclenchée après le commit de la commande et exécutée
+par un pool de threads ; les téléchargements servent le fichier prêt
+ou répondent "pending" tant que le rendu est en cours
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import Invoice
+from .rendering import invoice_document_data
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Pool de rendu partagé par le processus (créé au premier usage)"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.INVOICE_PDF_WORKERS,
+                thread_name_prefix='invoice-pdf'
+            )
+    return _executor
+
+
+class InvoiceDocumentService:
+
+    @staticmethod
+    def render_documents(invoice_id):
+        """Génère le ticket et la facture puis marque la facture comme prête"""
+        invoice = Invoice.objects.select_related('order__client').get(pk=invoice_id)
+        try:
+            data = invoice_document_data(invoice)
+            invoice.generate_receipt(save=False, data=data)
+            invoice.generate_invoice(save=False, data=data)
+        except Exception:
+            logger.exception(f"Échec du rendu PDF de la facture {invoice.invoice_number}")
+            Invoice.objects.filter(pk=invoice_id).update(pdf_status='failed', updated_at=timezone.now())
+            return False
+
+        # Mise à jour ciblée : ne pas écraser les champs modifiés entre-temps
+        Invoice.objects.filter(pk=invoice_id).update(
+            receipt_pdf=invoice.receipt_pdf.name,
+            invoice_pdf=invoice.invoice_pdf.name,
+            receipt_hash=invoice.receipt_hash,
+            invoice_hash=invoice.invoice_hash,
+            pdf_status='ready',
+            updated_at=timezone.now()
+        )
+        logger.info(f"PDF pré-rendus pour la facture {invoice.invoice_number}")
+        return True
+
+    @staticmethod
+    def _render_in_worker(invoice_id):
+        try:
+            return InvoiceDocumentService.render_documents(invoice_id)
+        except Exception:
+            logger.exception(f"Erreur du worker PDF pour la facture {invoice_id}")
+            return False
+        finally:
+            # Chaque thread du pool possède sa propre connexion
+            connection.close()
+
+    @staticmethod
+    def submit(invoice_id):
+        """Lance le rendu (synchrone si INVOICE_PDF_WORKERS vaut 0)"""
+        if settings.INVOICE_PDF_WORKERS <= 0:
+            return InvoiceDocumentService.render_documents(invoice_id)
+        return get_executor().submit(InvoiceDocumentService._render_in_worker, invoice_id)
+
+    @staticmethod
+    def schedule_after_commit(invoice):
+        """
+        Marque la facture "pending" et planifie le rendu après le commit
+        À appeler dans la transaction qui crée la commande
+        """
+        if invoice.pdf_status != 'pending':
+            Invoice.objects.filter(pk=invoice.pk).update(pdf_status='pending')
+            invoice.pdf_status = 'pending'
+        invoice_id = invoice.pk
+        transaction.on_commit(lambda: InvoiceDocumentService.submit(invoice_id))
+
+    @staticmethod
+    def is_rendering(invoice):
+        """
+        Vrai si un rendu est en cours et récent
+        Un rendu "pending" plus ancien que INVOICE_PDF_PENDING_TIMEOUT est
+        considéré comme perdu (redémarrage du serveur) et refait à la demande
+        """
+        if invoice.pdf_status != 'pending':
+            return False
+        timeout = timedelta(seconds=settings.INVOICE_PDF_PENDING_TIMEOUT)
+        return invoice.updated_at >= timezone.now() - timeout
@@ -0,0 +1,101 @@
+"""
+Ticket de caisse au format ESC/POS (imprimante thermique 80mm)
+Construit directement les octets envoyés à l'imprimante, sans passer par
+un PDF : même contenu que le ticket PDF (rendering.render_receipt), à partir
+des mêmes données (rendering.invoice_document_data)
+"""
+from .rendering import payment_label
+
+ESC = b'\x1b'
+GS = b'\x1d'
+
+INIT = ESC + b'@'
+CODEPAGE_CP858 = ESC + b't\x13'  # Page de code 19 : CP858 (latin + €)
+ALIGN_LEFT = ESC + b'a\x00'
+ALIGN_CENTER = ESC + b'a\x01'
+ALIGN_RIGHT = ESC + b'a\x02'
+BOLD_ON = ESC + b'E\x01'
+BOLD_OFF = ESC + b'E\x00'
+SIZE_NORMAL = GS + b'!\x00'
+SIZE_DOUBLE = GS + b'!\x11'  # Double largeur et double hauteur
+SIZE_TALL = GS + b'!\x01'  # Double hauteur
+CUT = GS + b'V\x42\x03'  # Avance de 3 lignes puis coupe partielle
+
+LINE_WIDTH = 48  # Caractères par ligne en police A sur 80mm
+ENCODING = 'cp858'
+
+
+def encode(text):
+    """Texte vers CP858 (caractère de remplacement si absent de la page de code)"""
+    return text.encode(ENCODING, errors='replace')
+
+
+def line(text=''):
+    return encode(text) + b'\n'
+
+
+def columns(left, right, width=LINE_WIDTH):
+    """Texte à gauche et montant aligné à droite sur une même ligne"""
+    space = width - len(right)
+    if len(left) > space - 1:
+        left = left[:max(space - 1, 0)]
+    return line(left.ljust(space) + right)
+
+
+def separator(char='-'):
+    return line(char * LINE_WIDTH)
+
+
+def money(value):
+    return f"{value:.2f}€"
+
+
+def render_receipt_escpos(data):
+    """Flux ESC/POS complet du ticket (en-tête, articles, totaux, paiement, pied)"""
+    store = data['store']
+    client = data['client']
+    out = [INIT, CODEPAGE_CP858]
+
+    # ============ EN-TÊTE ============
+    out += [ALIGN_CENTER, BOLD_ON, SIZE_DOUBLE, line('MICHEL DE VELO'), SIZE_NORMAL]
+    out += [line(store['name']), BOLD_OFF]
+    out += [line(store['address']), line(store['postal']), line(f"Tél: {store['phone']}")]
+    out += [ALIGN_LEFT, separator()]
+
+    # ============ TICKET N° ============
+    out += [ALIGN_CENTER, BOLD_ON, line(f"TICKET N° {data['invoice_number']}"), BOLD_OFF]
+    out += [line(f"Date: {data['created_at'].strftime('%d/%m/%Y %H:%M')}"), ALIGN_LEFT, line()]
+
+    # ============ CLIENT ============
+    out += [BOLD_ON, encode('Client: '), BOLD_OFF, line(f"{client['first_name']} {client['last_name']}")]
+    if client['phone']:
+        out.append(line(f"Tél: {client['phone']}"))
+    out.append(separator())
+
+    # ============ ARTICLES ============
+    for item in data['items']:
+        out += [BOLD_ON, line(item['name'][:LINE_WIDTH]), BOLD_OFF]
+        out.append(columns(
+            f"  {item['quantity']} x {money(item['unit_price_ttc'])}",
+            money(item['subtotal_ttc'])
+        ))
+    out.append(separator())
+
+    # ============ TOTAUX ============
+    out.append(columns('Sous-total HT', money(data['subtotal_ht'])))
+    out.append(columns('TVA (20%)', money(data['total_tva'])))
+    if data['discount_amount'] > 0:
+        out.append(columns('Remise', f"-{money(data['discount_amount'])}"))
+
+    out += [line(), ALIGN_CENTER, BOLD_ON, SIZE_TALL, line(f"TOTAL TTC: {money(data['total_ttc'])}"), SIZE_NORMAL, BOLD_OFF]
+    out.append(line(f"Paiement: {payment_label(data)}"))
+    out += [ALIGN_LEFT, separator()]
+
+    # ============ PIED DE PAGE ============
+    out += [ALIGN_CENTER, BOLD_ON, line('Merci de votre visite !'), BOLD_OFF]
+    out.append(line('Garantie: 2 ans vélos / 1 an accessoires'))
+    out.append(line('TVA non applicable - art. 293 B du CGI'))
+    out.append(line('SIRET: 123 456 789 00012'))
+    out += [ALIGN_LEFT, CUT]
+
+    return b''.join(out)
@@ -0,0 +1,169 @@
+"""
+Export groupé des factures d'une période sous forme d'archive ZIP
+Les PDF déjà générés sont repris tels quels ; les manquants sont rendus
+en parallèle dans un pool de processus. L'archive est produite au fil de
+l'eau (aucune archive complète en mémoire) : chaque fichier est envoyé
+dès qu'il est prêt
+"""
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models import Prefetch
+from orders.models import OrderItem
+from .models import Invoice
+from .rendering import content_hash, invoice_document_data, render_invoice
+import logging
+import zipfile
+
+logger = logging.getLogger(__name__)
+
+
+class ZipChunkBuffer:
+    """
+    Flux d'écriture non positionnable pour zipfile
+    Les octets écrits sont récupérés et vidés après chaque fichier
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class InvoiceExportService:
+
+    @staticmethod
+    def get_invoices(date_from, date_to, store=None):
+        """Factures émises entre deux dates incluses, avec leurs lignes préchargées"""
+        invoices = Invoice.objects.filter(
+            invoice_date__gte=date_from, invoice_date__lte=date_to
+        ).select_related('order__client').prefetch_related(
+            Prefetch('order__items', queryset=OrderItem.objects.select_related('product').order_by('id'))
+        ).order_by('invoice_date', 'id')
+        if store:
+            invoices = invoices.filter(order__store=store)
+        return invoices
+
+    @staticmethod
+    def archive_name(date_from, date_to, store=None):
+        suffix = f'_{store}' if store else ''
+        return f"factures{suffix}_{date_from:%Y%m%d}_{date_to:%Y%m%d}.zip"
+
+    @staticmethod
+    def _existing_pdf(invoice):
+        """Contenu du PDF déjà généré, ou None s'il est absent"""
+        if not invoice.invoice_pdf or not invoice.invoice_pdf.storage.exists(invoice.invoice_pdf.name):
+            return None
+        with invoice.invoice_pdf.open('rb') as handle:
+            return handle.read()
+
+    @staticmethod
+    def _store_pdf(invoice, digest, content):
+        """Conserve le PDF rendu pour les prochains téléchargements"""
+        invoice.invoice_hash = digest
+        invoice.invoice_pdf.save(f'facture_{invoice.invoice_number}.pdf', ContentFile(content), save=False)
+        Invoice.objects.filter(pk=invoice.pk).update(
+            invoice_pdf=invoice.invoice_pdf.name, invoice_hash=digest
+        )
+
+    @staticmethod
+    def iter_documents(invoices, workers=None):
+        """
+        Produit (nom de fichier, contenu PDF) dans l'ordre de disponibilité
+        Les PDF existants d'abord, puis les rendus au fur et à mesure qu'ils se terminent
+        Les échecs de rendu sont listés dans un fichier erreurs.txt en fin d'archive
+        """
+        if workers is None:
+            workers = settings.INVOICE_EXPORT_WORKERS
+
+        missing = []
+        for invoice in invoices:
+            content = InvoiceExportService._existing_pdf(invoice)
+            if content is None:
+                missing.append(invoice)
+            else:
+                yield f'facture_{invoice.invoice_number}.pdf', content
+
+        if not missing:
+            return
+
+        errors = []
+        if workers <= 0:
+            for invoice in missing:
+                data = invoice_document_data(invoice)
+                try:
+                    content = render_invoice(data)
+                except Exception:
+                    logger.exception(f"Échec du rendu de la facture {invoice.invoice_number}")
+                    errors.append(invoice.invoice_number)
+                    continue
+                InvoiceExportService._store_pdf(invoice, content_hash(data, 'invoice'), content)
+                yield f'facture_{invoice.invoice_number}.pdf', content
+        else:
+            yield from InvoiceExportService._render_in_pool(missing, workers, errors)
+
+        if errors:
+            report = 'Factures non rendues :\n' + '\n'.join(errors) + '\n'
+            yield 'erreurs.txt', report.encode()
+
+    @staticmethod
+    def _render_in_pool(invoices, workers, errors):
+        """
+        Rendu parallèle : les données sont extraites dans ce processus
+        (les workers n'accèdent pas à la base) et le nombre de rendus en
+        attente est borné pour ne pas accumuler les PDF si le client lit lentement
+        """
+        pending = {}
+        queue = iter(invoices)
+        max_in_flight = workers * 2
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            def submit_next():
+                invoice = next(queue, None)
+                if invoice is None:
+                    return False
+                data = invoice_document_data(invoice)
+                future = executor.submit(render_invoice, data)
+                pending[future] = (invoice, content_hash(data, 'invoice'))
+                return True
+
+            while len(pending) < max_in_flight and submit_next():
+                pass
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    invoice, digest = pending.pop(future)
+                    try:
+                        content = future.result()
+                    except Exception:
+                        logger.exception(f"Échec du rendu de la facture {invoice.invoice_number}")
+                        errors.append(invoice.invoice_number)
+                    else:
+                        InvoiceExportService._store_pdf(invoice, digest, content)
+                        yield f'facture_{invoice.invoice_number}.pdf', content
+                    submit_next()
+
+    @staticmethod
+    def stream_zip(documents):
+        """Générateur d'octets d'une archive ZIP construite fichier par fichier"""
+        buffer = ZipChunkBuffer()
+        with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for name, content in documents:
+                archive.writestr(name, content)
+                chunk = buffer.pop()
+                if chunk:
+                    yield chunk
+        chunk = buffer.pop()  # Répertoire central écrit à la fermeture
+        if chunk:
+            yield chunk
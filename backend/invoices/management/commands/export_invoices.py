@@ -0,0 +1,49 @@
+from datetime import date
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from invoices.export import InvoiceExportService
+
+
+def parse_day(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f'Date invalide : {value} (attendu AAAA-MM-JJ)')
+
+
+class Command(BaseCommand):
+    help = "Exporte les factures PDF d'une période dans une archive ZIP"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', required=True, help='Première date (AAAA-MM-JJ)')
+        parser.add_argument('--to', dest='date_to', required=True, help='Dernière date incluse (AAAA-MM-JJ)')
+        parser.add_argument('--store', choices=['ville_avray', 'garches'], help='Magasin (tous par défaut)')
+        parser.add_argument('--output', help="Chemin de l'archive (nom automatique par défaut)")
+        parser.add_argument(
+            '--workers', type=int, default=settings.INVOICE_EXPORT_WORKERS,
+            help='Processus de rendu des PDF manquants (0 = aucun parallélisme)',
+        )
+
+    def handle(self, *args, **options):
+        date_from = parse_day(options['date_from'])
+        date_to = parse_day(options['date_to'])
+        if date_from > date_to:
+            raise CommandError('--from doit précéder --to')
+
+        store = options['store']
+        output = options['output'] or InvoiceExportService.archive_name(date_from, date_to, store)
+        invoices = InvoiceExportService.get_invoices(date_from, date_to, store)
+
+        count = 0
+
+        def documents():
+            nonlocal count
+            for name, content in InvoiceExportService.iter_documents(invoices, workers=options['workers']):
+                count += 1
+                yield name, content
+
+        with open(output, 'wb') as handle:
+            for chunk in InvoiceExportService.stream_zip(documents()):
+                handle.write(chunk)
+
+        self.stdout.write(self.style.SUCCESS(f'{count} fichier(s) exporté(s) dans {output}'))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0003_alter_invoice_options_remove_invoice_due_date_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoice',
+            name='pdf_status',
+            field=models.CharField(blank=True, choices=[('pending', 'En cours de génération'), ('ready', 'Prêt'), ('failed', 'Échec')], max_length=10, null=True, verbose_name='État des PDF'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0004_invoice_pdf_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoice',
+            name='invoice_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='receipt_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
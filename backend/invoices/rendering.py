@@ -0,0 +1,569 @@
+"""
+Rendu des tickets de caisse et factures PDF
+Les styles ReportLab et le logo (fichier local, décodé et réduit une seule fois)
+sont construits une fois par processus. Le rendu part d'un dictionnaire de données
+pures (sérialisable, utilisable dans un autre processus) et chaque document est
+associé à une empreinte de ces données pour éviter de re-rendre un document inchangé
+"""
+from functools import lru_cache
+from io import BytesIO
+from pathlib import Path
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm, mm
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Flowable
+from utils.line_items import quantize_amount, to_decimal
+import hashlib
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Incrémenter à chaque modification de mise en page pour invalider les empreintes
+RENDERER_VERSION = 1
+
+LOGO_PATH = Path(__file__).resolve().parent / 'assets' / 'logo.png'
+LOGO_MAX_PIXELS = 200  # ~14 mm à 360 dpi
+
+VERT_MENTHE = colors.HexColor('#4ad19e')
+NOIR = colors.HexColor('#000000')
+GRIS_FONCE = colors.HexColor('#1a1a1a')
+GRIS_CLAIR = colors.HexColor('#f8f9fa')
+
+STORES = {
+    'ville_avray': {
+        'name': "Ville d'Avray",
+        'address': "123 Rue de Paris",
+        'postal': "92410 Ville d'Avray",
+        'phone': "01 23 45 67 89",
+        'email': "villeavray@micheldevelo.fr"
+    },
+    'garches': {
+        'name': "Garches",
+        'address': "456 Avenue de Versailles",
+        'postal': "92380 Garches",
+        'phone': "01 98 76 54 32",
+        'email': "garches@micheldevelo.fr"
+    }
+}
+
+PAYMENT_LABELS = {
+    'cash': 'Espèces',
+    'card': 'Carte bancaire',
+    'check': 'Chèque',
+    'sumup': 'SumUp',
+}
+
+
+def store_info(store):
+    """Coordonnées du magasin (Ville d'Avray par défaut)"""
+    return STORES.get(store, STORES['ville_avray'])
+
+
+def payment_label(data, installment_format='{n}x'):
+    if data['payment_method'] == 'installment':
+        return installment_format.format(n=data['installments'])
+    return PAYMENT_LABELS.get(data['payment_method'], data['payment_method'])
+
+
+# ============ DONNÉES ============
+
+def _amount(value):
+    """Montant normalisé (0 et Decimal('0.00') donnent la même empreinte)"""
+    return quantize_amount(to_decimal(value))
+
+
+def invoice_document_data(invoice):
+    """
+    Extrait les données d'une facture nécessaires au rendu
+    Deux requêtes au plus : commande + client (si non chargés) et lignes
+    (aucune si les lignes ont été préchargées, triées par id)
+    """
+    order = invoice.order
+    client = order.client
+    if 'items' in getattr(order, '_prefetched_objects_cache', {}):
+        order_items = order.items.all()
+    else:
+        order_items = order.items.select_related('product').order_by('id')
+    items = [
+        {
+            'name': item.product.name if item.product else (item.description or 'Prestation'),
+            'reference': item.product.reference if item.product else '',
+            'quantity': item.quantity,
+            'unit_price_ht': _amount(item.unit_price_ht),
+            'unit_price_ttc': _amount(item.unit_price_ttc),
+            'tva_rate': _amount(item.tva_rate),
+            'subtotal_ttc': _amount(item.subtotal_ttc),
+        }
+        for item in order_items
+    ]
+
+    return {
+        'invoice_number': invoice.invoice_number,
+        'created_at': invoice.created_at,
+        'invoice_date': invoice.invoice_date,
+        'order_created_at': order.created_at,
+        'store': store_info(order.store),
+        'client': {
+            'first_name': client.first_name,
+            'last_name': client.last_name,
+            'address': client.address,
+            'postal_code': client.postal_code,
+            'city': client.city,
+            'email': client.email,
+            'phone': client.phone,
+        },
+        'notes': order.notes,
+        'items': items,
+        'subtotal_ht': _amount(order.subtotal_ht),
+        'total_tva': _amount(order.total_tva),
+        'discount_amount': _amount(order.discount_amount),
+        'total_ttc': _amount(order.total_ttc),
+        'payment_method': order.payment_method,
+        'installments': order.installments,
+    }
+
+
+def content_hash(data, kind):
+    """Empreinte SHA-256 des données d'un document (ticket ou facture)"""
+    payload = json.dumps(
+        {'kind': kind, 'version': RENDERER_VERSION, 'data': data},
+        sort_keys=True, default=str, separators=(',', ':')
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+# ============ RESSOURCES PARTAGÉES ============
+
+@lru_cache(maxsize=1)
+def load_logo():
+    """Logo local décodé et réduit une seule fois par processus"""
+    from PIL import Image as PILImage
+
+    image = PILImage.open(LOGO_PATH)
+    image.load()
+    image.thumbnail((LOGO_MAX_PIXELS, LOGO_MAX_PIXELS))
+    reader = ImageReader(image)
+    reader.getRGBData()  # Force le décodage maintenant plutôt qu'au premier rendu
+    return reader
+
+
+class LogoFlowable(Flowable):
+    """Dessine le logo préchargé (pas de lecture disque ni réseau au rendu)"""
+
+    def __init__(self, width, height):
+        super().__init__()
+        self.width = width
+        self.height = height
+
+    def wrap(self, availWidth, availHeight):
+        return self.width, self.height
+
+    def draw(self):
+        self.canv.drawImage(load_logo(), 0, 0, self.width, self.height, mask='auto')
+
+
+@lru_cache(maxsize=1)
+def receipt_styles():
+    """Styles du ticket thermique (construits une fois par processus)"""
+    styles = getSampleStyleSheet()
+    return {
+        'header': ParagraphStyle(
+            'TicketHeader', parent=styles['Normal'], fontSize=14, fontName='Helvetica-Bold',
+            alignment=TA_CENTER, textColor=VERT_MENTHE, spaceAfter=3
+        ),
+        'info': ParagraphStyle(
+            'TicketInfo', parent=styles['Normal'], fontSize=8, alignment=TA_CENTER, spaceAfter=2
+        ),
+        'ticket': ParagraphStyle(
+            'TicketNumber', parent=styles['Normal'], fontSize=10, fontName='Helvetica-Bold',
+            alignment=TA_CENTER, spaceAfter=2
+        ),
+        'client': ParagraphStyle(
+            'ClientTicket', parent=styles['Normal'], fontSize=8, alignment=TA_LEFT, spaceAfter=1
+        ),
+        'item': ParagraphStyle(
+            'ItemTicket', parent=styles['Normal'], fontSize=8, alignment=TA_LEFT
+        ),
+        'total': ParagraphStyle(
+            'TotalTicket', parent=styles['Normal'], fontSize=9, alignment=TA_RIGHT, spaceAfter=1
+        ),
+        'total_ttc': ParagraphStyle(
+            'TotalTTCTicket', parent=styles['Normal'], fontSize=12, fontName='Helvetica-Bold',
+            alignment=TA_CENTER, spaceAfter=2
+        ),
+        'footer': ParagraphStyle(
+            'FooterTicket', parent=styles['Normal'], fontSize=7, alignment=TA_CENTER, spaceAfter=1
+        ),
+        'separator': TableStyle([
+            ('LINEBELOW', (0, 0), (-1, -1), 1, colors.black),
+        ]),
+    }
+
+
+@lru_cache(maxsize=1)
+def invoice_styles():
+    """Styles de la facture A4 (construits une fois par processus)"""
+    styles = getSampleStyleSheet()
+    return {
+        'title': ParagraphStyle(
+            'TitleStyle', parent=styles['Heading1'], fontSize=26, textColor=VERT_MENTHE,
+            fontName='Helvetica-Bold', alignment=TA_LEFT, leading=30
+        ),
+        'date': ParagraphStyle(
+            'DateStyle', parent=styles['Normal'], fontSize=9, alignment=TA_RIGHT, textColor=GRIS_FONCE
+        ),
+        'store': ParagraphStyle(
+            'StoreInfo', parent=styles['Normal'], fontSize=10, alignment=TA_CENTER, textColor=GRIS_FONCE
+        ),
+        'invoice_header': ParagraphStyle(
+            'InvoiceHeader', parent=styles['Heading2'], fontSize=18, textColor=colors.white,
+            alignment=TA_CENTER, fontName='Helvetica-Bold'
+        ),
+        'client_header': ParagraphStyle(
+            'ClientHeader', parent=styles['Normal'], fontSize=11, fontName='Helvetica-Bold',
+            textColor=VERT_MENTHE, spaceAfter=4
+        ),
+        'client_content': ParagraphStyle(
+            'ClientContent', parent=styles['Normal'], fontSize=9, textColor=GRIS_FONCE
+        ),
+        'notes': ParagraphStyle(
+            'NotesStyle', parent=styles['Normal'], fontSize=9, textColor=GRIS_FONCE, leftIndent=5
+        ),
+        'table_header': ParagraphStyle(
+            'TableHeader', parent=styles['Normal'], fontSize=10, textColor=colors.white,
+            fontName='Helvetica-Bold', alignment=TA_CENTER
+        ),
+        'item': ParagraphStyle(
+            'ItemStyle', parent=styles['Normal'], fontSize=9, textColor=GRIS_FONCE
+        ),
+        'totals_label': ParagraphStyle(
+            'TotalsLabel', parent=styles['Normal'], fontSize=10, textColor=GRIS_FONCE, alignment=TA_RIGHT
+        ),
+        'totals_value': ParagraphStyle(
+            'TotalsValue', parent=styles['Normal'], fontSize=10, textColor=GRIS_FONCE,
+            alignment=TA_RIGHT, fontName='Helvetica-Bold'
+        ),
+        'total_final': ParagraphStyle(
+            'TotalFinal', parent=styles['Normal'], fontSize=16, textColor=colors.white,
+            alignment=TA_CENTER, fontName='Helvetica-Bold'
+        ),
+        'footer': ParagraphStyle(
+            'Footer', parent=styles['Normal'], fontSize=8, textColor=GRIS_FONCE,
+            alignment=TA_CENTER, leading=12
+        ),
+    }
+
+
+# ============ TICKET DE CAISSE ============
+
+def render_receipt(data):
+    """
+    Génère un TICKET DE CAISSE format thermique 80mm
+    Version simplifiée et compacte pour imprimante ticket
+    """
+    buffer = BytesIO()
+    styles = receipt_styles()
+
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=(80*mm, 297*mm),  # Largeur fixe, hauteur auto
+        topMargin=5*mm,
+        bottomMargin=5*mm,
+        leftMargin=5*mm,
+        rightMargin=5*mm
+    )
+
+    def separator():
+        line_table = Table([['']], colWidths=[70*mm])
+        line_table.setStyle(styles['separator'])
+        return line_table
+
+    info_style = styles['info']
+    elements = []
+
+    # ============ EN-TÊTE COMPACT ============
+    elements.append(Paragraph('<b>MICHEL DE VELO</b>', styles['header']))
+
+    store = data['store']
+    elements.append(Paragraph(f"<b>{store['name']}</b>", info_style))
+    elements.append(Paragraph(f"{store['address']}", info_style))
+    elements.append(Paragraph(f"{store['postal']}", info_style))
+    elements.append(Paragraph(f"Tél: {store['phone']}", info_style))
+
+    elements.append(Spacer(1, 3*mm))
+    elements.append(separator())
+    elements.append(Spacer(1, 3*mm))
+
+    # ============ TICKET N° ============
+    elements.append(Paragraph(f"TICKET N° {data['invoice_number']}", styles['ticket']))
+    elements.append(Paragraph(f"Date: {data['created_at'].strftime('%d/%m/%Y %H:%M')}", info_style))
+    elements.append(Spacer(1, 3*mm))
+
+    # ============ CLIENT ============
+    client = data['client']
+    elements.append(Paragraph(f"<b>Client:</b> {client['first_name']} {client['last_name']}", styles['client']))
+    if client['phone']:
+        elements.append(Paragraph(f"Tél: {client['phone']}", styles['client']))
+    elements.append(Spacer(1, 3*mm))
+
+    # ============ ARTICLES ============
+    item_style = styles['item']
+    elements.append(Paragraph('<b>Article / Qté / Prix</b>', item_style))
+    elements.append(Spacer(1, 1*mm))
+
+    for item in data['items']:
+        elements.append(Paragraph(f"<b>{item['name']}</b>", item_style))
+        qty_price = f"{item['quantity']} x {item['unit_price_ttc']:.2f}€ = <b>{item['subtotal_ttc']:.2f}€</b>"
+        elements.append(Paragraph(qty_price, item_style))
+        elements.append(Spacer(1, 2*mm))
+
+    elements.append(separator())
+    elements.append(Spacer(1, 2*mm))
+
+    # ============ TOTAUX ============
+    total_style = styles['total']
+    elements.append(Paragraph(f"Sous-total HT: {data['subtotal_ht']:.2f}€", total_style))
+    elements.append(Paragraph(f"TVA (20%): {data['total_tva']:.2f}€", total_style))
+    if data['discount_amount'] > 0:
+        elements.append(Paragraph(f"Remise: -{data['discount_amount']:.2f}€", total_style))
+
+    elements.append(Spacer(1, 2*mm))
+    elements.append(Paragraph(f"<b>TOTAL TTC: {data['total_ttc']:.2f}€</b>", styles['total_ttc']))
+    elements.append(Paragraph(f"Paiement: {payment_label(data)}", info_style))
+
+    elements.append(Spacer(1, 3*mm))
+    elements.append(separator())
+    elements.append(Spacer(1, 3*mm))
+
+    # ============ PIED DE PAGE ============
+    footer_style = styles['footer']
+    elements.append(Paragraph('<b>Merci de votre visite !</b>', footer_style))
+    elements.append(Paragraph('Garantie: 2 ans vélos / 1 an accessoires', footer_style))
+    elements.append(Paragraph('TVA non applicable - art. 293 B du CGI', footer_style))
+    elements.append(Spacer(1, 2*mm))
+    elements.append(Paragraph('SIRET: 123 456 789 00012', footer_style))
+
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+# ============ FACTURE A4 ============
+
+def render_invoice(data):
+    """
+    Génère une FACTURE COMPLÈTE format A4
+    Document officiel avec toutes les mentions légales
+    Charte graphique: Blanc, #4ad19e (vert menthe), Noir
+    """
+    buffer = BytesIO()
+    styles = invoice_styles()
+
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        topMargin=1*cm,
+        bottomMargin=1.5*cm,
+        leftMargin=2*cm,
+        rightMargin=2*cm
+    )
+    elements = []
+
+    # ============ EN-TÊTE AVEC LOGO + DATES ============
+    logo = LogoFlowable(14*mm, 14*mm)
+    title_text = Paragraph("<b>MICHEL DE VELO</b>", styles['title'])
+    date_text = Paragraph(f"""
+        <b>Date d'émission:</b> {data['invoice_date'].strftime('%d/%m/%Y')}<br/>
+        <b>Date de commande:</b> {data['order_created_at'].strftime('%d/%m/%Y à %H:%M')}
+    """, styles['date'])
+
+    header_table = Table([[logo, title_text, date_text]], colWidths=[16*mm, 88*mm, 66*mm])
+    header_table.setStyle(TableStyle([
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('ALIGN', (0, 0), (1, 0), 'LEFT'),
+        ('ALIGN', (2, 0), (2, 0), 'RIGHT'),
+        ('LEFTPADDING', (0, 0), (-1, -1), 0),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+    ]))
+    elements.append(header_table)
+
+    line_table = Table([['']], colWidths=[17*cm])
+    line_table.setStyle(TableStyle([
+        ('LINEBELOW', (0, 0), (-1, -1), 2, VERT_MENTHE),
+        ('TOPPADDING', (0, 0), (-1, -1), 2),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+    ]))
+    elements.append(line_table)
+    elements.append(Spacer(1, 0.3*cm))
+
+    # ============ INFORMATIONS DU MAGASIN ============
+    store = data['store']
+    store_text = f"""
+    <b>Magasin de {store['name']}</b> · {store['address']} · {store['postal']}<br/>
+    <font color="#4ad19e">☎</font> {store['phone']} · <font color="#4ad19e">✉</font> {store['email']}
+    """
+    elements.append(Paragraph(store_text, styles['store']))
+    elements.append(Spacer(1, 0.5*cm))
+
+    # ============ NUMÉRO DE FACTURE ============
+    invoice_box_table = Table(
+        [[Paragraph(f"FACTURE N° {data['invoice_number']}", styles['invoice_header'])]],
+        colWidths=[17*cm]
+    )
+    invoice_box_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, -1), VERT_MENTHE),
+        ('PADDING', (0, 0), (-1, -1), 12),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ]))
+    elements.append(invoice_box_table)
+    elements.append(Spacer(1, 0.5*cm))
+
+    # ============ INFORMATIONS CLIENT ============
+    client = data['client']
+    client_content_style = styles['client_content']
+    client_box_data = [
+        [Paragraph('FACTURÉ À', styles['client_header'])],
+        [Paragraph(f"<b>{client['first_name']} {client['last_name']}</b>", client_content_style)],
+    ]
+    if client['address']:
+        client_box_data.append([Paragraph(client['address'], client_content_style)])
+    if client['postal_code'] and client['city']:
+        client_box_data.append([Paragraph(f"{client['postal_code']} {client['city']}", client_content_style)])
+    client_box_data.append([Paragraph(f'<font color="#4ad19e">✉</font> {client["email"]}', client_content_style)])
+    client_box_data.append([Paragraph(f'<font color="#4ad19e">☎</font> {client["phone"]}', client_content_style)])
+
+    client_table = Table(client_box_data, colWidths=[17*cm])
+    client_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, -1), GRIS_CLAIR),
+        ('PADDING', (0, 0), (-1, -1), 10),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('LINEBELOW', (0, 0), (-1, 0), 2, VERT_MENTHE),
+    ]))
+    elements.append(client_table)
+    elements.append(Spacer(1, 0.5*cm))
+
+    # ============ NOTES DE COMMANDE ============
+    if data['notes'] and data['notes'].strip():
+        notes_table = Table(
+            [[Paragraph(f'<b><font color="#4ad19e">💬 Notes:</font></b> {data["notes"]}', styles['notes'])]],
+            colWidths=[17*cm]
+        )
+        notes_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#e8f8f3')),
+            ('PADDING', (0, 0), (-1, -1), 8),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('LEFTPADDING', (0, 0), (-1, -1), 12),
+        ]))
+        elements.append(notes_table)
+        elements.append(Spacer(1, 0.4*cm))
+
+    # ============ TABLEAU DES ARTICLES ============
+    table_header_style = styles['table_header']
+    item_style = styles['item']
+    rows = [[
+        Paragraph('DÉSIGNATION', table_header_style),
+        Paragraph('QTÉ', table_header_style),
+        Paragraph('PRIX HT', table_header_style),
+        Paragraph('TVA', table_header_style),
+        Paragraph('TOTAL TTC', table_header_style)
+    ]]
+
+    for item in data['items']:
+        designation = f"<b>{item['name']}</b>"
+        if item['reference']:
+            designation += f'<br/><font size="7" color="#666666">Réf: {item["reference"]}</font>'
+        rows.append([
+            Paragraph(designation, item_style),
+            Paragraph(f"<b>{item['quantity']}</b>", item_style),
+            Paragraph(f"{item['unit_price_ht']:.2f} €", item_style),
+            Paragraph(f"{item['tva_rate']:.0f}%", item_style),
+            Paragraph(f"<b>{item['subtotal_ttc']:.2f} €</b>", item_style),
+        ])
+
+    table = Table(rows, colWidths=[8*cm, 1.8*cm, 2.5*cm, 1.8*cm, 2.9*cm])
+    table.setStyle(TableStyle([
+        # En-tête
+        ('BACKGROUND', (0, 0), (-1, 0), NOIR),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
+        ('TOPPADDING', (0, 0), (-1, 0), 10),
+        # Corps du tableau
+        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+        ('ALIGN', (1, 1), (-1, -1), 'CENTER'),
+        ('ALIGN', (0, 1), (0, -1), 'LEFT'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('FONTSIZE', (0, 1), (-1, -1), 9),
+        ('TOPPADDING', (0, 1), (-1, -1), 8),
+        ('BOTTOMPADDING', (0, 1), (-1, -1), 8),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, GRIS_CLAIR]),
+        # Bordures
+        ('LINEBELOW', (0, 0), (-1, 0), 2, VERT_MENTHE),
+        ('LINEBELOW', (0, 1), (-1, -1), 0.5, colors.HexColor('#e0e0e0')),
+    ]))
+    elements.append(table)
+    elements.append(Spacer(1, 0.5*cm))
+
+    # ============ TOTAUX ============
+    label_style = styles['totals_label']
+    value_style = styles['totals_value']
+    totals_data = [
+        [Paragraph('Sous-total HT:', label_style), Paragraph(f"{data['subtotal_ht']:.2f} €", value_style)],
+        [Paragraph('TVA (20%):', label_style), Paragraph(f"{data['total_tva']:.2f} €", value_style)],
+    ]
+    if data['discount_amount'] > 0:
+        totals_data.append([
+            Paragraph('Remise:', label_style),
+            Paragraph(f"-{data['discount_amount']:.2f} €", value_style)
+        ])
+
+    totals_data.append([
+        Paragraph(f"<b>TOTAL TTC: {data['total_ttc']:.2f} €</b>", styles['total_final']),
+        Paragraph('', value_style)
+    ])
+    totals_data.append([
+        Paragraph(
+            f'<font size="8">Mode de paiement: {payment_label(data, "Paiement en {n}x")}</font>', label_style
+        ),
+        Paragraph('', value_style)
+    ])
+
+    totals_table = Table(totals_data, colWidths=[13*cm, 4*cm])
+    totals_table.setStyle(TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('TOPPADDING', (0, 0), (-1, -2), 4),
+        ('BOTTOMPADDING', (0, 0), (-1, -2), 4),
+        # Ligne du total final
+        ('BACKGROUND', (0, -2), (-1, -2), VERT_MENTHE),
+        ('SPAN', (0, -2), (-1, -2)),
+        ('PADDING', (0, -2), (-1, -2), 12),
+        ('TOPPADDING', (0, -2), (-1, -2), 10),
+        ('BOTTOMPADDING', (0, -2), (-1, -2), 10),
+        ('ALIGN', (0, -2), (-1, -2), 'CENTER'),
+        # Ligne mode de paiement
+        ('BACKGROUND', (0, -1), (-1, -1), GRIS_CLAIR),
+        ('SPAN', (0, -1), (-1, -1)),
+        ('PADDING', (0, -1), (-1, -1), 6),
+    ]))
+    elements.append(totals_table)
+
+    # ============ PIED DE PAGE ============
+    elements.append(Spacer(1, 0.8*cm))
+    footer_text = """
+    <b>Merci de votre confiance !</b><br/>
+    Garantie : 2 ans sur les vélos · 1 an sur les accessoires<br/>
+    <i>TVA non applicable, art. 293 B du CGI · Facture acquittée</i><br/>
+    <br/>
+    <font color="#4ad19e">●</font> SIRET: 123 456 789 00012 <font color="#4ad19e">●</font> TVA: FR12345678901 <font color="#4ad19e">●</font>
+    """
+    elements.append(Paragraph(footer_text, styles['footer']))
+
+    doc.build(elements)
+    return buffer.getvalue()
@@ -1,9 +1,14 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.http import FileResponse
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_date
 from .models import Invoice
 from .serializers import InvoiceSerializer
+from .documents import InvoiceDocumentService
+from .export import InvoiceExportService
+from .escpos import render_receipt_escpos
+from .rendering import invoice_document_data
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,6 +18,31 @@ class InvoiceViewSet(viewsets.ModelViewSet):
     queryset = Invoice.objects.all()
     serializer_class = InvoiceSerializer
     
+    def _pending_response(self, invoice):
+        """Réponse à interroger tant que le pré-rendu n'est pas terminé"""
+        response = Response({
+            'status': 'pending',
+            'message': 'Document en cours de génération',
+            'invoice_number': invoice.invoice_number,
+        }, status=status.HTTP_202_ACCEPTED)
+        response['Retry-After'] = '1'
+        return response
+    
+    def _receipt_output(self, request):
+        """Format du ticket demandé : ?output=pdf (défaut) ou ?output=escpos"""
+        output = request.query_params.get('output', 'pdf')
+        return output if output in ('pdf', 'escpos') else None
+    
+    def _escpos_response(self, invoice, as_attachment):
+        """Ticket ESC/POS brut, à envoyer tel quel à l'imprimante thermique"""
+        response = HttpResponse(
+            render_receipt_escpos(invoice_document_data(invoice)),
+            content_type='application/octet-stream'
+        )
+        disposition = 'attachment' if as_attachment else 'inline'
+        response['Content-Disposition'] = f'{disposition}; filename="ticket_{invoice.invoice_number}.bin"'
+        return response
+    
     @action(detail=True, methods=['post'], url_path='generate_both')
     def generate_both(self, request, pk=None):
         """Génère le ticket ET la facture, puis envoie par email"""
@@ -40,14 +70,20 @@ class InvoiceViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['get'], url_path='download_receipt')
     def download_receipt(self, request, pk=None):
-        """Télécharge le ticket de caisse"""
+        """Télécharge le ticket de caisse (PDF, ou ESC/POS avec ?output=escpos)"""
         try:
             invoice = self.get_object()
+            output = self._receipt_output(request)
+            if output is None:
+                return Response({'error': 'Format invalide (pdf ou escpos)'}, status=status.HTTP_400_BAD_REQUEST)
+            if output == 'escpos':
+                return self._escpos_response(invoice, as_attachment=True)
             
-            if not invoice.receipt_pdf:
+            if InvoiceDocumentService.is_rendering(invoice):
+                if not invoice.receipt_pdf:
+                    return self._pending_response(invoice)
+            elif invoice.generate_receipt():
                 logger.info(f"Génération du ticket pour la facture {invoice.invoice_number}")
-                invoice.generate_receipt()
-                invoice.save()
             
             return FileResponse(
                 invoice.receipt_pdf.open('rb'),
@@ -68,10 +104,11 @@ class InvoiceViewSet(viewsets.ModelViewSet):
         try:
             invoice = self.get_object()
             
-            if not invoice.invoice_pdf:
+            if InvoiceDocumentService.is_rendering(invoice):
+                if not invoice.invoice_pdf:
+                    return self._pending_response(invoice)
+            elif invoice.generate_invoice():
                 logger.info(f"Génération de la facture pour {invoice.invoice_number}")
-                invoice.generate_invoice()
-                invoice.save()
             
             return FileResponse(
                 invoice.invoice_pdf.open('rb'),
@@ -88,13 +125,23 @@ class InvoiceViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['post'])
     def print_receipt(self, request, pk=None):
-        """Prépare le ticket pour impression directe (imprimante thermique)"""
+        """
+        Prépare le ticket pour impression directe (imprimante thermique)
+        Avec ?output=escpos, renvoie directement les octets ESC/POS à imprimer
+        """
         try:
             invoice = self.get_object()
+            output = self._receipt_output(request)
+            if output is None:
+                return Response({'error': 'Format invalide (pdf ou escpos)'}, status=status.HTTP_400_BAD_REQUEST)
+            if output == 'escpos':
+                return self._escpos_response(invoice, as_attachment=False)
             
-            if not invoice.receipt_pdf:
-                invoice.generate_receipt()
-                invoice.save()
+            if InvoiceDocumentService.is_rendering(invoice):
+                if not invoice.receipt_pdf:
+                    return self._pending_response(invoice)
+            else:
+                invoice.generate_receipt()  # Sans effet si le ticket est à jour
             
             return Response({
                 'message': 'Ticket prêt pour impression',
@@ -107,3 +154,35 @@ class InvoiceViewSet(viewsets.ModelViewSet):
             return Response({
                 'error': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Archive ZIP des factures d'une période (comptabilité)
+        ?date_from=2026-09-01&date_to=2026-09-30&store=garches
+        """
+        date_from = parse_date(request.query_params.get('date_from') or '')
+        date_to = parse_date(request.query_params.get('date_to') or '')
+        store = request.query_params.get('store') or None
+        
+        if not date_from or not date_to:
+            return Response({
+                'error': 'date_from et date_to sont requis (AAAA-MM-JJ)'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if date_from > date_to:
+            return Response({
+                'error': 'date_from doit précéder date_to'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if store and store not in ('ville_avray', 'garches'):
+            return Response({'error': 'Magasin invalide'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        invoices = InvoiceExportService.get_invoices(date_from, date_to, store)
+        logger.info(f"Export des factures du {date_from} au {date_to} ({store or 'tous magasins'})")
+        
+        response = StreamingHttpResponse(
+            InvoiceExportService.stream_zip(InvoiceExportService.iter_documents(invoices)),
+            content_type='application/zip'
+        )
+        filename = InvoiceExportService.archive_name(date_from, date_to, store)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
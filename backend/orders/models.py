@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 from clients.models import Client
 from products.models import Product
@@ -26,6 +27,7 @@ class Order(models.Model):
     ]
     
     order_number = models.CharField(max_length=20, unique=True, editable=False)
+    client_uuid = models.UUIDField(unique=True, null=True, blank=True, editable=False)  # Ticket hors ligne (caisse)
     client = models.ForeignKey(Client, on_delete=models.PROTECT, related_name='orders')
     user = models.ForeignKey(User, on_delete=models.PROTECT, related_name='orders')
     store = models.CharField(max_length=20, choices=STORE_CHOICES)
@@ -43,7 +45,8 @@ class Order(models.Model):
     
     notes = models.TextField(max_length=500, blank=True, null=True)
     
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Pas d'auto_now_add : un ticket synchronisé hors ligne est daté de sa vente
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     updated_at = models.DateTimeField(auto_now=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     
@@ -53,6 +56,8 @@ class Order(models.Model):
         indexes = [
             models.Index(fields=['order_number']),
             models.Index(fields=['status']),
+            models.Index(fields=['created_at', 'id']),  # Pagination par curseur
+            models.Index(fields=['updated_at']),  # Recalculs incrémentaux
         ]
     
     def __str__(self):
@@ -60,10 +65,21 @@ class Order(models.Model):
     
     def save(self, *args, **kwargs):
         if not self.order_number:
-            from django.utils import timezone
-            timestamp = timezone.now().strftime('%Y%m%d%H%M%S')
-            self.order_number = f"CMD-{timestamp}"
+            self.order_number = self.generate_order_number()
         super().save(*args, **kwargs)
+    
+    def generate_order_number(self):
+        """Numéro unique issu du compteur (magasin, jour) : CMD-A20261017-0001"""
+        from django.utils import timezone
+        from settings_app.sequences import SequenceService
+        today = timezone.localdate()
+        number = SequenceService.allocate('order', store=self.store, day=today)
+        return Order.format_order_number(self.store, today, number)
+    
+    @staticmethod
+    def format_order_number(store, day, number):
+        from settings_app.sequences import store_code
+        return f"CMD-{store_code(store)}{day.strftime('%Y%m%d')}-{number:04d}"
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
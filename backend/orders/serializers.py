@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Order, OrderItem
+from products.models import Product
 from products.serializers import ProductSerializer
 from invoices.serializers import InvoiceSerializer
 
@@ -20,4 +21,40 @@ class OrderSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Order
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+
+class OrderItemProductSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Product
+        fields = ['id', 'reference', 'name']
+
+
+class OrderListItemSerializer(serializers.ModelSerializer):
+    """Ligne allégée pour la liste (sans le détail produit complet)"""
+    product = OrderItemProductSummarySerializer(read_only=True)
+    
+    class Meta:
+        model = OrderItem
+        fields = ['id', 'product', 'description', 'quantity', 'subtotal_ttc']
+
+
+class OrderListSerializer(serializers.ModelSerializer):
+    """
+    Représentation résumée pour la liste des commandes
+    Nombre d'articles et facture issus des annotations de OrderViewSet.get_queryset
+    """
+    items = OrderListItemSerializer(many=True, read_only=True)
+    client_name = serializers.CharField(source='client.full_name', read_only=True)
+    items_count = serializers.IntegerField(read_only=True)
+    invoice_id = serializers.IntegerField(source='invoice_pk', read_only=True)
+    invoice_number = serializers.CharField(read_only=True)
+    
+    class Meta:
+        model = Order
+        fields = [
+            'id', 'order_number', 'client', 'client_name', 'user', 'store', 'status',
+            'payment_method', 'installments', 'subtotal_ht', 'total_tva', 'total_ttc',
+            'discount_amount', 'discount_percentage', 'notes', 'created_at', 'completed_at',
+            'items_count', 'invoice_id', 'invoice_number', 'items',
+        ]
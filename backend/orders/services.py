@@ -0,0 +1,322 @@
+"""
+Services métier pour le module Commandes
+Construction des lignes de vente et synchronisation des tickets hors ligne des caisses
+"""
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from decimal import Decimal
+from typing import Dict, List
+from .models import Order, OrderItem
+from clients.aggregates import ClientAggregateService
+from clients.models import Client
+from invoices.models import Invoice
+from invoices.documents import InvoiceDocumentService
+from analytics.rollups import DashboardRollupService
+from products.models import Product
+from products.services import StockReservationService, InsufficientStock
+from settings_app.sequences import SequenceService
+from utils.line_items import LineItemWriter, stock_field_for_store, to_decimal
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
+
+ORDER_ITEM_WRITER = LineItemWriter(OrderItem, 'order')
+
+# Nombre de tickets traités par transaction lors d'une synchronisation
+SYNC_CHUNK_SIZE = 100
+SYNC_MAX_TICKETS = 2000
+SYNC_MAX_RETRIES = 2
+
+# TVA par défaut pour services de réparation (20%)
+REPAIR_TVA_RATE = Decimal('20.0')
+
+
+class OrderService:
+
+    @staticmethod
+    def build_lines(items_data: List[Dict], products: Dict[int, Product]) -> List[Dict]:
+        """Prépare les lignes d'une vente (produits et réparations sans produit)"""
+        lines = []
+        for item_data in items_data:
+            quantity = int(item_data['quantity'])
+
+            if 'product' in item_data and item_data['product']:
+                # Item avec produit
+                product = products[int(item_data['product'])]
+                lines.append({
+                    'product': product,
+                    'quantity': quantity,
+                    'unit_price_ht': item_data.get('unit_price_ht', item_data['unit_price']),
+                    'unit_price_ttc': item_data.get('unit_price_ttc', item_data['unit_price']),
+                    'tva_rate': item_data.get('tva_rate', 20.0),
+                    'description': item_data.get('description', f"{product.name} x {quantity}"),
+                })
+            else:
+                # Item de réparation (sans produit)
+                unit_price = to_decimal(item_data['unit_price'])
+                lines.append({
+                    'product': None,  # Pas de produit pour les réparations
+                    'quantity': quantity,
+                    'unit_price_ht': unit_price,
+                    'unit_price_ttc': unit_price * (1 + REPAIR_TVA_RATE / 100),
+                    'tva_rate': REPAIR_TVA_RATE,
+                    'description': item_data.get('description', 'Service de réparation'),
+                })
+        return lines
+
+
+class OrderSyncService:
+    """
+    Rejoue un lot de tickets saisis hors ligne par une caisse
+
+    Chaque ticket porte un client_uuid généré par la caisse : un ticket déjà
+    reçu est signalé "duplicate" au lieu d'être réécrit. Les tickets sont traités
+    par paquets, chaque paquet en une transaction avec insertions groupées ; si
+    le même lot est envoyé deux fois en parallèle, la contrainte d'unicité de
+    client_uuid fait rejouer le paquet, qui voit alors les tickets de l'autre envoi.
+    Une vente est datée (created_at, numéro de commande, statistiques) du jour
+    de sa saisie en caisse, la facture du jour de la synchronisation.
+    Résultat par ticket : created, duplicate, conflict (stock) ou error.
+    """
+
+    @staticmethod
+    def sync(tickets: List[Dict], user, chunk_size: int = SYNC_CHUNK_SIZE) -> List[Dict]:
+        results = []
+        seen = set()
+
+        for start in range(0, len(tickets), chunk_size):
+            chunk = tickets[start:start + chunk_size]
+            results.extend(OrderSyncService._sync_chunk(chunk, user, seen))
+
+        return results
+
+    @staticmethod
+    def _sync_chunk(chunk: List[Dict], user, seen: set) -> List[Dict]:
+        error = 'Conflit de stock persistant, réessayer'
+        for attempt in range(SYNC_MAX_RETRIES + 1):
+            try:
+                with transaction.atomic():
+                    return OrderSyncService._ingest(chunk, user, set(seen), seen)
+            except InsufficientStock:
+                # Le stock a bougé entre la lecture et l'écriture : on rejoue le paquet
+                logger.warning(f"Conflit de stock pendant la synchronisation, nouvel essai ({attempt + 1})")
+            except IntegrityError:
+                # Ticket validé entre-temps par un envoi concurrent du même lot : au nouvel
+                # essai, la lecture des client_uuid existants le signale "duplicate"
+                logger.warning(f"Ticket déjà enregistré par un envoi concurrent, nouvel essai ({attempt + 1})")
+                error = 'Envoi concurrent du même lot, réessayer'
+
+        return [
+            OrderSyncService._result(ticket.get('client_uuid'), 'error', error=error)
+            for ticket in chunk
+        ]
+
+    @staticmethod
+    def _result(client_uuid, status, **extra) -> Dict:
+        return {'client_uuid': str(client_uuid) if client_uuid else None, 'status': status, **extra}
+
+    @staticmethod
+    def _parse(ticket: Dict) -> Dict:
+        """Valide un ticket et normalise ses champs (lève ValueError/KeyError)"""
+        client_uuid = uuid.UUID(str(ticket['client_uuid']))
+        items_data = ticket.get('items') or []
+        if not items_data:
+            raise ValueError('Aucun article dans le ticket')
+
+        store = ticket['store']
+        if store not in dict(Order.STORE_CHOICES):
+            raise ValueError(f'Magasin inconnu: {store}')
+
+        sold_at = ticket.get('sold_at')
+        if sold_at:
+            sold_at = parse_datetime(sold_at) if isinstance(sold_at, str) else sold_at
+            if sold_at is None:
+                raise ValueError('Date de vente invalide')
+            if timezone.is_naive(sold_at):
+                sold_at = timezone.make_aware(sold_at)
+
+        return {
+            'client_uuid': client_uuid,
+            'client_id': int(ticket['client']),
+            'store': store,
+            'payment_method': ticket.get('payment_method', 'cash'),
+            'installments': int(ticket.get('installments', 1)),
+            'notes': (ticket.get('notes') or '').strip() or None,
+            'sold_at': sold_at or timezone.now(),
+            'items': items_data,
+        }
+
+    @staticmethod
+    def existing_tickets(client_uuids: List) -> Dict:
+        """{client_uuid: {'id', 'order_number'}} des tickets déjà enregistrés"""
+        return {
+            row['client_uuid']: row
+            for row in Order.objects.filter(client_uuid__in=client_uuids).values('client_uuid', 'id', 'order_number')
+        }
+
+    @staticmethod
+    def _ingest(chunk: List[Dict], user, seen_before: set, seen: set) -> List[Dict]:
+        results = [None] * len(chunk)
+        parsed = {}
+
+        for index, ticket in enumerate(chunk):
+            try:
+                data = OrderSyncService._parse(ticket)
+            except (KeyError, ValueError, TypeError) as e:
+                message = f'Champ manquant: {e}' if isinstance(e, KeyError) else str(e)
+                results[index] = OrderSyncService._result(ticket.get('client_uuid'), 'error', error=message)
+                continue
+            if data['client_uuid'] in seen_before:
+                results[index] = OrderSyncService._result(data['client_uuid'], 'duplicate')
+                continue
+            seen_before.add(data['client_uuid'])
+            parsed[index] = data
+
+        # Tickets déjà synchronisés lors d'un envoi précédent (une requête)
+        existing = OrderSyncService.existing_tickets([data['client_uuid'] for data in parsed.values()])
+
+        # Clients et produits référencés (une requête chacun)
+        client_ids = set(
+            Client.objects.filter(id__in={data['client_id'] for data in parsed.values()}).values_list('id', flat=True)
+        )
+        product_ids = {
+            int(item['product'])
+            for data in parsed.values() for item in data['items'] if item.get('product')
+        }
+
+        # Produits verrouillés dans l'ordre des identifiants, stock des deux magasins
+        products = {
+            product.id: product
+            for product in Product.objects.select_for_update().filter(id__in=product_ids).order_by('id')
+        }
+        stock_rows = {
+            product.id: {
+                'id': product.id,
+                'reference': product.reference,
+                'name': product.name,
+                'product_type': product.product_type,
+                'stock_ville_avray': product.stock_ville_avray,
+                'stock_garches': product.stock_garches,
+            }
+            for product in products.values()
+        }
+
+        orders, invoices, items = [], [], []
+        created_indices = []
+        reserved = {}  # {store: {product_id: quantité}}
+
+        for index, data in parsed.items():
+            client_uuid = data['client_uuid']
+            if client_uuid in existing:
+                row = existing[client_uuid]
+                results[index] = OrderSyncService._result(
+                    client_uuid, 'duplicate', order_id=row['id'], order_number=row['order_number']
+                )
+                continue
+            if data['client_id'] not in client_ids:
+                results[index] = OrderSyncService._result(client_uuid, 'error', error='Client introuvable')
+                continue
+
+            if any(item.get('product') and int(item['product']) not in products for item in data['items']):
+                results[index] = OrderSyncService._result(client_uuid, 'error', error='Produit introuvable')
+                continue
+
+            try:
+                lines = OrderService.build_lines(data['items'], products)
+            except KeyError as e:
+                results[index] = OrderSyncService._result(client_uuid, 'error', error=f'Champ manquant: {e}')
+                continue
+            except (ValueError, TypeError, ArithmeticError) as e:
+                results[index] = OrderSyncService._result(client_uuid, 'error', error=str(e))
+                continue
+
+            # Réservation en mémoire sur le stock verrouillé, ticket par ticket
+            store = data['store']
+            demand = StockReservationService.demand_by_product(lines)
+            shortages = StockReservationService.find_shortages(store, demand, stock_rows)
+            if shortages:
+                results[index] = OrderSyncService._result(client_uuid, 'conflict', lines=shortages)
+                continue
+
+            field = stock_field_for_store(store)
+            store_reserved = reserved.setdefault(store, {})
+            for product_id, entry in demand.items():
+                stock_rows[product_id][field] -= entry['quantity']
+                store_reserved[product_id] = store_reserved.get(product_id, 0) + entry['quantity']
+
+            order = Order(
+                client_uuid=client_uuid,
+                client_id=data['client_id'],
+                user=user,
+                store=store,
+                status='completed',
+                payment_method=data['payment_method'],
+                installments=data['installments'],
+                notes=data['notes'],
+                created_at=data['sold_at'],
+                completed_at=data['sold_at'],
+            )
+            totals = ORDER_ITEM_WRITER.build(order, lines)
+            order.subtotal_ht = totals['subtotal_ht']
+            order.total_tva = totals['total_tva']
+            order.total_ttc = totals['total_ttc']
+
+            orders.append(order)
+            items.extend(totals['items'])
+            invoices.append(Invoice(order=order, pdf_status='pending'))
+            created_indices.append(index)
+
+        # Écritures groupées : stock par magasin, commandes, lignes, factures
+        for store, quantities in reserved.items():
+            StockReservationService.reserve(
+                store, [{'product': pid, 'quantity': qty} for pid, qty in quantities.items()]
+            )
+
+        OrderSyncService.assign_numbers(invoices)
+        Order.objects.bulk_create(orders)
+        for item in items:
+            item.order_id = item.order.pk
+        OrderItem.objects.bulk_create(items)
+        for invoice in invoices:
+            invoice.order_id = invoice.order.pk
+        Invoice.objects.bulk_create(invoices)
+
+        for invoice in invoices:
+            InvoiceDocumentService.schedule_after_commit(invoice)
+        if orders:
+            # bulk_create n'émet pas de signal post_save : jours de vente à recalculer
+            DashboardRollupService.mark_dirty(*{order.created_at for order in orders})
+            ClientAggregateService.record('orders', orders)
+
+        for index, order in zip(created_indices, orders):
+            results[index] = OrderSyncService._result(
+                order.client_uuid, 'created', order_id=order.pk, order_number=order.order_number
+            )
+
+        # Seuls les tickets créés : un ticket en erreur ou en conflit peut être renvoyé
+        seen.update(order.client_uuid for order in orders)
+        logger.info(f"Synchronisation caisse: {len(orders)} ticket(s) créés sur {len(chunk)}")
+        return results
+
+    @staticmethod
+    def assign_numbers(invoices: List[Invoice]):
+        """
+        Numérote le paquet par blocs (une requête par compteur) : les commandes
+        sur le jour local de la vente, les factures sur le jour de facturation
+        """
+        today = timezone.localdate()
+        for store in {invoice.order.store for invoice in invoices}:
+            store_invoices = [invoice for invoice in invoices if invoice.order.store == store]
+            invoice_numbers = SequenceService.allocate_block('invoice', len(store_invoices), store=store, day=today)
+            for invoice, invoice_seq in zip(store_invoices, invoice_numbers):
+                invoice.invoice_number = Invoice.format_invoice_number(store, today, invoice_seq)
+
+            by_day = {}
+            for invoice in store_invoices:
+                by_day.setdefault(timezone.localdate(invoice.order.created_at), []).append(invoice.order)
+            for day, orders in by_day.items():
+                order_numbers = SequenceService.allocate_block('order', len(orders), store=store, day=day)
+                for order, order_seq in zip(orders, order_numbers):
+                    order.order_number = Order.format_order_number(store, day, order_seq)
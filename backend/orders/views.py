@@ -1,19 +1,52 @@
 from rest_framework import viewsets, status
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.db import transaction
+from django.db.models import Count, F, Prefetch
 from .models import Order, OrderItem
-from .serializers import OrderSerializer
+from .serializers import OrderSerializer, OrderListSerializer
+from .services import OrderService, OrderSyncService, ORDER_ITEM_WRITER, SYNC_MAX_TICKETS
 from products.models import Product
+from products.services import StockReservationService, InsufficientStock
+from utils.line_items import load_products
+from utils.pagination import HybridCursorPagination, ListCountMixin
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(ListCountMixin, viewsets.ModelViewSet):
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
+    pagination_class = HybridCursorPagination
     ordering = ['-created_at']
     
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        
+        if self.action == 'list':
+            # Liste résumée : nombre constant de requêtes quelle que soit la taille de page
+            return queryset.select_related('client').annotate(
+                items_count=Count('items'),
+                invoice_pk=F('invoice__id'),
+                invoice_number=F('invoice__invoice_number'),
+            ).prefetch_related(
+                Prefetch(
+                    'items',
+                    queryset=OrderItem.objects.select_related('product').only(
+                        'id', 'order_id', 'description', 'quantity', 'subtotal_ttc',
+                        'product__id', 'product__reference', 'product__name'
+                    )
+                )
+            ).order_by('-created_at', '-id')  # Meta.ordering est ignoré avec GROUP BY
+        
+        return queryset.select_related('client', 'invoice').prefetch_related('items__product__category')
+    
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return OrderListSerializer
+        return OrderSerializer
+    
     def create(self, request, *args, **kwargs):
         # Debug: afficher les données reçues
         logger.info("===== DONNÉES REÇUES =====")
@@ -48,59 +81,21 @@ class OrderViewSet(viewsets.ModelViewSet):
                 
                 logger.info(f"Commande créée: ID={order.id}, Notes={order.notes}")
                 
-                # Créer les items et calculer les totaux
-                subtotal_ht = 0
-                total_tva = 0
-                
-                for item_data in items_data:
-                    # Gérer les réparations (sans produit) et les produits (avec produit)
-                    if 'product' in item_data and item_data['product']:
-                        # Item avec produit
-                        product = Product.objects.get(id=item_data['product'])
-                        
-                        # Créer l'item
-                        order_item = OrderItem.objects.create(
-                            order=order,
-                            product=product,
-                            quantity=item_data['quantity'],
-                            unit_price_ht=float(item_data.get('unit_price_ht', item_data['unit_price'])),
-                            unit_price_ttc=float(item_data.get('unit_price_ttc', item_data['unit_price'])),
-                            tva_rate=float(item_data.get('tva_rate', 20.0)),
-                            description=item_data.get('description', f"{product.name} x {item_data['quantity']}")
-                        )
-                        
-                        subtotal_ht += float(order_item.subtotal_ht)
-                        total_tva += (float(order_item.subtotal_ttc) - float(order_item.subtotal_ht))
-                        
-                        # Déduire du stock
-                        if order.store == 'ville_avray':
-                            product.stock_ville_avray -= item_data['quantity']
-                        else:
-                            product.stock_garches -= item_data['quantity']
-                        product.save()
-                    else:
-                        # Item de réparation (sans produit)
-                        unit_price = float(item_data['unit_price'])
-                        # TVA par défaut pour services de réparation (20%)
-                        tva_rate = 20.0
-                        
-                        # Créer l'item de commande sans produit réel
-                        order_item = OrderItem.objects.create(
-                            order=order,
-                            product=None,  # Pas de produit pour les réparations
-                            quantity=item_data['quantity'],
-                            unit_price_ht=unit_price,
-                            unit_price_ttc=unit_price * (1 + tva_rate/100),
-                            tva_rate=tva_rate,
-                            description=item_data.get('description', 'Service de réparation')
-                        )
-                        
-                        # Calculer les totaux pour cet item
-                        item_subtotal_ht = unit_price * item_data['quantity']
-                        item_subtotal_ttc = unit_price * (1 + tva_rate/100) * item_data['quantity']
-                        
-                        subtotal_ht += item_subtotal_ht
-                        total_tva += (item_subtotal_ttc - item_subtotal_ht)
+                # Charger tous les produits référencés en une seule requête
+                products = load_products(
+                    item_data.get('product') for item_data in items_data
+                )
+                
+                # Construire les lignes (produits et réparations sans produit)
+                lines = OrderService.build_lines(items_data, products)
+                
+                # Réserver le stock (UPDATE conditionnel, aucune survente possible)
+                StockReservationService.reserve(order.store, lines)
+                
+                # Insérer toutes les lignes et calculer les totaux en Decimal
+                totals = ORDER_ITEM_WRITER.write(order, lines)
+                subtotal_ht = totals['subtotal_ht']
+                total_tva = totals['total_tva']
                 
                 # Mettre à jour les totaux de la commande
                 order.subtotal_ht = subtotal_ht
@@ -113,13 +108,28 @@ class OrderViewSet(viewsets.ModelViewSet):
                 
                 # Créer la facture automatiquement
                 from invoices.models import Invoice
-                invoice = Invoice.objects.create(order=order)
+                from invoices.documents import InvoiceDocumentService
+                invoice = Invoice.objects.create(order=order, pdf_status='pending')
+                
+                # Ticket et facture rendus en arrière-plan après le commit
+                InvoiceDocumentService.schedule_after_commit(invoice)
                 
                 logger.info(f"Facture créée: {invoice.invoice_number}")
                 
+                # Recharger avec les relations pour une sérialisation sans N+1
+                order = Order.objects.select_related('client', 'invoice').prefetch_related(
+                    'items__product__category'
+                ).get(pk=order.pk)
+                
                 serializer = self.get_serializer(order)
                 return Response(serializer.data, status=status.HTTP_201_CREATED)
                 
+        except InsufficientStock as e:
+            logger.warning(str(e))
+            return Response(
+                {'error': 'Stock insuffisant', 'store': e.store, 'lines': e.shortages},
+                status=status.HTTP_409_CONFLICT
+            )
         except Product.DoesNotExist:
             logger.error("Produit non trouvé")
             return Response(
@@ -141,3 +151,33 @@ class OrderViewSet(viewsets.ModelViewSet):
                 {'error': str(e)}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
+    
+    @action(detail=False, methods=['post'])
+    def sync(self, request):
+        """
+        Synchronise un lot de tickets saisis hors ligne par une caisse
+        Chaque ticket porte un client_uuid : un renvoi est dédupliqué
+        """
+        tickets = request.data.get('tickets')
+        
+        if not isinstance(tickets, list) or not tickets:
+            return Response(
+                {'error': 'Aucun ticket à synchroniser'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if len(tickets) > SYNC_MAX_TICKETS:
+            return Response(
+                {'error': f'Lot trop volumineux (maximum {SYNC_MAX_TICKETS} tickets)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        results = OrderSyncService.sync(tickets, request.user)
+        
+        summary = {}
+        for result in results:
+            summary[result['status']] = summary.get(result['status'], 0) + 1
+        
+        logger.info(f"Synchronisation caisse: {summary}")
+        
+        return Response({'summary': summary, 'results': results})
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_fix_stock_columns'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['created_at', 'id'], name='products_created_8097c0_idx'),
+        ),
+    ]
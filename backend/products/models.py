@@ -60,6 +60,7 @@ class Product(models.Model):
             models.Index(fields=['reference']),
             models.Index(fields=['barcode']),
             models.Index(fields=['name']),
+            models.Index(fields=['created_at', 'id']),  # Pagination par curseur
         ]
 
     size = models.CharField(max_length=50, blank=True, null=True, verbose_name='Taille')
@@ -0,0 +1,155 @@
+"""
+Services métier pour le module Produits
+Réservation du stock au passage en caisse sans survente ni mise à jour perdue
+"""
+from django.db import transaction
+from django.db.models import Q, F, Case, When, Value, IntegerField
+from django.utils import timezone
+from typing import Dict, List
+from .models import Product
+from utils.line_items import stock_field_for_store
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Types de produits sans suivi de stock (la prestation n'est jamais en rupture)
+UNTRACKED_PRODUCT_TYPES = ('prestation',)
+
+
+class InsufficientStock(Exception):
+    """
+    Levée quand au moins une ligne ne peut pas être servie
+    shortages: une entrée par produit en défaut avec les indices des lignes concernées
+    """
+
+    def __init__(self, store: str, shortages: List[Dict]):
+        self.store = store
+        self.shortages = shortages
+        references = ', '.join(s['reference'] for s in shortages)
+        super().__init__(f"Stock insuffisant ({store}): {references}")
+
+
+class StockReservationService:
+    """
+    Décrémente le stock d'un magasin pour un ensemble de lignes
+
+    Les lignes produits sont verrouillées dans l'ordre croissant des identifiants
+    (pas d'interblocage entre deux caisses) puis décrémentées par un seul UPDATE
+    conditionnel `stock >= quantité` : deux ventes simultanées du dernier exemplaire
+    ne peuvent jamais aboutir toutes les deux.
+    """
+
+    @staticmethod
+    def demand_by_product(lines: List[Dict], quantity_field: str = 'quantity') -> Dict[int, Dict]:
+        """Regroupe les quantités demandées par produit en gardant les indices de lignes"""
+        demand = {}
+        for index, line in enumerate(lines):
+            product = line.get('product')
+            if product is None:
+                continue
+            product_id = product.pk if hasattr(product, 'pk') else int(product)
+            entry = demand.setdefault(product_id, {'quantity': 0, 'lines': []})
+            entry['quantity'] += int(line[quantity_field])
+            entry['lines'].append(index)
+        return demand
+
+    @staticmethod
+    def find_shortages(store: str, demand: Dict[int, Dict], rows: Dict[int, Dict]) -> List[Dict]:
+        """Compare la demande au stock lu et retourne le détail des lignes en défaut"""
+        field = stock_field_for_store(store)
+        shortages = []
+        for product_id, entry in sorted(demand.items()):
+            row = rows.get(product_id)
+            if row is None:
+                shortages.append({
+                    'product_id': product_id,
+                    'reference': str(product_id),
+                    'name': None,
+                    'requested': entry['quantity'],
+                    'available': 0,
+                    'lines': entry['lines'],
+                })
+                continue
+            if row['product_type'] in UNTRACKED_PRODUCT_TYPES:
+                continue
+            if row[field] < entry['quantity']:
+                shortages.append({
+                    'product_id': product_id,
+                    'reference': row['reference'],
+                    'name': row['name'],
+                    'requested': entry['quantity'],
+                    'available': row[field],
+                    'lines': entry['lines'],
+                })
+        return shortages
+
+    @staticmethod
+    def reserve(store: str, lines: List[Dict], quantity_field: str = 'quantity') -> Dict[int, int]:
+        """
+        Réserve (décrémente) le stock des lignes dans le magasin donné
+        Doit être appelée dans la transaction qui crée le document de vente.
+        Lève InsufficientStock sans rien modifier si une ligne ne peut être servie.
+        Retourne {product_id: quantité décrémentée}
+        """
+        demand = StockReservationService.demand_by_product(lines, quantity_field)
+        if not demand:
+            return {}
+
+        field = stock_field_for_store(store)
+
+        with transaction.atomic():
+            # Verrouillage dans un ordre déterministe (sans effet sur SQLite,
+            # où l'UPDATE conditionnel ci-dessous reste la garantie)
+            rows = {
+                row['id']: row
+                for row in Product.objects.select_for_update()
+                .filter(id__in=demand.keys())
+                .order_by('id')
+                .values('id', 'reference', 'name', 'product_type', field)
+            }
+
+            shortages = StockReservationService.find_shortages(store, demand, rows)
+            if shortages:
+                raise InsufficientStock(store, shortages)
+
+            tracked = {
+                product_id: entry['quantity']
+                for product_id, entry in demand.items()
+                if rows[product_id]['product_type'] not in UNTRACKED_PRODUCT_TYPES
+            }
+            if not tracked:
+                return {}
+
+            StockReservationService._decrement(store, tracked, demand)
+
+        return tracked
+
+    @staticmethod
+    def _decrement(store: str, quantities: Dict[int, int], demand: Dict[int, Dict]):
+        """UPDATE unique gardé par `stock >= quantité` pour chaque produit"""
+        field = stock_field_for_store(store)
+        guard = Q()
+        for product_id, quantity in quantities.items():
+            guard |= Q(id=product_id, **{f'{field}__gte': quantity})
+
+        variation = Case(
+            *[When(id=pid, then=Value(qty)) for pid, qty in sorted(quantities.items())],
+            default=Value(0),
+            output_field=IntegerField()
+        )
+
+        updated = Product.objects.filter(guard).update(
+            **{field: F(field) - variation, 'updated_at': timezone.now()}
+        )
+
+        if updated != len(quantities):
+            # Une autre transaction a consommé le stock entre la lecture et l'écriture :
+            # on relit pour produire le détail, l'exception annule l'UPDATE partiel
+            rows = {
+                row['id']: row
+                for row in Product.objects.filter(id__in=quantities.keys())
+                .values('id', 'reference', 'name', 'product_type', field)
+            }
+            shortages = StockReservationService.find_shortages(store, demand, rows)
+            logger.warning(f"Conflit de réservation de stock ({store}): {updated}/{len(quantities)} lignes")
+            raise InsufficientStock(store, shortages)
@@ -4,12 +4,14 @@ from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import Product, Category
 from .serializers import ProductSerializer, CategorySerializer
+from utils.pagination import HybridCursorPagination, ListCountMixin
 from django.db import models
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(ListCountMixin, viewsets.ModelViewSet):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    pagination_class = HybridCursorPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['category', 'product_type', 'is_active', 'is_visible']
     search_fields = ['name', 'reference', 'barcode', 'brand']
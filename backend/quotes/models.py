@@ -80,20 +80,19 @@ class Quote(models.Model):
         DG04112025-000001 pour Garches
         """
         from django.utils import timezone
-        today = timezone.now()
+        from settings_app.sequences import SequenceService
+        today = timezone.localdate()
         date_str = today.strftime('%d%m%Y')
         
         prefix = 'DA' if self.store == 'ville_avray' else 'DG'
         
-        last_quote = Quote.objects.filter(
-            quote_number__startswith=f"{prefix}{date_str}"
-        ).order_by('-quote_number').first()
-        
-        if last_quote:
-            last_number = int(last_quote.quote_number.split('-')[1])
-            new_number = last_number + 1
-        else:
-            new_number = 1
+        # Compteur atomique, initialisé depuis les devis existants du jour
+        new_number = SequenceService.allocate(
+            'quote', store=self.store, day=today,
+            seed=lambda: SequenceService.last_number_with_prefix(
+                Quote.objects, 'quote_number', f"{prefix}{date_str}", lambda value: int(value.split('-')[1])
+            )
+        )
         
         return f"{prefix}{date_str}-{new_number:07d}"
     
@@ -7,13 +7,19 @@ from rest_framework import filters
 from .models import Quote, QuoteItem
 from .serializers import QuoteSerializer
 from products.models import Product
-from orders.models import Order, OrderItem
+from orders.models import Order
+from orders.services import ORDER_ITEM_WRITER
+from utils.line_items import LineItemWriter, load_products, to_decimal, quantize_amount
+from products.services import StockReservationService, InsufficientStock
 from django.utils.dateparse import parse_date
 from django.http import HttpResponse
 from reportlab.pdfgen import canvas
 import io
 
 
+QUOTE_ITEM_WRITER = LineItemWriter(QuoteItem, 'quote')
+
+
 class QuoteViewSet(viewsets.ModelViewSet):
     queryset = Quote.objects.all()
     serializer_class = QuoteSerializer
@@ -50,37 +56,31 @@ class QuoteViewSet(viewsets.ModelViewSet):
                     notes=request.data.get('notes', '')
 )
                 
-                # Créer les items
-                subtotal_ht = 0
-                total_tva = 0
+                # Charger tous les produits en une seule requête
+                products = load_products(item_data['product'] for item_data in items_data)
                 
+                lines = []
                 for item_data in items_data:
-                    product = Product.objects.get(id=item_data['product'])
-                    
-                    # Calculer les prix
-                    unit_price_ht = float(item_data.get('unit_price', product.price_ht))
-                    unit_price_ttc = float(item_data.get('unit_price_ttc', product.price_ttc))
-                    tva_rate = float(item_data.get('tva_rate', product.tva_rate))
-                    quantity = int(item_data['quantity'])
-                    
-                    quote_item = QuoteItem.objects.create(
-                        quote=quote,
-                        product=product,
-                        quantity=quantity,
-                        unit_price_ht=unit_price_ht,
-                        unit_price_ttc=unit_price_ttc,
-                        tva_rate=tva_rate,
-                    )
-                    
-                    subtotal_ht += float(quote_item.subtotal_ht)
-                    total_tva += (float(quote_item.subtotal_ttc) - float(quote_item.subtotal_ht))
+                    product = products[int(item_data['product'])]
+                    lines.append({
+                        'product': product,
+                        'quantity': int(item_data['quantity']),
+                        'unit_price_ht': item_data.get('unit_price', product.price_ht),
+                        'unit_price_ttc': item_data.get('unit_price_ttc', product.price_ttc),
+                        'tva_rate': item_data.get('tva_rate', product.tva_rate),
+                    })
+                
+                # Créer les items en un seul bulk_create
+                totals = QUOTE_ITEM_WRITER.write(quote, lines)
+                subtotal_ht = totals['subtotal_ht']
+                total_tva = totals['total_tva']
                 
                 # Appliquer les remises si présentes
-                discount_amount = float(request.data.get('discount_amount', 0))
+                discount_amount = to_decimal(request.data.get('discount_amount', 0))
                 if discount_amount > 0:
                     discount_type = request.data.get('discount_type', 'amount')
                     if discount_type == 'percentage':
-                        discount_amount = subtotal_ht * (discount_amount / 100)
+                        discount_amount = quantize_amount(subtotal_ht * discount_amount / 100)
                     subtotal_ht -= discount_amount
                     quote.discount_amount = discount_amount
                 
@@ -90,6 +90,11 @@ class QuoteViewSet(viewsets.ModelViewSet):
                 quote.total_ttc = subtotal_ht + total_tva
                 quote.save()
                 
+                # Recharger avec les relations pour une sérialisation sans N+1
+                quote = Quote.objects.select_related('client').prefetch_related(
+                    'items__product__category'
+                ).get(pk=quote.pk)
+                
                 serializer = self.get_serializer(quote)
                 return Response(serializer.data, status=status.HTTP_201_CREATED)
                 
@@ -131,24 +136,19 @@ class QuoteViewSet(viewsets.ModelViewSet):
                     notes=f"Converti du devis {quote.quote_number}. {quote.notes}"
                 )
                 
-                # Copier les items et déduire du stock
-                for quote_item in quote.items.all():
-                    OrderItem.objects.create(
-                        order=order,
-                        product=quote_item.product,
-                        quantity=quote_item.quantity,
-                        unit_price_ht=quote_item.unit_price_ht,
-                        unit_price_ttc=quote_item.unit_price_ttc,
-                        tva_rate=quote_item.tva_rate,
-                    )
-                    
-                    # Déduire du stock
-                    product = quote_item.product
-                    if order.store == 'ville_avray':
-                        product.stock_ville_avray -= quote_item.quantity
-                    else:
-                        product.stock_garches -= quote_item.quantity
-                    product.save()
+                # Copier les items en un seul bulk_create après réservation du stock
+                lines = [
+                    {
+                        'product': quote_item.product,
+                        'quantity': quote_item.quantity,
+                        'unit_price_ht': quote_item.unit_price_ht,
+                        'unit_price_ttc': quote_item.unit_price_ttc,
+                        'tva_rate': quote_item.tva_rate,
+                    }
+                    for quote_item in quote.items.select_related('product')
+                ]
+                StockReservationService.reserve(order.store, lines)
+                ORDER_ITEM_WRITER.write(order, lines)
                 
                 order.status = 'completed'
                 order.save()
@@ -160,7 +160,11 @@ class QuoteViewSet(viewsets.ModelViewSet):
                 
                 # Créer la facture
                 from invoices.models import Invoice
-                invoice = Invoice.objects.create(order=order)
+                from invoices.documents import InvoiceDocumentService
+                invoice = Invoice.objects.create(order=order, pdf_status='pending')
+                
+                # Ticket et facture rendus en arrière-plan après le commit
+                InvoiceDocumentService.schedule_after_commit(invoice)
                 
                 return Response({
                     'message': 'Devis converti en commande avec succès',
@@ -169,6 +173,11 @@ class QuoteViewSet(viewsets.ModelViewSet):
                     'invoice_id': invoice.id
                 })
                 
+        except InsufficientStock as e:
+            return Response(
+                {'error': 'Stock insuffisant', 'store': e.store, 'lines': e.shortages},
+                status=status.HTTP_409_CONFLICT
+            )
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     
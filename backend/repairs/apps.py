@@ -5,3 +5,12 @@ class RepairsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'repairs'
     verbose_name = 'Réparations'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+        from .kanban import RepairKanbanService
+        from .metrics import RepairMetricsService
+        from .models import Repair
+        post_save.connect(RepairMetricsService.invalidate, sender=Repair, dispatch_uid='repair_metrics_save')
+        post_delete.connect(RepairMetricsService.invalidate, sender=Repair, dispatch_uid='repair_metrics_delete')
+        post_delete.connect(RepairKanbanService.record_deletion, sender=Repair, dispatch_uid='repair_kanban_tombstone')
@@ -0,0 +1,173 @@
+"""
+Tableau Kanban de l'atelier
+Les cartes de toutes les colonnes sont lues en une requête : ROW_NUMBER()
+partitionné par statut limite chaque colonne (la colonne « Vélo récupéré »
+ne garde que les dernières livraisons) ; les totaux par colonne viennent d'un
+seul COUNT groupé. En mode ?since= seules les cartes modifiées depuis et les
+réparations supprimées (RepairTombstone) sont renvoyées
+"""
+from datetime import timedelta
+from django.db.models import Case, Count, F, IntegerField, Value, When, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+from .models import Repair, RepairTombstone
+import logging
+
+logger = logging.getLogger(__name__)
+
+# (statut, titre, couleur)
+KANBAN_COLUMNS = [
+    ('pending', 'Réception vélo', '#FFA500'),
+    ('in_progress', 'En réparation', '#4CAF50'),
+    ('completed', 'Réparé - SMS envoyé', '#2196F3'),
+    ('delivered', 'Vélo récupéré', '#9C27B0'),
+]
+DONE_COLUMN = 'delivered'
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+# Au-delà, les traces de suppression sont purgées (tâche quotidienne) : le client
+# recharge tout le tableau
+TOMBSTONE_DAYS = 7
+# Marge de recouvrement entre deux synchronisations (transactions validées en retard)
+SYNC_OVERLAP = timedelta(seconds=5)
+
+PRIORITY_RANK = Case(
+    When(priority='urgent', then=Value(0)),
+    When(priority='high', then=Value(1)),
+    When(priority='normal', then=Value(2)),
+    default=Value(3),
+    output_field=IntegerField(),
+)
+CARD_FIELDS = [
+    'id', 'reference_number', 'bike_brand', 'bike_model', 'description', 'status', 'priority',
+    'created_at', 'updated_at', 'estimated_cost', 'final_cost', 'photo_1', 'store',
+    'client__id', 'client__first_name', 'client__last_name', 'client__phone', 'client__email',
+]
+
+
+class RepairKanbanService:
+
+    @staticmethod
+    def repairs(store=None):
+        queryset = Repair.objects.select_related('client').only(*CARD_FIELDS)
+        return queryset.filter(store=store) if store else queryset
+
+    @staticmethod
+    def card(repair):
+        description = repair.description
+        return {
+            'id': repair.id,
+            'reference_number': repair.reference_number,
+            'client': {
+                'id': repair.client.id,
+                'first_name': repair.client.first_name,
+                'last_name': repair.client.last_name,
+                'phone': repair.client.phone,
+                'email': repair.client.email
+            },
+            'bike_brand': repair.bike_brand,
+            'bike_model': repair.bike_model,
+            'description': description[:100] + '...' if len(description) > 100 else description,
+            'status': repair.status,
+            'priority': repair.priority,
+            'created_at': repair.created_at.isoformat(),
+            'updated_at': repair.updated_at.isoformat(),
+            'estimated_cost': float(repair.estimated_cost),
+            'final_cost': float(repair.final_cost),
+            'photo_1': repair.photo_1.url if repair.photo_1 else None,
+            'store': repair.store
+        }
+
+    @staticmethod
+    def totals(store=None):
+        """{statut: nombre de réparations} en un COUNT groupé"""
+        queryset = Repair.objects.filter(store=store) if store else Repair.objects.all()
+        counts = dict(queryset.values_list('status').annotate(count=Count('id')).order_by())
+        return {status: counts.get(status, 0) for status, _, _ in KANBAN_COLUMNS}
+
+    @staticmethod
+    def summary(totals):
+        return {
+            'total_repairs': sum(totals.values()),
+            'in_progress': totals['pending'] + totals['in_progress'],
+            'completed': totals[DONE_COLUMN]
+        }
+
+    @staticmethod
+    def board(store=None, limit=DEFAULT_LIMIT):
+        """Tableau complet : `limit` cartes au plus par colonne"""
+        next_since = timezone.now() - SYNC_OVERLAP
+        # Colonnes actives : priorité puis ancienneté ; livrées : les plus récentes d'abord
+        position = Window(
+            RowNumber(),
+            partition_by=[F('status')],
+            order_by=[
+                Case(When(status=DONE_COLUMN, then=Value(0)), default=PRIORITY_RANK).asc(),
+                Case(When(status=DONE_COLUMN, then=F('updated_at'))).desc(nulls_last=True),
+                F('created_at').asc(),
+                F('id').asc(),
+            ],
+        )
+        cards = RepairKanbanService.repairs(store).filter(
+            status__in=[status for status, _, _ in KANBAN_COLUMNS]
+        ).annotate(position=position).filter(position__lte=limit).order_by('position')
+
+        by_status = {status: [] for status, _, _ in KANBAN_COLUMNS}
+        for repair in cards:
+            by_status[repair.status].append(RepairKanbanService.card(repair))
+        totals = RepairKanbanService.totals(store)
+
+        return {
+            'full': True,
+            'next_since': next_since.isoformat(),
+            'columns': [
+                {
+                    'id': status,
+                    'title': title,
+                    'color': color,
+                    'total': totals[status],
+                    'has_more': totals[status] > len(by_status[status]),
+                    'repairs': by_status[status],
+                }
+                for status, title, color in KANBAN_COLUMNS
+            ],
+            'summary': RepairKanbanService.summary(totals),
+        }
+
+    @staticmethod
+    def changes(since, store=None, limit=DEFAULT_LIMIT):
+        """
+        Cartes modifiées depuis `since` et réparations supprimées depuis
+        Tableau complet si `since` est antérieur à la conservation des traces
+        """
+        now = timezone.now()
+        if since < now - timedelta(days=TOMBSTONE_DAYS):
+            return RepairKanbanService.board(store, limit)
+
+        changed = RepairKanbanService.repairs(store).filter(updated_at__gt=since).order_by('updated_at')
+        tombstones = RepairTombstone.objects.filter(deleted_at__gt=since)
+        if store:
+            tombstones = tombstones.filter(store=store)
+        totals = RepairKanbanService.totals(store)
+
+        return {
+            'full': False,
+            'next_since': (now - SYNC_OVERLAP).isoformat(),
+            'changed': [RepairKanbanService.card(repair) for repair in changed],
+            'deleted': list(tombstones.values_list('repair_id', flat=True)),
+            'totals': totals,
+            'summary': RepairKanbanService.summary(totals),
+        }
+
+    @staticmethod
+    def record_deletion(sender, instance, **kwargs):
+        """Récepteur post_delete : trace de suppression"""
+        RepairTombstone.objects.create(repair_id=instance.pk, store=instance.store)
+
+    @staticmethod
+    def purge_tombstones():
+        """Supprime les traces plus anciennes que la fenêtre de synchronisation"""
+        cutoff = timezone.now() - timedelta(days=TOMBSTONE_DAYS)
+        deleted = RepairTombstone.objects.filter(deleted_at__lt=cutoff).delete()[0]
+        logger.info(f"Kanban : {deleted} trace(s) de suppression purgée(s)")
+        return deleted
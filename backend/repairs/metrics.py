@@ -0,0 +1,128 @@
+"""
+Indicateurs de l'atelier (dashboard et statistiques des réparations)
+Tous les compteurs (statut, priorité, magasin, type), chiffres d'affaires et
+durée moyenne de réparation sont calculés par un seul aggregate() à filtres
+conditionnels, durée comprise (moyenne calculée par la base). Le résultat est
+mis en cache par magasin et invalidé à chaque réparation enregistrée ou
+supprimée
+"""
+from datetime import timedelta
+from django.core.cache import cache
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from analytics.rollups import day_start
+from .models import Repair
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+OPEN_STATUSES = ('pending', 'in_progress')
+DONE_STATUS = 'delivered'
+RECENT_DAYS = 7
+MONTHLY_DAYS = 30
+
+CACHE_VERSION_KEY = 'repair_metrics_version'
+CACHE_TIMEOUT = 60 * 15
+
+
+def choice_values(choices):
+    return [value for value, _ in choices]
+
+
+class RepairMetricsService:
+
+    @staticmethod
+    def aggregates(today):
+        """Expressions de l'aggregate() : une entrée par indicateur"""
+        recent = timezone.now() - timedelta(days=RECENT_DAYS)
+        month_ago = today - timedelta(days=MONTHLY_DAYS)
+        delivered = Q(status=DONE_STATUS)
+
+        expressions = {
+            'total': Count('id'),
+            'recent': Count('id', filter=Q(created_at__gte=recent)),
+            'created_last_30_days': Count('id', filter=Q(created_at__gte=day_start(month_ago))),
+            'open': Count('id', filter=Q(status__in=OPEN_STATUSES)),
+            'overdue': Count('id', filter=Q(status__in=OPEN_STATUSES, estimated_completion__lt=today)),
+            'budget_exceeded': Count('id', filter=Q(max_budget__isnull=False, estimated_cost__gt=F('max_budget'))),
+            'revenue_total': Sum('final_cost', filter=delivered),
+            'revenue_last_30_days': Sum('final_cost', filter=delivered & Q(actual_completion__gte=month_ago)),
+            'revenue_month': Sum('final_cost', filter=delivered & Q(actual_completion__gte=today.replace(day=1))),
+            # Durée calculée par la base : date de livraison - jour de dépôt (heure locale)
+            'average_duration': Avg(
+                ExpressionWrapper(
+                    F('actual_completion') - TruncDate('created_at', tzinfo=timezone.get_current_timezone()),
+                    output_field=DurationField(),
+                ),
+                filter=delivered & Q(actual_completion__isnull=False),
+            ),
+        }
+        for field, choices in (
+            ('status', Repair.STATUS_CHOICES), ('priority', Repair.PRIORITY_CHOICES),
+            ('repair_type', Repair.TYPE_CHOICES),
+        ):
+            for value in choice_values(choices):
+                expressions[f'{field}:{value}'] = Count('id', filter=Q(**{field: value}))
+        for store in choice_values(Repair.STORE_CHOICES):
+            expressions[f'store:{store}'] = Count('id', filter=Q(store=store))
+            expressions[f'store_revenue:{store}'] = Sum('final_cost', filter=delivered & Q(store=store))
+        return expressions
+
+    @staticmethod
+    def compute(store=None, today=None):
+        """Indicateurs des réparations (d'un magasin ou de tous), en une requête"""
+        today = today or timezone.localdate()
+        queryset = Repair.objects.all()
+        if store:
+            queryset = queryset.filter(store=store)
+        row = queryset.aggregate(**RepairMetricsService.aggregates(today))
+
+        def counts(prefix, values):
+            return {value: row[f'{prefix}:{value}'] for value in values}
+
+        duration = row['average_duration']
+        stores = [store] if store else choice_values(Repair.STORE_CHOICES)
+        return {
+            'store': store,
+            'total': row['total'],
+            'recent': row['recent'],
+            'created_last_30_days': row['created_last_30_days'],
+            'open': row['open'],
+            'overdue': row['overdue'],
+            'budget_exceeded': row['budget_exceeded'],
+            'by_status': counts('status', choice_values(Repair.STATUS_CHOICES)),
+            'by_priority': counts('priority', choice_values(Repair.PRIORITY_CHOICES)),
+            'by_type': counts('repair_type', choice_values(Repair.TYPE_CHOICES)),
+            'by_store': [
+                {'store': value, 'count': row[f'store:{value}'], 'revenue': float(row[f'store_revenue:{value}'] or 0)}
+                for value in stores
+            ],
+            'revenue': {
+                'total': float(row['revenue_total'] or 0),
+                'last_30_days': float(row['revenue_last_30_days'] or 0),
+                'month': float(row['revenue_month'] or 0),
+            },
+            'average_duration_days': round(duration.total_seconds() / 86400, 1) if duration else 0,
+        }
+
+    @staticmethod
+    def cache_key(store, today):
+        return f"repair_metrics:{cache.get(CACHE_VERSION_KEY, 0)}:{store or 'all'}:{today}"
+
+    @staticmethod
+    def get(store=None, today=None):
+        """Indicateurs en cache (une entrée par magasin et par jour)"""
+        today = today or timezone.localdate()
+        key = RepairMetricsService.cache_key(store, today)
+        metrics = cache.get(key)
+        if metrics is None:
+            metrics = RepairMetricsService.compute(store, today)
+            cache.set(key, metrics, CACHE_TIMEOUT)
+        return metrics
+
+    @staticmethod
+    def invalidate(**kwargs):
+        """Invalide toutes les entrées (utilisable comme récepteur de signal)"""
+        cache.set(CACHE_VERSION_KEY, time.time_ns(), None)
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repairs', '0003_alter_repairitem_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='repair',
+            index=models.Index(fields=['created_at', 'id'], name='repairs_created_b849ba_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repairs', '0004_repair_created_at_id_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RepairTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('repair_id', models.BigIntegerField()),
+                ('store', models.CharField(choices=[('ville_avray', "Ville d'Avray"), ('garches', 'Garches')], max_length=20)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'db_table': 'repair_tombstones',
+                'ordering': ['deleted_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='repair',
+            index=models.Index(fields=['updated_at'], name='repairs_updated_e06c33_idx'),
+        ),
+    ]
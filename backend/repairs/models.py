@@ -1,3 +1,4 @@
+from decimal import Decimal
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
@@ -112,6 +113,8 @@ class Repair(models.Model):
             models.Index(fields=['created_at']),
             models.Index(fields=['store']),
             models.Index(fields=['priority']),
+            models.Index(fields=['created_at', 'id']),  # Pagination par curseur
+            models.Index(fields=['updated_at']),  # Synchronisation du Kanban (?since=)
         ]
     
     def __str__(self):
@@ -124,21 +127,20 @@ class Repair(models.Model):
     
     def generate_reference_number(self):
         """Génère un numéro de référence unique"""
-        today = timezone.now()
+        from settings_app.sequences import SequenceService
+        today = timezone.localdate()
         date_str = today.strftime('%Y%m%d')
         
         store_code = 'VA' if self.store == 'ville_avray' else 'GA'
         prefix = f"REP-{store_code}-{date_str}"
         
-        last_repair = Repair.objects.filter(
-            reference_number__startswith=prefix
-        ).order_by('-reference_number').first()
-        
-        if last_repair:
-            last_number = int(last_repair.reference_number.split('-')[-1])
-            new_number = last_number + 1
-        else:
-            new_number = 1
+        # Compteur atomique, initialisé depuis les références existantes du jour
+        new_number = SequenceService.allocate(
+            'repair', store=self.store, day=today,
+            seed=lambda: SequenceService.last_number_with_prefix(
+                Repair.objects, 'reference_number', prefix, lambda value: int(value.split('-')[-1])
+            )
+        )
         
         return f"{prefix}-{new_number:03d}"
     
@@ -149,8 +151,10 @@ class Repair(models.Model):
     
     @property
     def parts_cost(self):
-        """Coût total des pièces"""
-        return sum(item.total_price for item in self.items.all())
+        """Coût total des pièces (articles préchargés, sinon SUM calculé par la base)"""
+        if 'items' in getattr(self, '_prefetched_objects_cache', {}):
+            return sum((item.total_price for item in self.items.all()), Decimal('0'))
+        return self.items.aggregate(total=models.Sum('total_price'))['total'] or Decimal('0')
     
     @property
     def total_cost(self):
@@ -271,3 +275,21 @@ class WorkshopWorkload(models.Model):
     
     def __str__(self):
         return f"{self.mechanic.username} - {self.date} ({self.store})"
+
+
+class RepairTombstone(models.Model):
+    """
+    Trace d'une réparation supprimée, pour la synchronisation incrémentale
+    du Kanban et du planning (purgée par la tâche quotidienne
+    repairs.purge_tombstones_daily après kanban.TOMBSTONE_DAYS jours)
+    """
+    repair_id = models.BigIntegerField()
+    store = models.CharField(max_length=20, choices=Repair.STORE_CHOICES)
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    class Meta:
+        db_table = 'repair_tombstones'
+        ordering = ['deleted_at']
+    
+    def __str__(self):
+        return f"Réparation #{self.repair_id} supprimée le {self.deleted_at}"
@@ -0,0 +1,344 @@
+"""
+Planification de l'atelier sur une semaine glissante
+Les réparations ouvertes sont placées par ordonnancement de liste : file de
+priorité des travaux (priorité, date promise, ancienneté) et tas des
+mécaniciens ordonné par premier créneau libre. La capacité de chaque
+mécanicien est celle de WorkshopWorkload (heures prévues par jour et par
+magasin) ; un travail peut déborder sur les jours suivants. Une réparation
+attribuée à un mécanicien absent du planning de la semaine n'est jamais
+réattribuée : elle reste non planifiée (off_roster).
+
+Le placement d'un travail ne dépend que des travaux qui le précèdent : l'état
+des mécaniciens est conservé tous les CHECKPOINT_EVERY travaux, et une
+réparation modifiée ne fait rejouer que la fin de la file à partir du point
+de reprise précédent. Le plan est mis en cache par magasin et resynchronisé
+à la lecture via updated_at et RepairTombstone (comme le Kanban)
+"""
+from collections import namedtuple
+from datetime import datetime, timedelta
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from .kanban import SYNC_OVERLAP
+from .metrics import OPEN_STATUSES
+from .models import Repair, RepairTombstone, WorkshopWorkload
+import bisect
+import heapq
+import logging
+
+logger = logging.getLogger(__name__)
+
+PLANNING_DAYS = 7
+CHECKPOINT_EVERY = 64
+# Durée retenue lorsqu'estimated_duration n'est pas renseignée (heures)
+DEFAULT_DURATION_HOURS = 1
+PRIORITY_ORDER = {'urgent': 0, 'high': 1, 'normal': 2, 'low': 3}
+NO_DEADLINE = datetime.max.toordinal()
+EPSILON = 1e-9
+
+CACHE_TIMEOUT = 60 * 60 * 24
+JOB_FIELDS = [
+    'id', 'reference_number', 'store', 'status', 'priority', 'estimated_duration',
+    'estimated_completion', 'created_at', 'assigned_to_id',
+]
+
+PlanJob = namedtuple('PlanJob', 'id reference priority hours deadline created mechanic')
+
+
+def job_from_repair(repair):
+    return PlanJob(
+        id=repair.id,
+        reference=repair.reference_number,
+        priority=repair.priority,
+        hours=float(repair.estimated_duration or DEFAULT_DURATION_HOURS),
+        deadline=repair.estimated_completion,
+        created=repair.created_at.timestamp(),
+        mechanic=repair.assigned_to_id,
+    )
+
+
+def job_key(job):
+    """Ordre de la file : priorité, date promise (les travaux sans date après), ancienneté"""
+    deadline = job.deadline.toordinal() if job.deadline else NO_DEADLINE
+    return (PRIORITY_ORDER.get(job.priority, len(PRIORITY_ORDER)), deadline, job.created, job.id)
+
+
+class WorkshopPlan:
+    """Plan d'un magasin : pur Python (sans accès base), sérialisable dans le cache"""
+
+    def __init__(self, store, days, capacity, names):
+        self.store = store
+        self.days = days                    # [date]
+        self.capacity = capacity            # {mechanic_id: [heures disponibles par jour]}
+        self.names = names                  # {mechanic_id: nom}
+        self.keys = []                      # Clés triées de la file
+        self.jobs = {}                      # {repair_id: PlanJob}
+        self.placements = {}                # {repair_id: (mechanic_id, [(jour, heures)])}
+        self.checkpoints = [self._initial_state()]
+        self.synced_at = None
+        self.fingerprint = None
+
+    def _initial_state(self):
+        # Curseur de chaque mécanicien : (jour, heures déjà planifiées ce jour-là)
+        return {mechanic: (0, 0.0) for mechanic in self.capacity}
+
+    def load(self, jobs):
+        self.jobs = {job.id: job for job in jobs}
+        self.keys = sorted(job_key(job) for job in jobs)
+        self.schedule_from(0)
+
+    def apply_changes(self, upserts=(), removals=()):
+        """
+        Ajoute/remplace et retire des travaux puis rejoue la file à partir de
+        la première position touchée ; retourne cette position (None si rien)
+        """
+        first = None
+        for job_id in removals:
+            position = self._remove(job_id)
+            if position is not None:
+                first = position if first is None else min(first, position)
+        for job in upserts:
+            position = self._remove(job.id)
+            key = job_key(job)
+            inserted = bisect.bisect_left(self.keys, key)
+            self.keys.insert(inserted, key)
+            self.jobs[job.id] = job
+            for candidate in (position, inserted):
+                if candidate is not None:
+                    first = candidate if first is None else min(first, candidate)
+        if first is not None:
+            self.schedule_from(first)
+        return first
+
+    def _remove(self, job_id):
+        job = self.jobs.pop(job_id, None)
+        if job is None:
+            return None
+        position = bisect.bisect_left(self.keys, job_key(job))
+        del self.keys[position]
+        self.placements.pop(job_id, None)
+        return position
+
+    def _place(self, state, mechanic, hours):
+        """Créneaux [(jour, heures)] à partir du curseur, ou None si la semaine ne suffit pas"""
+        day, used = state[mechanic]
+        capacity = self.capacity[mechanic]
+        remaining, segments = hours, []
+        while remaining > EPSILON and day < len(self.days):
+            free = capacity[day] - used
+            if free <= EPSILON:
+                day, used = day + 1, 0.0
+                continue
+            taken = min(free, remaining)
+            segments.append((day, taken))
+            used += taken
+            remaining -= taken
+            if capacity[day] - used <= EPSILON:
+                day, used = day + 1, 0.0
+        if remaining > EPSILON:
+            return None
+        return (day, used), segments
+
+    def schedule_from(self, position):
+        """Rejoue la file depuis le point de reprise précédant `position`"""
+        checkpoint = min(position // CHECKPOINT_EVERY, len(self.checkpoints) - 1)
+        del self.checkpoints[checkpoint + 1:]
+        state = dict(self.checkpoints[checkpoint])
+        start = checkpoint * CHECKPOINT_EVERY
+        for key in self.keys[start:]:
+            self.placements.pop(key[-1], None)
+
+        # Tas des mécaniciens disponibles ; les entrées périmées sont ignorées au dépilage
+        heap = [(day, used, mechanic) for mechanic, (day, used) in state.items() if day < len(self.days)]
+        heapq.heapify(heap)
+
+        for index in range(start, len(self.keys)):
+            if index > start and index % CHECKPOINT_EVERY == 0:
+                self.checkpoints.append(dict(state))
+            job = self.jobs[self.keys[index][-1]]
+
+            if job.mechanic is not None:
+                # Réparation déjà attribuée : conservée chez son mécanicien, non
+                # planifiée s'il n'a aucune heure prévue cette semaine
+                if job.mechanic not in state:
+                    continue
+                mechanic = job.mechanic
+            else:
+                mechanic = None
+                while heap:
+                    day, used, candidate = heap[0]
+                    if state[candidate] == (day, used):
+                        mechanic = candidate
+                        break
+                    heapq.heappop(heap)
+            if mechanic is None or state[mechanic][0] >= len(self.days):
+                continue
+
+            placed = self._place(state, mechanic, job.hours)
+            if placed is None:
+                continue
+            cursor, segments = placed
+            state[mechanic] = cursor
+            self.placements[job.id] = (mechanic, segments)
+            if cursor[0] < len(self.days):
+                heapq.heappush(heap, (cursor[0], cursor[1], mechanic))
+
+    def as_dict(self):
+        """Planning par mécanicien et par jour, travaux non planifiés, hors planning et en retard"""
+        def job_entry(job, hours=None):
+            return {
+                'id': job.id,
+                'reference_number': job.reference,
+                'priority': job.priority,
+                'hours': round(job.hours if hours is None else hours, 2),
+            }
+
+        schedule = {
+            mechanic: [{'repairs': [], 'planned_hours': 0.0} for _ in self.days] for mechanic in self.capacity
+        }
+        unscheduled, off_roster, late = [], [], []
+        for key in self.keys:
+            job = self.jobs[key[-1]]
+            placement = self.placements.get(job.id)
+            if placement is None:
+                unscheduled.append(job_entry(job))
+                if job.mechanic is not None and job.mechanic not in self.capacity:
+                    off_roster.append(job.id)
+                continue
+            mechanic, segments = placement
+            for day, hours in segments:
+                schedule[mechanic][day]['repairs'].append(job_entry(job, hours))
+                schedule[mechanic][day]['planned_hours'] += hours
+            if job.deadline and self.days[segments[-1][0]] > job.deadline:
+                late.append(job.id)
+
+        return {
+            'store': self.store,
+            'start': self.days[0].isoformat(),
+            'end': self.days[-1].isoformat(),
+            'jobs': len(self.keys),
+            'scheduled': len(self.placements),
+            'mechanics': [
+                {
+                    'id': mechanic,
+                    'name': self.names[mechanic],
+                    'capacity_hours': round(sum(self.capacity[mechanic]), 2),
+                    'planned_hours': round(sum(day['planned_hours'] for day in schedule[mechanic]), 2),
+                    'days': [
+                        {
+                            'date': date.isoformat(),
+                            'capacity_hours': round(self.capacity[mechanic][index], 2),
+                            'planned_hours': round(schedule[mechanic][index]['planned_hours'], 2),
+                            'repairs': schedule[mechanic][index]['repairs'],
+                        }
+                        for index, date in enumerate(self.days)
+                    ],
+                }
+                for mechanic in sorted(self.capacity, key=lambda mechanic: self.names[mechanic])
+            ],
+            'unscheduled': unscheduled,
+            'off_roster': off_roster,
+            'late': late,
+        }
+
+
+class RepairPlanningService:
+
+    @staticmethod
+    def cache_key(store, start):
+        return f"repair_planning:{store}:{start}"
+
+    @staticmethod
+    def capacity(store, start):
+        """Capacité par mécanicien et par jour (WorkshopWorkload) et noms des mécaniciens"""
+        days = [start + timedelta(days=offset) for offset in range(PLANNING_DAYS)]
+        rows = WorkshopWorkload.objects.filter(
+            store=store, date__range=[days[0], days[-1]]
+        ).select_related('mechanic').order_by('mechanic_id', 'date')
+        capacity, names, fingerprint = {}, {}, []
+        for row in rows:
+            hours = float(row.estimated_hours)
+            capacity.setdefault(row.mechanic_id, [0.0] * PLANNING_DAYS)[(row.date - start).days] = hours
+            names[row.mechanic_id] = row.mechanic.get_full_name() or row.mechanic.username
+            fingerprint.append((row.mechanic_id, row.date.toordinal(), hours))
+        return days, capacity, names, tuple(fingerprint)
+
+    @staticmethod
+    def open_repairs(store):
+        return Repair.objects.filter(store=store, status__in=OPEN_STATUSES).only(*JOB_FIELDS).order_by()
+
+    @staticmethod
+    def build(store, start, days, capacity, names, fingerprint, now):
+        plan = WorkshopPlan(store, days, capacity, names)
+        plan.load([job_from_repair(repair) for repair in RepairPlanningService.open_repairs(store)])
+        plan.synced_at, plan.fingerprint = now, fingerprint
+        return plan
+
+    @staticmethod
+    def sync(plan, store, now):
+        """Répercute les réparations modifiées et supprimées depuis la dernière lecture"""
+        since = plan.synced_at - SYNC_OVERLAP
+        upserts, removals = [], []
+        for repair in Repair.objects.filter(store=store, updated_at__gt=since).only(*JOB_FIELDS).order_by():
+            if repair.status in OPEN_STATUSES:
+                upserts.append(job_from_repair(repair))
+            else:
+                removals.append(repair.id)
+        removals.extend(
+            RepairTombstone.objects.filter(store=store, deleted_at__gt=since).values_list('repair_id', flat=True)
+        )
+        plan.apply_changes(upserts, removals)
+        plan.synced_at = now
+        return len(upserts) + len(removals)
+
+    @staticmethod
+    def get_plan(store, start=None):
+        """
+        Plan d'un magasin pour les PLANNING_DAYS jours à partir de `start`
+        Reconstruit si absent du cache ou si la capacité a changé, sinon
+        mis à jour à partir des seules réparations modifiées
+        """
+        start = start or timezone.localdate()
+        now = timezone.now()
+        days, capacity, names, fingerprint = RepairPlanningService.capacity(store, start)
+        key = RepairPlanningService.cache_key(store, start)
+        plan = cache.get(key)
+
+        if plan is None or plan.fingerprint != fingerprint:
+            plan = RepairPlanningService.build(store, start, days, capacity, names, fingerprint, now)
+            incremental = False
+        else:
+            plan.names = names
+            changes = RepairPlanningService.sync(plan, store, now)
+            incremental = True
+            logger.debug(f"Planning {store}: {changes} réparation(s) resynchronisée(s)")
+
+        cache.set(key, plan, CACHE_TIMEOUT)
+        return plan, incremental
+
+    @staticmethod
+    def auto_assign(store, start=None):
+        """
+        Attribue aux réparations sans mécanicien celui que le plan a retenu
+        Un seul bulk_update ; retourne le nombre de réparations attribuées
+        """
+        plan, _ = RepairPlanningService.get_plan(store, start)
+        chosen = {
+            job_id: mechanic for job_id, (mechanic, _) in plan.placements.items()
+            if plan.jobs[job_id].mechanic is None
+        }
+        if not chosen:
+            return 0
+
+        now = timezone.now()
+        with transaction.atomic():
+            repairs = list(
+                Repair.objects.select_for_update().filter(pk__in=list(chosen), assigned_to__isnull=True).only('id')
+            )
+            for repair in repairs:
+                repair.assigned_to_id = chosen[repair.id]
+                repair.updated_at = now  # bulk_update ne renseigne pas auto_now
+            Repair.objects.bulk_update(repairs, ['assigned_to', 'updated_at'])
+
+        logger.info(f"Planning {store}: {len(repairs)} réparation(s) attribuée(s) automatiquement")
+        return len(repairs)
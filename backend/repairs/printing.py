@@ -0,0 +1,199 @@
+"""
+Impression des bons de réparation
+Le bon individuel (print) et l'impression groupée des dépôts du jour
+(print_batch) partagent la même mise en page : WorkOrderPrinter dessine un
+bon par page sur un canvas unique, polices et positions étant communes à
+tous les bons. L'impression groupée charge réparations, clients et articles
+en deux requêtes ; le PDF est écrit dans un fichier temporaire (en mémoire,
+puis sur disque au-delà d'un seuil) et envoyé par blocs
+"""
+from datetime import timedelta
+from tempfile import SpooledTemporaryFile
+from django.db.models import Prefetch
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+from analytics.rollups import day_start
+from .models import Repair, RepairItem
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Nombre maximal de bons par impression groupée
+BATCH_MAX_REPAIRS = 200
+# Au-delà, le PDF en cours de rendu est écrit sur disque plutôt qu'en mémoire
+SPOOL_MAX_SIZE = 5 * 1024 * 1024
+
+# Mise en page (points A4)
+X_LEFT = 50
+Y_START = 800
+Y_BOTTOM = 50
+LINE_HEIGHT = 15
+WRAP_WIDTH = 80
+
+TITLE = ('Helvetica-Bold', 16)
+HEADING = ('Helvetica-Bold', 12)
+TEXT = ('Helvetica', 10)
+STRONG = ('Helvetica-Bold', 10)
+
+
+def wrap_line(line, width=WRAP_WIDTH):
+    """Découpe une ligne trop longue sur les espaces (même règle que le bon historique)"""
+    if len(line) <= width:
+        return [line]
+    lines, current = [], ''
+    for word in line.split(' '):
+        if len(current + word) < width:
+            current += word + ' '
+        else:
+            lines.append(current)
+            current = word + ' '
+    if current:
+        lines.append(current)
+    return lines
+
+
+class WorkOrderPrinter:
+    """Canvas ReportLab partagé : un bon de réparation par page (suite sur la page suivante si besoin)"""
+
+    def __init__(self, output):
+        self.canvas = canvas.Canvas(output, pagesize=A4, pageCompression=1)
+        self.y = Y_START
+        self.font = None
+        self.pages = 0
+
+    def _set_font(self, font):
+        # L'état graphique est réinitialisé à chaque page
+        if font != self.font:
+            self.canvas.setFont(*font)
+            self.font = font
+
+    def _end_page(self):
+        self.canvas.showPage()
+        self.pages += 1
+        self.y = Y_START
+        self.font = None
+
+    def text(self, value, font=TEXT, indent=0, advance=LINE_HEIGHT):
+        if self.y < Y_BOTTOM:
+            self._end_page()
+        self._set_font(font)
+        self.canvas.drawString(X_LEFT + indent, self.y, value)
+        self.y -= advance
+
+    def heading(self, value):
+        self.text(value, HEADING, advance=20)
+
+    def skip(self, height=LINE_HEIGHT):
+        self.y -= height
+
+    def draw(self, repair):
+        """Bon de réparation complet ; articles lus depuis le préchargement s'il existe"""
+        client = repair.client
+        self.text(f"Bon de réparation n°{repair.reference_number}", TITLE, advance=30)
+
+        self.heading("Informations générales")
+        self.text(f"Client : {client.first_name} {client.last_name}")
+        self.text(f"Email : {client.email}")
+        if client.phone:
+            self.text(f"Téléphone : {client.phone}")
+        self.text(f"Magasin : {repair.get_store_display()}")
+        self.text(f"Date de dépôt : {repair.created_at.strftime('%d/%m/%Y à %H:%M')}")
+        self.text(f"Statut : {repair.get_status_display()}")
+        self.text(f"Priorité : {repair.get_priority_display()}", advance=30)
+
+        self.heading("Vélo")
+        self.text(f"Produit déposé : {repair.bike_brand}")
+        if repair.bike_model:
+            self.text(f"Modèle : {repair.bike_model}")
+        if repair.bike_serial_number:
+            self.text(f"N° de série : {repair.bike_serial_number}")
+        self.skip()
+
+        self.heading("Description du problème")
+        for line in repair.description.split('\n'):
+            for part in wrap_line(line):
+                self.text(part, indent=10)
+        self.skip()
+
+        if repair.diagnosis:
+            self.heading("Diagnostic")
+            for line in repair.diagnosis.split('\n')[:5]:  # Limiter à 5 lignes
+                self.text(line[:WRAP_WIDTH], indent=10)
+            self.skip()
+
+        items = list(repair.items.all())
+        if items:
+            self.heading("Pièces et interventions")
+            for item in items:
+                self.text(f"• {item.description}", indent=10)
+                self.text(
+                    f"Qté : {item.quantity} - Prix unitaire : {item.unit_price}€ - Total : {item.total_price}€",
+                    indent=20, advance=20
+                )
+        self.skip()
+
+        self.heading("Coûts")
+        if repair.max_budget:
+            self.text(f"Budget maximum : {repair.max_budget}€")
+        self.text(f"Coût estimé : {repair.estimated_cost}€")
+        if repair.final_cost > 0:
+            self.text(f"Coût final : {repair.final_cost}€", STRONG)
+        if repair.deposit_paid > 0:
+            self.text(f"Acompte versé : {repair.deposit_paid}€")
+
+        self.skip()
+        self.heading("Dates")
+        if repair.estimated_completion:
+            self.text(f"Livraison estimée : {repair.estimated_completion.strftime('%d/%m/%Y')}")
+        if repair.actual_completion:
+            self.text(f"Livraison réelle : {repair.actual_completion.strftime('%d/%m/%Y')}")
+
+        self.skip(30)
+        self.text("Signature du client :", advance=0)
+        self.canvas.line(X_LEFT + 120, self.y - 5, X_LEFT + 300, self.y - 5)
+        self._end_page()
+
+    def save(self):
+        self.canvas.save()
+
+
+class WorkOrderPrintService:
+
+    @staticmethod
+    def get_repairs(day, store=None, statuses=None):
+        """Réparations déposées le jour donné (heure locale), clients et articles préchargés"""
+        repairs = Repair.objects.filter(
+            created_at__gte=day_start(day), created_at__lt=day_start(day + timedelta(days=1))
+        ).select_related('client').prefetch_related(
+            Prefetch('items', queryset=RepairItem.objects.only(
+                'id', 'repair_id', 'item_type', 'description', 'quantity', 'unit_price', 'total_price'
+            ))
+        ).order_by('created_at', 'id')
+        if store:
+            repairs = repairs.filter(store=store)
+        if statuses:
+            repairs = repairs.filter(status__in=statuses)
+        return repairs
+
+    @staticmethod
+    def render(repairs, output):
+        """Dessine les bons dans `output` (fichier binaire) ; retourne le nombre de pages"""
+        printer = WorkOrderPrinter(output)
+        for repair in repairs:
+            printer.draw(repair)
+        printer.save()
+        return printer.pages
+
+    @staticmethod
+    def render_spooled(repairs):
+        """PDF groupé dans un fichier temporaire repositionné au début, prêt à être envoyé"""
+        spool = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        pages = WorkOrderPrintService.render(repairs, spool)
+        spool.seek(0)
+        logger.info(f"Impression groupée: {len(repairs)} bon(s), {pages} page(s)")
+        return spool
+
+    @staticmethod
+    def batch_name(day, store=None):
+        suffix = f'_{store}' if store else ''
+        return f"bons_reparation{suffix}_{day:%Y%m%d}.pdf"
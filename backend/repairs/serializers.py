@@ -1,5 +1,7 @@
+from django.db.models import Sum
 from rest_framework import serializers
 from .models import Repair, RepairItem
+from .services import RepairCostService
 
 
 class RepairItemSerializer(serializers.ModelSerializer):
@@ -49,6 +51,32 @@ class RepairSerializer(serializers.ModelSerializer):
         }
 
 
+class RepairListSerializer(RepairSerializer):
+    """
+    Représentation résumée pour la liste des réparations
+    Sans articles imbriqués : nombre d'articles, total pièces et total main
+    d'œuvre issus des annotations de RepairViewSet.get_queryset ; la
+    description est un extrait calculé par la base (textes longs différés)
+    """
+    description = serializers.CharField(source='description_excerpt', read_only=True)
+    items_count = serializers.IntegerField(read_only=True)
+    parts_total = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    labor_total = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = Repair
+        fields = [
+            'id', 'reference_number', 'client', 'client_name', 'client_info',
+            'bike_brand', 'bike_model', 'bike_serial_number', 'bike_type', 'photo_1', 'photo_2', 'photo_3',
+            'repair_type', 'description', 'created_at', 'updated_at', 'estimated_completion',
+            'actual_completion', 'estimated_duration', 'store', 'status', 'priority',
+            'assigned_to', 'assigned_to_name', 'estimated_cost', 'final_cost', 'deposit_paid', 'max_budget',
+            'client_notified', 'client_approved', 'labor_hours', 'labor_rate',
+            'items_count', 'parts_total', 'labor_total',
+        ]
+        read_only_fields = fields
+
+
 class RepairCreateSerializer(serializers.ModelSerializer):
     """Serializer pour la création et mise à jour des réparations"""
     items = RepairItemSerializer(many=True, required=False)
@@ -145,8 +173,12 @@ class RepairCreateSerializer(serializers.ModelSerializer):
         repair = Repair.objects.create(**validated_data)
         
         # Créer les items si fournis
-        for item_data in items_data:
-            RepairItem.objects.create(repair=repair, **item_data)
+        items = [RepairItem.objects.create(repair=repair, **item_data) for item_data in items_data]
+        
+        # Coût final : les articles s'ajoutent au montant saisi
+        if items:
+            RepairCostService.apply_item_delta(repair, sum(item.total_price for item in items))
+            repair.refresh_from_db(fields=['final_cost', 'updated_at'])
         
         return repair
     
@@ -162,10 +194,13 @@ class RepairCreateSerializer(serializers.ModelSerializer):
         
         # Mettre à jour les items si fournis
         if items_data is not None:
+            previous = instance.items.aggregate(total=Sum('total_price'))['total'] or 0
             # Supprimer les anciens items
             instance.items.all().delete()
             # Créer les nouveaux
-            for item_data in items_data:
-                RepairItem.objects.create(repair=instance, **item_data)
+            items = [RepairItem.objects.create(repair=instance, **item_data) for item_data in items_data]
+            # Coût final : montant des anciens articles remplacé par celui des nouveaux
+            RepairCostService.apply_item_delta(instance, sum(item.total_price for item in items) - previous)
+            instance.refresh_from_db(fields=['final_cost', 'updated_at'])
         
         return instance
@@ -0,0 +1,141 @@
+"""
+Services métier pour le module Réparations
+Changements de statut groupés depuis le tableau Kanban, coût final tenu
+à jour par variations lors de l'ajout ou du retrait d'articles
+"""
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from typing import Dict, List
+from analytics.rollups import DashboardRollupService
+from clients.aggregates import ClientAggregateService
+from utils.business_services import RepairBusinessService
+from .metrics import RepairMetricsService
+from .models import Repair, RepairTimeline
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Nombre maximal de réparations déplacées par requête
+BULK_MAX_MOVES = 500
+BATCH_SIZE = 500
+
+
+class RepairStatusService:
+
+    @staticmethod
+    def _result(repair_id, result, **extra) -> Dict:
+        return {'id': repair_id, 'result': result, **extra}
+
+    @staticmethod
+    def bulk_transition(moves: List[Dict], user) -> List[Dict]:
+        """
+        Applique des changements de statut [{'id', 'status'}] en une transaction
+        Chaque déplacement est validé (RepairBusinessService) ; les valides sont
+        écrits en un bulk_update et tracés en un bulk_create de RepairTimeline.
+        Retourne un résultat par déplacement, dans l'ordre reçu :
+        updated / unchanged / invalid / not_found / duplicate
+        """
+        valid_statuses = dict(Repair.STATUS_CHOICES)
+        results = [None] * len(moves)
+        wanted = {}
+        for index, move in enumerate(moves):
+            try:
+                repair_id, new_status = int(move['id']), move['status']
+            except (KeyError, TypeError, ValueError):
+                results[index] = RepairStatusService._result(
+                    move.get('id') if isinstance(move, dict) else None, 'invalid', error='id et status requis'
+                )
+                continue
+            if repair_id in wanted:
+                results[index] = RepairStatusService._result(repair_id, 'duplicate')
+                continue
+            if new_status not in valid_statuses:
+                results[index] = RepairStatusService._result(repair_id, 'invalid', error=f'Statut invalide: {new_status}')
+                continue
+            wanted[repair_id] = (index, new_status)
+
+        now = timezone.now()
+        today = timezone.localdate()
+        changed, events, deliveries = [], [], []
+        with transaction.atomic():
+            repairs = Repair.objects.select_for_update().filter(pk__in=list(wanted)).only(
+                'id', 'status', 'client_id', 'final_cost', 'created_at', 'actual_completion', 'updated_at'
+            )
+            found = {repair.pk: repair for repair in repairs}
+            for repair_id, (index, new_status) in wanted.items():
+                repair = found.get(repair_id)
+                if repair is None:
+                    results[index] = RepairStatusService._result(repair_id, 'not_found')
+                    continue
+                old_status = repair.status
+                if old_status == new_status:
+                    results[index] = RepairStatusService._result(repair_id, 'unchanged', status=old_status)
+                    continue
+                if not RepairBusinessService.validate_repair_status_transition(old_status, new_status):
+                    results[index] = RepairStatusService._result(
+                        repair_id, 'invalid', status=old_status,
+                        error=f'Transition interdite: {old_status} → {new_status}'
+                    )
+                    continue
+
+                repair.status = new_status
+                repair.updated_at = now  # bulk_update ne renseigne pas auto_now
+                if new_status == 'delivered' and not repair.actual_completion:
+                    repair.actual_completion = today
+                changed.append(repair)
+                events.append(RepairTimeline(
+                    repair=repair, status=new_status, created_by=user,
+                    description=f"Statut : {valid_statuses[old_status]} → {valid_statuses[new_status]}",
+                ))
+                for counted, sign in ((old_status, -1), (new_status, 1)):
+                    if counted == 'delivered':
+                        deliveries.append((repair.client_id, 'repairs', repair.final_cost, repair.created_at, sign))
+                results[index] = RepairStatusService._result(
+                    repair_id, 'updated', previous_status=old_status, status=new_status
+                )
+
+            if changed:
+                Repair.objects.bulk_update(
+                    changed, ['status', 'updated_at', 'actual_completion'], batch_size=BATCH_SIZE
+                )
+                RepairTimeline.objects.bulk_create(events, batch_size=BATCH_SIZE)
+                # bulk_update n'émet pas de signal post_save
+                ClientAggregateService.apply(deliveries)
+                DashboardRollupService.mark_dirty(*{repair.created_at for repair in changed})
+
+        if changed:
+            RepairMetricsService.invalidate()
+
+        logger.info(f"Changement de statut groupé: {len(changed)} réparation(s) sur {len(moves)}")
+        return results
+
+
+class RepairCostService:
+
+    @staticmethod
+    def apply_item_delta(repair: Repair, delta) -> None:
+        """
+        Répercute la variation d'un article sur le coût final de la réparation
+        UPDATE ... SET final_cost = final_cost + delta : aucun article relu ;
+        update() n'émettant pas de signal, les agrégats du client (réparation
+        livrée), le cumul du jour de dépôt du dashboard et les indicateurs de
+        l'atelier sont mis à jour ici.
+        L'instance n'est pas modifiée : la relire pour obtenir le nouveau coût
+        """
+        delta = Decimal(str(delta or 0))
+        if not delta:
+            return
+        with transaction.atomic():
+            Repair.objects.filter(pk=repair.pk).update(
+                final_cost=F('final_cost') + delta, updated_at=timezone.now()
+            )
+            if repair.status == 'delivered':
+                # Retrait de l'ancien montant, ajout du nouveau : nombre de réparations inchangé
+                ClientAggregateService.apply([
+                    (repair.client_id, 'repairs', repair.final_cost, None, -1),
+                    (repair.client_id, 'repairs', repair.final_cost + delta, None, 1),
+                ])
+            DashboardRollupService.mark_dirty(repair.created_at)
+        RepairMetricsService.invalidate()
@@ -0,0 +1,11 @@
+from celery import shared_task
+from .kanban import RepairKanbanService
+
+
+@shared_task(name='repairs.purge_tombstones_daily')
+def purge_tombstones_daily():
+    """
+    Tâche planifiée (quotidienne) : purge des traces de réparations supprimées
+    au-delà de la fenêtre de synchronisation du Kanban
+    """
+    return {'deleted': RepairKanbanService.purge_tombstones()}
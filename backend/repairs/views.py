@@ -3,11 +3,20 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from django.conf import settings
-from django.http import JsonResponse
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, Substr
+from django.http import FileResponse, JsonResponse
 from django.core.files.base import ContentFile
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from .kanban import DEFAULT_LIMIT as KANBAN_DEFAULT_LIMIT, MAX_LIMIT as KANBAN_MAX_LIMIT, RepairKanbanService
+from .metrics import RepairMetricsService
+from .planning import RepairPlanningService
+from .printing import BATCH_MAX_REPAIRS, WorkOrderPrintService
+from .services import BULK_MAX_MOVES, RepairCostService, RepairStatusService
 from .models import Repair, RepairItem
-from .serializers import RepairSerializer, RepairCreateSerializer, RepairItemSerializer
+from .serializers import RepairSerializer, RepairCreateSerializer, RepairItemSerializer, RepairListSerializer
+from utils.pagination import HybridCursorPagination, ListCountMixin
 from .sms_service import sms_service
 from .email_service import email_service
 try:
@@ -21,6 +30,9 @@ from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 import io
 
+# Longueur de l'extrait de description renvoyé par la liste
+DESCRIPTION_EXCERPT_LENGTH = 100
+
 
 class RepairItemViewSet(viewsets.ModelViewSet):
     """ViewSet pour la gestion des articles de réparation"""
@@ -37,8 +49,22 @@ class RepairItemViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(repair_id=repair_id)
         return queryset
 
+    def perform_create(self, serializer):
+        item = serializer.save()
+        RepairCostService.apply_item_delta(item.repair, item.total_price)
+
+    def perform_update(self, serializer):
+        previous = serializer.instance.total_price
+        item = serializer.save()
+        RepairCostService.apply_item_delta(item.repair, item.total_price - previous)
 
-class RepairViewSet(viewsets.ModelViewSet):
+    def perform_destroy(self, instance):
+        repair, amount = instance.repair, instance.total_price
+        instance.delete()
+        RepairCostService.apply_item_delta(repair, -amount)
+
+
+class RepairViewSet(ListCountMixin, viewsets.ModelViewSet):
     """
     ViewSet pour gérer les réparations
     
@@ -55,6 +81,7 @@ class RepairViewSet(viewsets.ModelViewSet):
     """
     queryset = Repair.objects.select_related('client', 'assigned_to', 'created_by').prefetch_related('items')
     serializer_class = RepairSerializer
+    pagination_class = HybridCursorPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['status', 'store', 'client', 'priority']
     search_fields = [
@@ -68,10 +95,38 @@ class RepairViewSet(viewsets.ModelViewSet):
     ordering_fields = ['created_at', 'estimated_completion', 'actual_completion', 'priority']
     ordering = ['-created_at']
     
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        
+        if self.action == 'list':
+            # Liste résumée : nombre constant de requêtes quelle que soit la taille de page
+            money = DecimalField(max_digits=10, decimal_places=2)
+            zero = Value(0, output_field=money)
+            labor = Q(items__item_type='labor')
+            return queryset.select_related('client', 'assigned_to').prefetch_related(None).defer(
+                'description', 'diagnosis', 'notes'
+            ).annotate(
+                description_excerpt=Substr('description', 1, DESCRIPTION_EXCERPT_LENGTH),
+                items_count=Count('items'),
+                parts_total=Coalesce(Sum('items__total_price', filter=~labor), zero),
+                labor_total=ExpressionWrapper(
+                    Coalesce(Sum('items__total_price', filter=labor), zero) + F('labor_hours') * F('labor_rate'),
+                    output_field=money,
+                ),
+            ).order_by('-created_at', '-id')  # Meta.ordering est ignoré avec GROUP BY
+        
+        if self.action == 'add_item':
+            # Seul le nouvel article est enregistré : inutile de précharger les autres
+            return queryset.prefetch_related(None)
+        
+        return queryset
+    
     def get_serializer_class(self):
         """Retourne le serializer approprié selon l'action"""
         if self.action in ['create', 'update', 'partial_update']:
             return RepairCreateSerializer
+        if self.action == 'list':
+            return RepairListSerializer
         return RepairSerializer
     
     def create(self, request, *args, **kwargs):
@@ -166,6 +221,32 @@ class RepairViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(repair)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['post'])
+    def bulk_update_status(self, request):
+        """
+        Changer le statut de plusieurs réparations en une requête (Kanban)
+        Corps : {"moves": [{"id": 1, "status": "in_progress"}, ...]}
+        ou {"ids": [1, 2], "status": "delivered"}
+        """
+        moves = request.data.get('moves')
+        if moves is None and isinstance(request.data.get('ids'), list):
+            moves = [{'id': repair_id, 'status': request.data.get('status')} for repair_id in request.data['ids']]
+        
+        if not isinstance(moves, list) or not moves:
+            return Response({'error': 'Aucun changement de statut'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(moves) > BULK_MAX_MOVES:
+            return Response(
+                {'error': f'Lot trop volumineux (maximum {BULK_MAX_MOVES} réparations)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        results = RepairStatusService.bulk_transition(moves, request.user)
+        
+        summary = {}
+        for result in results:
+            summary[result['result']] = summary.get(result['result'], 0) + 1
+        return Response({'summary': summary, 'results': results})
+    
     @action(detail=True, methods=['post'])
     def add_item(self, request, pk=None):
         """Ajouter un article/intervention à une réparation"""
@@ -173,12 +254,10 @@ class RepairViewSet(viewsets.ModelViewSet):
         serializer = RepairItemSerializer(data=request.data)
         
         if serializer.is_valid():
-            serializer.save(repair=repair)
+            item = serializer.save(repair=repair)
             
-            # Recalculer le coût final
-            total = sum(item.total_price for item in repair.items.all())
-            repair.final_cost = total
-            repair.save()
+            # Coût final augmenté du montant de l'article (sans relire les autres)
+            RepairCostService.apply_item_delta(repair, item.total_price)
             
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         
@@ -270,168 +349,100 @@ class RepairViewSet(viewsets.ModelViewSet):
         """
         repair = self.get_object()
 
-        # Création d'un PDF en mémoire
+        # Création d'un PDF en mémoire (même mise en page que l'impression groupée)
         buffer = io.BytesIO()
-        p = canvas.Canvas(buffer, pagesize=A4)
-        
-        # Marges et positions
-        x_left = 50
-        y_start = 800
-        y = y_start
-        
-        # En-tête
-        p.setFont("Helvetica-Bold", 16)
-        p.drawString(x_left, y, f"Bon de réparation n°{repair.reference_number}")
-        y -= 30
-        
-        # Informations générales
-        p.setFont("Helvetica-Bold", 12)
-        p.drawString(x_left, y, "Informations générales")
-        y -= 20
-        
-        p.setFont("Helvetica", 10)
-        p.drawString(x_left, y, f"Client : {repair.client.first_name} {repair.client.last_name}")
-        y -= 15
-        p.drawString(x_left, y, f"Email : {repair.client.email}")
-        y -= 15
-        if hasattr(repair.client, 'phone') and repair.client.phone:
-            p.drawString(x_left, y, f"Téléphone : {repair.client.phone}")
-            y -= 15
-        p.drawString(x_left, y, f"Magasin : {repair.get_store_display()}")
-        y -= 15
-        p.drawString(x_left, y, f"Date de dépôt : {repair.created_at.strftime('%d/%m/%Y à %H:%M')}")
-        y -= 15
-        p.drawString(x_left, y, f"Statut : {repair.get_status_display()}")
-        y -= 15
-        p.drawString(x_left, y, f"Priorité : {repair.get_priority_display()}")
-        y -= 30
-        
-        # Informations vélo
-        p.setFont("Helvetica-Bold", 12)
-        p.drawString(x_left, y, "Vélo")
-        y -= 20
-        
-        p.setFont("Helvetica", 10)
-        p.drawString(x_left, y, f"Produit déposé : {repair.bike_brand}")
-        y -= 15
-        
-        if repair.bike_model:
-            p.drawString(x_left, y, f"Modèle : {repair.bike_model}")
-            y -= 15
-        
-        if repair.bike_serial_number:
-            p.drawString(x_left, y, f"N° de série : {repair.bike_serial_number}")
-            y -= 15
-        
-        y -= 15
-        
-        # Description
-        p.setFont("Helvetica-Bold", 12)
-        p.drawString(x_left, y, "Description du problème")
-        y -= 20
-        
-        p.setFont("Helvetica", 10)
-        # Gérer les descriptions longues
-        description_lines = repair.description.split('\n')
-        for line in description_lines:
-            # Couper les lignes trop longues
-            if len(line) > 80:
-                words = line.split(' ')
-                current_line = ''
-                for word in words:
-                    if len(current_line + word) < 80:
-                        current_line += word + ' '
-                    else:
-                        p.drawString(x_left + 10, y, current_line)
-                        y -= 15
-                        current_line = word + ' '
-                if current_line:
-                    p.drawString(x_left + 10, y, current_line)
-                    y -= 15
-            else:
-                p.drawString(x_left + 10, y, line)
-                y -= 15
-        
-        y -= 15
-        
-        # Diagnostic si présent
-        if repair.diagnosis:
-            p.setFont("Helvetica-Bold", 12)
-            p.drawString(x_left, y, "Diagnostic")
-            y -= 20
-            
-            p.setFont("Helvetica", 10)
-            diagnosis_lines = repair.diagnosis.split('\n')
-            for line in diagnosis_lines[:5]:  # Limiter à 5 lignes
-                p.drawString(x_left + 10, y, line[:80])
-                y -= 15
-            y -= 15
-        
-        # Pièces nécessaires (via les items)
-        if repair.items.exists():
-            p.setFont("Helvetica-Bold", 12)
-            p.drawString(x_left, y, "Pièces et interventions")
-            y -= 20
-            
-            p.setFont("Helvetica", 10)
-            for item in repair.items.all():
-                p.drawString(x_left + 10, y, f"• {item.description}")
-                y -= 15
-                p.drawString(x_left + 20, y, f"Qté : {item.quantity} - Prix unitaire : {item.unit_price}€ - Total : {item.total_price}€")
-                y -= 20
-        y -= 15
-        
-        # Coûts
-        p.setFont("Helvetica-Bold", 12)
-        p.drawString(x_left, y, "Coûts")
-        y -= 20
-        
-        p.setFont("Helvetica", 10)
-        if repair.max_budget:
-            p.drawString(x_left, y, f"Budget maximum : {repair.max_budget}€")
-            y -= 15
-        
-        p.drawString(x_left, y, f"Coût estimé : {repair.estimated_cost}€")
-        y -= 15
-        
-        if repair.final_cost > 0:
-            p.setFont("Helvetica-Bold", 10)
-            p.drawString(x_left, y, f"Coût final : {repair.final_cost}€")
-            y -= 15
-        
-        if repair.deposit_paid > 0:
-            p.drawString(x_left, y, f"Acompte versé : {repair.deposit_paid}€")
-            y -= 15
-        
-        # Dates
-        y -= 15
-        p.setFont("Helvetica-Bold", 12)
-        p.drawString(x_left, y, "Dates")
-        y -= 20
-        
-        p.setFont("Helvetica", 10)
-        if repair.estimated_completion:
-            p.drawString(x_left, y, f"Livraison estimée : {repair.estimated_completion.strftime('%d/%m/%Y')}")
-            y -= 15
-        
-        if repair.actual_completion:
-            p.drawString(x_left, y, f"Livraison réelle : {repair.actual_completion.strftime('%d/%m/%Y')}")
-            y -= 15
-        
-        # Signature
-        y -= 30
-        p.setFont("Helvetica", 10)
-        p.drawString(x_left, y, "Signature du client :")
-        p.line(x_left + 120, y - 5, x_left + 300, y - 5)
-
-        p.showPage()
-        p.save()
+        WorkOrderPrintService.render([repair], buffer)
 
         buffer.seek(0)
         response = HttpResponse(buffer, content_type='application/pdf')
         response['Content-Disposition'] = f'attachment; filename="reparation_{repair.reference_number}.pdf"'
         return response
     
+    def _planning_params(self, request):
+        """(magasins, premier jour) du planning, ou (None, message d'erreur)"""
+        store = request.query_params.get('store') or request.data.get('store') or None
+        if store and store not in dict(Repair.STORE_CHOICES):
+            return None, 'Magasin invalide'
+        start = request.query_params.get('start')
+        try:
+            start = parse_date(start) if start else timezone.localdate()
+        except ValueError:
+            start = None
+        if start is None:
+            return None, 'start invalide (AAAA-MM-JJ attendu)'
+        stores = [store] if store else [value for value, _ in Repair.STORE_CHOICES]
+        return (stores, start), None
+    
+    @action(detail=False, methods=['get'])
+    def planning(self, request):
+        """
+        Planning de l'atelier sur 7 jours, par magasin et par mécanicien
+        ?store=   magasin (défaut : tous)
+        ?start=   premier jour AAAA-MM-JJ (défaut : aujourd'hui)
+        """
+        params, error = self._planning_params(request)
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+        stores, start = params
+        
+        plans = []
+        for store in stores:
+            plan, incremental = RepairPlanningService.get_plan(store, start)
+            plans.append({**plan.as_dict(), 'incremental': incremental})
+        return Response({'stores': plans})
+    
+    @action(detail=False, methods=['post'])
+    def auto_assign(self, request):
+        """Attribue un mécanicien aux réparations ouvertes qui n'en ont pas, selon le planning"""
+        params, error = self._planning_params(request)
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+        stores, start = params
+        
+        assigned = {store: RepairPlanningService.auto_assign(store, start) for store in stores}
+        return Response({'assigned': assigned, 'total': sum(assigned.values())})
+    
+    @action(detail=False, methods=['get'])
+    def print_batch(self, request):
+        """
+        Bons de réparation des dépôts d'une journée dans un seul PDF (un bon par page)
+        ?date=     jour de dépôt AAAA-MM-JJ (défaut : aujourd'hui)
+        ?store=    filtre par magasin
+        ?status=   statut(s) séparés par des virgules
+        """
+        day = request.query_params.get('date')
+        try:
+            day = parse_date(day) if day else timezone.localdate()
+        except ValueError:
+            day = None
+        if day is None:
+            return Response({'error': 'date invalide (AAAA-MM-JJ attendu)'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        store = request.query_params.get('store') or None
+        if store and store not in dict(Repair.STORE_CHOICES):
+            return Response({'error': 'Magasin invalide'}, status=status.HTTP_400_BAD_REQUEST)
+        statuses = [value for value in request.query_params.get('status', '').split(',') if value]
+        invalid = set(statuses) - set(dict(Repair.STATUS_CHOICES))
+        if invalid:
+            return Response({'error': f"Statut invalide: {', '.join(sorted(invalid))}"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Un bon de plus pour détecter le dépassement sans requête de comptage
+        repairs = list(WorkOrderPrintService.get_repairs(day, store, statuses)[:BATCH_MAX_REPAIRS + 1])
+        if not repairs:
+            return Response({'error': 'Aucune réparation à imprimer'}, status=status.HTTP_404_NOT_FOUND)
+        if len(repairs) > BATCH_MAX_REPAIRS:
+            return Response(
+                {'error': f'Plus de {BATCH_MAX_REPAIRS} réparations : préciser le magasin ou le statut'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return FileResponse(
+            WorkOrderPrintService.render_spooled(repairs),
+            content_type='application/pdf',
+            as_attachment=True,
+            filename=WorkOrderPrintService.batch_name(day, store)
+        )
+    
     @action(detail=True, methods=['get'])
     def print_quote(self, request, pk=None):
         """Générer un devis PDF pour la réparation"""
@@ -702,57 +713,23 @@ class RepairViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def dashboard(self, request):
-        """Dashboard des réparations avec statistiques avancées"""
-        from django.db.models import Count, Sum, Q, F
-        from django.utils import timezone
-        from datetime import timedelta, date
-        
-        # Périodes
-        today = timezone.now().date()
-        thirty_days_ago = today - timedelta(days=30)
-        seven_days_ago = today - timedelta(days=7)
-        
-        # Statistiques de base
-        total_repairs = Repair.objects.count()
-        pending_repairs = Repair.objects.filter(status='pending').count()
-        in_progress_repairs = Repair.objects.filter(status='in_progress').count()
-        completed_repairs = Repair.objects.filter(status='completed').count()
-        delivered_repairs = Repair.objects.filter(status='delivered').count()
-        
-        # Réparations récentes
-        recent_repairs = Repair.objects.filter(
-            created_at__gte=seven_days_ago
-        ).count()
-        
-        # Réparations en retard
-        overdue_repairs = Repair.objects.filter(
-            estimated_completion__lt=today,
-            status__in=['pending', 'in_progress']
-        ).count()
-        
-        # Revenus
-        total_revenue = Repair.objects.filter(
-            status='delivered'
-        ).aggregate(total=Sum('final_cost'))['total'] or 0
-        
-        monthly_revenue = Repair.objects.filter(
-            status='delivered',
-            actual_completion__gte=thirty_days_ago
-        ).aggregate(total=Sum('final_cost'))['total'] or 0
-        
-        # Réparations par magasin
-        store_stats = Repair.objects.values('store').annotate(
-            count=Count('id'),
-            revenue=Sum('final_cost', filter=Q(status='delivered'))
-        ).order_by('-count')
-        
-        # Réparations par priorité
-        priority_stats = Repair.objects.values('priority').annotate(
-            count=Count('id')
-        ).order_by('-count')
+        """Dashboard des réparations avec statistiques avancées (?store= optionnel)"""
+        today = timezone.localdate()
+        store = request.query_params.get('store') or None
+        if store and store not in dict(Repair.STORE_CHOICES):
+            return Response({'error': 'Magasin invalide'}, status=status.HTTP_400_BAD_REQUEST)
+        metrics = RepairMetricsService.get(store)
+        
+        # Réparations par magasin et par priorité (compteurs du service)
+        store_stats = sorted((row for row in metrics['by_store'] if row['count']), key=lambda row: -row['count'])
+        priority_stats = sorted(
+            ({'priority': priority, 'count': count} for priority, count in metrics['by_priority'].items() if count),
+            key=lambda row: -row['count']
+        )
+        repairs = Repair.objects.filter(store=store) if store else Repair.objects.all()
         
         # Dernières réparations
-        latest_repairs = Repair.objects.select_related('client').order_by('-created_at')[:5]
+        latest_repairs = repairs.select_related('client').order_by('-created_at')[:5]
         latest_data = []
         for repair in latest_repairs:
             latest_data.append({
@@ -766,7 +743,7 @@ class RepairViewSet(viewsets.ModelViewSet):
             })
         
         # Réparations urgentes
-        urgent_repairs = Repair.objects.filter(
+        urgent_repairs = repairs.filter(
             priority='urgent',
             status__in=['pending', 'in_progress']
         ).select_related('client').order_by('created_at')[:5]
@@ -784,101 +761,47 @@ class RepairViewSet(viewsets.ModelViewSet):
         
         return Response({
             'overview': {
-                'total_repairs': total_repairs,
-                'pending': pending_repairs,
-                'in_progress': in_progress_repairs,
-                'completed': completed_repairs,
-                'delivered': delivered_repairs,
-                'recent': recent_repairs,
-                'overdue': overdue_repairs
+                'total_repairs': metrics['total'],
+                'pending': metrics['by_status']['pending'],
+                'in_progress': metrics['by_status']['in_progress'],
+                'completed': metrics['by_status']['completed'],
+                'delivered': metrics['by_status']['delivered'],
+                'recent': metrics['recent'],
+                'overdue': metrics['overdue']
             },
             'revenue': {
-                'total': float(total_revenue),
-                'monthly': float(monthly_revenue)
+                'total': metrics['revenue']['total'],
+                'monthly': metrics['revenue']['last_30_days']
             },
-            'store_stats': list(store_stats),
-            'priority_stats': list(priority_stats),
+            'store_stats': store_stats,
+            'priority_stats': priority_stats,
             'latest_repairs': latest_data,
             'urgent_repairs': urgent_data
         })
     
     @action(detail=False, methods=['get'])
     def statistics(self, request):
-        """Statistiques des réparations"""
-        from django.db.models import Count, Sum, Avg, Q, F
-        from django.utils import timezone
-        from datetime import timedelta
-        
-        # Statistiques par statut
-        status_stats = Repair.objects.values('status').annotate(
-            count=Count('id')
-        )
-        
-        # Statistiques par priorité
-        priority_stats = Repair.objects.values('priority').annotate(
-            count=Count('id')
-        )
-        
-        # Statistiques par magasin
-        store_stats = Repair.objects.values('store').annotate(
-            count=Count('id')
-        )
+        """Statistiques des réparations (une requête agrégée, en cache ; ?store= optionnel)"""
+        store = request.query_params.get('store') or None
+        if store and store not in dict(Repair.STORE_CHOICES):
+            return Response({'error': 'Magasin invalide'}, status=status.HTTP_400_BAD_REQUEST)
+        metrics = RepairMetricsService.get(store)
         
-        # Statistiques mensuelles
-        thirty_days_ago = timezone.now().date() - timedelta(days=30)
-        monthly_repairs = Repair.objects.filter(
-            created_at__gte=thirty_days_ago
-        ).count()
-        
-        # Réparations en cours
-        in_progress_count = Repair.objects.filter(
-            status__in=['pending', 'in_progress', 'waiting_parts']
-        ).count()
-        
-        # Revenus des réparations terminées
-        total_revenue = Repair.objects.filter(
-            status='delivered'
-        ).aggregate(total=Sum('final_cost'))['total'] or 0
-        
-        # Revenus du mois
-        monthly_revenue = Repair.objects.filter(
-            status='delivered',
-            actual_completion__gte=thirty_days_ago
-        ).aggregate(total=Sum('final_cost'))['total'] or 0
-        
-        # Durée moyenne de réparation
-        completed_repairs = Repair.objects.filter(
-            status='delivered',
-            actual_completion__isnull=False
-        )
-        
-        avg_duration = 0
-        if completed_repairs.exists():
-            durations = []
-            for r in completed_repairs:
-                if r.created_at and r.actual_completion:
-                    duration = (r.actual_completion - r.created_at.date()).days
-                    durations.append(duration)
-            
-            if durations:
-                avg_duration = sum(durations) / len(durations)
-        
-        # Réparations avec dépassement de budget
-        budget_exceeded = Repair.objects.filter(
-            max_budget__isnull=False,
-            estimated_cost__gt=F('max_budget')
-        ).count()
+        def distribution(field, counts):
+            return [{field: value, 'count': count} for value, count in counts.items() if count]
         
         return Response({
-            'status_distribution': list(status_stats),
-            'priority_distribution': list(priority_stats),
-            'store_distribution': list(store_stats),
-            'monthly_repairs': monthly_repairs,
-            'in_progress_count': in_progress_count,
-            'total_revenue': float(total_revenue),
-            'monthly_revenue': float(monthly_revenue),
-            'average_duration_days': round(avg_duration, 1),
-            'budget_exceeded_count': budget_exceeded
+            'status_distribution': distribution('status', metrics['by_status']),
+            'priority_distribution': distribution('priority', metrics['by_priority']),
+            'store_distribution': [
+                {'store': row['store'], 'count': row['count']} for row in metrics['by_store'] if row['count']
+            ],
+            'monthly_repairs': metrics['created_last_30_days'],
+            'in_progress_count': metrics['open'],
+            'total_revenue': metrics['revenue']['total'],
+            'monthly_revenue': metrics['revenue']['last_30_days'],
+            'average_duration_days': metrics['average_duration_days'],
+            'budget_exceeded_count': metrics['budget_exceeded']
         })
     
     @action(detail=False, methods=['get'])
@@ -888,80 +811,36 @@ class RepairViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def kanban(self, request):
-        """Données pour le tableau Kanban des réparations - CORRIGÉ pour cohérence avec models.py"""
-        from django.db.models import Count, Q
-        
-        # Debug: Log that endpoint is being called
-        print("Kanban endpoint called - DEBUG")
-        
-        # Définir les colonnes Kanban - ALIGNÉES avec les vrais statuts du modèle
-        kanban_columns = {
-            'pending': {
-                'title': 'Réception vélo',
-                'status': ['pending'],
-                'color': '#FFA500'
-            },
-            'in_progress': {
-                'title': 'En réparation',
-                'status': ['in_progress'],
-                'color': '#4CAF50'
-            },
-            'completed': {
-                'title': 'Réparé - SMS envoyé',
-                'status': ['completed'],
-                'color': '#2196F3'
-            },
-            'delivered': {
-                'title': 'Vélo récupéré',
-                'status': ['delivered'],
-                'color': '#9C27B0'
-            }
-        }
-        
-        kanban_data = []
-        
-        for column_id, column_info in kanban_columns.items():
-            repairs = Repair.objects.filter(
-                status__in=column_info['status']
-            ).select_related('client', 'assigned_to').order_by('-priority', 'created_at')
-            
-            column_repairs = []
-            for repair in repairs:
-                repair_data = {
-                    'id': repair.id,
-                    'reference_number': repair.reference_number,
-                    'client': {
-                        'id': repair.client.id,
-                        'first_name': repair.client.first_name,
-                        'last_name': repair.client.last_name,
-                        'phone': repair.client.phone,
-                        'email': repair.client.email
-                    },
-                    'bike_brand': repair.bike_brand,
-                    'bike_model': repair.bike_model,
-                    'description': repair.description[:100] + '...' if len(repair.description) > 100 else repair.description,
-                    'status': repair.status,
-                    'priority': repair.priority,
-                    'created_at': repair.created_at.isoformat(),
-                    'estimated_cost': float(repair.estimated_cost),
-                    'final_cost': float(repair.final_cost),
-                    'photo_1': repair.photo_1.url if repair.photo_1 else None,
-                    'store': repair.store
-                }
-                column_repairs.append(repair_data)
-            
-            kanban_data.append({
-                'id': column_id,
-                'title': column_info['title'],
-                'color': column_info['color'],
-                'repairs': column_repairs
-            })
+        """
+        Données pour le tableau Kanban des réparations
+        ?store=   filtre par magasin
+        ?limit=   nombre de cartes par colonne (défaut 50, max 200)
+        ?since=   seulement les cartes modifiées et supprimées depuis (valeur next_since)
+        """
+        store = request.query_params.get('store') or None
+        if store and store not in dict(Repair.STORE_CHOICES):
+            return Response({'error': 'Magasin invalide'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.query_params.get('limit', KANBAN_DEFAULT_LIMIT))
+            if not 1 <= limit <= KANBAN_MAX_LIMIT:
+                raise ValueError
+        except ValueError:
+            return Response(
+                {'error': f'limit doit être un entier entre 1 et {KANBAN_MAX_LIMIT}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        return Response({
-            'columns': kanban_data,
-            'summary': {
-                'total_repairs': Repair.objects.count(),
-                'in_progress': Repair.objects.filter(status__in=['pending', 'in_progress', 'waiting_parts']).count(),
-                'completed': Repair.objects.filter(status='delivered').count()
-            }
-        })
+        since = request.query_params.get('since')
+        if not since:
+            return Response(RepairKanbanService.board(store, limit))
+        
+        # « + » du fuseau décodé en espace dans une URL non encodée
+        try:
+            since = parse_datetime(since.replace(' ', '+'))
+        except ValueError:
+            since = None
+        if since is None:
+            return Response({'error': 'since invalide (date ISO 8601 attendue)'}, status=status.HTTP_400_BAD_REQUEST)
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        return Response(RepairKanbanService.changes(since, store, limit))
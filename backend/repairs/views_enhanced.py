@@ -8,6 +8,7 @@ from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Q, Count, Sum, Avg, F
 from django.utils import timezone
 from datetime import timedelta, date
+from .metrics import RepairMetricsService
 from .models import Repair, RepairItem, RepairTimeline, RepairDocument, WorkshopWorkload
 from .serializers_enhanced import (
     RepairSerializer, RepairCreateSerializer, RepairStatusUpdateSerializer,
@@ -312,50 +313,24 @@ class RepairViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def statistics(self, request):
         """Statistiques détaillées de l'atelier"""
-        # Périodes
-        today = timezone.now().date()
-        thirty_days_ago = today - timedelta(days=30)
-        start_of_month = today.replace(day=1)
+        store = request.query_params.get('store') or None
+        if store and store not in dict(Repair.STORE_CHOICES):
+            return Response({'error': 'Magasin invalide'}, status=status.HTTP_400_BAD_REQUEST)
+        metrics = RepairMetricsService.get(store)
         
-        # Statistiques générales
+        # Compteurs, revenus et durée moyenne : une requête agrégée (en cache)
         stats = {
-            'total_repairs': Repair.objects.count(),
-            'pending_repairs': Repair.objects.filter(status='pending').count(),
-            'in_progress_repairs': Repair.objects.filter(
-                status__in=['diagnosis', 'waiting_parts', 'in_progress', 'testing']
-            ).count(),
-            'completed_repairs': Repair.objects.filter(status='completed').count(),
-            'delivered_repairs': Repair.objects.filter(status='delivered').count(),
-            'overdue_repairs': Repair.objects.filter(
-                estimated_completion__lt=today,
-                status__in=['pending', 'diagnosis', 'waiting_parts', 'in_progress', 'testing']
-            ).count(),
+            'total_repairs': metrics['total'],
+            'pending_repairs': metrics['by_status']['pending'],
+            'in_progress_repairs': metrics['by_status']['in_progress'],
+            'completed_repairs': metrics['by_status']['completed'],
+            'delivered_repairs': metrics['by_status']['delivered'],
+            'overdue_repairs': metrics['overdue'],
+            'average_duration': metrics['average_duration_days'],
+            'total_revenue': metrics['revenue']['total'],
+            'monthly_revenue': metrics['revenue']['month'],
         }
         
-        # Durée moyenne
-        completed_repairs = Repair.objects.filter(
-            status='delivered',
-            actual_completion__isnull=False
-        )
-        if completed_repairs.exists():
-            durations = []
-            for repair in completed_repairs:
-                duration = (repair.actual_completion - repair.created_at.date()).days
-                durations.append(duration)
-            stats['average_duration'] = sum(durations) / len(durations)
-        else:
-            stats['average_duration'] = 0
-        
-        # Revenus
-        stats['total_revenue'] = Repair.objects.filter(
-            status='delivered'
-        ).aggregate(total=Sum('final_cost'))['total'] or 0
-        
-        stats['monthly_revenue'] = Repair.objects.filter(
-            status='delivered',
-            actual_completion__gte=start_of_month
-        ).aggregate(total=Sum('final_cost'))['total'] or 0
-        
         # Charge de travail par mécanicien
         workload = Repair.objects.filter(
             status__in=['pending', 'diagnosis', 'waiting_parts', 'in_progress', 'testing']
@@ -366,19 +341,13 @@ class RepairViewSet(viewsets.ModelViewSet):
         
         stats['workload_by_mechanic'] = list(workload)
         
-        # Réparations par type
-        repairs_by_type = Repair.objects.values('repair_type').annotate(
-            count=Count('id')
-        ).order_by('-count')
-        
-        stats['repairs_by_type'] = list(repairs_by_type)
-        
-        # Réparations par priorité
-        repairs_by_priority = Repair.objects.values('priority').annotate(
-            count=Count('id')
-        ).order_by('-priority')
-        
-        stats['repairs_by_priority'] = list(repairs_by_priority)
+        stats['repairs_by_type'] = sorted(
+            ({'repair_type': value, 'count': count} for value, count in metrics['by_type'].items() if count),
+            key=lambda row: -row['count']
+        )
+        stats['repairs_by_priority'] = [
+            {'priority': value, 'count': count} for value, count in metrics['by_priority'].items() if count
+        ]
         
         return Response(stats)
     
@@ -69,3 +69,24 @@ class SystemSetting(models.Model):
 
     def __str__(self):
         return f"{self.key}: {self.value}"
+
+class DocumentSequence(models.Model):
+    """
+    Compteur de numérotation des documents (commandes, factures, devis, ...)
+    Une ligne par (type de document, magasin, jour) incrémentée atomiquement
+    """
+    doc_type = models.CharField(max_length=30)
+    store = models.CharField(max_length=20, blank=True, default='')
+    day = models.DateField()
+    last_value = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'document_sequences'
+        verbose_name = 'Séquence de numérotation'
+        verbose_name_plural = 'Séquences de numérotation'
+        constraints = [
+            models.UniqueConstraint(fields=['doc_type', 'store', 'day'], name='unique_document_sequence'),
+        ]
+
+    def __str__(self):
+        return f"{self.doc_type} {self.store or '-'} {self.day}: {self.last_value}"
@@ -0,0 +1,88 @@
+"""
+Allocation des numéros de documents sans collision
+Chaque numéro est obtenu par un seul UPDATE ... RETURNING sur le compteur
+(type de document, magasin, jour) : pas de balayage ORDER BY ... DESC, pas de
+doublon sous concurrence, et pas de trou puisque le compteur est annulé avec
+la transaction du document
+"""
+from django.db import connection, transaction
+from django.utils import timezone
+from typing import Callable, Optional
+from .models import DocumentSequence
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Code magasin utilisé dans les numéros
+STORE_CODES = {
+    'ville_avray': 'A',
+    'garches': 'G',
+}
+
+
+def store_code(store: str) -> str:
+    return STORE_CODES.get(store, 'G')
+
+
+class SequenceService:
+
+    @staticmethod
+    def _increment(doc_type: str, store: str, day, count: int) -> Optional[int]:
+        """Incrémente le compteur et retourne la nouvelle valeur (None si absent)"""
+        table = connection.ops.quote_name(DocumentSequence._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} SET last_value = last_value + %s "
+                f"WHERE doc_type = %s AND store = %s AND day = %s "
+                f"RETURNING last_value",
+                [count, doc_type, store, day]
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def allocate_block(doc_type: str, count: int, store: str = '', day=None,
+                       seed: Optional[Callable[[], int]] = None) -> range:
+        """
+        Réserve `count` numéros consécutifs et retourne leur plage
+        seed: appelé une seule fois, à la création du compteur, pour reprendre
+        après le dernier numéro déjà attribué par l'ancienne numérotation
+        """
+        if count < 1:
+            return range(0)
+
+        day = day or timezone.localdate()
+
+        value = SequenceService._increment(doc_type, store, day, count)
+        if value is None:
+            # Premier numéro de la journée : création du compteur (sans erreur si
+            # une autre transaction le crée au même moment)
+            with transaction.atomic():
+                initial = seed() if seed else 0
+                DocumentSequence.objects.bulk_create(
+                    [DocumentSequence(doc_type=doc_type, store=store, day=day, last_value=initial)],
+                    ignore_conflicts=True
+                )
+                value = SequenceService._increment(doc_type, store, day, count)
+            logger.info(f"Séquence {doc_type}/{store or '-'}/{day} initialisée à {initial}")
+
+        return range(value - count + 1, value + 1)
+
+    @staticmethod
+    def allocate(doc_type: str, store: str = '', day=None, seed: Optional[Callable[[], int]] = None) -> int:
+        """Réserve le prochain numéro"""
+        return SequenceService.allocate_block(doc_type, 1, store=store, day=day, seed=seed)[0]
+
+    @staticmethod
+    def last_number_with_prefix(queryset, field: str, prefix: str, parse: Callable[[str], int]) -> int:
+        """
+        Dernier numéro attribué avant la mise en place du compteur
+        (utilisé uniquement comme valeur initiale du compteur)
+        """
+        last = queryset.filter(**{f'{field}__startswith': prefix}).order_by(f'-{field}').values_list(field, flat=True).first()
+        if not last:
+            return 0
+        try:
+            return parse(last)
+        except (ValueError, IndexError):
+            return 0
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('suppliers', '0002_add_order_type_and_transfer_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storestockconfig',
+            name='forecast_demand',
+            field=models.FloatField(default=0.0, verbose_name='Demande prévue (4 semaines)'),
+        ),
+        migrations.AddField(
+            model_name='storestockconfig',
+            name='forecast_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -150,20 +150,20 @@ class PurchaseOrder(models.Model):
         BCG04112025-000001 pour Garches
         """
         from django.utils import timezone
-        today = timezone.now()
+        from settings_app.sequences import SequenceService
+        today = timezone.localdate()
         date_str = today.strftime('%d%m%Y')
         
         prefix = 'BCA' if self.store == 'ville_avray' else 'BCG'
         
-        last_po = PurchaseOrder.objects.filter(
-            purchase_order_number__startswith=f"{prefix}{date_str}"
-        ).order_by('-purchase_order_number').first()
-        
-        if last_po:
-            last_number = int(last_po.purchase_order_number.split('-')[1])
-            new_number = last_number + 1
-        else:
-            new_number = 1
+        # Compteur atomique, initialisé depuis les bons existants du jour
+        new_number = SequenceService.allocate(
+            'purchase_order', store=self.store, day=today,
+            seed=lambda: SequenceService.last_number_with_prefix(
+                PurchaseOrder.objects, 'purchase_order_number', f"{prefix}{date_str}",
+                lambda value: int(value.split('-')[1])
+            )
+        )
         
         return f"{prefix}{date_str}-{new_number:07d}"
 
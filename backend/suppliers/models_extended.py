@@ -26,6 +26,9 @@ class StoreStockConfig(models.Model):
     max_stock = models.PositiveIntegerField(default=20, verbose_name="Stock maximum")
     priority = models.PositiveIntegerField(default=1, verbose_name="Priorité (1 = plus prioritaire)")
     seasonal_factor = models.FloatField(default=1.0, verbose_name="Facteur saisonnier")
+    # Prévision (analytics.forecasting), mise à jour à chaque recalcul
+    forecast_demand = models.FloatField(default=0.0, verbose_name="Demande prévue (4 semaines)")
+    forecast_updated_at = models.DateTimeField(null=True, blank=True)
     is_active = models.BooleanField(default=True, verbose_name="Actif")
     
     # Métadonnées
@@ -112,13 +115,18 @@ class StockTransfer(models.Model):
     
     def generate_transfer_number(self):
         """Génère un numéro de transfert unique"""
-        from datetime import datetime
-        date_str = datetime.now().strftime('%Y%m')
-        # Compter les transferts du mois
-        count = StockTransfer.objects.filter(
-            transfer_number__startswith=f'TRF{date_str}'
-        ).count()
-        return f'TRF{date_str}{str(count + 1).zfill(3)}'
+        from settings_app.sequences import SequenceService
+        month = timezone.localdate().replace(day=1)
+        date_str = month.strftime('%Y%m')
+        prefix = f'TRF{date_str}'
+        # Numérotation mensuelle commune aux deux magasins
+        number = SequenceService.allocate(
+            'stock_transfer', day=month,
+            seed=lambda: SequenceService.last_number_with_prefix(
+                StockTransfer.objects, 'transfer_number', prefix, lambda value: int(value[len(prefix):])
+            )
+        )
+        return f'{prefix}{str(number).zfill(3)}'
     
     @property
     def is_pending_validation(self):
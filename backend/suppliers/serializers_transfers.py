@@ -17,9 +17,12 @@ class StoreStockConfigSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'product', 'product_name', 'product_reference', 'store',
             'min_stock', 'max_stock', 'priority', 'seasonal_factor', 'is_active',
+            'forecast_demand', 'forecast_updated_at',
             'created_at', 'updated_at', 'updated_by', 'updated_by_name'
         ]
-        read_only_fields = ['created_at', 'updated_at', 'updated_by', 'updated_by_name']
+        read_only_fields = [
+            'forecast_demand', 'forecast_updated_at', 'created_at', 'updated_at', 'updated_by', 'updated_by_name'
+        ]
 
 
 class StockTransferItemSerializer(serializers.ModelSerializer):
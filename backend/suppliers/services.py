@@ -5,10 +5,13 @@ from django.db import transaction, models
 from django.utils import timezone
 from decimal import Decimal
 from .models import PurchaseOrder, PurchaseOrderItem, Supplier
-from products.models import Product
+from utils.line_items import LineItemWriter, load_products
 from django.core.mail import send_mail
 from django.conf import settings
 
+
+PURCHASE_ORDER_ITEM_WRITER = LineItemWriter(PurchaseOrderItem, 'purchase_order', quantity_field='quantity_ordered')
+
 class PurchaseOrderService:
     
     @staticmethod
@@ -29,30 +32,44 @@ class PurchaseOrderService:
             status='draft'
         )
         
-        # Ajouter les articles
-        subtotal = Decimal('0')
-        for item_data in items_data:
-            product = Product.objects.get(id=item_data['product_id'])
-            quantity = Decimal(str(item_data['quantity']))
-            unit_price = Decimal(str(item_data['unit_price']))
-            
-            PurchaseOrderItem.objects.create(
-                purchase_order=order,
-                product=product,
-                quantity=quantity,
-                unit_price=unit_price,
-                total_price=quantity * unit_price
-            )
-            
-            subtotal += quantity * unit_price
+        # Ajouter les articles (produits chargés en une requête, lignes en un bulk_create)
+        lines = PurchaseOrderService.build_item_lines(items_data)
+        totals = PURCHASE_ORDER_ITEM_WRITER.write(order, lines)
         
         # Calculer les totaux
-        order.subtotal_ht = subtotal
-        order.total_ttc = subtotal + Decimal(str(shipping_cost))
+        order.subtotal_ht = totals['subtotal_ht']
+        order.total_ttc = totals['subtotal_ht'] + Decimal(str(shipping_cost))
         order.save()
         
         return order
     
+    @staticmethod
+    def build_item_lines(items_data):
+        """
+        Prépare les lignes d'un bon de commande à partir des données reçues
+        Les produits référencés sont chargés en une seule requête
+        """
+        products = load_products(
+            (item_data.get('product_id') or item_data.get('product') for item_data in items_data),
+            strict=False
+        )
+        
+        lines = []
+        for item_data in items_data:
+            product_id = item_data.get('product_id') or item_data.get('product')
+            product = products.get(int(product_id)) if product_id else None
+            
+            lines.append({
+                'product': product,
+                'product_reference': product.reference if product else item_data.get('product_reference', ''),
+                'product_name': product.name if product else item_data.get('product_name', ''),
+                'quantity_ordered': item_data.get('quantity_ordered', item_data.get('quantity', 1)),
+                'unit_price_ht': item_data.get('unit_price_ht', item_data.get('unit_price', 0)),
+                'tva_rate': item_data.get('tva_rate', 20),
+            })
+        
+        return lines
+    
     @staticmethod
     @transaction.atomic
     def receive_purchase_items(order_id, received_items_data, user=None):
@@ -141,67 +141,82 @@ class StockChecker:
     
     @staticmethod
     def generate_stock_report(products, store=None):
-        """Générer un rapport de stock détaillé"""
-        report = {
-            'total_products': len([p for p in products if p.is_active]),
-            'low_stock_products': 0,
-            'out_of_stock_products': 0,
-            'total_stock_value': 0,
-            'alerts': [],
-            'categories': {}
-        }
+        """
+        Générer un rapport de stock détaillé
+        Comptages et valeurs calculés en base ; seuls les produits en alerte
+        sont lus ligne par ligne
+        """
+        from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum, Value
+        from django.db.models.functions import Coalesce
         
-        for product in products:
-            if not product.is_active:
-                continue
-                
-            # Récupérer le stock selon le magasin
-            if store == 'ville_avray':
-                current_stock = product.stock_ville_avray
-            elif store == 'garches':
-                current_stock = product.stock_garches
+        # Stock selon le magasin
+        if store == 'ville_avray':
+            current_stock = F('stock_ville_avray')
+        elif store == 'garches':
+            current_stock = F('stock_garches')
+        else:
+            current_stock = F('stock_ville_avray') + F('stock_garches')
+        
+        products = products.filter(is_active=True).annotate(
+            current_stock=current_stock,
+            stock_value=ExpressionWrapper(
+                current_stock * Coalesce(F('price_ht'), Value(0)),
+                output_field=DecimalField(max_digits=14, decimal_places=2)
+            ),
+            category_name=Coalesce('category__name', Value('Non catégorisé')),
+        )
+        out_of_stock = Q(current_stock__lte=0)
+        low_stock = Q(current_stock__lte=F('alert_stock'))
+        
+        totals = products.aggregate(
+            total_products=Count('id'),
+            out_of_stock_products=Count('id', filter=out_of_stock),
+            low_stock_products=Count('id', filter=low_stock & ~out_of_stock),
+            total_stock_value=Sum('stock_value'),
+        )
+        categories = products.values('category_name').annotate(
+            count=Count('id'),
+            stock_value=Sum('stock_value'),
+            low_stock=Count('id', filter=low_stock),
+        ).order_by()
+        
+        alerts = []
+        for product in products.filter(low_stock).values(
+            'id', 'name', 'current_stock', 'alert_stock'
+        ).order_by('current_stock', 'name'):
+            if product['current_stock'] <= 0:
+                severity = 'critical'
+                message = f"RUPTURE: {product['name']} - {product['current_stock']} unités"
             else:
-                current_stock = product.stock_ville_avray + product.stock_garches
-            
-            # Calculer la valeur du stock
-            stock_value = current_stock * float(product.price_ht or 0)
-            report['total_stock_value'] += stock_value
-            
-            # Catégoriser
-            category = product.category.name if product.category else 'Non catégorisé'
-            if category not in report['categories']:
-                report['categories'][category] = {
-                    'count': 0,
-                    'stock_value': 0,
-                    'low_stock': 0
-                }
-            
-            report['categories'][category]['count'] += 1
-            report['categories'][category]['stock_value'] += stock_value
-            
-            # Vérifier les alertes
-            if current_stock <= 0:
-                report['out_of_stock_products'] += 1
-                report['categories'][category]['low_stock'] += 1
-                report['alerts'].append({
-                    'product': product,
-                    'current_stock': current_stock,
-                    'alert_stock': product.alert_stock,
-                    'severity': 'critical',
-                    'message': f"RUPTURE: {product.name} - {current_stock} unités"
-                })
-            elif current_stock <= product.alert_stock:
-                report['low_stock_products'] += 1
-                report['categories'][category]['low_stock'] += 1
-                report['alerts'].append({
-                    'product': product,
-                    'current_stock': current_stock,
-                    'alert_stock': product.alert_stock,
-                    'severity': 'warning',
-                    'message': f"STOCK FAIBLE: {product.name} - {current_stock} unités (alerte: {product.alert_stock})"
-                })
+                severity = 'warning'
+                message = (
+                    f"STOCK FAIBLE: {product['name']} - {product['current_stock']} unités "
+                    f"(alerte: {product['alert_stock']})"
+                )
+            alerts.append({
+                'product_id': product['id'],
+                'product_name': product['name'],
+                'current_stock': product['current_stock'],
+                'alert_stock': product['alert_stock'],
+                'severity': severity,
+                'message': message,
+            })
         
-        return report
+        return {
+            'total_products': totals['total_products'],
+            'low_stock_products': totals['low_stock_products'],
+            'out_of_stock_products': totals['out_of_stock_products'],
+            'total_stock_value': float(totals['total_stock_value'] or 0),
+            'alerts': alerts,
+            'categories': {
+                row['category_name']: {
+                    'count': row['count'],
+                    'stock_value': float(row['stock_value'] or 0),
+                    'low_stock': row['low_stock'],
+                }
+                for row in categories
+            }
+        }
 
 class PurchaseOrderValidator:
     """Validateur de commandes d'achat"""
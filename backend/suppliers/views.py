@@ -7,7 +7,7 @@ from django.utils import timezone
 from django.core.files.uploadedfile import InMemoryUploadedFile
 from .models import Supplier, PurchaseOrder, PurchaseOrderItem
 from .serializers import SupplierSerializer, PurchaseOrderSerializer, PurchaseOrderItemSerializer
-from .services import PurchaseOrderService
+from .services import PurchaseOrderService, PURCHASE_ORDER_ITEM_WRITER
 from .utils import DocumentParser, StockChecker, PurchaseOrderValidator
 from products.models import Product
 
@@ -83,38 +83,11 @@ class PurchaseOrderViewSet(viewsets.ModelViewSet):
                     status=request.data.get('status', 'draft')
                 )
                 
-                # Créer les items
-                subtotal_ht = 0
-                total_tva = 0
-                
-                for item_data in items_data:
-                    # Récupérer les informations du produit
-                    product = None
-                    product_name = item_data.get('product_name', '')
-                    product_reference = item_data.get('product_reference', '')
-                    
-                    if item_data.get('product'):
-                        try:
-                            product = Product.objects.get(id=item_data['product'])
-                            product_name = product.name
-                            product_reference = product.reference
-                        except Product.DoesNotExist:
-                            pass
-                    
-                    # Créer l'item
-                    item = PurchaseOrderItem.objects.create(
-                        purchase_order=purchase_order,
-                        product=product,
-                        product_reference=product_reference,
-                        product_name=product_name,
-                        quantity_ordered=item_data.get('quantity_ordered', item_data.get('quantity', 1)),
-                        unit_price_ht=item_data.get('unit_price_ht', item_data.get('unit_price', 0)),
-                        tva_rate=item_data.get('tva_rate', 20),
-                    )
-                    
-                    subtotal_ht += float(item.subtotal_ht)
-                    tva = float(item.subtotal_ht) * float(item.tva_rate) / 100
-                    total_tva += tva
+                # Créer les items (produits chargés en une requête, lignes en un bulk_create)
+                lines = PurchaseOrderService.build_item_lines(items_data)
+                totals = PURCHASE_ORDER_ITEM_WRITER.write(purchase_order, lines)
+                subtotal_ht = float(totals['subtotal_ht'])
+                total_tva = float(totals['total_tva'])
                 
                 # Ajouter les frais de port au total HT
                 shipping_cost = float(request.data.get('shipping_cost', 0))
@@ -153,36 +126,11 @@ class PurchaseOrderViewSet(viewsets.ModelViewSet):
                     # Supprimer les anciens items
                     instance.items.all().delete()
                     
-                    # Créer les nouveaux items
-                    subtotal_ht = 0
-                    total_tva = 0
-                    
-                    for item_data in items_data:
-                        product = None
-                        product_name = item_data.get('product_name', '')
-                        product_reference = item_data.get('product_reference', '')
-                        
-                        if item_data.get('product'):
-                            try:
-                                product = Product.objects.get(id=item_data['product'])
-                                product_name = product.name
-                                product_reference = product.reference
-                            except Product.DoesNotExist:
-                                pass
-                        
-                        item = PurchaseOrderItem.objects.create(
-                            purchase_order=instance,
-                            product=product,
-                            product_reference=product_reference,
-                            product_name=product_name,
-                            quantity_ordered=item_data.get('quantity_ordered', item_data.get('quantity', 1)),
-                            unit_price_ht=item_data.get('unit_price_ht', item_data.get('unit_price', 0)),
-                            tva_rate=item_data.get('tva_rate', 20),
-                        )
-                        
-                        subtotal_ht += float(item.subtotal_ht)
-                        tva = float(item.subtotal_ht) * float(item.tva_rate) / 100
-                        total_tva += tva
+                    # Créer les nouveaux items en un seul bulk_create
+                    lines = PurchaseOrderService.build_item_lines(items_data)
+                    totals = PURCHASE_ORDER_ITEM_WRITER.write(instance, lines)
+                    subtotal_ht = float(totals['subtotal_ht'])
+                    total_tva = float(totals['total_tva'])
                     
                     # Ajouter les frais de port
                     shipping_cost = float(request.data.get('shipping_cost', 0))
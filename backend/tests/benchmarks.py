@@ -0,0 +1,19 @@
+"""
+Benchmarks des tests, désactivés par défaut
+Les mesures de temps dépendent de la machine : elles ne sont affichées
+(report) et vérifiées (tests marqués @benchmark) que si RUN_BENCHMARKS est
+défini, par exemple :
+    RUN_BENCHMARKS=1 python manage.py test tests.test_stock_reservation
+"""
+import os
+import unittest
+
+ENABLED = bool(os.environ.get('RUN_BENCHMARKS'))
+
+benchmark = unittest.skipUnless(ENABLED, 'Benchmark : définir RUN_BENCHMARKS=1')
+
+
+def report(message):
+    """Affiche une mesure (uniquement avec RUN_BENCHMARKS)"""
+    if ENABLED:
+        print(f"\n{message}")
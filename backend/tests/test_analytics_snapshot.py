@@ -0,0 +1,170 @@
+"""
+Tests de l'instantané colonnaire
+Rafraîchissement incrémental (modifications, suppressions), requêtes
+groupées sur les colonnes et rapports sans accès à la base
+"""
+import io
+import shutil
+import tempfile
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+import numpy as np
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from analytics.snapshot import AnalyticsSnapshotService, Frame
+from analytics.snapshot_reports import basket_stats, category_revenue, cohort_retention
+from clients.models import Client
+from orders.models import Order, OrderItem
+from products.models import Category, Product
+from tests.benchmarks import benchmark, report
+
+User = get_user_model()
+
+PARIS = ZoneInfo('Europe/Paris')
+
+
+class AnalyticsSnapshotTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.settings_override = override_settings(ANALYTICS_SNAPSHOT_DIR=self.directory)
+        self.settings_override.enable()
+        self.user = User.objects.create_user(username='gerant', email='gerant@test.com', password='pass1234')
+        self.alice = Client.objects.create(first_name='Alice', last_name='Martin', phone='0600000001')
+        self.bob = Client.objects.create(first_name='Bob', last_name='Durand', phone='0600000002')
+        self.parts = Category.objects.create(name='Pièces')
+        self.chain = Product.objects.create(
+            name='Chaîne', reference='CH-1', category=self.parts,
+            price_ht=Decimal('20.00'), price_ttc=Decimal('24.00')
+        )
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _order(self, client, when, quantity=1, store='garches', status='completed', unit_ht='20.00'):
+        order = Order.objects.create(
+            client=client, user=self.user, store=store, status=status,
+            subtotal_ht=Decimal(unit_ht) * quantity, total_ttc=Decimal(unit_ht) * quantity * Decimal('1.2')
+        )
+        OrderItem.objects.create(
+            order=order, product=self.chain, quantity=quantity, unit_price_ht=Decimal(unit_ht),
+            unit_price_ttc=Decimal(unit_ht) * Decimal('1.2'), tva_rate=Decimal('20.00')
+        )
+        Order.objects.filter(pk=order.pk).update(created_at=when)
+        return order
+
+    def test_columns_are_typed(self):
+        self._order(self.alice, datetime(2026, 3, 31, 23, 30, tzinfo=PARIS), quantity=2)
+        AnalyticsSnapshotService.refresh()
+
+        orders = AnalyticsSnapshotService.load('orders')
+        self.assertEqual(orders['total_ttc'].dtype, np.int64)
+        self.assertEqual(orders['total_ttc'][0], 4800)
+        self.assertEqual(orders['created_at'][0], np.datetime64('2026-03-31'))  # Jour de Paris
+        self.assertEqual(orders.rows()[0]['store'], 'garches')
+        self.assertIsInstance(orders['id'], np.memmap)
+
+    def test_incremental_refresh(self):
+        first = self._order(self.alice, datetime(2026, 1, 5, 12, tzinfo=PARIS))
+        second = self._order(self.bob, datetime(2026, 1, 6, 12, tzinfo=PARIS))
+        AnalyticsSnapshotService.refresh()
+
+        Order.objects.filter(pk=first.pk).update(status='cancelled')  # Sans updated_at : invisible
+        second.refresh_from_db()
+        second.store = 'ville_avray'
+        second.save()
+        third = self._order(self.bob, datetime(2026, 2, 1, 12, tzinfo=PARIS), quantity=3)
+        OrderItem.objects.filter(order=third).update(quantity=4)  # Commande modifiée : lignes relues
+
+        rewritten = AnalyticsSnapshotService.refresh(['orders', 'order_items'])
+        self.assertEqual(rewritten, {'orders': 2, 'order_items': 2})
+
+        orders = AnalyticsSnapshotService.load('orders')
+        rows = {row['id']: row for row in orders.rows()}
+        self.assertEqual(rows[first.pk]['status'], 'completed')
+        self.assertEqual(rows[second.pk]['store'], 'ville_avray')
+        items = AnalyticsSnapshotService.load('order_items')
+        self.assertEqual(items.where(order_id=third.pk).sum('quantity'), 4)
+
+        third.delete()
+        AnalyticsSnapshotService.refresh(['orders', 'order_items'])
+        self.assertNotIn(third.pk, AnalyticsSnapshotService.load('orders')['id'].tolist())
+        self.assertEqual(len(AnalyticsSnapshotService.load('order_items')), 2)
+
+        call_command('refresh_analytics_snapshot', '--full', '--table', 'orders', stdout=io.StringIO())
+        self.assertEqual(AnalyticsSnapshotService.load('orders').where(status='cancelled')['id'].tolist(), [first.pk])
+
+    def test_frame_queries(self):
+        frame = Frame({
+            'store': np.array([0, 1, 0, 1], dtype=np.int16),
+            'total': np.array([100, 250, 50, 0], dtype=np.int64),
+            'day': np.array(['2026-01-01', '2026-01-01', '2026-01-02', '2026-01-03'], dtype='datetime64[D]'),
+        }, {'store': ['garches', 'ville_avray']})
+
+        grouped = frame.group_by('store', orders=('count',), total=('sum', 'total'), last=('max', 'day'))
+        self.assertEqual(grouped.rows(), [
+            {'store': 'garches', 'orders': 2, 'total': 150, 'last': date(2026, 1, 2)},
+            {'store': 'ville_avray', 'orders': 2, 'total': 250, 'last': date(2026, 1, 3)},
+        ])
+        self.assertEqual(frame.where(store='ville_avray', total__gt=0).sum('total'), 250)
+        self.assertEqual(len(frame.where(day__gte=np.datetime64('2026-01-02'))), 2)
+        self.assertEqual(frame.where(store__in=['garches']).sum('total'), 150)
+
+    def test_reports_run_without_queries(self):
+        self._order(self.alice, datetime(2026, 1, 5, 12, tzinfo=PARIS), quantity=2, unit_ht='18.00')
+        self._order(self.alice, datetime(2026, 3, 5, 12, tzinfo=PARIS))
+        self._order(self.bob, datetime(2026, 3, 8, 12, tzinfo=PARIS), store='ville_avray')
+        self._order(self.bob, datetime(2026, 3, 9, 12, tzinfo=PARIS), status='cancelled', quantity=9)
+        AnalyticsSnapshotService.refresh()
+
+        with CaptureQueriesContext(connection) as ctx:
+            cohorts = cohort_retention()
+            baskets = basket_stats()
+            categories = category_revenue()
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+        self.assertEqual(cohorts, [
+            {'cohort': date(2026, 1, 1), 'months': 0, 'clients': 1},
+            {'cohort': date(2026, 1, 1), 'months': 2, 'clients': 1},
+            {'cohort': date(2026, 3, 1), 'months': 0, 'clients': 1},
+        ])
+        self.assertEqual(baskets['garches'], {
+            'orders': 2, 'items_per_basket': 1.5, 'average_basket': Decimal('33.60')
+        })
+        self.assertEqual(categories, [{
+            'category_id': self.parts.pk, 'quantity': 4,
+            'revenue_ht': Decimal('76.00'), 'discount_ht': Decimal('4.00'),
+        }])
+
+    def _large_frame(self, size=1_000_000):
+        rng = np.random.default_rng(0)
+        return Frame({
+            'store': rng.integers(0, 2, size).astype(np.int16),
+            'day': (np.datetime64('2024-01-01') + rng.integers(0, 730, size)).astype('datetime64[D]'),
+            'total': rng.integers(0, 50_000, size),
+        }, {'store': ['garches', 'ville_avray']})
+
+    def _monthly(self, frame):
+        return frame.assign(month=frame['day'].astype('datetime64[M]')).group_by(
+            'store', 'month', revenue=('sum', 'total'), orders=('count',)
+        )
+
+    def test_group_by_large_frame(self):
+        frame = self._large_frame()
+        monthly = self._monthly(frame)
+        self.assertEqual(len(monthly), 48)
+        self.assertEqual(int(monthly['revenue'].sum()), int(frame['total'].sum()))
+
+    @benchmark
+    def test_group_by_throughput(self):
+        frame = self._large_frame()
+        started = time.perf_counter()
+        self._monthly(frame)
+        elapsed = time.perf_counter() - started
+        report(f"Group-by magasin x mois sur {len(frame)} lignes : {elapsed * 1000:.0f} ms")
+        self.assertLess(elapsed, 2.0)
@@ -0,0 +1,144 @@
+"""
+Tests de l'analyse des paniers
+Comptage des paires, recalcul incrémental (modification, annulation,
+suppression), classement par confidence/lift et suggestions de caisse
+"""
+import io
+from decimal import Decimal
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from analytics.baskets import BasketAnalysisService
+from analytics.models import CountedBasket, ProductAssociation, ProductPair
+from clients.models import Client
+from orders.models import Order, OrderItem
+from products.models import Product
+
+User = get_user_model()
+
+
+class BasketAnalysisTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.api = APIClient()
+        self.user = User.objects.create_user(username='gerant', email='gerant@test.com', password='pass1234')
+        self.api.force_authenticate(user=self.user)
+        self.customer = Client.objects.create(first_name='Marie', last_name='Curie', phone='0612345678')
+        self.tube = self._product('Chambre à air', 'CA-1')
+        self.levers = self._product('Démonte-pneus', 'DP-1')
+        self.pump = self._product('Pompe', 'PO-1')
+        self.light = self._product('Éclairage', 'EC-1')
+
+    def _product(self, name, reference):
+        return Product.objects.create(name=name, reference=reference, price_ht=Decimal('10.00'), price_ttc=Decimal('12.00'))
+
+    def _order(self, *products, status='completed'):
+        order = Order.objects.create(client=self.customer, user=self.user, store='garches', status=status)
+        for product in products:
+            OrderItem.objects.create(
+                order=order, product=product, quantity=1,
+                unit_price_ht=Decimal('10.00'), unit_price_ttc=Decimal('12.00'), tva_rate=Decimal('20.00')
+            )
+        return order
+
+    def _pair(self, a, b):
+        a, b = sorted((a.pk, b.pk))
+        row = ProductPair.objects.filter(product_a_id=a, product_b_id=b).first()
+        return row.baskets if row else 0
+
+    def _history(self):
+        for _ in range(3):
+            self._order(self.tube, self.levers)
+        self._order(self.tube, self.pump)
+        self._order(self.tube)
+        for _ in range(5):
+            self._order(self.light)
+        self._order(self.pump, self.light, status='cancelled')
+
+    def test_pairs_and_associations(self):
+        self._history()
+        BasketAnalysisService.refresh()
+
+        self.assertEqual(self._pair(self.tube, self.tube), 5)
+        self.assertEqual(self._pair(self.tube, self.levers), 3)
+        self.assertEqual(self._pair(self.pump, self.light), 0)  # Commande annulée
+        self.assertEqual(CountedBasket.objects.count(), 10)
+
+        association = ProductAssociation.objects.get(product=self.levers, rank=1)
+        self.assertEqual(association.recommended_id, self.tube.pk)
+        self.assertEqual((association.confidence, association.lift), (1.0, 2.0))
+        self.assertAlmostEqual(association.support, 0.3)
+        # Paire vue une seule fois : ignorée
+        self.assertFalse(ProductAssociation.objects.filter(product=self.pump).exists())
+
+    def test_incremental_refresh(self):
+        self._history()
+        BasketAnalysisService.refresh()
+
+        pump_order = self._order(self.tube, self.pump)
+        cancelled = Order.objects.filter(status='completed').order_by('id').first()  # Chambre + démonte-pneus
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(BasketAnalysisService.refresh(), 1)
+        self.assertEqual(self._pair(self.tube, self.pump), 2)
+        self.assertTrue(ProductAssociation.objects.filter(product=self.pump, recommended=self.tube).exists())
+        self.assertLess(len(ctx.captured_queries), 25)
+
+        # Annulation puis suppression : paniers décomptés
+        cancelled.status = 'cancelled'
+        cancelled.save()
+        pump_order.delete()
+        self.assertEqual(BasketAnalysisService.refresh(), 2)
+        self.assertEqual(self._pair(self.tube, self.levers), 2)
+        self.assertEqual(self._pair(self.tube, self.pump), 1)
+
+        incremental = sorted(ProductPair.objects.values_list('product_a_id', 'product_b_id', 'baskets'))
+        call_command('refresh_basket_analysis', '--full', stdout=io.StringIO())
+        self.assertEqual(sorted(ProductPair.objects.values_list('product_a_id', 'product_b_id', 'baskets')), incremental)
+
+    def test_untouched_products_reranked_when_total_drifts(self):
+        self._history()
+        BasketAnalysisService.refresh()
+        association = ProductAssociation.objects.get(product=self.levers, rank=1)
+        self.assertEqual((association.total_baskets, association.lift), (10, 2.0))
+
+        # Aucun panier avec le démonte-pneus, mais le total triple : tout est reclassé
+        for _ in range(20):
+            self._order(self.light)
+        self.assertEqual(BasketAnalysisService.refresh(), 20)
+        association = ProductAssociation.objects.get(product=self.levers, rank=1)
+        self.assertEqual(association.total_baskets, 30)
+        self.assertAlmostEqual(association.support, 0.1)
+        self.assertEqual(association.lift, 6.0)
+
+        # Un panier de plus (3 %) : sous le seuil de dérive, classement conservé
+        self._order(self.light)
+        BasketAnalysisService.refresh()
+        self.assertEqual(ProductAssociation.objects.get(product=self.levers, rank=1).total_baskets, 30)
+
+    def test_suggestions_endpoint(self):
+        self._history()
+        BasketAnalysisService.refresh()
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.api.get('/api/analytics/products/suggestions/', {'cart': f'{self.levers.pk}'}, secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['reference'] for item in response.data['suggestions']], ['CA-1'])
+        lookups = [query for query in ctx.captured_queries if 'product_associations' in query['sql']]
+        self.assertEqual(len(lookups), 1)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.api.get('/api/analytics/products/suggestions/', {'cart': f'{self.levers.pk}'}, secure=True)
+        self.assertFalse([query for query in ctx.captured_queries if 'product_associations' in query['sql']])
+
+        response = self.api.get(
+            '/api/analytics/products/suggestions/', {'cart': f'{self.levers.pk},{self.tube.pk}'}, secure=True
+        )
+        self.assertEqual(response.data['suggestions'], [])
+
+        response = self.api.get('/api/analytics/products/suggestions/', {'cart': 'abc'}, secure=True)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
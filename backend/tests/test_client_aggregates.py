@@ -0,0 +1,167 @@
+"""
+Tests des agrégats clients
+Incréments à la vente/livraison, reconstruction complète, tri et filtre de la liste
+"""
+import io
+from datetime import timedelta
+from decimal import Decimal
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from clients.aggregates import ClientAggregateService
+from clients.models import Client
+from orders.models import Order
+from repairs.models import Repair
+from utils.business_services import ClientBusinessService
+
+User = get_user_model()
+
+
+class ClientAggregateTest(TestCase):
+    def setUp(self):
+        self.api = APIClient()
+        self.user = User.objects.create_user(username='gerant', email='gerant@test.com', password='pass1234')
+        self.api.force_authenticate(user=self.user)
+
+    def _client(self, name):
+        return Client.objects.create(first_name=name, last_name='Test', phone='0600000000')
+
+    def _order(self, client, total, status='completed'):
+        return Order.objects.create(
+            client=client, user=self.user, store='garches', status=status, total_ttc=Decimal(total)
+        )
+
+    def _repair(self, client, cost, status='delivered'):
+        return Repair.objects.create(
+            client=client, store='garches', bike_brand='Trek', description='Révision', status=status,
+            final_cost=Decimal(cost), estimated_cost=Decimal(cost), created_by=self.user
+        )
+
+    def _reload(self, client):
+        client.refresh_from_db()
+        return client
+
+    def test_increments_on_completion_and_delivery(self):
+        client = self._client('Alice')
+        order = self._order(client, '100.00', status='pending')
+        self.assertEqual(self._reload(client).visit_count, 0)
+
+        order.status = 'completed'
+        order.save()
+        self._order(client, '50.00')
+        repair = self._repair(client, '80.00', status='in_progress')
+        repair.status = 'delivered'
+        repair.save()
+        repair.save()  # Nouvel enregistrement sans changement : pas de double comptage
+
+        client = self._reload(client)
+        self.assertEqual((client.orders_total, client.orders_count), (Decimal('150.00'), 2))
+        self.assertEqual((client.repairs_total, client.repairs_count), (Decimal('80.00'), 1))
+        self.assertEqual((client.total_purchases, client.visit_count), (Decimal('230.00'), 3))
+        self.assertEqual(client.average_basket, Decimal('75.00'))
+        self.assertEqual(client.first_interaction, order.created_at)
+        self.assertEqual(client.last_interaction, repair.created_at)
+
+    def test_changes_are_reverted(self):
+        client, other = self._client('Alice'), self._client('Bob')
+        order = self._order(client, '100.00')
+        repair = self._repair(client, '80.00')
+
+        # Montant corrigé, commande annulée, réparation transférée puis supprimée
+        repair = Repair.objects.get(pk=repair.pk)
+        repair.final_cost = Decimal('90.00')
+        repair.save()
+        order = Order.objects.get(pk=order.pk)
+        order.status = 'cancelled'
+        order.save()
+        repair.client = other
+        repair.save()
+        client = self._reload(client)
+        self.assertEqual((client.total_purchases, client.orders_count, client.repairs_count), (0, 0, 0))
+        self.assertEqual(self._reload(other).repairs_total, Decimal('90.00'))
+
+        repair.delete()
+        other = self._reload(other)
+        self.assertEqual((other.total_purchases, other.visit_count), (0, 0))
+
+    def test_single_update_per_save(self):
+        client = self._client('Alice')
+        order = self._order(client, '100.00', status='pending')
+        order.status = 'completed'
+        with CaptureQueriesContext(connection) as ctx:
+            order.save()
+        client_queries = [query['sql'] for query in ctx.captured_queries if '"clients"' in query['sql']]
+        # Un UPDATE par incréments, sans lecture de l'historique
+        self.assertEqual(len(client_queries), 1)
+        self.assertTrue(client_queries[0].startswith('UPDATE'))
+
+    def test_rebuild_matches_history(self):
+        alice, bob, carol = self._client('Alice'), self._client('Bob'), self._client('Carol')
+        self._order(alice, '100.00')
+        self._order(alice, '40.00')
+        self._order(alice, '999.00', status='cancelled')
+        self._repair(alice, '60.00')
+        self._repair(bob, '25.00')
+        self._repair(bob, '70.00', status='pending')
+        fields = ['total_purchases', 'visit_count', 'orders_count', 'repairs_total', 'first_interaction', 'last_interaction']
+        expected = list(Client.objects.order_by('id').values_list(*fields))
+
+        # Données faussées puis reconstruites
+        Client.objects.update(total_purchases=Decimal('12.00'), visit_count=7, first_interaction=None)
+
+        out = io.StringIO()
+        call_command('rebuild_client_aggregates', stdout=out)
+        self.assertIn('2 client(s)', out.getvalue())
+        self.assertEqual(list(Client.objects.order_by('id').values_list(*fields)), expected)
+        alice, carol = self._reload(alice), self._reload(carol)
+        self.assertEqual((alice.total_purchases, alice.visit_count), (Decimal('200.00'), 3))
+        self.assertEqual((carol.total_purchases, carol.visit_count, carol.last_interaction), (0, 0, None))
+
+    def test_bulk_record(self):
+        client = self._client('Alice')
+        now = timezone.now()
+        orders = [
+            Order(client=client, user=self.user, store='garches', status='completed', total_ttc=Decimal('10.00'),
+                  created_at=now - timedelta(days=day))
+            for day in range(3)
+        ]
+        ClientAggregateService.record('orders', orders)
+        client = self._reload(client)
+        self.assertEqual((client.orders_total, client.orders_count), (Decimal('30.00'), 3))
+        self.assertEqual(client.first_interaction, now - timedelta(days=2))
+        self.assertEqual(client.last_interaction, now)
+
+    def test_lifetime_value_reads_aggregates(self):
+        client = self._client('Alice')
+        self._order(client, '100.00')
+        self._repair(client, '50.00')
+        client = self._reload(client)
+        with CaptureQueriesContext(connection) as ctx:
+            value = ClientBusinessService.calculate_client_lifetime_value(client)
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(value['total_value'], 150.0)
+        self.assertEqual(value['total_interactions'], 2)
+        self.assertEqual(value['avg_basket'], 100.0)
+        self.assertEqual(value['avg_transaction_value'], 75.0)
+
+        empty = ClientBusinessService.calculate_client_lifetime_value(self._client('Bob'))
+        self.assertEqual((empty['total_value'], empty['first_interaction']), (0.0, None))
+
+    def test_client_list_sorted_and_filtered_by_value(self):
+        for name, total in (('Alice', '300.00'), ('Bob', '50.00'), ('Carol', '1200.00')):
+            self._order(self._client(name), total)
+        self._client('Dan')
+
+        response = self.api.get('/api/clients/', {'ordering': '-total_purchases', 'min_value': '100'}, secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual([row['first_name'] for row in results], ['Carol', 'Alice'])
+        self.assertEqual(results[0]['total_purchases'], '1200.00')
+
+        response = self.api.get('/api/clients/', {'min_value': 'abc'}, secure=True)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,158 @@
+"""
+Tests de la segmentation RFM des clients
+Notes par quintile, montants sans double comptage, endpoints et volume
+"""
+import io
+import time
+from datetime import timedelta
+from decimal import Decimal
+import numpy as np
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from analytics.models import ClientSegment
+from analytics.segmentation import ClientSegmentationService, quintile_scores
+from clients.models import Client
+from orders.models import Order
+from repairs.models import Repair
+from utils.business_services import ClientBusinessService
+from tests.benchmarks import benchmark, report
+
+User = get_user_model()
+
+
+class ClientSegmentationTest(TestCase):
+    def setUp(self):
+        self.api = APIClient()
+        self.user = User.objects.create_user(username='gerant', email='gerant@test.com', password='pass1234')
+        self.api.force_authenticate(user=self.user)
+
+    def _client(self, name):
+        return Client.objects.create(first_name=name, last_name='Test', phone='0600000000')
+
+    def _order(self, client, total, days_ago=0, status='completed'):
+        order = Order.objects.create(
+            client=client, user=self.user, store='garches', status=status, total_ttc=Decimal(total)
+        )
+        Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+        return order
+
+    def _repair(self, client, cost, days_ago=0, status='delivered'):
+        repair = Repair.objects.create(
+            client=client, store='garches', bike_brand='Trek', description='Révision', status=status,
+            final_cost=Decimal(cost), estimated_cost=Decimal(cost), created_by=self.user
+        )
+        Repair.objects.filter(pk=repair.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+        return repair
+
+    def test_quintile_scores(self):
+        self.assertEqual(quintile_scores(np.arange(10)).tolist(), [1, 1, 2, 2, 3, 3, 4, 4, 5, 5])
+        self.assertEqual(quintile_scores(np.array([7, 7, 7])).tolist(), [1, 1, 1])
+
+    def test_monetary_is_not_fanned_out(self):
+        client = self._client('Alice')
+        for _ in range(3):
+            self._order(client, '100.00', days_ago=5)
+        self._repair(client, '50.00', days_ago=2)
+        self._repair(client, '80.00', status='pending')  # Pas encore facturée
+        self._order(client, '999.00', status='cancelled')
+
+        ClientSegmentationService.refresh()
+        segment = ClientSegment.objects.get(client=client)
+        self.assertEqual(segment.monetary, Decimal('350.00'))
+        self.assertEqual((segment.frequency, segment.recency_days), (5, 0))
+
+    def test_segments(self):
+        champion = self._client('Champion')
+        for _ in range(6):
+            self._order(champion, '400.00', days_ago=3)
+        lost = self._client('Perdu')
+        self._order(lost, '20.00', days_ago=400)
+        fillers = [self._client(f'Client{index}') for index in range(8)]
+        for index, client in enumerate(fillers):
+            for _ in range(index % 3 + 1):
+                self._order(client, '60.00', days_ago=30 + index * 20)
+        prospect = self._client('Prospect')
+
+        counts = ClientSegmentationService.refresh()
+        self.assertEqual(sum(counts.values()), 11)
+        self.assertEqual(ClientSegment.objects.get(client=champion).segment, 'champion')
+        self.assertEqual(ClientSegment.objects.get(client=lost).segment, 'lost')
+        self.assertEqual(ClientSegment.objects.get(client=prospect).segment, 'prospect')
+
+        # Recalcul : mise à jour en place
+        self._order(lost, '20.00')
+        call_command('segment_clients', stdout=io.StringIO())
+        self.assertEqual(ClientSegment.objects.count(), 11)
+        self.assertEqual(ClientSegment.objects.get(client=lost).recency_days, 0)
+
+        stats = ClientBusinessService.segment_clients(Client.objects.all())
+        self.assertEqual((stats['total'], stats['vip']), (11, 1))
+
+    def test_segment_clients_without_nightly_run(self):
+        vip, lapsed = self._client('Vip'), self._client('Ancien')
+        self._order(vip, '1500.00', days_ago=2)
+        self._order(lapsed, '50.00', days_ago=200)
+
+        # Segmentation jamais calculée : calculée à la demande
+        stats = ClientBusinessService.segment_clients(Client.objects.all())
+        self.assertEqual(ClientSegment.objects.count(), 2)
+        self.assertEqual((stats['vip'], stats['active'], stats['inactive']), (1, 1, 1))
+        self.assertIsNotNone(stats['computed_at'])
+
+        # Client créé depuis le calcul : ni actif ni inactif, compté à part
+        self._client('Nouveau')
+        stats = ClientBusinessService.segment_clients(Client.objects.all())
+        self.assertEqual((stats['total'], stats['segmented'], stats['unsegmented']), (3, 2, 1))
+        self.assertEqual((stats['active'], stats['inactive'], stats['active_percentage']), (1, 1, 50.0))
+
+    def test_endpoints(self):
+        alice = self._client('Alice')
+        self._order(alice, '120.00')
+        self._client('Bob')
+
+        response = self.api.post('/api/analytics/clients/segments/refresh/', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.user.is_staff = True
+        self.user.save()
+        response = self.api.post('/api/analytics/clients/segments/refresh/', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.api.get('/api/analytics/clients/segments/', {'segment': 'prospect'}, secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total'], 2)
+        self.assertEqual([client['name'] for client in response.data['clients']], ['Bob Test'])
+        prospects = next(row for row in response.data['segments'] if row['segment'] == 'prospect')
+        self.assertEqual((prospects['count'], prospects['percentage']), (1, 50.0))
+
+        response = self.api.get('/api/analytics/clients/segments/', {'segment': 'vip'}, secure=True)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def _activity(self, now, size=50_000):
+        rng = np.random.default_rng(0)
+        return {
+            client_id: (now - timedelta(days=int(days)), int(count), Decimal(int(cents)) / 100)
+            for client_id, days, count, cents in zip(
+                range(1, size + 1), rng.integers(0, 1000, size),
+                rng.integers(1, 30, size), rng.integers(1000, 500_000, size),
+            )
+        }
+
+    def test_scoring_50k_clients(self):
+        now = timezone.now()
+        ids, *_, labels = ClientSegmentationService.score(self._activity(now), now)
+        self.assertEqual(len(ids), 50_000)
+        self.assertEqual(len(labels), 50_000)
+
+    @benchmark
+    def test_scoring_time(self):
+        now = timezone.now()
+        activity = self._activity(now)
+        started = time.perf_counter()
+        ClientSegmentationService.score(activity, now)
+        elapsed = time.perf_counter() - started
+        report(f"Notation RFM de 50 000 clients : {elapsed * 1000:.0f} ms")
+        self.assertLess(elapsed, 1.0)
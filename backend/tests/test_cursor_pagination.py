@@ -0,0 +1,90 @@
+"""
+Tests de la pagination par curseur (created_at, id)
+Parcours complet sans doublon malgré des dates identiques, coût constant
+des pages profondes et compte séparé mis en cache
+"""
+from datetime import timedelta
+from django.test import TestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import cache
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from clients.models import Client
+
+User = get_user_model()
+
+URL = '/api/clients/'
+
+
+class CursorPaginationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.api = APIClient()
+        self.user = User.objects.create_user(username='vendeur', email='vendeur@test.com', password='pass1234')
+        self.api.force_authenticate(user=self.user)
+
+        Client.objects.bulk_create([
+            Client(first_name=f'Client{i}', last_name='Test', phone=f'06{i:08d}') for i in range(95)
+        ])
+        # Groupes de 3 clients créés au même instant pour éprouver le départage par id
+        now = timezone.now()
+        for index, pk in enumerate(Client.objects.order_by('id').values_list('id', flat=True)):
+            Client.objects.filter(pk=pk).update(created_at=now - timedelta(minutes=index // 3))
+
+        self.expected = list(Client.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def _get(self, url, **params):
+        response = self.api.get(url, params, secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return response.data
+
+    def _walk(self, data, direction):
+        pages = [data]
+        while data[direction]:
+            data = self._get(data[direction])
+            pages.append(data)
+        return pages
+
+    def test_forward_and_backward_walk(self):
+        first = self._get(URL, cursor='', page_size=10)
+        self.assertNotIn('count', first)
+        self.assertIsNone(first['previous'])
+
+        pages = self._walk(first, 'next')
+        seen = [client['id'] for page in pages for client in page['results']]
+        self.assertEqual(len(pages), 10)
+        self.assertEqual(seen, self.expected)
+
+        back = self._walk(pages[-1], 'previous')
+        seen_back = [client['id'] for page in reversed(back) for client in page['results']]
+        self.assertEqual(seen_back, self.expected)
+
+    def test_deep_page_costs_the_same_as_first(self):
+        data = self._get(URL, cursor='', page_size=10)
+        counts = []
+        while data['next']:
+            with CaptureQueriesContext(connection) as ctx:
+                data = self._get(data['next'])
+            counts.append(len(ctx.captured_queries))
+            self.assertFalse(any('COUNT(' in q['sql'].upper() for q in ctx.captured_queries))
+            self.assertFalse(any('OFFSET' in q['sql'].upper() for q in ctx.captured_queries))
+        self.assertEqual(len(set(counts)), 1, counts)
+
+    def test_count_is_separate_and_cached(self):
+        self.assertEqual(self._get(URL + 'count/'), {'count': 95, 'estimated': False})
+
+        Client.objects.create(first_name='Nouveau', phone='0700000000')
+        self.assertEqual(self._get(URL + 'count/')['count'], 95)
+        self.assertEqual(self._get(URL + 'count/', search='Nouveau')['count'], 1)
+
+    def test_page_number_mode_is_unchanged(self):
+        data = self._get(URL)
+        self.assertEqual(data['count'], 95)
+        self.assertEqual(len(data['results']), 50)
+
+    def test_invalid_cursor(self):
+        response = self.api.get(URL, {'cursor': 'pas-un-curseur'}, secure=True)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,156 @@
+"""
+Tests des agrégats journaliers du dashboard
+Mise à jour après commit, reprise de l'historique et nombre de requêtes
+du dashboard indépendant du volume de commandes
+"""
+import io
+from datetime import time, timedelta
+from decimal import Decimal
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from analytics.models import DashboardStats
+from analytics.rollups import DashboardRollupService, day_start
+from appointments.models import Appointment
+from clients.models import Client
+from orders.models import Order
+from quotes.models import Quote
+from repairs.models import Repair
+
+User = get_user_model()
+
+
+class DashboardRollupTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.api = APIClient()
+        self.user = User.objects.create_user(username='gerant', email='gerant@test.com', password='pass1234')
+        self.api.force_authenticate(user=self.user)
+        self.customer = Client.objects.create(first_name='Marie', last_name='Curie', phone='0612345678')
+        self.today = timezone.localdate()
+
+    def _order(self, store='garches', total='100.00', status='completed'):
+        return Order.objects.create(
+            client=self.customer, user=self.user, store=store, status=status, total_ttc=Decimal(total)
+        )
+
+    def _move_to(self, queryset, day):
+        """Déplace des lignes dans le passé sans déclencher les signaux"""
+        queryset.update(created_at=day_start(day) + timedelta(hours=10))
+
+    def _row(self, day=None):
+        return DashboardStats.objects.get(period='daily', date=day or self.today)
+
+    def test_row_updated_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self._order('garches', '100.00')
+            self._order('ville_avray', '50.00')
+            self._order('garches', '30.00', status='pending')
+            Repair.objects.create(
+                client=self.customer, store='garches', bike_brand='Trek', description='Crevaison',
+                status='completed', final_cost=Decimal('40.00'), created_by=self.user
+            )
+            Quote.objects.create(
+                client=self.customer, user=self.user, store='garches', status='sent',
+                valid_until=self.today + timedelta(days=30)
+            )
+            Appointment.objects.create(
+                client=self.customer, title='Révision', appointment_date=self.today,
+                appointment_time=time(10, 0), created_by=self.user
+            )
+
+        row = self._row()
+        self.assertEqual(row.total_orders, 3)
+        self.assertEqual(row.completed_orders, 2)
+        self.assertEqual(row.total_revenue, Decimal('150.00'))
+        self.assertEqual(row.average_order_value, Decimal('75.00'))
+        self.assertEqual((row.revenue_garches, row.revenue_ville_avray), (Decimal('100.00'), Decimal('50.00')))
+        self.assertEqual(row.new_clients, 1)
+        self.assertEqual((row.total_repairs, row.completed_repairs), (1, 1))
+        self.assertEqual(row.average_repair_cost, Decimal('40.00'))
+        self.assertEqual((row.total_quotes, row.pending_quotes), (1, 1))
+        self.assertEqual(row.total_appointments, 1)
+
+    def test_changes_and_deletions_are_reflected(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            order = self._order('garches', '100.00')
+            appointment = Appointment.objects.create(
+                client=self.customer, title='Révision', appointment_date=self.today,
+                appointment_time=time(10, 0), created_by=self.user
+            )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = 'cancelled'
+            order.save()
+            appointment = Appointment.objects.get(pk=appointment.pk)
+            appointment.appointment_date = self.today + timedelta(days=2)
+            appointment.save()
+
+        row = self._row()
+        self.assertEqual((row.total_orders, row.total_revenue), (1, Decimal('0.00')))
+        self.assertEqual(row.total_appointments, 0)
+        self.assertEqual(self._row(self.today + timedelta(days=2)).total_appointments, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Appointment.objects.get(pk=appointment.pk).delete()
+        self.assertFalse(DashboardStats.objects.filter(date=self.today + timedelta(days=2)).exists())
+
+    def test_rolled_back_transaction_is_refreshed_later(self):
+        DashboardRollupService.mark_dirty(self.today)  # Callback abandonné (pas de commit)
+        with self.captureOnCommitCallbacks(execute=True):
+            self._order()
+        self.assertEqual(self._row().total_orders, 1)
+
+    def test_backfill_command(self):
+        orders = [self._order('garches', '20.00') for _ in range(3)]
+        past = self.today - timedelta(days=40)
+        self._move_to(Order.objects.filter(pk__in=[orders[0].pk, orders[1].pk]), past)
+        self._move_to(Client.objects.all(), past)
+        DashboardStats.objects.create(period='daily', date=past - timedelta(days=1), year=past.year, total_orders=9)
+
+        call_command('backfill_dashboard_stats', '--from', str(past - timedelta(days=5)), stdout=io.StringIO())
+
+        self.assertEqual(self._row(past).total_orders, 2)
+        self.assertEqual(self._row(past).new_clients, 1)
+        self.assertEqual(self._row().total_revenue, Decimal('20.00'))
+        self.assertFalse(DashboardStats.objects.filter(date=past - timedelta(days=1)).exists())
+
+    def _dashboard(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.api.get('/api/analytics/dashboard/', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data, len(ctx.captured_queries)
+
+    def _history(self, days):
+        for offset in range(days):
+            order = self._order('ville_avray' if offset % 2 else 'garches', '10.00')
+            self._move_to(Order.objects.filter(pk=order.pk), self.today - timedelta(days=offset))
+        call_command('backfill_dashboard_stats', stdout=io.StringIO())
+
+    def test_dashboard_reads_rollups(self):
+        self._history(4)
+        data, _ = self._dashboard()
+
+        self.assertEqual(data['totalOrders'], 4)
+        self.assertEqual(data['totalRevenue'], 40.0)
+        self.assertEqual(data['storeStats'], {'ville_avray': 20.0, 'garches': 20.0})
+        self.assertEqual(sum(month['total'] for month in data['salesByMonth']), 40.0)
+        self.assertEqual(data['salesByMonth'][-1]['month'], self.today.strftime('%b %Y'))
+        self.assertEqual(len(data['recentOrders']), 4)
+
+    def test_dashboard_query_count_is_flat(self):
+        self._history(5)
+        _, small = self._dashboard()
+        self._history(120)
+        data, large = self._dashboard()
+
+        self.assertEqual(data['totalOrders'], 125)
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, 12)
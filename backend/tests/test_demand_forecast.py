@@ -0,0 +1,135 @@
+"""
+Tests de la prévision de la demande
+Matrice des ventes en une requête, saisonnalité, report sur la configuration
+des stocks, cache invalidé par les commandes et volume d'un grand catalogue
+"""
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+import numpy as np
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from analytics.forecasting import DemandForecastService, HISTORY_WEEKS
+from clients.models import Client
+from orders.models import Order, OrderItem
+from products.models import Product
+from suppliers.models_extended import StoreStockConfig
+from utils.business_services import FinancialBusinessService
+from tests.benchmarks import benchmark, report
+
+User = get_user_model()
+
+PARIS = ZoneInfo('Europe/Paris')
+TODAY = date(2026, 6, 3)
+
+
+class DemandForecastTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.api = APIClient()
+        self.user = User.objects.create_user(username='gerant', email='gerant@test.com', password='pass1234')
+        self.api.force_authenticate(user=self.user)
+        self.customer = Client.objects.create(first_name='Marie', last_name='Curie', phone='0612345678')
+        self.fan = self._product('Bidon', 'BI-1')
+        self.light = self._product('Éclairage', 'EC-1')
+
+    def _product(self, name, reference):
+        return Product.objects.create(name=name, reference=reference, price_ht=Decimal('10.00'), price_ttc=Decimal('12.00'))
+
+    def _sale(self, product, day, quantity, store='garches', status='completed'):
+        order = Order.objects.create(client=self.customer, user=self.user, store=store, status=status)
+        OrderItem.objects.create(
+            order=order, product=product, quantity=quantity,
+            unit_price_ht=Decimal('10.00'), unit_price_ttc=Decimal('12.00'), tva_rate=Decimal('20.00')
+        )
+        Order.objects.filter(pk=order.pk).update(created_at=datetime.combine(day, datetime.min.time(), PARIS) + timedelta(hours=12))
+
+    def _history(self):
+        """Bidons vendus surtout l'été, éclairages surtout l'hiver (une vente par semaine)"""
+        start = TODAY - timedelta(weeks=HISTORY_WEEKS)
+        for week in range(HISTORY_WEEKS):
+            day = start + timedelta(weeks=week)
+            summer = day.month in (6, 7, 8)
+            self._sale(self.fan, day, 12 if summer else 3)
+            self._sale(self.light, day, 1 if summer else 6)
+
+    def test_sales_matrix_single_query(self):
+        self._sale(self.fan, date(2026, 5, 27), 2)
+        self._sale(self.fan, date(2026, 5, 28), 3, store='ville_avray')
+        self._sale(self.fan, date(2026, 5, 29), 9, status='cancelled')
+        self._sale(self.fan, TODAY, 5)  # Semaine en cours : exclue
+
+        with CaptureQueriesContext(connection) as ctx:
+            products, weeks, matrix = DemandForecastService.sales_matrix(TODAY)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(products.tolist(), [self.fan.pk])
+        self.assertEqual(weeks[-1], date(2026, 5, 25))
+        self.assertEqual(matrix[0, :, -1].tolist(), [3.0, 2.0])  # ville_avray, garches
+        self.assertEqual(matrix.sum(), 5)
+
+    def test_seasonal_factors_written_back(self):
+        self._history()
+        configs = [
+            StoreStockConfig.objects.create(product=self.fan, store='garches', seasonal_factor=1.0),
+            StoreStockConfig.objects.create(product=self.light, store='garches', seasonal_factor=1.0),
+            StoreStockConfig.objects.create(product=self.light, store='ville_avray', seasonal_factor=3.0),
+        ]
+
+        self.assertEqual(DemandForecastService.refresh(TODAY), 3)
+        fan, light, light_va = [StoreStockConfig.objects.get(pk=config.pk) for config in configs]
+        self.assertGreater(fan.seasonal_factor, 1.5)
+        self.assertLess(light.seasonal_factor, 0.5)
+        self.assertGreater(fan.forecast_demand, light.forecast_demand)
+        self.assertAlmostEqual(fan.forecast_demand, 48, delta=8)
+        self.assertEqual((light_va.seasonal_factor, light_va.forecast_demand), (1.0, 0.0))  # Aucune vente
+        self.assertIsNotNone(fan.forecast_updated_at)
+
+    def test_forecast_cached_until_orders_change(self):
+        self._sale(self.fan, date(2026, 5, 27), 2)
+        DemandForecastService.forecast(TODAY)
+        with CaptureQueriesContext(connection) as ctx:
+            DemandForecastService.forecast(TODAY)
+        self.assertEqual(len(ctx.captured_queries), 1)  # Empreinte des commandes seulement
+
+        self._sale(self.light, date(2026, 5, 27), 4)
+        self.assertEqual(len(DemandForecastService.forecast(TODAY)['products']), 2)
+
+    def test_forecast_endpoint(self):
+        self._sale(self.fan, date.today() - timedelta(days=7), 4)
+        response = self.api.get('/api/analytics/inventory/forecast/', {'store': 'garches'}, secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['weeks']), 4)
+        self.assertEqual(response.data['products'][0]['name'], 'Bidon')
+
+        response = self.api.get('/api/analytics/inventory/forecast/', {'store': 'paris'}, secure=True)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def _large_catalog(self):
+        rng = np.random.default_rng(0)
+        weeks = [date(2024, 6, 3) + timedelta(weeks=index) for index in range(HISTORY_WEEKS)]
+        return rng.poisson(3.0, size=(5000, 2, HISTORY_WEEKS)).astype(np.float64), weeks
+
+    def test_fit_large_catalog(self):
+        forecast, factor, future = DemandForecastService.fit(*self._large_catalog())
+        self.assertEqual(forecast.shape, (5000, 2, 4))
+        self.assertTrue(np.all((factor >= 0.1) & (factor <= 5.0)))
+
+    @benchmark
+    def test_fit_time(self):
+        matrix, weeks = self._large_catalog()
+        started = time.perf_counter()
+        DemandForecastService.fit(matrix, weeks)
+        elapsed = time.perf_counter() - started
+        report(f"Prévision de 5000 produits x 2 magasins : {elapsed * 1000:.0f} ms")
+        self.assertLess(elapsed, 2.0)
+
+    def test_monthly_revenue_forecast_follows_trend(self):
+        history = [{'total_revenue': 1000 + 100 * month} for month in range(12)]
+        forecasts = FinancialBusinessService.forecast_monthly_revenue(history, 3)
+        self.assertEqual([item['forecast_revenue'] for item in forecasts], [2200.0, 2300.0, 2400.0])
@@ -0,0 +1,141 @@
+"""
+Tests du compteur de numérotation des documents
+Numéros consécutifs par (type, magasin, jour), reprise de l'ancienne
+numérotation et absence de doublon sous forte concurrence
+"""
+import random
+import threading
+import time
+from datetime import date, timedelta
+from django.test import TestCase, TransactionTestCase
+from django.db import connection, transaction, OperationalError
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from clients.models import Client
+from orders.models import Order
+from quotes.models import Quote
+from settings_app.sequences import SequenceService
+from tests.benchmarks import report
+
+User = get_user_model()
+
+
+def with_retry(func, *args, **kwargs):
+    """SQLite en mémoire partagée refuse les écritures concurrentes au lieu d'attendre"""
+    while True:
+        try:
+            return func(*args, **kwargs)
+        except OperationalError:
+            time.sleep(random.uniform(0.0005, 0.005))
+
+
+class SequenceServiceTest(TestCase):
+    def test_numbers_are_consecutive_per_key(self):
+        day = date(2026, 10, 17)
+        self.assertEqual(
+            [SequenceService.allocate('order', store='garches', day=day) for _ in range(3)],
+            [1, 2, 3]
+        )
+        self.assertEqual(SequenceService.allocate('order', store='ville_avray', day=day), 1)
+        self.assertEqual(SequenceService.allocate('order', store='garches', day=day + timedelta(days=1)), 1)
+        self.assertEqual(SequenceService.allocate('invoice', store='garches', day=day), 1)
+
+    def test_allocate_block(self):
+        day = date(2026, 10, 17)
+        SequenceService.allocate('order', store='garches', day=day)
+        self.assertEqual(SequenceService.allocate_block('order', 5, store='garches', day=day), range(2, 7))
+        self.assertEqual(SequenceService.allocate('order', store='garches', day=day), 7)
+
+    def test_rolled_back_number_is_reused(self):
+        day = date(2026, 10, 17)
+        SequenceService.allocate('order', day=day)
+        try:
+            with transaction.atomic():
+                self.assertEqual(SequenceService.allocate('order', day=day), 2)
+                raise ValueError('annulation')
+        except ValueError:
+            pass
+        self.assertEqual(SequenceService.allocate('order', day=day), 2)
+
+    def test_counter_resumes_after_legacy_numbers(self):
+        user = User.objects.create_user(username='vendeur', email='v@test.com', password='pass1234')
+        customer = Client.objects.create(first_name='Test', last_name='Client', phone='0612345678')
+        date_str = timezone.localdate().strftime('%d%m%Y')
+        Quote.objects.create(
+            quote_number=f'DA{date_str}-0000041', client=customer, user=user,
+            store='ville_avray', valid_until=date.today()
+        )
+
+        quote = Quote.objects.create(client=customer, user=user, store='ville_avray', valid_until=date.today())
+        self.assertEqual(quote.quote_number, f'DA{date_str}-0000042')
+
+    def test_order_and_invoice_numbers(self):
+        user = User.objects.create_user(username='vendeur', email='v@test.com', password='pass1234')
+        customer = Client.objects.create(first_name='Test', last_name='Client', phone='0612345678')
+        today = timezone.localdate().strftime('%Y%m%d')
+
+        orders = [Order.objects.create(client=customer, user=user, store='ville_avray') for _ in range(2)]
+        self.assertEqual([o.order_number for o in orders], [f'CMD-A{today}-0001', f'CMD-A{today}-0002'])
+
+        from invoices.models import Invoice
+        invoice = Invoice.objects.create(order=orders[0])
+        self.assertEqual(invoice.invoice_number, f'FACT-A{today}-0001')
+
+
+class SequenceConcurrencyBenchmark(TransactionTestCase):
+    """Des milliers de numéros attribués en parallèle, sans doublon ni trou"""
+
+    THREADS = 8
+    PER_THREAD = 250
+
+    def _run_threads(self, target, count):
+        numbers, lock, start = [], threading.Lock(), threading.Event()
+
+        def worker():
+            allocated = []
+            start.wait()
+            try:
+                for _ in range(count):
+                    allocated.append(target())
+            finally:
+                connection.close()
+            with lock:
+                numbers.extend(allocated)
+
+        threads = [threading.Thread(target=worker) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        began = time.perf_counter()
+        start.set()
+        for thread in threads:
+            thread.join()
+        return numbers, time.perf_counter() - began
+
+    def test_parallel_allocation_has_no_duplicates(self):
+        day = date(2026, 10, 17)
+        numbers, elapsed = self._run_threads(
+            lambda: with_retry(SequenceService.allocate, 'invoice', store='garches', day=day),
+            self.PER_THREAD
+        )
+        total = self.THREADS * self.PER_THREAD
+        report(f"Numérotation concurrente: {total} numéros en {elapsed:.2f}s ({total / elapsed:.0f}/s)")
+
+        self.assertEqual(len(numbers), total)
+        self.assertEqual(sorted(numbers), list(range(1, total + 1)))
+
+    def test_parallel_orders_have_unique_numbers(self):
+        user = User.objects.create_user(username='vendeur', email='v@test.com', password='pass1234')
+        customer = Client.objects.create(first_name='Test', last_name='Client', phone='0612345678')
+
+        def create_order():
+            def create():
+                with transaction.atomic():
+                    return Order.objects.create(client=customer, user=user, store='garches').order_number
+            return with_retry(create)
+
+        numbers, elapsed = self._run_threads(create_order, 25)
+        report(f"Commandes concurrentes: {len(numbers)} en {elapsed:.2f}s")
+
+        self.assertEqual(len(numbers), self.THREADS * 25)
+        self.assertEqual(len(set(numbers)), len(numbers))
+        self.assertEqual(Order.objects.count(), len(numbers))
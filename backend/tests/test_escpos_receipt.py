@@ -0,0 +1,146 @@
+"""
+Tests du ticket ESC/POS
+Comparaison octet par octet avec des fichiers de référence (tests/golden/),
+à régénérer avec UPDATE_GOLDEN=1 après une modification volontaire
+"""
+import os
+import time
+from datetime import date, datetime, timezone as dt_timezone
+from decimal import Decimal
+from django.test import SimpleTestCase, TestCase
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from clients.models import Client
+from orders.models import Order, OrderItem
+from invoices.models import Invoice
+from invoices.escpos import CUT, INIT, render_receipt_escpos
+from invoices.rendering import STORES
+from tests.benchmarks import benchmark, report
+
+User = get_user_model()
+
+GOLDEN_DIR = os.path.join(os.path.dirname(__file__), 'golden')
+
+
+def receipt_data(**overrides):
+    data = {
+        'invoice_number': 'FACT-G20261017-0042',
+        'created_at': datetime(2026, 10, 17, 14, 30, tzinfo=dt_timezone.utc),
+        'invoice_date': date(2026, 10, 17),
+        'order_created_at': datetime(2026, 10, 17, 14, 29, tzinfo=dt_timezone.utc),
+        'store': STORES['garches'],
+        'client': {
+            'first_name': 'Hélène', 'last_name': 'Müller', 'address': '', 'postal_code': '',
+            'city': '', 'email': 'helene@example.com', 'phone': '0612345678',
+        },
+        'notes': '',
+        'items': [
+            {
+                'name': 'Pneu Continental Grand Prix 5000 700x25C', 'reference': 'PN-GP5000',
+                'quantity': 2, 'unit_price_ht': Decimal('45.00'), 'unit_price_ttc': Decimal('54.00'),
+                'tva_rate': Decimal('20.00'), 'subtotal_ttc': Decimal('108.00'),
+            },
+            {
+                'name': 'Réglage freins', 'reference': '',
+                'quantity': 1, 'unit_price_ht': Decimal('12.50'), 'unit_price_ttc': Decimal('15.00'),
+                'tva_rate': Decimal('20.00'), 'subtotal_ttc': Decimal('15.00'),
+            },
+        ],
+        'subtotal_ht': Decimal('102.50'),
+        'total_tva': Decimal('20.50'),
+        'discount_amount': Decimal('0.00'),
+        'total_ttc': Decimal('123.00'),
+        'payment_method': 'card',
+        'installments': 1,
+    }
+    data.update(overrides)
+    return data
+
+
+class EscPosGoldenTest(SimpleTestCase):
+    def assertGolden(self, name, output):
+        path = os.path.join(GOLDEN_DIR, name)
+        if os.environ.get('UPDATE_GOLDEN'):
+            with open(path, 'wb') as handle:
+                handle.write(output)
+        with open(path, 'rb') as handle:
+            self.assertEqual(output, handle.read())
+
+    def test_card_receipt(self):
+        self.assertGolden('receipt_card.escpos', render_receipt_escpos(receipt_data()))
+
+    def test_installment_receipt_with_discount(self):
+        output = render_receipt_escpos(receipt_data(
+            payment_method='installment', installments=3,
+            discount_amount=Decimal('10.00'), total_ttc=Decimal('113.00'),
+            store=STORES['ville_avray']
+        ))
+        self.assertGolden('receipt_installment_discount.escpos', output)
+
+    def test_stream_structure(self):
+        output = render_receipt_escpos(receipt_data())
+        self.assertTrue(output.startswith(INIT))
+        self.assertTrue(output.endswith(CUT))
+        self.assertIn('€'.encode('cp858'), output)
+        self.assertIn('Hélène Müller'.encode('cp858'), output)
+        self.assertIn(b'Paiement: Carte bancaire', output)
+        for text in output.split(b'\n'):
+            printable = bytes(b for b in text if b >= 0x20)
+            self.assertLessEqual(len(printable), 48 + 3)  # Commandes ESC/GS + 48 colonnes
+
+    @benchmark
+    def test_render_time(self):
+        data = receipt_data()
+        count = 2000
+        began = time.perf_counter()
+        for _ in range(count):
+            render_receipt_escpos(data)
+        per_ticket = (time.perf_counter() - began) / count * 1e6
+        report(f"Ticket ESC/POS: {per_ticket:.0f} µs par ticket")
+        self.assertLess(per_ticket, 5000)
+
+
+class EscPosEndpointTest(TestCase):
+    def setUp(self):
+        self.api = APIClient()
+        self.user = User.objects.create_user(username='caisse', email='caisse@test.com', password='pass1234')
+        self.api.force_authenticate(user=self.user)
+        customer = Client.objects.create(first_name='Marie', last_name='Curie', phone='0612345678')
+        order = Order.objects.create(
+            client=customer, user=self.user, store='garches', payment_method='cash',
+            subtotal_ht=Decimal('10.00'), total_tva=Decimal('2.00'), total_ttc=Decimal('12.00')
+        )
+        OrderItem.objects.create(
+            order=order, description='Gonflage', quantity=1, unit_price_ht=Decimal('10.00'),
+            unit_price_ttc=Decimal('12.00'), tva_rate=Decimal('20.00'),
+            subtotal_ht=Decimal('10.00'), subtotal_ttc=Decimal('12.00')
+        )
+        self.invoice = Invoice.objects.create(order=order)
+
+    def test_download_receipt_escpos(self):
+        response = self.api.get(
+            f'/api/invoices/{self.invoice.id}/download_receipt/', {'output': 'escpos'}, secure=True
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/octet-stream')
+        self.assertIn('attachment', response['Content-Disposition'])
+        self.assertTrue(response.content.startswith(INIT))
+        self.assertIn(b'Paiement: Esp', response.content)
+
+        self.invoice.refresh_from_db()
+        self.assertFalse(self.invoice.receipt_pdf)  # Aucun PDF rendu
+
+    def test_print_receipt_escpos(self):
+        response = self.api.post(
+            f'/api/invoices/{self.invoice.id}/print_receipt/?output=escpos', secure=True
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('inline', response['Content-Disposition'])
+        self.assertTrue(response.content.endswith(CUT))
+
+    def test_unknown_output(self):
+        response = self.api.get(
+            f'/api/invoices/{self.invoice.id}/download_receipt/', {'output': 'zpl'}, secure=True
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,125 @@
+"""
+Tests de l'analyse des stocks
+Classes ABC/XYZ, rotation, couverture, stock dormant, endpoint paginé et
+rapport de stock calculé par agrégats
+"""
+import io
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+import numpy as np
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from analytics.inventory import InventoryAnalyticsService, abc_classes, xyz_classes
+from analytics.models import InventoryClassification
+from clients.models import Client
+from orders.models import Order, OrderItem
+from products.models import Category, Product
+from suppliers.utils import StockChecker
+
+User = get_user_model()
+
+PARIS = ZoneInfo('Europe/Paris')
+TODAY = date(2026, 6, 15)
+
+
+class InventoryAnalyticsTest(TestCase):
+    def setUp(self):
+        self.api = APIClient()
+        self.user = User.objects.create_user(username='gerant', email='gerant@test.com', password='pass1234')
+        self.api.force_authenticate(user=self.user)
+        self.customer = Client.objects.create(first_name='Marie', last_name='Curie', phone='0612345678')
+        self.parts = Category.objects.create(name='Pièces')
+        self.bike = self._product('Vélo', 'VE-1', '800.00', garches=4)
+        self.chain = self._product('Chaîne', 'CH-1', '20.00', garches=30, category=self.parts)
+        self.bell = self._product('Sonnette', 'SO-1', '5.00', garches=12, ville_avray=0)
+
+    def _product(self, name, reference, price, garches=0, ville_avray=0, category=None):
+        return Product.objects.create(
+            name=name, reference=reference, category=category, alert_stock=5,
+            price_ht=Decimal(price), price_ttc=Decimal(price) * Decimal('1.2'),
+            stock_garches=garches, stock_ville_avray=ville_avray,
+        )
+
+    def _sale(self, product, day, quantity, store='garches'):
+        order = Order.objects.create(client=self.customer, user=self.user, store=store, status='completed')
+        OrderItem.objects.create(
+            order=order, product=product, quantity=quantity, unit_price_ht=product.price_ht,
+            unit_price_ttc=product.price_ttc, tva_rate=Decimal('20.00')
+        )
+        Order.objects.filter(pk=order.pk).update(created_at=datetime(day.year, day.month, day.day, 12, tzinfo=PARIS))
+
+    def test_classification_helpers(self):
+        revenue = np.array([700.0, 150.0, 100.0, 50.0, 0.0])
+        self.assertEqual(abc_classes(revenue).tolist(), ['A', 'A', 'B', 'C', 'C'])
+        classes, cv = xyz_classes(np.array([[5.0] * 12, [0.0] * 11 + [12.0], [0.0] * 12]))
+        self.assertEqual(classes.tolist(), ['X', 'Z', 'Z'])
+        self.assertTrue(np.isnan(cv[2]))
+
+    def test_refresh(self):
+        for month in range(1, 7):
+            self._sale(self.chain, date(2026, month, 5), 10)          # Demande régulière
+        self._sale(self.bike, date(2026, 3, 10), 8)                   # Gros CA, ponctuel
+        self._sale(self.bell, date(2025, 9, 1), 1)                    # Plus vendu depuis 6 mois
+
+        with CaptureQueriesContext(connection) as ctx:
+            rows = InventoryAnalyticsService.refresh(TODAY)
+        self.assertEqual(rows, 6)
+        self.assertLessEqual(len(ctx.captured_queries), 8)
+
+        bike = InventoryClassification.objects.get(product=self.bike, store='garches')
+        chain = InventoryClassification.objects.get(product=self.chain, store='garches')
+        bell = InventoryClassification.objects.get(product=self.bell, store='garches')
+        self.assertEqual((bike.abc_class, bike.xyz_class), ('A', 'Z'))
+        self.assertEqual((chain.abc_class, chain.units_sold), ('B', 60))
+        self.assertEqual(chain.turnover, 2.0)
+        self.assertAlmostEqual(chain.days_of_cover, 182.4, delta=1)
+        self.assertEqual((bike.stock_status, bike.stock_value), ('low', Decimal('3200.00')))
+        self.assertTrue(bell.is_dead_stock)
+        self.assertFalse(chain.is_dead_stock)
+        self.assertEqual(InventoryClassification.objects.get(product=self.bell, store='ville_avray').stock_status, 'out')
+
+        # Produit désactivé : retiré au recalcul suivant
+        Product.objects.filter(pk=self.bell.pk).update(is_active=False)
+        call_command('refresh_inventory_analytics', stdout=io.StringIO())
+        self.assertFalse(InventoryClassification.objects.filter(product=self.bell).exists())
+
+    def test_inventory_endpoint(self):
+        self._sale(self.chain, date.today() - timedelta(days=3), 10)
+
+        response = self.api.get('/api/analytics/inventory/', {'store': 'garches', 'page_size': 2}, secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(len(response.data['products']), 2)
+        self.assertIsNotNone(response.data['next'])
+        self.assertEqual(response.data['products'][0]['name'], 'Chaîne')
+        self.assertEqual(response.data['summary']['dead_stock_count'], 2)
+
+        response = self.api.get('/api/analytics/inventory/', {'dead': '1', 'ordering': '-stock_value'}, secure=True)
+        self.assertEqual([row['reference'] for row in response.data['products']], ['VE-1', 'SO-1'])
+
+        response = self.api.get('/api/analytics/inventory/', {'ordering': 'name'}, secure=True)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_stock_report_uses_aggregates(self):
+        with CaptureQueriesContext(connection) as ctx:
+            report = StockChecker.generate_stock_report(Product.objects.all(), 'garches')
+        self.assertEqual(len(ctx.captured_queries), 3)
+        self.assertEqual(report['total_products'], 3)
+        self.assertEqual((report['low_stock_products'], report['out_of_stock_products']), (1, 0))
+        self.assertEqual(report['total_stock_value'], 3860.0)
+        self.assertEqual(report['categories']['Pièces'], {'count': 1, 'stock_value': 600.0, 'low_stock': 0})
+        self.assertEqual(report['alerts'][0]['product_id'], self.bike.pk)
+
+        report = StockChecker.generate_stock_report(Product.objects.all(), 'ville_avray')
+        self.assertEqual(report['out_of_stock_products'], 3)
+        self.assertEqual(report['alerts'][0]['severity'], 'critical')
+
+        response = self.api.get('/api/suppliers/purchase-orders/stock_check/', {'store': 'garches'}, secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_products'], 3)
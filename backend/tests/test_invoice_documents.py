@@ -0,0 +1,115 @@
+"""
+Tests du pré-rendu des PDF de facture après la caisse
+Le rendu ne doit jamais s'exécuter pendant la requête de création de commande
+"""
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from products.models import Product
+from clients.models import Client
+from invoices.models import Invoice
+from analytics.rollups import DashboardRollupService
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def fake_receipt(self, save=True, **kwargs):
+    self.receipt_pdf.save(f'ticket_{self.invoice_number}.pdf', ContentFile(b'%PDF-ticket'), save=save)
+    return True
+
+
+def fake_invoice(self, save=True, **kwargs):
+    self.invoice_pdf.save(f'facture_{self.invoice_number}.pdf', ContentFile(b'%PDF-facture'), save=save)
+    return True
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, INVOICE_PDF_WORKERS=0)
+@mock.patch.object(Invoice, 'generate_invoice', fake_invoice)
+@mock.patch.object(Invoice, 'generate_receipt', fake_receipt)
+class InvoiceDocumentPipelineTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.api = APIClient()
+        self.user = User.objects.create_user(username='caisse', email='caisse@test.com', password='pass1234')
+        self.api.force_authenticate(user=self.user)
+        self.customer = Client.objects.create(first_name='Test', last_name='Client', phone='0612345678')
+        self.product = Product.objects.create(
+            reference='PDF-1', name='Chambre à air', price_ht=Decimal('10.00'),
+            price_ttc=Decimal('12.00'), stock_ville_avray=10
+        )
+
+    def _checkout(self, execute_on_commit):
+        with self.captureOnCommitCallbacks(execute=execute_on_commit) as callbacks:
+            response = self.api.post('/api/orders/', {
+                'client': self.customer.id,
+                'store': 'ville_avray',
+                'items': [{'product': self.product.id, 'quantity': 1, 'unit_price': '12.00',
+                           'unit_price_ht': '10.00', 'unit_price_ttc': '12.00'}],
+            }, format='json', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        # Seul le rendu des PDF nous intéresse (pas le recalcul des statistiques)
+        callbacks = [callback for callback in callbacks if callback is not DashboardRollupService._flush]
+        return Invoice.objects.get(order_id=response.data['id']), callbacks
+
+    def _download(self, invoice, kind='receipt'):
+        return self.api.get(f'/api/invoices/{invoice.id}/download_{kind}/', secure=True)
+
+    def test_checkout_does_not_render_in_request(self):
+        with mock.patch('invoices.documents.InvoiceDocumentService.render_documents') as render:
+            invoice, callbacks = self._checkout(execute_on_commit=False)
+            render.assert_not_called()
+
+        self.assertEqual(invoice.pdf_status, 'pending')
+        self.assertEqual(len(callbacks), 1)
+
+    def test_download_is_pending_until_rendered(self):
+        invoice, callbacks = self._checkout(execute_on_commit=False)
+
+        response = self._download(invoice)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], 'pending')
+        self.assertEqual(response['Retry-After'], '1')
+
+        callbacks[0]()
+        invoice.refresh_from_db()
+        self.assertEqual(invoice.pdf_status, 'ready')
+
+        response = self._download(invoice, 'invoice')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-facture')
+
+    def test_documents_ready_after_commit(self):
+        invoice, _ = self._checkout(execute_on_commit=True)
+        invoice.refresh_from_db()
+        self.assertEqual(invoice.pdf_status, 'ready')
+        self.assertTrue(invoice.receipt_pdf.name.endswith('.pdf'))
+        self.assertTrue(invoice.invoice_pdf.name.endswith('.pdf'))
+
+    def test_stale_pending_renders_inline(self):
+        invoice, _ = self._checkout(execute_on_commit=False)
+        Invoice.objects.filter(pk=invoice.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+
+        response = self._download(invoice)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-ticket')
+
+    def test_render_failure_is_recorded(self):
+        invoice, callbacks = self._checkout(execute_on_commit=False)
+        with mock.patch.object(Invoice, 'generate_invoice', side_effect=RuntimeError('ReportLab')):
+            callbacks[0]()
+        invoice.refresh_from_db()
+        self.assertEqual(invoice.pdf_status, 'failed')
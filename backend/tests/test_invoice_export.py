@@ -0,0 +1,130 @@
+"""
+Tests de l'export ZIP des factures d'une période
+Réutilisation des PDF existants, rendu parallèle des manquants et
+archive produite par morceaux
+"""
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+from datetime import date
+from decimal import Decimal
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from products.models import Product
+from clients.models import Client
+from orders.models import Order, OrderItem
+from invoices.models import Invoice
+from invoices.export import InvoiceExportService
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, INVOICE_EXPORT_WORKERS=0)
+class InvoiceExportTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.api = APIClient()
+        self.user = User.objects.create_user(username='compta', email='compta@test.com', password='pass1234')
+        self.api.force_authenticate(user=self.user)
+        self.customer = Client.objects.create(first_name='Marie', last_name='Curie', phone='0612345678')
+        self.product = Product.objects.create(
+            reference='EXP-1', name='Casque', price_ht=Decimal('50.00'), price_ttc=Decimal('60.00')
+        )
+        self.september = [self._invoice('garches', date(2026, 9, day)) for day in (1, 15, 30)]
+        self.other_store = self._invoice('ville_avray', date(2026, 9, 10))
+        self.october = self._invoice('garches', date(2026, 10, 1))
+
+        # Facture déjà générée : reprise telle quelle
+        self.existing = self.september[1]
+        self.existing.invoice_pdf.save('facture_existante.pdf', ContentFile(b'%PDF-existante'))
+
+    def _invoice(self, store, day):
+        order = Order.objects.create(
+            client=self.customer, user=self.user, store=store,
+            subtotal_ht=Decimal('50.00'), total_tva=Decimal('10.00'), total_ttc=Decimal('60.00')
+        )
+        OrderItem.objects.create(
+            order=order, product=self.product, quantity=1, unit_price_ht=Decimal('50.00'),
+            unit_price_ttc=Decimal('60.00'), tva_rate=Decimal('20.00'),
+            subtotal_ht=Decimal('50.00'), subtotal_ttc=Decimal('60.00')
+        )
+        invoice = Invoice.objects.create(order=order)
+        Invoice.objects.filter(pk=invoice.pk).update(invoice_date=day)
+        invoice.refresh_from_db()
+        return invoice
+
+    def _export(self, **params):
+        return self.api.get('/api/invoices/export/', {
+            'date_from': '2026-09-01', 'date_to': '2026-09-30', **params
+        }, secure=True)
+
+    def test_export_streams_period_archive(self):
+        existing_name = self.existing.invoice_pdf.name
+        response = self._export(store='garches')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        self.assertIn('factures_garches_20260901_20260930.zip', response['Content-Disposition'])
+
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        names = sorted(archive.namelist())
+        self.assertEqual(names, sorted(f'facture_{i.invoice_number}.pdf' for i in self.september))
+        self.assertEqual(archive.read(f'facture_{self.existing.invoice_number}.pdf'), b'%PDF-existante')
+        for invoice in (self.september[0], self.september[2]):
+            self.assertTrue(archive.read(f'facture_{invoice.invoice_number}.pdf').startswith(b'%PDF-1.'))
+            invoice.refresh_from_db()
+            self.assertTrue(invoice.invoice_pdf)  # Conservé pour les prochains téléchargements
+
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.invoice_pdf.name, existing_name)
+
+    def test_export_all_stores(self):
+        response = self._export()
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(len(archive.namelist()), 4)
+
+    def test_invalid_parameters(self):
+        self.assertEqual(
+            self.api.get('/api/invoices/export/', {'date_from': '2026-09-01'}, secure=True).status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+        self.assertEqual(
+            self._export(date_from='2026-10-01').status_code, status.HTTP_400_BAD_REQUEST
+        )
+        self.assertEqual(self._export(store='paris').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_archive_is_produced_file_by_file(self):
+        documents = [(f'doc{i}.pdf', os.urandom(2048)) for i in range(5)]
+        chunks = list(InvoiceExportService.stream_zip(iter(documents)))
+        self.assertGreaterEqual(len(chunks), len(documents))
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(chunks)))
+        self.assertEqual(archive.read('doc3.pdf'), documents[3][1])
+
+    def test_missing_invoices_rendered_in_process_pool(self):
+        invoices = InvoiceExportService.get_invoices(date(2026, 9, 1), date(2026, 9, 30))
+        documents = dict(InvoiceExportService.iter_documents(invoices, workers=2))
+
+        self.assertEqual(len(documents), 4)
+        self.assertEqual(documents[f'facture_{self.existing.invoice_number}.pdf'], b'%PDF-existante')
+        self.assertEqual(Invoice.objects.filter(invoice_date__month=9).exclude(invoice_hash='').count(), 3)
+
+    def test_management_command(self):
+        output = os.path.join(MEDIA_ROOT, 'export.zip')
+        call_command(
+            'export_invoices', '--from', '2026-10-01', '--to', '2026-10-31',
+            '--output', output, '--workers', '0', stdout=io.StringIO()
+        )
+        with zipfile.ZipFile(output) as archive:
+            self.assertEqual(archive.namelist(), [f'facture_{self.october.invoice_number}.pdf'])
@@ -0,0 +1,124 @@
+"""
+Tests du rendu des tickets et factures
+Styles et logo préparés une seule fois, aucun accès réseau, pas de nouveau
+rendu tant que les données de la commande n'ont pas changé
+"""
+import shutil
+import socket
+import tempfile
+import time
+from decimal import Decimal
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from products.models import Product
+from clients.models import Client
+from orders.models import Order, OrderItem
+from invoices.models import Invoice
+from invoices import rendering
+from tests.benchmarks import benchmark, report
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def no_network(*args, **kwargs):
+    raise AssertionError('Accès réseau pendant le rendu')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class InvoiceRenderingTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.api = APIClient()
+        self.user = User.objects.create_user(username='caisse', email='caisse@test.com', password='pass1234')
+        self.api.force_authenticate(user=self.user)
+        self.customer = Client.objects.create(
+            first_name='Marie', last_name='Curie', phone='0612345678',
+            address='1 rue des Vélos', postal_code='92380', city='Garches'
+        )
+        self.product = Product.objects.create(
+            reference='RND-1', name='Pneu route', price_ht=Decimal('25.00'), price_ttc=Decimal('30.00')
+        )
+        self.order = Order.objects.create(
+            client=self.customer, user=self.user, store='garches', payment_method='card',
+            subtotal_ht=Decimal('35.00'), total_tva=Decimal('7.00'), total_ttc=Decimal('42.00')
+        )
+        OrderItem.objects.create(
+            order=self.order, product=self.product, quantity=1, unit_price_ht=Decimal('25.00'),
+            unit_price_ttc=Decimal('30.00'), tva_rate=Decimal('20.00'),
+            subtotal_ht=Decimal('25.00'), subtotal_ttc=Decimal('30.00')
+        )
+        # Ligne de prestation sans produit
+        OrderItem.objects.create(
+            order=self.order, product=None, description='Réglage freins', quantity=1,
+            unit_price_ht=Decimal('10.00'), unit_price_ttc=Decimal('12.00'), tva_rate=Decimal('20.00'),
+            subtotal_ht=Decimal('10.00'), subtotal_ttc=Decimal('12.00')
+        )
+        self.invoice = Invoice.objects.create(order=self.order)
+
+    def test_renders_offline_with_local_logo(self):
+        with mock.patch.object(socket, 'create_connection', no_network), \
+                mock.patch.object(socket.socket, 'connect', no_network):
+            self.assertTrue(self.invoice.generate_invoice())
+            self.assertTrue(self.invoice.generate_receipt())
+
+        for field in (self.invoice.invoice_pdf, self.invoice.receipt_pdf):
+            with field.open('rb') as handle:
+                self.assertTrue(handle.read().startswith(b'%PDF'))
+        self.assertEqual(len(self.invoice.invoice_hash), 64)
+
+    def test_styles_and_logo_are_built_once(self):
+        self.assertIs(rendering.invoice_styles(), rendering.invoice_styles())
+        self.assertIs(rendering.receipt_styles(), rendering.receipt_styles())
+        self.assertIs(rendering.load_logo(), rendering.load_logo())
+        self.assertLessEqual(max(rendering.load_logo().getSize()), rendering.LOGO_MAX_PIXELS)
+
+    def test_unchanged_invoice_is_not_rendered_again(self):
+        self.invoice.generate_invoice()
+        first_name = self.invoice.invoice_pdf.name
+
+        with mock.patch('invoices.models.render_invoice', side_effect=AssertionError('nouveau rendu')):
+            response = self.api.get(f'/api/invoices/{self.invoice.id}/download_invoice/', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.invoice_pdf.name, first_name)
+
+    def test_changed_order_is_rendered_again(self):
+        self.invoice.generate_invoice()
+        previous = self.invoice.invoice_hash
+
+        Order.objects.filter(pk=self.order.pk).update(notes='Livraison samedi')
+        self.invoice.refresh_from_db()
+        self.assertTrue(self.invoice.generate_invoice())
+        self.assertNotEqual(self.invoice.invoice_hash, previous)
+        self.assertFalse(self.invoice.generate_invoice())
+
+    @benchmark
+    def test_rendering_throughput(self):
+        data = rendering.invoice_document_data(self.invoice)
+        rendering.render_invoice(data)  # Préchauffage : styles et logo
+
+        count = 30
+        began = time.perf_counter()
+        for _ in range(count):
+            rendering.render_invoice(data)
+        invoice_elapsed = time.perf_counter() - began
+
+        began = time.perf_counter()
+        for _ in range(count):
+            rendering.render_receipt(data)
+        receipt_elapsed = time.perf_counter() - began
+
+        report(
+            f"Rendu PDF: {count / invoice_elapsed:.1f} factures/s, "
+            f"{count / receipt_elapsed:.1f} tickets/s"
+        )
+        self.assertGreater(count / invoice_elapsed, 1)
@@ -0,0 +1,119 @@
+"""
+Benchmark du nombre de requêtes pour l'écriture groupée des lignes
+Le nombre de requêtes d'une création de commande/devis doit rester constant
+quel que soit le nombre de lignes
+"""
+from decimal import Decimal
+from datetime import date, timedelta
+from django.test import TestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from products.models import Product, Category
+from clients.models import Client
+from orders.models import Order
+from quotes.models import Quote
+from utils.line_items import apply_stock_changes
+
+User = get_user_model()
+
+LINE_COUNTS = [1, 5, 25]
+
+
+class LineItemWriterBenchmark(TestCase):
+    def setUp(self):
+        self.api = APIClient()
+        self.user = User.objects.create_user(username='vendeur', email='vendeur@test.com', password='pass1234')
+        self.api.force_authenticate(user=self.user)
+
+        category = Category.objects.create(name='Pièces')
+        self.products = [
+            Product.objects.create(
+                reference=f'REF-{i:03d}',
+                name=f'Produit {i}',
+                price_ht=Decimal('16.66'),
+                price_ttc=Decimal('19.99'),
+                category=category,
+                stock_ville_avray=100,
+                stock_garches=100,
+            )
+            for i in range(max(LINE_COUNTS))
+        ]
+        self.customer = Client.objects.create(first_name='Test', last_name='Client', phone='0612345678')
+
+    def _order_payload(self, line_count):
+        return {
+            'client': self.customer.id,
+            'store': 'ville_avray',
+            'payment_method': 'card',
+            'items': [
+                {'product': product.id, 'quantity': 3, 'unit_price': '19.99',
+                 'unit_price_ht': '16.66', 'unit_price_ttc': '19.99'}
+                for product in self.products[:line_count]
+            ],
+        }
+
+    def _quote_payload(self, line_count):
+        return {
+            'client': self.customer.id,
+            'store': 'garches',
+            'valid_until': (date.today() + timedelta(days=30)).isoformat(),
+            'items': [
+                {'product': product.id, 'quantity': 2}
+                for product in self.products[:line_count]
+            ],
+        }
+
+    def _measure(self, url, payload):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.api.post(url, payload, format='json', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        return len(ctx.captured_queries)
+
+    def test_order_query_count_is_constant(self):
+        # Premier document du jour : création des compteurs de numérotation
+        self._measure('/api/orders/', self._order_payload(1))
+        counts = {n: self._measure('/api/orders/', self._order_payload(n)) for n in LINE_COUNTS}
+        self.assertEqual(len(set(counts.values())), 1, counts)
+
+    def test_quote_query_count_is_constant(self):
+        self._measure('/api/quotes/', self._quote_payload(1))
+        counts = {n: self._measure('/api/quotes/', self._quote_payload(n)) for n in LINE_COUNTS}
+        self.assertEqual(len(set(counts.values())), 1, counts)
+
+    def test_order_totals_use_exact_decimal(self):
+        self._measure('/api/orders/', self._order_payload(3))
+        order = Order.objects.get()
+
+        self.assertEqual(order.subtotal_ht, Decimal('149.94'))
+        self.assertEqual(order.total_ttc, Decimal('179.91'))
+        self.assertEqual(order.total_tva, Decimal('29.97'))
+        self.assertEqual(
+            sorted(order.items.values_list('subtotal_ttc', flat=True)),
+            [Decimal('59.97')] * 3
+        )
+
+        for product in self.products[:3]:
+            product.refresh_from_db()
+            self.assertEqual(product.stock_ville_avray, 97)
+            self.assertEqual(product.stock_garches, 100)
+
+    def test_quote_does_not_touch_stock(self):
+        self._measure('/api/quotes/', self._quote_payload(2))
+        quote = Quote.objects.get()
+        self.assertEqual(quote.items.count(), 2)
+        self.assertEqual(quote.total_ttc, Decimal('79.96'))
+        self.assertFalse(Product.objects.exclude(stock_garches=100).exists())
+
+    def test_apply_stock_changes_single_statement(self):
+        deltas = {product.id: -(i + 1) for i, product in enumerate(self.products[:10])}
+        with CaptureQueriesContext(connection) as ctx:
+            updated = apply_stock_changes('garches', deltas)
+        self.assertEqual(updated, 10)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(
+            list(Product.objects.filter(id__in=deltas).order_by('id').values_list('stock_garches', flat=True)),
+            [100 - (i + 1) for i in range(10)]
+        )
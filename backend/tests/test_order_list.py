@@ -0,0 +1,99 @@
+"""
+Tests de la liste résumée des commandes
+Le nombre de requêtes de la liste doit être indépendant de la taille de page
+"""
+from decimal import Decimal
+from django.test import TestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from products.models import Product, Category
+from clients.models import Client
+from orders.models import Order, OrderItem
+from invoices.models import Invoice
+
+User = get_user_model()
+
+
+class OrderListTest(TestCase):
+    def setUp(self):
+        self.api = APIClient()
+        self.user = User.objects.create_user(username='vendeur', email='vendeur@test.com', password='pass1234')
+        self.api.force_authenticate(user=self.user)
+        category = Category.objects.create(name='Accessoires')
+        self.products = [
+            Product.objects.create(
+                reference=f'LST-{i}', name=f'Produit {i}', category=category,
+                price_ht=Decimal('10.00'), price_ttc=Decimal('12.00')
+            )
+            for i in range(3)
+        ]
+        self.customer = Client.objects.create(first_name='Marie', last_name='Curie', phone='0612345678')
+        self.sequence = 0
+
+    def _create_orders(self, count):
+        for _ in range(count):
+            self.sequence += 1
+            order = Order.objects.create(
+                order_number=f'CMD-TEST-{self.sequence:04d}', client=self.customer, user=self.user,
+                store='garches', status='completed', total_ttc=Decimal('36.00')
+            )
+            OrderItem.objects.bulk_create([
+                OrderItem(
+                    order=order, product=product, quantity=1, unit_price_ht=Decimal('10.00'),
+                    unit_price_ttc=Decimal('12.00'), tva_rate=Decimal('20.00'),
+                    subtotal_ht=Decimal('10.00'), subtotal_ttc=Decimal('12.00')
+                )
+                for product in self.products
+            ])
+            Invoice.objects.create(order=order, invoice_number=f'FACT-TEST-{self.sequence:04d}')
+
+    def _list(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.api.get('/api/orders/', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, len(ctx.captured_queries)
+
+    def test_list_query_count_is_constant(self):
+        self._create_orders(5)
+        _, small = self._list()
+        self._create_orders(45)
+        response, large = self._list()
+
+        self.assertEqual(len(response.data['results']), 50)
+        self.assertEqual(small, large)
+
+    def test_list_uses_summary_representation(self):
+        self._create_orders(1)
+        response, _ = self._list()
+        order = response.data['results'][0]
+
+        self.assertEqual(order['client_name'], 'Marie Curie')
+        self.assertEqual(order['items_count'], 3)
+        self.assertEqual(order['invoice_number'], 'FACT-TEST-0001')
+        self.assertEqual(order['items'][0]['product'], {
+            'id': self.products[0].id, 'reference': 'LST-0', 'name': 'Produit 0'
+        })
+        self.assertNotIn('invoice', order)
+
+    def test_retrieve_keeps_full_serializer(self):
+        self._create_orders(1)
+        order = Order.objects.get()
+        response = self.api.get(f'/api/orders/{order.id}/', secure=True)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['invoice']['invoice_number'], 'FACT-TEST-0001')
+        self.assertEqual(response.data['items'][0]['product']['category_name'], 'Accessoires')
+
+    def test_cursor_mode_on_summary_list(self):
+        self._create_orders(12)
+        response = self.api.get('/api/orders/', {'cursor': '', 'page_size': 5}, secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertEqual(response.data['results'][0]['items_count'], 3)
+
+        second = self.api.get(response.data['next'], secure=True).data
+        ids = [o['id'] for o in response.data['results'] + second['results']]
+        self.assertEqual(ids, list(Order.objects.order_by('-created_at', '-id').values_list('id', flat=True)[:10]))
@@ -0,0 +1,180 @@
+"""
+Tests de la synchronisation des tickets hors ligne des caisses
+Déduplication par client_uuid, résultat par ticket et insertions groupées
+"""
+import time
+import uuid
+from decimal import Decimal
+from unittest import mock
+from datetime import date
+from django.test import TestCase
+from django.utils import timezone
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from products.models import Product
+from clients.models import Client
+from orders.models import Order, OrderItem
+from orders.services import OrderSyncService
+from analytics.rollups import DashboardRollupService
+from invoices.models import Invoice
+from tests.benchmarks import report
+
+User = get_user_model()
+
+SYNC_URL = '/api/orders/sync/'
+
+
+class OrderSyncTest(TestCase):
+    def setUp(self):
+        self.api = APIClient()
+        self.user = User.objects.create_user(username='caisse', email='caisse@test.com', password='pass1234')
+        self.api.force_authenticate(user=self.user)
+        self.customer = Client.objects.create(first_name='Test', last_name='Client', phone='0612345678')
+        self.products = [
+            Product.objects.create(
+                reference=f'SYNC-{i}', name=f'Produit {i}', price_ht=Decimal('10.00'),
+                price_ttc=Decimal('12.00'), stock_ville_avray=1000, stock_garches=1000
+            )
+            for i in range(5)
+        ]
+
+    def _ticket(self, product=None, quantity=1, store='ville_avray', **extra):
+        ticket = {
+            'client_uuid': str(uuid.uuid4()),
+            'client': self.customer.id,
+            'store': store,
+            'payment_method': 'card',
+            'sold_at': '2026-10-16T15:30:00+02:00',
+            'items': [{
+                'product': (product or self.products[0]).id, 'quantity': quantity,
+                'unit_price': '12.00', 'unit_price_ht': '10.00', 'unit_price_ttc': '12.00',
+            }],
+        }
+        ticket.update(extra)
+        return ticket
+
+    def _sync(self, tickets):
+        response = self.api.post(SYNC_URL, {'tickets': tickets}, format='json', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return response.data
+
+    def test_batch_is_created_with_bulk_inserts(self):
+        tickets = [self._ticket(self.products[i % 5]) for i in range(300)]
+
+        began = time.perf_counter()
+        with CaptureQueriesContext(connection) as ctx:
+            data = self._sync(tickets)
+        elapsed = time.perf_counter() - began
+        report(f"Synchronisation de 300 tickets: {elapsed:.2f}s, {len(ctx.captured_queries)} requêtes")
+
+        self.assertEqual(data['summary'], {'created': 300})
+        self.assertEqual(Order.objects.count(), 300)
+        self.assertEqual(OrderItem.objects.count(), 300)
+        self.assertEqual(Invoice.objects.filter(pdf_status='pending').count(), 300)
+        # Nombre de requêtes par paquet indépendant du nombre de tickets
+        self.assertLess(len(ctx.captured_queries), 60)
+
+        self.products[0].refresh_from_db()
+        self.assertEqual(self.products[0].stock_ville_avray, 940)
+
+        order = Order.objects.get(client_uuid=tickets[0]['client_uuid'])
+        self.assertEqual(order.status, 'completed')
+        self.assertEqual(order.total_ttc, Decimal('12.00'))
+        self.assertEqual(order.completed_at.isoformat(), '2026-10-16T13:30:00+00:00')
+
+    def test_retry_is_deduplicated(self):
+        tickets = [self._ticket() for _ in range(3)]
+        first = self._sync(tickets)
+        second = self._sync(tickets + [tickets[0]])
+
+        self.assertEqual(second['summary'], {'duplicate': 4})
+        self.assertEqual(
+            [r['order_id'] for r in second['results'][:3]],
+            [r['order_id'] for r in first['results']]
+        )
+        self.assertEqual(Order.objects.count(), 3)
+        self.products[0].refresh_from_db()
+        self.assertEqual(self.products[0].stock_ville_avray, 997)
+
+    def test_concurrent_resend_reports_duplicates(self):
+        tickets = [self._ticket() for _ in range(2)]
+        first = self._sync(tickets[:1])
+        lookup = OrderSyncService.existing_tickets
+        calls = []
+
+        def racing_lookup(client_uuids):
+            # Premier passage : l'autre envoi n'est pas encore visible
+            calls.append(client_uuids)
+            return {} if len(calls) == 1 else lookup(client_uuids)
+
+        with mock.patch.object(OrderSyncService, 'existing_tickets', side_effect=racing_lookup):
+            data = self._sync(tickets)
+
+        self.assertEqual(len(calls), 2)  # Paquet rejoué après l'IntegrityError
+        self.assertEqual([r['status'] for r in data['results']], ['duplicate', 'created'])
+        self.assertEqual(data['results'][0]['order_id'], first['results'][0]['order_id'])
+        self.assertEqual(Order.objects.count(), 2)
+        self.products[0].refresh_from_db()
+        self.assertEqual(self.products[0].stock_ville_avray, 998)
+
+    def test_offline_sale_is_dated_on_sale_day(self):
+        tickets = [
+            self._ticket(sold_at='2026-10-16T23:30:00+02:00'),
+            self._ticket(sold_at='2026-10-14T09:00:00+02:00'),
+        ]
+        with mock.patch.object(DashboardRollupService, 'mark_dirty') as mark_dirty:
+            data = self._sync(tickets)
+
+        late, older = (Order.objects.get(pk=result['order_id']) for result in data['results'])
+        self.assertEqual(late.created_at.isoformat(), '2026-10-16T21:30:00+00:00')
+        self.assertTrue(late.order_number.endswith('20261016-0001'), late.order_number)
+        self.assertTrue(older.order_number.endswith('20261014-0001'), older.order_number)
+        self.assertEqual(
+            {timezone.localdate(value) for value in mark_dirty.call_args.args},
+            {date(2026, 10, 16), date(2026, 10, 14)}
+        )
+
+    def test_failed_ticket_can_be_resent_in_same_request(self):
+        ticket = self._ticket(client=999999)
+        fixed = {**ticket, 'client': self.customer.id}
+        results = OrderSyncService.sync([ticket, fixed], self.user, chunk_size=1)
+        self.assertEqual([r['status'] for r in results], ['error', 'created'])
+
+    def test_stock_conflict_is_reported_per_ticket(self):
+        scarce = Product.objects.create(
+            reference='RARE', name='Dernier vélo', price_ht=Decimal('500.00'),
+            price_ttc=Decimal('600.00'), stock_garches=2
+        )
+        tickets = [self._ticket(scarce, store='garches') for _ in range(3)]
+        data = self._sync(tickets)
+
+        self.assertEqual([r['status'] for r in data['results']], ['created', 'created', 'conflict'])
+        conflict = data['results'][2]['lines'][0]
+        self.assertEqual((conflict['reference'], conflict['requested'], conflict['available']), ('RARE', 1, 0))
+        scarce.refresh_from_db()
+        self.assertEqual(scarce.stock_garches, 0)
+
+    def test_invalid_ticket_does_not_block_batch(self):
+        tickets = [
+            self._ticket(),
+            self._ticket(client=999999),
+            self._ticket(client_uuid='pas-un-uuid'),
+            self._ticket(items=[{'product': 999999, 'quantity': 1, 'unit_price': '1.00'}]),
+            self._ticket(),
+        ]
+        data = self._sync(tickets)
+
+        self.assertEqual(
+            [r['status'] for r in data['results']],
+            ['created', 'error', 'error', 'error', 'created']
+        )
+        self.assertEqual(data['results'][1]['error'], 'Client introuvable')
+        self.assertEqual(data['results'][3]['error'], 'Produit introuvable')
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_empty_batch_is_rejected(self):
+        response = self.api.post(SYNC_URL, {'tickets': []}, format='json', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
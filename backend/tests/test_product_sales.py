@@ -0,0 +1,145 @@
+"""
+Tests des ventes mensuelles par produit et des classements
+Recalcul limité aux mois modifiés, répartition par magasin et lecture des
+tables matérialisées par les endpoints
+"""
+import io
+from datetime import date, datetime
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from analytics.models import ProductSales, TopProduct
+from analytics.product_sales import ProductSalesService
+from analytics.tasks import product_sales_refresh
+from clients.models import Client
+from orders.models import Order, OrderItem
+from products.models import Product
+
+User = get_user_model()
+
+PARIS = ZoneInfo('Europe/Paris')
+
+
+class ProductSalesTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.api = APIClient()
+        self.user = User.objects.create_user(username='gerant', email='gerant@test.com', password='pass1234')
+        self.api.force_authenticate(user=self.user)
+        self.customer = Client.objects.create(first_name='Marie', last_name='Curie', phone='0612345678')
+        self.chain = self._product('Chaîne', 'CH-1', '20.00')
+        self.tube = self._product('Chambre à air', 'CA-1', '8.00')
+
+    def _product(self, name, reference, price):
+        return Product.objects.create(
+            name=name, reference=reference, price_ht=Decimal(price), price_ttc=Decimal(price) * Decimal('1.2')
+        )
+
+    def _order(self, when, lines, store='garches', status='completed'):
+        order = Order.objects.create(client=self.customer, user=self.user, store=store, status=status)
+        for product, quantity in lines:
+            OrderItem.objects.create(
+                order=order, product=product, quantity=quantity,
+                unit_price_ht=product.price_ht, unit_price_ttc=product.price_ttc, tva_rate=Decimal('20.00')
+            )
+        Order.objects.filter(pk=order.pk).update(created_at=when)
+        return order
+
+    def _sales(self, product, month, store='garches'):
+        return ProductSales.objects.get(product=product, store=store, year=month.year, month=month.month)
+
+    def test_monthly_sales_per_store(self):
+        self._order(datetime(2026, 5, 31, 23, 30, tzinfo=PARIS), [(self.chain, 2)])  # 21h30 UTC, mai à Paris
+        self._order(datetime(2026, 6, 3, 12, tzinfo=PARIS), [(self.chain, 1), (self.tube, 3)])
+        self._order(datetime(2026, 6, 4, 12, tzinfo=PARIS), [(self.chain, 1)], store='ville_avray')
+        self._order(datetime(2026, 6, 5, 12, tzinfo=PARIS), [(self.chain, 9)], status='cancelled')
+
+        months = ProductSalesService.refresh()
+
+        self.assertEqual(months, [date(2026, 5, 1), date(2026, 6, 1)])
+        may = self._sales(self.chain, date(2026, 5, 1))
+        self.assertEqual((may.quantity_sold, may.revenue, may.average_price), (2, Decimal('48.00'), Decimal('24.00')))
+        self.assertEqual(self._sales(self.chain, date(2026, 6, 1)).quantity_sold, 1)
+        self.assertEqual(self._sales(self.chain, date(2026, 6, 1), 'ville_avray').quantity_sold, 1)
+        self.assertEqual(self._sales(self.tube, date(2026, 6, 1)).revenue, Decimal('28.80'))
+
+        overall = TopProduct.objects.filter(period='monthly', date=date(2026, 6, 1), store='').order_by('rank')
+        self.assertEqual([(top.product_id, top.total_sales) for top in overall], [(self.chain.pk, 2), (self.tube.pk, 3)])
+        self.assertEqual(overall[0].market_share, Decimal('62.50'))
+        yearly = TopProduct.objects.get(period='yearly', date=date(2026, 1, 1), store='garches', rank=1)
+        self.assertEqual((yearly.product_id, yearly.total_sales), (self.chain.pk, 3))
+
+    def test_incremental_refresh_touches_changed_months(self):
+        old = self._order(datetime(2026, 1, 10, 12, tzinfo=PARIS), [(self.chain, 1)])
+        ProductSalesService.refresh()
+        ProductSales.objects.filter(year=2026, month=1).update(quantity_sold=99)  # Marqueur
+
+        recent = self._order(datetime(2026, 3, 10, 12, tzinfo=PARIS), [(self.tube, 2)])
+        self.assertEqual(ProductSalesService.refresh(), [date(2026, 3, 1)])
+        self.assertEqual(self._sales(self.chain, date(2026, 1, 1)).quantity_sold, 99)
+        self.assertEqual(ProductSalesService.refresh(), [])
+
+        # Commande annulée : la ligne du mois disparaît
+        recent.refresh_from_db()
+        recent.status = 'cancelled'
+        recent.save()
+        ProductSalesService.refresh()
+        self.assertFalse(ProductSales.objects.filter(year=2026, month=3).exists())
+        self.assertFalse(TopProduct.objects.filter(period='monthly', date=date(2026, 3, 1)).exists())
+
+        old.delete()
+        call_command('refresh_product_sales', '--full', stdout=io.StringIO())
+        self.assertFalse(ProductSales.objects.exists())
+        self.assertFalse(TopProduct.objects.exists())
+
+    def test_deleted_order_month_is_recomputed(self):
+        kept = self._order(datetime(2026, 2, 10, 12, tzinfo=PARIS), [(self.chain, 1)])
+        removed = self._order(datetime(2026, 2, 11, 12, tzinfo=PARIS), [(self.chain, 4), (self.tube, 1)])
+        self._order(datetime(2026, 4, 2, 12, tzinfo=PARIS), [(self.tube, 1)])
+        ProductSalesService.refresh()
+        self.assertEqual(self._sales(self.chain, date(2026, 2, 1)).quantity_sold, 5)
+
+        removed.refresh_from_db()  # Date de vente réécrite par _order
+        removed.delete()
+        # Aucune commande restante n'a été modifiée : seul le mois de la suppression est repris
+        self.assertEqual(product_sales_refresh(), {'months': 1})
+        self.assertEqual(self._sales(self.chain, date(2026, 2, 1)).quantity_sold, 1)
+        self.assertFalse(ProductSales.objects.filter(product=self.tube, year=2026, month=2).exists())
+        top = TopProduct.objects.filter(period='monthly', date=date(2026, 2, 1), store='')
+        self.assertEqual([row.product_id for row in top], [self.chain.pk])
+
+        Order.objects.filter(pk=kept.pk).delete()
+        self.assertEqual(ProductSalesService.refresh(), [date(2026, 2, 1)])
+        self.assertFalse(ProductSales.objects.filter(year=2026, month=2).exists())
+        self.assertEqual(ProductSalesService.refresh(), [])
+
+    def test_top_products_endpoint(self):
+        this_month = timezone.localdate().replace(day=1)
+        noon = datetime(this_month.year, this_month.month, 1, 12, tzinfo=PARIS)
+        self._order(noon, [(self.chain, 1), (self.tube, 1)])
+        self._order(noon, [(self.tube, 10)], store='ville_avray')
+        call_command('refresh_product_sales', stdout=io.StringIO())
+
+        response = self.api.get('/api/analytics/products/top/', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['reference'] for row in response.data], ['CA-1', 'CH-1'])
+        self.assertEqual(response.data[0]['quantity_sold'], 11)
+
+        response = self.api.get('/api/analytics/products/top/', {'store': 'garches', 'period': 'month'}, secure=True)
+        self.assertEqual([row['reference'] for row in response.data], ['CH-1', 'CA-1'])
+        self.assertEqual(response.data[0]['revenue'], 24.0)
+
+        response = self.api.get('/api/analytics/products/top/', {'period': 'year', 'limit': 1}, secure=True)
+        self.assertEqual([row['name'] for row in response.data], ['Chambre à air'])
+
+        response = self.api.get('/api/analytics/products/top/', {'period': 'week'}, secure=True)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.api.get('/api/analytics/dashboard/', secure=True)
+        self.assertEqual(response.data['topProducts'][0], {'name': 'Chambre à air', 'quantity': 11})
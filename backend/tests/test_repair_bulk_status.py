@@ -0,0 +1,109 @@
+"""
+Tests du changement de statut groupé des réparations (Kanban)
+Validation des transitions, écritures groupées, timeline et effets de bord
+"""
+from decimal import Decimal
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from analytics.models import DashboardStats
+from clients.models import Client
+from repairs.metrics import RepairMetricsService
+from repairs.models import Repair, RepairTimeline
+
+User = get_user_model()
+
+BULK_URL = '/api/repairs/repairs/bulk_update_status/'
+
+
+class RepairBulkStatusTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.api = APIClient()
+        self.user = User.objects.create_user(username='atelier', email='atelier@test.com', password='pass1234')
+        self.api.force_authenticate(user=self.user)
+        self.customer = Client.objects.create(first_name='Test', last_name='Client', phone='0612345678')
+
+    def _repair(self, status='pending', cost='0'):
+        return Repair.objects.create(
+            client=self.customer, store='garches', bike_brand='Trek', description='Révision', status=status,
+            final_cost=Decimal(cost), created_by=self.user
+        )
+
+    def _post(self, payload):
+        response = self.api.post(BULK_URL, payload, format='json', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return response.data
+
+    def test_moves_are_validated_and_applied(self):
+        pending = self._repair()
+        completed = self._repair(status='completed', cost='120.00')
+        delivered = self._repair(status='delivered')
+        in_progress = self._repair(status='in_progress')
+
+        data = self._post({'moves': [
+            {'id': pending.id, 'status': 'in_progress'},
+            {'id': completed.id, 'status': 'delivered'},
+            {'id': delivered.id, 'status': 'pending'},        # État final
+            {'id': in_progress.id, 'status': 'in_progress'},
+            {'id': pending.id, 'status': 'completed'},
+            {'id': 999999, 'status': 'completed'},
+            {'id': in_progress.id, 'status': 'lost'},
+        ]})
+
+        self.assertEqual(
+            [result['result'] for result in data['results']],
+            ['updated', 'updated', 'invalid', 'unchanged', 'duplicate', 'not_found', 'duplicate']
+        )
+        self.assertEqual(data['summary'], {'updated': 2, 'invalid': 1, 'unchanged': 1, 'duplicate': 2, 'not_found': 1})
+
+        pending.refresh_from_db()
+        completed.refresh_from_db()
+        delivered.refresh_from_db()
+        self.assertEqual((pending.status, completed.status, delivered.status), ('in_progress', 'delivered', 'delivered'))
+        self.assertEqual(completed.actual_completion, timezone.localdate())
+        self.assertGreater(completed.updated_at, completed.created_at)
+
+        events = RepairTimeline.objects.order_by('id')
+        self.assertEqual([(event.repair_id, event.status) for event in events],
+                         [(pending.id, 'in_progress'), (completed.id, 'delivered')])
+        self.assertEqual(events[0].created_by, self.user)
+
+        # Réparation livrée comptée dans les agrégats du client (avec celle déjà livrée)
+        self.customer.refresh_from_db()
+        self.assertEqual((self.customer.repairs_total, self.customer.repairs_count), (Decimal('120.00'), 2))
+
+    def test_single_batch_of_writes(self):
+        repairs = [self._repair() for _ in range(30)]
+        with CaptureQueriesContext(connection) as ctx:
+            data = self._post({'ids': [repair.id for repair in repairs], 'status': 'in_progress'})
+        self.assertEqual(data['summary'], {'updated': 30})
+        writes = [query['sql'] for query in ctx.captured_queries if query['sql'].startswith(('UPDATE', 'INSERT'))]
+        # Un UPDATE pour les réparations, un INSERT pour la timeline
+        self.assertEqual(len(writes), 2)
+        self.assertEqual(Repair.objects.filter(status='in_progress').count(), 30)
+        self.assertEqual(RepairTimeline.objects.count(), 30)
+
+    def test_metrics_cache_invalidated(self):
+        repair = self._repair()
+        self.assertEqual(RepairMetricsService.get()['by_status']['pending'], 1)
+        self._post({'moves': [{'id': repair.id, 'status': 'in_progress'}]})
+        self.assertEqual(RepairMetricsService.get()['by_status']['in_progress'], 1)
+
+    def test_dashboard_rollup_updated(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            repairs = [self._repair(status='in_progress', cost='50.00') for _ in range(2)]
+        with self.captureOnCommitCallbacks(execute=True):
+            self._post({'ids': [repair.id for repair in repairs], 'status': 'completed'})
+        row = DashboardStats.objects.get(period='daily', date=timezone.localdate())
+        self.assertEqual((row.total_repairs, row.completed_repairs), (2, 2))
+
+    def test_rejects_empty_or_oversized_payload(self):
+        for payload in ({}, {'moves': []}, {'moves': [{'id': 1, 'status': 'pending'}] * 501}):
+            response = self.api.post(BULK_URL, payload, format='json', secure=True)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,114 @@
+"""
+Tests du tableau Kanban de l'atelier
+Limite par colonne en une requête, totaux groupés, synchronisation ?since=
+"""
+from datetime import timedelta
+from decimal import Decimal
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from clients.models import Client
+from repairs.kanban import TOMBSTONE_DAYS, RepairKanbanService
+from repairs.models import Repair, RepairTombstone
+from repairs.tasks import purge_tombstones_daily
+
+User = get_user_model()
+
+KANBAN_URL = '/api/repairs/repairs/kanban/'
+
+
+class RepairKanbanTest(TestCase):
+    def setUp(self):
+        self.api = APIClient()
+        self.user = User.objects.create_user(username='atelier', email='atelier@test.com', password='pass1234')
+        self.api.force_authenticate(user=self.user)
+        self.customer = Client.objects.create(first_name='Test', last_name='Client', phone='0612345678')
+
+    def _repair(self, status='pending', priority='normal', store='garches', **extra):
+        return Repair.objects.create(
+            client=self.customer, store=store, bike_brand='Trek', description='Révision', status=status,
+            priority=priority, estimated_cost=Decimal('50.00'), created_by=self.user, **extra
+        )
+
+    def _column(self, data, column_id):
+        return next(column for column in data['columns'] if column['id'] == column_id)
+
+    def test_board_limits_each_column(self):
+        normal = self._repair()
+        urgent = self._repair(priority='urgent')
+        low = self._repair(priority='low')
+        self._repair(status='in_progress')
+        delivered = [self._repair(status='delivered') for _ in range(5)]
+        Repair.objects.filter(pk=delivered[0].pk).update(updated_at=timezone.now() + timedelta(minutes=1))
+        self._repair(status='delivered', store='ville_avray')
+
+        with CaptureQueriesContext(connection) as ctx:
+            board = RepairKanbanService.board(store='garches', limit=2)
+        # Cartes (fenêtre ROW_NUMBER) + totaux (COUNT groupé)
+        self.assertEqual(len(ctx.captured_queries), 2)
+
+        pending = self._column(board, 'pending')
+        self.assertEqual([card['id'] for card in pending['repairs']], [urgent.id, normal.id])
+        self.assertEqual((pending['total'], pending['has_more']), (3, True))
+        self.assertNotIn(low.id, [card['id'] for card in pending['repairs']])
+
+        done = self._column(board, 'delivered')
+        self.assertEqual(len(done['repairs']), 2)
+        self.assertEqual(done['repairs'][0]['id'], delivered[0].id)  # Dernière livraison en tête
+        self.assertEqual(done['total'], 5)
+        self.assertEqual(board['summary'], {'total_repairs': 9, 'in_progress': 4, 'completed': 5})
+
+    def test_since_returns_changes_and_tombstones(self):
+        kept = self._repair()
+        moved = self._repair()
+        removed = self._repair()
+        other_store = self._repair(store='ville_avray')
+
+        response = self.api.get(KANBAN_URL, {'store': 'garches'}, secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        since = timezone.now()
+
+        moved.status = 'in_progress'
+        moved.save()
+        removed_id = removed.pk
+        removed.delete()
+        other_store.delete()
+        self.assertEqual(RepairTombstone.objects.count(), 2)
+
+        response = self.api.get(KANBAN_URL, {'store': 'garches', 'since': since.isoformat()}, secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data
+        self.assertFalse(data['full'])
+        self.assertEqual([card['id'] for card in data['changed']], [moved.id])
+        self.assertEqual(data['changed'][0]['status'], 'in_progress')
+        self.assertEqual(data['deleted'], [removed_id])
+        self.assertEqual(data['totals'], {'pending': 1, 'in_progress': 1, 'completed': 0, 'delivered': 0})
+        self.assertNotIn(kept.id, [card['id'] for card in data['changed']])
+
+    def test_stale_since_returns_full_board(self):
+        self._repair()
+        since = (timezone.now() - timedelta(days=30)).isoformat()
+        response = self.api.get(KANBAN_URL, {'since': since}, secure=True)
+        self.assertTrue(response.data['full'])
+        self.assertEqual(len(self._column(response.data, 'pending')['repairs']), 1)
+
+    def test_invalid_parameters(self):
+        for params in ({'limit': '0'}, {'limit': 'abc'}, {'since': 'hier'}, {'since': '2026-13-45T00:00:00'}, {'store': 'paris'}):
+            response = self.api.get(KANBAN_URL, params, secure=True)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+    def test_old_tombstones_purged_by_daily_task(self):
+        self._repair().delete()
+        RepairTombstone.objects.update(deleted_at=timezone.now() - timedelta(days=TOMBSTONE_DAYS + 1))
+        recent = self._repair()
+        recent_id = recent.pk
+        # La suppression n'écrit que sa propre trace
+        recent.delete()
+        self.assertEqual(RepairTombstone.objects.count(), 2)
+
+        self.assertEqual(purge_tombstones_daily(), {'deleted': 1})
+        self.assertEqual(list(RepairTombstone.objects.values_list('repair_id', flat=True)), [recent_id])
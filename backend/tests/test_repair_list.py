@@ -0,0 +1,152 @@
+"""
+Tests de la liste des réparations et du coût final
+Liste résumée en nombre constant de requêtes, variations F() sur les articles
+"""
+from decimal import Decimal
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from analytics.models import DashboardStats
+from clients.models import Client
+from repairs.models import Repair, RepairItem
+from repairs.serializers import RepairCreateSerializer
+
+User = get_user_model()
+
+LIST_URL = '/api/repairs/repairs/'
+ITEMS_URL = '/api/repairs/repair-items/'
+
+
+class RepairListTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.api = APIClient()
+        self.user = User.objects.create_user(username='atelier', email='atelier@test.com', password='pass1234')
+        self.api.force_authenticate(user=self.user)
+        self.customer = Client.objects.create(first_name='Test', last_name='Client', phone='0612345678')
+
+    def _repair(self, status='pending', description='Révision', **extra):
+        return Repair.objects.create(
+            client=self.customer, store='garches', bike_brand='Trek', description=description,
+            status=status, created_by=self.user, **extra
+        )
+
+    def _repairs_with_items(self, count):
+        repairs = [self._repair() for _ in range(count)]
+        RepairItem.objects.bulk_create([
+            RepairItem(repair=repair, item_type=item_type, description=item_type,
+                       quantity=Decimal('1'), unit_price=price, total_price=price)
+            for repair in repairs
+            for item_type, price in (('part', Decimal('12.50')), ('labor', Decimal('30.00')))
+        ])
+        return repairs
+
+    def _list_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.api.get(LIST_URL, {'page_size': 200}, secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data, len(ctx.captured_queries)
+
+    def test_list_takes_constant_queries(self):
+        self._repairs_with_items(20)
+        data, small = self._list_queries()
+        self.assertEqual(len(data['results']), 20)
+
+        self._repairs_with_items(180)
+        data, large = self._list_queries()
+        self.assertEqual(len(data['results']), 200)
+        self.assertEqual(small, large)
+        # Comptage de la pagination + page annotée
+        self.assertLessEqual(large, 2)
+
+    def test_compact_representation(self):
+        repair = self._repairs_with_items(1)[0]
+        Repair.objects.filter(pk=repair.pk).update(
+            description='x' * 300, diagnosis='Diagnostic', notes='Notes', labor_hours=Decimal('1.5')
+        )
+        data, _ = self._list_queries()
+        row = data['results'][0]
+        self.assertNotIn('items', row)
+        self.assertNotIn('diagnosis', row)
+        self.assertNotIn('notes', row)
+        self.assertEqual(row['items_count'], 2)
+        self.assertEqual(row['parts_total'], '12.50')
+        self.assertEqual(row['labor_total'], '82.50')  # 30.00 + 1,5 h à 35 €/h
+        self.assertEqual(len(row['description']), 100)
+        self.assertEqual(row['client_info']['name'], 'Test Client')
+
+        # Le détail conserve la représentation complète
+        detail = self.api.get(f'{LIST_URL}{repair.id}/', secure=True).data
+        self.assertEqual(len(detail['items']), 2)
+        self.assertEqual(detail['diagnosis'], 'Diagnostic')
+
+    def test_final_cost_follows_item_deltas(self):
+        repair = self._repair(status='delivered', final_cost=Decimal('40.00'))
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.repairs_total, Decimal('40.00'))
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.api.post(f'{LIST_URL}{repair.id}/add_item/', {
+                'item_type': 'part', 'description': 'Chambre à air', 'quantity': '2', 'unit_price': '7.50',
+                'total_price': '15.00', 'repair': repair.id,
+            }, format='json', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        # Les articles existants ne sont pas relus
+        self.assertFalse([query for query in ctx.captured_queries if 'FROM "repair_items"' in query['sql']])
+        repair.refresh_from_db()
+        self.assertEqual(repair.final_cost, Decimal('55.00'))
+
+        item_id = response.data['id']
+        response = self.api.patch(f'{ITEMS_URL}{item_id}/', {'quantity': '3'}, format='json', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        repair.refresh_from_db()
+        self.assertEqual(repair.final_cost, Decimal('62.50'))
+
+        response = self.api.delete(f'{ITEMS_URL}{item_id}/', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        repair.refresh_from_db()
+        self.assertEqual(repair.final_cost, Decimal('40.00'))
+
+        # Réparation livrée : agrégats du client suivis, nombre de réparations inchangé
+        self.customer.refresh_from_db()
+        self.assertEqual((self.customer.repairs_total, self.customer.repairs_count), (Decimal('40.00'), 1))
+
+    def test_item_edit_refreshes_dashboard_rollup(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            repair = self._repair(status='completed', final_cost=Decimal('40.00'))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.api.post(f'{LIST_URL}{repair.id}/add_item/', {
+                'item_type': 'part', 'description': 'Câble', 'quantity': '1', 'unit_price': '10.00',
+                'total_price': '10.00', 'repair': repair.id,
+            }, format='json', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        row = DashboardStats.objects.get(period='daily', date=timezone.localdate())
+        self.assertEqual(row.average_repair_cost, Decimal('50.00'))
+
+    def test_nested_items_update_final_cost(self):
+        def items(*prices):
+            return [
+                {'item_type': 'part', 'description': 'Pièce', 'quantity': Decimal('1'),
+                 'unit_price': Decimal(price), 'total_price': Decimal(price)}
+                for price in prices
+            ]
+
+        serializer = RepairCreateSerializer()
+        repair = serializer.create({
+            'client': self.customer, 'store': 'garches', 'bike_brand': 'Trek', 'description': 'Révision',
+            'created_by': self.user, 'final_cost': Decimal('10.00'), 'items': items('15.00', '5.00'),
+        })
+        self.assertEqual(repair.final_cost, Decimal('30.00'))
+
+        # Remplacement des articles : les montants supprimés sont retirés
+        repair = serializer.update(repair, {'items': items('8.00')})
+        self.assertEqual(repair.final_cost, Decimal('18.00'))
+        repair.refresh_from_db()
+        self.assertEqual(repair.final_cost, Decimal('18.00'))
+        self.assertEqual(repair.items.count(), 1)
+
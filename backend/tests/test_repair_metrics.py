@@ -0,0 +1,106 @@
+"""
+Tests des indicateurs de l'atelier
+Une seule requête agrégée, durée moyenne calculée par la base, cache par magasin
+"""
+from datetime import timedelta
+from decimal import Decimal
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from clients.models import Client
+from repairs.metrics import RepairMetricsService
+from repairs.models import Repair
+
+User = get_user_model()
+
+
+class RepairMetricsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.api = APIClient()
+        self.user = User.objects.create_user(username='atelier', email='atelier@test.com', password='pass1234')
+        self.api.force_authenticate(user=self.user)
+        self.customer = Client.objects.create(first_name='Test', last_name='Client', phone='0612345678')
+        self.today = timezone.localdate()
+
+    def _repair(self, store='garches', status='pending', priority='normal', cost='0', days_ago=0, **extra):
+        repair = Repair.objects.create(
+            client=self.customer, store=store, bike_brand='Trek', description='Révision', status=status,
+            priority=priority, final_cost=Decimal(cost), created_by=self.user, **extra
+        )
+        Repair.objects.filter(pk=repair.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+        return repair
+
+    def test_metrics_in_one_query(self):
+        self._repair(priority='urgent', estimated_completion=self.today - timedelta(days=1))
+        self._repair(status='in_progress', store='ville_avray')
+        self._repair(status='delivered', cost='120.00', days_ago=10,
+                     actual_completion=self.today - timedelta(days=6))
+        self._repair(status='delivered', cost='80.00', store='ville_avray', days_ago=60,
+                     actual_completion=self.today - timedelta(days=58))
+        self._repair(status='completed', estimated_cost=Decimal('300.00'), max_budget=Decimal('200.00'))
+
+        with CaptureQueriesContext(connection) as ctx:
+            metrics = RepairMetricsService.compute(today=self.today)
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+        self.assertEqual(metrics['total'], 5)
+        self.assertEqual(metrics['by_status'], {'pending': 1, 'in_progress': 1, 'completed': 1, 'delivered': 2})
+        self.assertEqual(metrics['by_priority']['urgent'], 1)
+        self.assertEqual((metrics['open'], metrics['overdue'], metrics['budget_exceeded']), (2, 1, 1))
+        self.assertEqual(metrics['created_last_30_days'], 4)
+        self.assertEqual(metrics['revenue']['total'], 200.0)
+        self.assertEqual(metrics['revenue']['last_30_days'], 120.0)
+        # (4 + 2) / 2 jours
+        self.assertEqual(metrics['average_duration_days'], 3.0)
+        by_store = {row['store']: row for row in metrics['by_store']}
+        self.assertEqual((by_store['garches']['count'], by_store['garches']['revenue']), (3, 120.0))
+
+        garches = RepairMetricsService.compute(store='garches', today=self.today)
+        self.assertEqual((garches['total'], garches['revenue']['total']), (3, 120.0))
+        self.assertEqual([row['store'] for row in garches['by_store']], ['garches'])
+
+    def test_cache_invalidated_on_save(self):
+        repair = self._repair()
+        self.assertEqual(RepairMetricsService.get()['by_status']['pending'], 1)
+        with CaptureQueriesContext(connection) as ctx:
+            RepairMetricsService.get()
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+        repair.status = 'in_progress'
+        repair.save()
+        metrics = RepairMetricsService.get()
+        self.assertEqual((metrics['by_status']['pending'], metrics['by_status']['in_progress']), (0, 1))
+
+        repair.delete()
+        self.assertEqual(RepairMetricsService.get()['total'], 0)
+
+    def test_endpoints(self):
+        self._repair(status='delivered', cost='50.00', actual_completion=self.today)
+        self._repair(store='ville_avray', priority='urgent')
+
+        response = self.api.get('/api/repairs/repairs/statistics/', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_revenue'], 50.0)
+        self.assertEqual(response.data['in_progress_count'], 1)
+        self.assertEqual(
+            sorted((row['status'], row['count']) for row in response.data['status_distribution']),
+            [('delivered', 1), ('pending', 1)]
+        )
+
+        response = self.api.get('/api/repairs/repairs/dashboard/', {'store': 'ville_avray'}, secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['overview']['total_repairs'], 1)
+        self.assertEqual(response.data['priority_stats'], [{'priority': 'urgent', 'count': 1}])
+        self.assertEqual(len(response.data['urgent_repairs']), 1)
+
+    def test_unknown_store_rejected(self):
+        for url in ('/api/repairs/repairs/statistics/', '/api/repairs/repairs/dashboard/'):
+            response = self.api.get(url, {'store': 'paris'}, secure=True)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, url)
+
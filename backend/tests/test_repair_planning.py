@@ -0,0 +1,188 @@
+"""
+Tests du planning de l'atelier
+Ordonnancement par file de priorité, recalcul incrémental, endpoint et benchmark
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+import random
+import time
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from clients.models import Client
+from repairs.models import Repair, WorkshopWorkload
+from repairs.planning import PlanJob, WorkshopPlan
+from tests.benchmarks import benchmark, report
+
+User = get_user_model()
+
+PLANNING_URL = '/api/repairs/repairs/planning/'
+ASSIGN_URL = '/api/repairs/repairs/auto_assign/'
+START = date(2026, 10, 19)
+DAYS = [START + timedelta(days=offset) for offset in range(7)]
+
+
+def make_plan(mechanics, hours=8.0):
+    return WorkshopPlan('garches', DAYS, {m: [hours] * 7 for m in mechanics}, {m: f'Méca {m}' for m in mechanics})
+
+
+def job(job_id, hours, priority='normal', deadline=None, mechanic=None):
+    return PlanJob(job_id, f'REP-{job_id}', priority, float(hours), deadline, float(job_id), mechanic)
+
+
+class WorkshopPlanTest(SimpleTestCase):
+    def test_priority_queue_and_earliest_mechanic(self):
+        plan = make_plan([1, 2])
+        plan.load([
+            job(1, 6, 'low'),
+            job(2, 4, 'urgent'),
+            job(3, 10, 'normal', deadline=START),
+            job(4, 3, 'normal', mechanic=2),
+        ])
+        # Urgent d'abord (Méca 1), puis la date promise (Méca 2, déborde sur le lendemain)
+        self.assertEqual(plan.placements[2], (1, [(0, 4.0)]))
+        self.assertEqual(plan.placements[3], (2, [(0, 8.0), (1, 2.0)]))
+        # Réparation déjà attribuée : reste chez son mécanicien
+        self.assertEqual(plan.placements[4], (2, [(1, 3.0)]))
+        self.assertEqual(plan.placements[1], (1, [(0, 4.0), (1, 2.0)]))
+
+        data = plan.as_dict()
+        self.assertEqual(data['late'], [3])
+        self.assertEqual(data['scheduled'], 4)
+        first_day = data['mechanics'][0]['days'][0]
+        self.assertEqual((first_day['planned_hours'], len(first_day['repairs'])), (8.0, 2))
+
+    def test_overflow_is_unscheduled(self):
+        plan = make_plan([1], hours=4.0)
+        plan.load([job(1, 20), job(2, 8), job(3, 1)])  # 28 h disponibles
+        self.assertEqual(set(plan.placements), {1, 2})
+        self.assertEqual([entry['id'] for entry in plan.as_dict()['unscheduled']], [3])
+
+    def test_mechanic_off_roster_is_not_reassigned(self):
+        plan = make_plan([1])
+        plan.load([job(10, 3, mechanic=99), job(11, 2)])
+        # Mécanicien 99 sans heures prévues : la réparation reste à lui, non planifiée
+        self.assertEqual(plan.placements, {11: (1, [(0, 2.0)])})
+        data = plan.as_dict()
+        self.assertEqual([entry['id'] for entry in data['unscheduled']], [10])
+        self.assertEqual(data['off_roster'], [10])
+        self.assertEqual(data['mechanics'][0]['planned_hours'], 2.0)
+
+    def _random_jobs(self, rng):
+        priorities = ['urgent', 'high', 'normal', 'normal', 'low']
+
+        def random_job(job_id):
+            deadline = START + timedelta(days=rng.randint(0, 10)) if rng.random() < 0.6 else None
+            mechanic = rng.choice([None, None, None, 3])
+            return job(job_id, rng.randint(1, 6), rng.choice(priorities), deadline, mechanic)
+        return random_job
+
+    def _apply_random_changes(self, plan, jobs, rng, random_job, steps=50):
+        for step in range(steps):
+            job_id = rng.randint(1, 4000)
+            if step % 5 == 0 and job_id in jobs:
+                del jobs[job_id]
+                plan.apply_changes(removals=[job_id])
+            else:
+                jobs[job_id] = random_job(job_id)
+                plan.apply_changes(upserts=[jobs[job_id]])
+
+    def test_incremental_matches_full_rebuild(self):
+        rng = random.Random(42)
+        random_job = self._random_jobs(rng)
+        jobs = {job_id: random_job(job_id) for job_id in range(1, 4001)}
+        plan = make_plan(range(1, 9))
+        plan.load(list(jobs.values()))
+        self._apply_random_changes(plan, jobs, rng, random_job)
+
+        expected = make_plan(range(1, 9))
+        expected.load(list(jobs.values()))
+        self.assertEqual(plan.keys, expected.keys)
+        self.assertEqual(plan.placements, expected.placements)
+
+    @benchmark
+    def test_incremental_timing(self):
+        rng = random.Random(42)
+        random_job = self._random_jobs(rng)
+        jobs = {job_id: random_job(job_id) for job_id in range(1, 4001)}
+        plan = make_plan(range(1, 9))
+
+        started = time.perf_counter()
+        plan.load(list(jobs.values()))
+        full = time.perf_counter() - started
+
+        started = time.perf_counter()
+        self._apply_random_changes(plan, jobs, rng, random_job)
+        incremental = (time.perf_counter() - started) / 50
+        report(f"Planning de 4000 travaux x 8 mécaniciens : {full * 1000:.0f} ms, "
+               f"recalcul après une modification : {incremental * 1000:.1f} ms")
+        self.assertLess(full, 2.0)
+        self.assertLess(incremental, full)
+
+
+class RepairPlanningAPITest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.api = APIClient()
+        self.user = User.objects.create_user(username='atelier', email='atelier@test.com', password='pass1234')
+        self.api.force_authenticate(user=self.user)
+        self.mechanic = User.objects.create_user(username='meca', email='meca@test.com', password='pass1234')
+        self.customer = Client.objects.create(first_name='Test', last_name='Client', phone='0612345678')
+        self.today = timezone.localdate()
+        for offset in range(7):
+            WorkshopWorkload.objects.create(
+                date=self.today + timedelta(days=offset), store='garches',
+                mechanic=self.mechanic, estimated_hours=Decimal('8')
+            )
+
+    def _repair(self, duration, priority='normal', status='pending', store='garches'):
+        return Repair.objects.create(
+            client=self.customer, store=store, bike_brand='Trek', description='Révision', status=status,
+            priority=priority, estimated_duration=duration, created_by=self.user
+        )
+
+    def _plan(self):
+        response = self.api.get(PLANNING_URL, {'store': 'garches'}, secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['stores'][0]
+
+    def test_planning_is_updated_incrementally(self):
+        normal = self._repair(5)
+        self._repair(2, status='delivered')
+        self._repair(3, store='ville_avray')
+
+        plan = self._plan()
+        self.assertFalse(plan['incremental'])
+        self.assertEqual(plan['jobs'], 1)
+        day = plan['mechanics'][0]['days'][0]
+        self.assertEqual([entry['id'] for entry in day['repairs']], [normal.id])
+
+        urgent = self._repair(6, priority='urgent')
+        plan = self._plan()
+        self.assertTrue(plan['incremental'])
+        day = plan['mechanics'][0]['days'][0]
+        self.assertEqual([(entry['id'], entry['hours']) for entry in day['repairs']],
+                         [(urgent.id, 6.0), (normal.id, 2.0)])
+
+        urgent.status = 'completed'
+        urgent.save()
+        normal.delete()
+        plan = self._plan()
+        self.assertEqual(plan['jobs'], 0)
+        self.assertEqual(plan['mechanics'][0]['planned_hours'], 0)
+
+    def test_auto_assign(self):
+        repair = self._repair(4)
+        response = self.api.post(ASSIGN_URL, {'store': 'garches'}, format='json', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['assigned'], {'garches': 1})
+        repair.refresh_from_db()
+        self.assertEqual(repair.assigned_to, self.mechanic)
+
+    def test_invalid_parameters(self):
+        for params in ({'store': 'paris'}, {'start': 'lundi'}, {'start': '2026-02-30'}):
+            response = self.api.get(PLANNING_URL, params, secure=True)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
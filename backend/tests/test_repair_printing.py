@@ -0,0 +1,92 @@
+"""
+Tests de l'impression groupée des bons de réparation
+Un PDF multi-pages pour les dépôts du jour, en nombre constant de requêtes
+"""
+from datetime import timedelta
+from decimal import Decimal
+import re
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from clients.models import Client
+from repairs.models import Repair, RepairItem
+
+User = get_user_model()
+
+BATCH_URL = '/api/repairs/repairs/print_batch/'
+
+
+def page_count(content):
+    return len(re.findall(rb'/Type /Page[^s]', content))
+
+
+class RepairBatchPrintTest(TestCase):
+    def setUp(self):
+        self.api = APIClient()
+        self.user = User.objects.create_user(username='atelier', email='atelier@test.com', password='pass1234')
+        self.api.force_authenticate(user=self.user)
+        self.customer = Client.objects.create(first_name='Test', last_name='Client', phone='0612345678')
+
+    def _repair(self, store='garches', status='pending', **extra):
+        repair = Repair.objects.create(
+            client=self.customer, store=store, bike_brand='Trek', description='Révision complète',
+            status=status, created_by=self.user, **extra
+        )
+        RepairItem.objects.create(
+            repair=repair, item_type='part', description='Chambre à air', quantity=Decimal('1'),
+            unit_price=Decimal('7.50'), total_price=Decimal('7.50')
+        )
+        return repair
+
+    def _get(self, params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.api.get(BATCH_URL, params, secure=True)
+            content = b''.join(response.streaming_content) if response.status_code == 200 else None
+        return response, content, len(ctx.captured_queries)
+
+    def test_single_pdf_for_the_day(self):
+        for _ in range(3):
+            self._repair()
+        self._repair(store='ville_avray')
+        yesterday = self._repair()
+        Repair.objects.filter(pk=yesterday.pk).update(created_at=timezone.now() - timedelta(days=1))
+
+        response, content, small = self._get({'store': 'garches'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn(f'bons_reparation_garches_{timezone.localdate():%Y%m%d}.pdf', response['Content-Disposition'])
+        self.assertTrue(content.startswith(b'%PDF'))
+        self.assertEqual(page_count(content), 3)
+
+        for _ in range(12):
+            self._repair()
+        response, content, large = self._get({'store': 'garches', 'status': 'pending,in_progress'})
+        self.assertEqual(page_count(content), 15)
+        # Réparations avec clients + articles, quel que soit le nombre de bons
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, 2)
+
+    def test_date_and_status_filters(self):
+        repair = self._repair(status='in_progress')
+        yesterday = timezone.localdate() - timedelta(days=1)
+        Repair.objects.filter(pk=repair.pk).update(created_at=timezone.now() - timedelta(days=1))
+
+        response, content, _ = self._get({'date': yesterday.isoformat(), 'status': 'in_progress'})
+        self.assertEqual(page_count(content), 1)
+        response, _, _ = self._get({'date': yesterday.isoformat(), 'status': 'pending'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_invalid_parameters(self):
+        for params in ({'date': 'hier'}, {'date': '2026-13-45'}, {'store': 'paris'}, {'status': 'lost'}):
+            response = self.api.get(BATCH_URL, params, secure=True)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+    def test_single_work_order_uses_same_layout(self):
+        repair = self._repair()
+        response = self.api.get(f'/api/repairs/repairs/{repair.id}/print/', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(page_count(response.content), 1)
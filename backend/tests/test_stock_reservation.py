@@ -0,0 +1,175 @@
+"""
+Tests de la réservation de stock au passage en caisse
+Vérifie le détail par ligne en cas de rupture et l'absence de survente
+sous caisses concurrentes (test de charge multi-thread)
+"""
+import random
+import threading
+import time
+from decimal import Decimal
+from django.test import TestCase, TransactionTestCase
+from django.db import connection, transaction, OperationalError
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from products.models import Product
+from products.services import StockReservationService, InsufficientStock
+from clients.models import Client
+from orders.models import Order
+from tests.benchmarks import report
+
+User = get_user_model()
+
+
+def make_product(reference, stock_ville_avray=10, stock_garches=10, product_type='part'):
+    return Product.objects.create(
+        reference=reference,
+        name=f'Produit {reference}',
+        product_type=product_type,
+        price_ht=Decimal('10.00'),
+        price_ttc=Decimal('12.00'),
+        stock_ville_avray=stock_ville_avray,
+        stock_garches=stock_garches,
+    )
+
+
+class StockReservationTest(TestCase):
+    def setUp(self):
+        self.api = APIClient()
+        self.user = User.objects.create_user(username='caisse', email='caisse@test.com', password='pass1234')
+        self.api.force_authenticate(user=self.user)
+        self.customer = Client.objects.create(first_name='Test', last_name='Client', phone='0612345678')
+        self.available = make_product('DISPO', stock_ville_avray=5)
+        self.scarce = make_product('RARE', stock_ville_avray=1)
+
+    def _checkout(self, items, store='ville_avray'):
+        return self.api.post('/api/orders/', {
+            'client': self.customer.id,
+            'store': store,
+            'payment_method': 'card',
+            'items': [
+                {'product': product.id, 'quantity': quantity, 'unit_price': '12.00',
+                 'unit_price_ht': '10.00', 'unit_price_ttc': '12.00'}
+                for product, quantity in items
+            ],
+        }, format='json', secure=True)
+
+    def test_reserve_decrements_only_the_store(self):
+        StockReservationService.reserve('garches', [{'product': self.available, 'quantity': 3}])
+        self.available.refresh_from_db()
+        self.assertEqual(self.available.stock_garches, 7)
+        self.assertEqual(self.available.stock_ville_avray, 5)
+
+    def test_insufficient_stock_reports_each_line(self):
+        lines = [
+            {'product': self.available, 'quantity': 2},
+            {'product': self.scarce, 'quantity': 1},
+            {'product': self.scarce, 'quantity': 1},
+        ]
+        with self.assertRaises(InsufficientStock) as ctx:
+            StockReservationService.reserve('ville_avray', lines)
+
+        self.assertEqual(ctx.exception.shortages, [{
+            'product_id': self.scarce.id,
+            'reference': 'RARE',
+            'name': 'Produit RARE',
+            'requested': 2,
+            'available': 1,
+            'lines': [1, 2],
+        }])
+        self.available.refresh_from_db()
+        self.assertEqual(self.available.stock_ville_avray, 5)
+
+    def test_prestation_is_not_stock_tracked(self):
+        service = make_product('PRESTA', stock_ville_avray=0, product_type='prestation')
+        reserved = StockReservationService.reserve('ville_avray', [{'product': service, 'quantity': 4}])
+        self.assertEqual(reserved, {})
+        service.refresh_from_db()
+        self.assertEqual(service.stock_ville_avray, 0)
+
+    def test_checkout_returns_conflict_without_side_effects(self):
+        response = self._checkout([(self.available, 1), (self.scarce, 3)])
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['lines'][0]['reference'], 'RARE')
+        self.assertEqual(response.data['lines'][0]['lines'], [1])
+        self.assertFalse(Order.objects.exists())
+        self.available.refresh_from_db()
+        self.assertEqual(self.available.stock_ville_avray, 5)
+
+    def test_checkout_decrements_stock(self):
+        response = self._checkout([(self.available, 2), (self.scarce, 1)])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.scarce.refresh_from_db()
+        self.assertEqual(self.scarce.stock_ville_avray, 0)
+
+
+class StockReservationStressTest(TransactionTestCase):
+    """Plusieurs caisses vendent simultanément le même stock"""
+
+    THREADS = 8
+    ATTEMPTS_PER_THREAD = 25
+    INITIAL_STOCK = 100
+
+    def setUp(self):
+        self.products = [make_product(f'STRESS-{i}', stock_ville_avray=self.INITIAL_STOCK) for i in range(3)]
+
+    def _worker(self, results, lock, start):
+        sold = refused = retries = 0
+        start.wait()
+        try:
+            for attempt in range(self.ATTEMPTS_PER_THREAD):
+                # Ordre des lignes volontairement différent d'un thread à l'autre
+                lines = [{'product': p.id, 'quantity': 1} for p in self.products]
+                if attempt % 2:
+                    lines.reverse()
+                while True:
+                    try:
+                        with transaction.atomic():
+                            StockReservationService.reserve('ville_avray', lines)
+                        sold += 1
+                        break
+                    except InsufficientStock:
+                        refused += 1
+                        break
+                    except OperationalError:
+                        # SQLite verrouille la base entière : on rejoue la transaction
+                        retries += 1
+                        time.sleep(random.uniform(0.001, 0.01))
+        finally:
+            connection.close()
+        with lock:
+            results.append((sold, refused, retries))
+
+    def test_no_oversell_and_no_lost_update(self):
+        results, lock, start = [], threading.Lock(), threading.Event()
+        threads = [
+            threading.Thread(target=self._worker, args=(results, lock, start))
+            for _ in range(self.THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        began = time.perf_counter()
+        start.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - began
+
+        sold = sum(r[0] for r in results)
+        refused = sum(r[1] for r in results)
+        retries = sum(r[2] for r in results)
+        stocks = list(
+            Product.objects.filter(id__in=[p.id for p in self.products]).values_list('stock_ville_avray', flat=True)
+        )
+        lost_updates = sum(self.INITIAL_STOCK - stock - sold for stock in stocks)
+
+        report(
+            f"Caisses concurrentes: {self.THREADS} threads, {sold} ventes, {refused} refus, "
+            f"{retries} reprises, {sold / elapsed:.0f} ventes/s, mises à jour perdues: {lost_updates}"
+        )
+
+        self.assertEqual(len(results), self.THREADS)
+        self.assertEqual(sold + refused, self.THREADS * self.ATTEMPTS_PER_THREAD)
+        self.assertEqual(sold, self.INITIAL_STOCK)
+        self.assertEqual(lost_updates, 0)
+        self.assertTrue(all(stock == 0 for stock in stocks))
@@ -0,0 +1,136 @@
+"""
+Tests des séries temporelles des statistiques
+Intervalles en heure de Paris, intervalles vides complétés, répartition
+par magasin/statut et une seule requête quelle que soit la période
+"""
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from analytics.timeseries import TimeSeries, bucket_starts, last_buckets
+from appointments.models import Appointment
+from clients.models import Client
+from orders.models import Order
+
+User = get_user_model()
+
+PARIS = ZoneInfo('Europe/Paris')
+
+
+class TimeSeriesTest(TestCase):
+    def setUp(self):
+        self.api = APIClient()
+        self.user = User.objects.create_user(username='gerant', email='gerant@test.com', password='pass1234')
+        self.api.force_authenticate(user=self.user)
+        self.customer = Client.objects.create(first_name='Marie', last_name='Curie', phone='0612345678')
+
+    def _order(self, when, total='10.00', store='garches', status='completed'):
+        order = Order.objects.create(
+            client=self.customer, user=self.user, store=store, status=status, total_ttc=Decimal(total)
+        )
+        Order.objects.filter(pk=order.pk).update(created_at=when)
+        return order
+
+    def test_buckets_follow_paris_days(self):
+        # 23h30 et 00h30 heure de Paris : deux jours différents (UTC les placerait le même jour)
+        self._order(datetime(2026, 7, 14, 23, 30, tzinfo=PARIS), '10.00')
+        self._order(datetime(2026, 7, 15, 0, 30, tzinfo=PARIS), '20.00')
+
+        series = TimeSeries.query(Order.objects.all(), date(2026, 7, 13), date(2026, 7, 16), sum_field='total_ttc')
+        self.assertEqual([p['bucket'] for p in series], [date(2026, 7, d) for d in (13, 14, 15, 16)])
+        self.assertEqual([p['count'] for p in series], [0, 1, 1, 0])
+        self.assertEqual(series[2]['total'], Decimal('20.00'))
+
+    def test_week_and_month_buckets(self):
+        self._order(datetime(2026, 3, 2, 12, tzinfo=PARIS))   # Lundi
+        self._order(datetime(2026, 3, 8, 12, tzinfo=PARIS))   # Dimanche, même semaine
+        self._order(datetime(2026, 4, 30, 23, 45, tzinfo=PARIS))
+
+        weeks = TimeSeries.query(Order.objects.all(), date(2026, 3, 1), date(2026, 3, 15), 'week')
+        self.assertEqual([(p['bucket'], p['count']) for p in weeks], [
+            (date(2026, 2, 23), 0), (date(2026, 3, 2), 2), (date(2026, 3, 9), 0)
+        ])
+
+        months = TimeSeries.query(Order.objects.all(), date(2026, 2, 1), date(2026, 5, 31), 'month')
+        self.assertEqual([p['count'] for p in months], [0, 2, 1, 0])
+
+    def test_split_by_store(self):
+        day = datetime(2026, 7, 14, 12, tzinfo=PARIS)
+        self._order(day, '10.00', 'garches')
+        self._order(day, '15.00', 'ville_avray')
+        self._order(day, '5.00', 'ville_avray')
+
+        point = TimeSeries.query(
+            Order.objects.all(), date(2026, 7, 14), date(2026, 7, 14), sum_field='total_ttc', split='store'
+        )[0]
+        self.assertEqual(point['count'], 3)
+        self.assertEqual(point['splits']['ville_avray'], {'count': 2, 'total': Decimal('20.00')})
+        self.assertEqual(point['splits']['garches']['total'], Decimal('10.00'))
+
+    def test_date_field_series(self):
+        Appointment.objects.create(
+            client=self.customer, title='Révision', appointment_date=date(2026, 7, 14),
+            appointment_time=time(10, 0), created_by=self.user
+        )
+        series = TimeSeries.query(
+            Appointment.objects.all(), date(2026, 7, 13), date(2026, 7, 14), date_field='appointment_date'
+        )
+        self.assertEqual([p['count'] for p in series], [0, 1])
+
+    def test_bucket_helpers(self):
+        self.assertEqual(last_buckets(3, 'month', date(2026, 1, 15)), (date(2025, 11, 1), date(2026, 1, 15)))
+        self.assertEqual(
+            bucket_starts(date(2025, 11, 1), date(2026, 1, 15), 'month'),
+            [date(2025, 11, 1), date(2025, 12, 1), date(2026, 1, 1)]
+        )
+
+    def _get(self, url, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.api.get(url, params, secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return response.data, len(ctx.captured_queries)
+
+    def test_sales_stats_single_query(self):
+        today = timezone.localdate()
+        noon = datetime.combine(today, time(12), tzinfo=PARIS)
+        self._order(noon, '30.00')
+        self._order(noon - timedelta(days=100), '20.00')
+        self._order(noon, '99.00', status='cancelled')
+
+        short, short_queries = self._get('/api/analytics/sales/', days=7)
+        year, year_queries = self._get('/api/analytics/sales/', days=365)
+
+        self.assertEqual(len(year['daily_sales']), 365)
+        self.assertEqual(year['daily_sales'][-1], {'date': today.strftime('%Y-%m-%d'), 'total': 30.0, 'count': 1})
+        self.assertEqual((year['total_sales'], year['total_orders']), (50.0, 2))
+        self.assertEqual(short['total_sales'], 30.0)
+        self.assertEqual(short_queries, year_queries)
+        self.assertEqual(year_queries, 1)
+
+    def test_sales_trends_with_status_split(self):
+        noon = datetime.combine(timezone.localdate(), time(12), tzinfo=PARIS)
+        self._order(noon, '30.00')
+        self._order(noon, '99.00', status='cancelled')
+
+        data, queries = self._get('/api/analytics/sales/trends/', months=24, split='status')
+        current = data['trends'][-1]
+        self.assertEqual(len(data['trends']), 24)
+        self.assertEqual((current['sales'], current['orders']), (30.0, 1))
+        self.assertEqual(current['splits']['cancelled'], {'total': 99.0, 'count': 1})
+        self.assertEqual(queries, 1)
+
+    def test_invalid_split(self):
+        response = self.api.get('/api/analytics/sales/', {'split': 'client'}, secure=True)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_monthly_series_endpoints(self):
+        self.assertEqual(self._get('/api/analytics/clients/')[0]['new_clients_by_month'][-1]['new_clients'], 1)
+        data, queries = self._get('/api/analytics/repairs/')
+        self.assertEqual(len(data['repairs_by_month']), 6)
+        self.assertLessEqual(queries, 3)
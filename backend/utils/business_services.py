@@ -196,74 +196,57 @@ class ClientBusinessService:
     
     @staticmethod
     def calculate_client_lifetime_value(client) -> Dict:
-        """Calcule la valeur vie client (CLV)"""
-        from orders.models import Order
-        from repairs.models import Repair
-        
-        # Valeur totale des commandes
-        orders_total = Order.objects.filter(client=client).aggregate(
-            total=Sum(models.F('total_ttc')),
-            count=Count('id')
-        )
-        
-        # Valeur totale des réparations
-        repairs_total = Repair.objects.filter(client=client).aggregate(
-            total=Sum('estimated_cost'),
-            count=Count('id')
-        )
-        
-        # Date de première et dernière interaction
-        interactions = list(
-            Order.objects.filter(client=client).values_list('created_at', flat=True)
-        ) + list(
-            Repair.objects.filter(client=client).values_list('created_at', flat=True)
-        )
-        
-        if interactions:
-            first_interaction = min(interactions)
-            last_interaction = max(interactions)
-            days_as_customer = (timezone.now() - first_interaction).days
-        else:
-            first_interaction = None
-            last_interaction = None
-            days_as_customer = 0
+        """
+        Calcule la valeur vie client (CLV)
+        Agrégats tenus à jour sur le client (commandes terminées, réparations
+        livrées) : aucune requête sur l'historique
+        """
+        first_interaction = client.first_interaction
+        days_as_customer = (timezone.now() - first_interaction).days if first_interaction else 0
         
         return {
-            'total_orders_value': float(orders_total['total'] or 0),
-            'total_repairs_value': float(repairs_total['total'] or 0),
-            'total_value': float((orders_total['total'] or 0) + (repairs_total['total'] or 0)),
-            'orders_count': orders_total['count'] or 0,
-            'repairs_count': repairs_total['count'] or 0,
-            'total_interactions': (orders_total['count'] or 0) + (repairs_total['count'] or 0),
+            'total_orders_value': float(client.orders_total),
+            'total_repairs_value': float(client.repairs_total),
+            'total_value': float(client.total_purchases),
+            'orders_count': client.orders_count,
+            'repairs_count': client.repairs_count,
+            'total_interactions': client.visit_count,
             'days_as_customer': days_as_customer,
             'first_interaction': first_interaction.isoformat() if first_interaction else None,
-            'last_interaction': last_interaction.isoformat() if last_interaction else None,
-            'avg_transaction_value': round(
-                ((orders_total['total'] or 0) + (repairs_total['total'] or 0)) / 
-                max((orders_total['count'] or 0) + (repairs_total['count'] or 0), 1), 2
-            )
+            'last_interaction': client.last_interaction.isoformat() if client.last_interaction else None,
+            'avg_basket': float(client.average_basket),
+            'avg_transaction_value': round(float(client.total_purchases) / max(client.visit_count, 1), 2)
         }
     
     @staticmethod
     def segment_clients(clients_queryset) -> Dict:
-        """Segmente les clients par valeur et activité"""
-        from django.db.models import Sum, Count, Q
+        """
+        Segmente les clients par valeur et activité
+        Valeur et récence lues dans ClientSegment (segmentation RFM recalculée
+        chaque nuit) : aucune somme à travers les jointures commandes/réparations.
+        Si aucun client du queryset n'est segmenté, la segmentation est calculée
+        à la demande ; actifs et inactifs ne portent que sur les clients
+        segmentés, les autres (créés depuis le dernier calcul) sont comptés à part
+        """
+        from django.db.models import Count, Max, Q
         from datetime import timedelta
-        
-        # Clients VIP (plus de 1000€ de commandes/réparations)
-        vip_clients = clients_queryset.annotate(
-            total_value=Sum(models.F('orders__total_ttc') + models.F('repairs__estimated_cost'))
-        ).filter(total_value__gte=1000).count()
-        
-        # Clients actifs (interaction dans les 90 derniers jours)
-        active_threshold = timezone.now() - timedelta(days=90)
-        active_clients = clients_queryset.filter(
-            Q(orders__created_at__gte=active_threshold) |
-            Q(repairs__created_at__gte=active_threshold)
-        ).distinct().count()
-        
-        # Clients inactifs
-        inactive_clients = clients_queryset.count() - active_clients
+        from analytics.models import ClientSegment
+        from analytics.segmentation import ClientSegmentationService
+        
+        total = clients_queryset.count()
+        segments = ClientSegment.objects.filter(client__in=clients_queryset)
+        if total and not segments.exists():
+            logger.info("Segmentation des clients absente : calcul à la demande")
+            ClientSegmentationService.refresh()
+        stats = segments.aggregate(
+            segmented=Count('id'),
+            # Clients VIP (plus de 1000€ de commandes/réparations)
+            vip=Count('id', filter=Q(monetary__gte=1000)),
+            # Clients actifs (interaction dans les 90 jours précédant le calcul)
+            active=Count('id', filter=Q(recency_days__lte=90)),
+            computed_at=Max('computed_at'),
+        )
+        segmented = stats['segmented']
         
         # Nouveaux clients (moins de 30 jours)
         new_threshold = timezone.now() - timedelta(days=30)
@@ -272,13 +255,16 @@ class ClientBusinessService:
         ).count()
         
         return {
-            'total': clients_queryset.count(),
-            'vip': vip_clients,
-            'active': active_clients,
-            'inactive': inactive_clients,
+            'total': total,
+            'segmented': segmented,
+            'unsegmented': total - segmented,
+            'computed_at': stats['computed_at'],
+            'vip': stats['vip'],
+            'active': stats['active'],
+            'inactive': segmented - stats['active'],
             'new': new_clients,
-            'vip_percentage': round(vip_clients / max(clients_queryset.count(), 1) * 100, 2),
-            'active_percentage': round(active_clients / max(clients_queryset.count(), 1) * 100, 2)
+            'vip_percentage': round(stats['vip'] / max(total, 1) * 100, 2),
+            'active_percentage': round(stats['active'] / max(segmented, 1) * 100, 2)
         }
 
 class FinancialBusinessService:
@@ -344,30 +330,38 @@ class FinancialBusinessService:
     
     @staticmethod
     def forecast_monthly_revenue(historical_data: List[Dict], months_ahead: int = 3) -> List[Dict]:
-        """Prédit les revenus mensuels basés sur l'historique"""
+        """
+        Prédit les revenus mensuels basés sur l'historique
+        Tendance linéaire (moindres carrés) sur les 12 derniers mois ; avec deux
+        ans d'historique, chaque mois est corrigé de l'écart observé sur le même
+        mois de l'année précédente
+        """
+        import numpy as np
+        
         if len(historical_data) < 3:
             return []
         
-        # Simple moyenne mobile pondérée
-        recent_data = historical_data[-3:]  # 3 derniers mois
-        avg_revenue = sum(item['total_revenue'] for item in recent_data) / len(recent_data)
-        
-        # Tendance de croissance
-        if len(historical_data) >= 2:
-            growth_rate = (historical_data[-1]['total_revenue'] - historical_data[0]['total_revenue']) / historical_data[0]['total_revenue']
-        else:
-            growth_rate = 0
+        revenue = np.array([float(item['total_revenue'] or 0) for item in historical_data])
+        recent = revenue[-12:]
+        slope, intercept = np.polyfit(np.arange(len(recent)), recent, 1)
+        growth_rate = slope / recent.mean() if recent.mean() else 0.0
         
         forecasts = []
         for i in range(1, months_ahead + 1):
-            # Appliquer la tendance de croissance
-            forecast_revenue = avg_revenue * (1 + growth_rate) * (1 + i * 0.1)  # Légère accélération
+            forecast_revenue = intercept + slope * (len(recent) - 1 + i)
+            
+            # Saisonnalité : même mois l'année précédente comparé à sa tendance
+            last_year = len(revenue) - 12 + i - 1
+            if len(revenue) >= 24 and 0 <= last_year < len(revenue):
+                trend_then = intercept + slope * (len(recent) - 1 + i - 12)
+                if trend_then > 0:
+                    forecast_revenue *= revenue[last_year] / trend_then
             
             forecasts.append({
                 'month_offset': i,
-                'forecast_revenue': round(forecast_revenue, 2),
+                'forecast_revenue': round(max(float(forecast_revenue), 0.0), 2),
                 'confidence': max(0.7 - i * 0.1, 0.3),  # Confiance diminue avec le temps
-                'growth_rate': round(growth_rate * 100, 2)
+                'growth_rate': round(float(growth_rate) * 100, 2)
             })
         
         return forecasts
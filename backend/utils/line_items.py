@@ -0,0 +1,150 @@
+"""
+Écriture groupée des lignes de documents (commandes, devis, bons d'achat)
+Charge les produits en une requête, calcule les sous-totaux en Decimal exact
+et insère toutes les lignes avec un seul bulk_create
+"""
+from django.db.models import Case, When, F, Value, IntegerField
+from django.utils import timezone
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, Iterable, List
+from products.models import Product
+import logging
+
+logger = logging.getLogger(__name__)
+
+CENTS = Decimal('0.01')
+
+
+def to_decimal(value) -> Decimal:
+    """Convertit une valeur (str, int, float) en Decimal sans erreur binaire"""
+    if isinstance(value, Decimal):
+        return value
+    if value is None or value == '':
+        return Decimal('0')
+    return Decimal(str(value))
+
+
+def quantize_amount(value: Decimal) -> Decimal:
+    """Arrondi commercial au centime"""
+    return value.quantize(CENTS, rounding=ROUND_HALF_UP)
+
+
+def stock_field_for_store(store: str) -> str:
+    """Colonne de stock correspondant au magasin"""
+    return 'stock_ville_avray' if store == 'ville_avray' else 'stock_garches'
+
+
+def load_products(product_ids: Iterable, strict: bool = True) -> Dict[int, Product]:
+    """
+    Charge tous les produits référencés en une seule requête (in_bulk)
+    En mode strict, lève Product.DoesNotExist si un identifiant est inconnu
+    """
+    ids = {int(pid) for pid in product_ids if pid}
+    products = Product.objects.in_bulk(ids) if ids else {}
+
+    if strict and len(products) != len(ids):
+        missing = sorted(ids - set(products))
+        raise Product.DoesNotExist(f"Produit(s) introuvable(s): {missing}")
+
+    return products
+
+
+def apply_stock_changes(store: str, deltas: Dict[int, int]) -> int:
+    """
+    Applique les variations de stock d'un magasin en un seul UPDATE
+    deltas: {product_id: variation} (négatif pour une sortie de stock)
+    """
+    deltas = {int(pid): int(delta) for pid, delta in deltas.items() if pid and delta}
+    if not deltas:
+        return 0
+
+    field = stock_field_for_store(store)
+    variation = Case(
+        *[When(id=pid, then=Value(delta)) for pid, delta in sorted(deltas.items())],
+        default=Value(0),
+        output_field=IntegerField()
+    )
+
+    return Product.objects.filter(id__in=deltas.keys()).update(
+        **{field: F(field) + variation, 'updated_at': timezone.now()}
+    )
+
+
+class LineItemWriter:
+    """
+    Écrit les lignes d'un document en un nombre constant de requêtes
+
+    Chaque ligne est un dictionnaire des champs du modèle de ligne
+    (product, quantity, unit_price_ht, unit_price_ttc, tva_rate, ...).
+    Les sous-totaux sont calculés ici car bulk_create n'appelle pas save().
+    """
+
+    def __init__(self, item_model, parent_field: str, quantity_field: str = 'quantity'):
+        self.item_model = item_model
+        self.parent_field = parent_field
+        self.quantity_field = quantity_field
+
+        field_names = {field.name for field in item_model._meta.get_fields()}
+        self.has_ttc = 'subtotal_ttc' in field_names
+
+    def build(self, parent, lines: List[Dict]) -> Dict:
+        """Construit les instances de lignes et les totaux sans toucher à la base"""
+        items = []
+        subtotal_ht = Decimal('0.00')
+        total_tva = Decimal('0.00')
+
+        for line in lines:
+            values = dict(line)
+            quantity = int(values[self.quantity_field])
+            unit_price_ht = quantize_amount(to_decimal(values['unit_price_ht']))
+            tva_rate = to_decimal(values.get('tva_rate', 20))
+
+            line_ht = quantize_amount(unit_price_ht * quantity)
+
+            if self.has_ttc:
+                unit_price_ttc = quantize_amount(to_decimal(values['unit_price_ttc']))
+                line_ttc = quantize_amount(unit_price_ttc * quantity)
+                values['unit_price_ttc'] = unit_price_ttc
+                values['subtotal_ttc'] = line_ttc
+                line_tva = line_ttc - line_ht
+            else:
+                line_tva = quantize_amount(line_ht * tva_rate / 100)
+
+            values[self.quantity_field] = quantity
+            values['unit_price_ht'] = unit_price_ht
+            values['tva_rate'] = tva_rate
+            values['subtotal_ht'] = line_ht
+            values[self.parent_field] = parent
+
+            items.append(self.item_model(**values))
+            subtotal_ht += line_ht
+            total_tva += line_tva
+
+        return {
+            'items': items,
+            'subtotal_ht': subtotal_ht,
+            'total_tva': total_tva,
+            'total_ttc': subtotal_ht + total_tva,
+        }
+
+    def write(self, parent, lines: List[Dict]) -> Dict:
+        """Insère toutes les lignes avec un seul bulk_create et retourne les totaux"""
+        result = self.build(parent, lines)
+        result['items'] = self.item_model.objects.bulk_create(result['items'])
+        logger.debug(
+            f"{len(result['items'])} lignes {self.item_model.__name__} écrites "
+            f"pour {self.parent_field}={getattr(parent, 'pk', None)}"
+        )
+        return result
+
+    @staticmethod
+    def stock_deltas(lines: List[Dict], quantity_field: str = 'quantity', sign: int = -1) -> Dict[int, int]:
+        """Regroupe les quantités par produit (une entrée par produit, signe appliqué)"""
+        deltas = {}
+        for line in lines:
+            product = line.get('product')
+            if product is None:
+                continue
+            product_id = product.pk if hasattr(product, 'pk') else int(product)
+            deltas[product_id] = deltas.get(product_id, 0) + sign * int(line[quantity_field])
+        return deltas
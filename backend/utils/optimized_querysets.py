@@ -158,18 +158,11 @@ class ClientQuerySet(models.QuerySet):
         )
     
     def with_lifetime_value(self):
-        """Calcule et ajoute la valeur vie client"""
-        from orders.models import Order
-        from repairs.models import Repair
-        
+        """Ajoute la valeur vie client (agrégats tenus à jour sur le client, sans jointure)"""
         return self.annotate(
-            orders_count=Count('orders'),
-            repairs_count=Count('repairs'),
-            total_orders_value=Sum('orders__total_ttc'),
-            total_repairs_value=Sum('repairs__estimated_cost'),
-            lifetime_value=Sum(
-                models.F('orders__total_ttc') + models.F('repairs__estimated_cost')
-            )
+            total_orders_value=F('orders_total'),
+            total_repairs_value=F('repairs_total'),
+            lifetime_value=F('total_purchases'),
         )
     
     def active_clients(self):
@@ -181,12 +174,8 @@ class ClientQuerySet(models.QuerySet):
         ).distinct()
     
     def vip_clients(self, min_value=1000):
-        """Filtre les clients VIP (valeur > min_value)"""
-        return self.annotate(
-            lifetime_value=Sum(
-                models.F('orders__total_ttc') + models.F('repairs__estimated_cost')
-            )
-        ).filter(lifetime_value__gte=min_value)
+        """Filtre les clients VIP (valeur > min_value, index sur total_purchases)"""
+        return self.filter(total_purchases__gte=min_value)
     
     def search_multiple_fields(self, query):
         """Recherche dans plusieurs champs"""
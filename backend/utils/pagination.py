@@ -0,0 +1,167 @@
+"""
+Pagination des listes volumineuses
+Mode par défaut : numéros de page (compatible avec le frontend existant)
+Mode curseur (opt-in via ?cursor=) : pagination par clé (created_at, id)
+sans COUNT(*) ni OFFSET, la page N coûte le même prix que la page 1
+"""
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+import hashlib
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class HybridCursorPagination(PageNumberPagination):
+    """
+    Pagination par numéro de page ou par curseur opaque
+
+    ?cursor=          première page en mode curseur
+    ?cursor=<jeton>   page suivante/précédente (jetons fournis dans next/previous)
+    Le tri est imposé en mode curseur : -created_at puis -id (index composite).
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Curseur invalide'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.cursor_query_param in request.query_params
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request.query_params.get(self.cursor_query_param))
+
+        backwards = cursor is not None and cursor['d'] == 'prev'
+        if backwards:
+            queryset = queryset.order_by('created_at', 'id')
+        else:
+            queryset = queryset.order_by('-created_at', '-id')
+
+        if cursor is not None:
+            created_at, pk = cursor['c'], cursor['i']
+            if backwards:
+                queryset = queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk))
+            else:
+                queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+        # Un élément de plus pour savoir s'il existe une page suivante
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if backwards:
+            rows.reverse()
+
+        self.page_rows = rows
+        self.has_next = has_more if not backwards else True
+        self.has_previous = cursor is not None and (has_more if backwards else True)
+        return rows
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_next_link(self):
+        if not self.cursor_mode:
+            return super().get_next_link()
+        if not self.has_next or not self.page_rows:
+            return None
+        return self.encode_cursor(self.page_rows[-1], 'next')
+
+    def get_previous_link(self):
+        if not self.cursor_mode:
+            return super().get_previous_link()
+        if not self.has_previous or not self.page_rows:
+            return None
+        return self.encode_cursor(self.page_rows[0], 'prev')
+
+    def encode_cursor(self, row, direction):
+        payload = json.dumps(
+            {'c': row.created_at.isoformat(), 'i': row.pk, 'd': direction},
+            separators=(',', ':')
+        )
+        token = urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+        url = remove_query_param(self.base_url, self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def decode_cursor(self, token):
+        if not token:
+            return None
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            payload = json.loads(urlsafe_b64decode(padded.encode()).decode())
+            created_at = parse_datetime(payload['c'])
+            if created_at is None or payload['d'] not in ('next', 'prev'):
+                raise ValueError
+            return {'c': created_at, 'i': int(payload['i']), 'd': payload['d']}
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties'].pop('count', None)
+        return response_schema
+
+
+class ListCountMixin:
+    """
+    Compte séparé pour les listes paginées par curseur : GET <liste>/count/
+    Mis en cache quelques instants par jeu de filtres ; sans filtre sur une
+    grande table PostgreSQL, l'estimation du planificateur est utilisée
+    """
+    count_cache_timeout = 60
+    count_estimate_threshold = 100000
+
+    @action(detail=False, methods=['get'])
+    def count(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        params = sorted(
+            (key, value) for key, value in request.query_params.lists()
+            if key not in ('cursor', 'page', 'page_size', 'ordering')
+        )
+        digest = hashlib.sha1(json.dumps(params).encode()).hexdigest()
+        cache_key = f"list_count:{queryset.model._meta.label_lower}:{digest}"
+
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return Response(cached)
+
+        result = None
+        if not params:
+            estimate = self._estimate_rows(queryset.model)
+            if estimate is not None and estimate >= self.count_estimate_threshold:
+                result = {'count': estimate, 'estimated': True}
+
+        if result is None:
+            result = {'count': queryset.order_by().count(), 'estimated': False}
+
+        cache.set(cache_key, result, self.count_cache_timeout)
+        return Response(result)
+
+    @staticmethod
+    def _estimate_rows(model):
+        """Nombre de lignes estimé par PostgreSQL (None sur les autres bases)"""
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [model._meta.db_table])
+            row = cursor.fetchone()
+        return int(row[0]) if row and row[0] and row[0] > 0 else None